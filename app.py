@@ -1,33 +1,22 @@
+import os
+
 import streamlit as st
-from llm_handler import LLMHandler
-from recommender import RunningRecommender
+from app_resources import RerunTimer, get_recommender, new_llm_handler, warm_up
+from plan_parser import PlanStreamParser
+from plan_schema import TABLE_COLUMNS, plan_table_rows
+from plan_templates import action_name
 
 import pandas as pd
-import re
-from io import StringIO
 
 try:
     from mileage_predictor import predict_next_week_mileage
 except ImportError:
     predict_next_week_mileage = None
 
-# --- Human-friendly mapping for action codes ---
-action_map = {
-    "progressive_build": "Progressive Build",
-    "recovery_week": "Recovery Week",
-    "gradual_build": "Gradual Build",
-    "taper": "Taper Phase",
-    "mandatory_recovery": "Mandatory Recovery",
-    "build_consistency": "Build Consistency",
-    "slow_progression": "Slow Progression",
-    "balanced_progression": "Balanced Progression",
-    "moderate_increase": "Moderate Increase",
-    "recovery_focus": "Recovery Focus",
-    "reduce_volume": "Reduce Volume",
-    "maintain_or_build": "Maintain or Build",
-    "progressive_overload": "Progressive Overload",
-    # Add more as needed
-}
+try:
+    from cluster_assignment import assign_cluster
+except ImportError:
+    assign_cluster = None
 
 st.set_page_config(
     page_title="Running Plan Builder",
@@ -36,6 +25,19 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Shared resources: loaded once per process, timed per rerun ---
+timer = RerunTimer()
+
+
+@st.cache_resource(show_spinner="Loading models...")
+def load_resources():
+    """Warm up the recommender, models and LLM client once per process."""
+    return warm_up(skip_missing=True)
+
+
+with timer.phase('load'):
+    resource_load_times = load_resources()
+
 # --- Custom CSS for a modern, earth-tone look ---
 st.markdown("""
     <style>
@@ -163,43 +165,24 @@ else:
     for i in range(6, 0, -1):
         val = st.sidebar.number_input(f"Week {i} ago", min_value=0.0, max_value=200.0, value=10.0)
         recent_mileage.append(val)
-    if predict_next_week_mileage:
-        predicted_mileage = predict_next_week_mileage(recent_mileage)
-    else:
-        predicted_mileage = sum(recent_mileage[-3:]) / 3 * 1.05
-
-def extract_markdown_table(text):
-    """
-    Extracts the first markdown table from a string and returns it as a pandas DataFrame.
-    """
-    lines = text.splitlines()
-    table_lines = []
-    in_table = False
-    for line in lines:
-        if re.match(r"^\|.*\|$", line):
-            table_lines.append(line)
-            in_table = True
-        elif in_table and (line.strip() == "" or not "|" in line):
-            break
-        elif in_table:
-            table_lines.append(line)
-    if table_lines:
-        # Remove alignment lines (those with only dashes and pipes)
-        table_str = "\n".join([l for l in table_lines if not re.match(r"^\|\s*:?-+:?\s*\|", l)])
-        try:
-            df = pd.read_csv(StringIO(table_str), sep="|").dropna(axis=1, how='all')
-            df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-            return df
-        except Exception:
-            return None
-    return None
+    with timer.phase('compute'):
+        if predict_next_week_mileage:
+            predicted_mileage = predict_next_week_mileage(recent_mileage)
+        else:
+            predicted_mileage = sum(recent_mileage[-3:]) / 3 * 1.05
+        # Place the runner from their history instead of the self-selected level
+        if assign_cluster:
+            cluster_id = assign_cluster(recent_mileage, training_days)
+    if assign_cluster:
+        detected_level = {v: k for k, v in cluster_map.items()}[cluster_id]
+        st.sidebar.caption(f"Detected level from your history: {detected_level.split(' (')[0]}")
 
 # --- Main Layout ---
 st.markdown("<div class='card'>", unsafe_allow_html=True)
 st.markdown("### Your Personalized Plan")
 if st.button("Generate My Plan"):
-    with st.spinner("Generating your plan..."):
-        recommender = RunningRecommender()
+    with st.spinner("Generating your plan..."), timer.phase('compute'):
+        recommender = get_recommender()
         rec = recommender.get_recommendation(
             cluster_id=cluster_id,
             current_weekly_mileage=current_mileage if plan_mode == "Quick Plan (for new runners)" else recent_mileage[-1],
@@ -209,11 +192,8 @@ if st.button("Generate My Plan"):
             goal_race_distance=goal_race_distance,
             weeks_until_race=weeks_until_race
         )
-        # Map action code to human-friendly phrase
-        rec['action'] = action_map.get(rec['action'], rec['action'].replace('_', ' ').title())
-        handler = LLMHandler()
-        plan = handler.get_friendly_plan(rec)
-
+        # Map action code to human-friendly phrase (plan_templates maps it back)
+        rec['action'] = action_name(rec['action'])
         # --- Plan Summary Section ---
         col1, col2 = st.columns([2, 1])
         with col1:
@@ -226,39 +206,78 @@ if st.button("Generate My Plan"):
             st.markdown(f"<div class='focus-area'>Fatigue: <b>{rec['current_fatigue']}</b></div>", unsafe_allow_html=True)
             st.markdown(f"<div class='focus-area'>Next Week Mileage: <b>{rec['predicted_mileage']:.1f}</b></div>", unsafe_allow_html=True)
 
-        # --- Extract summary, table, and coach's advice from LLM output ---
-        summary, table, rest = None, None, None
-        lines = plan.splitlines()
-        summary_lines = []
-        table_lines = []
-        in_table = False
-        for line in lines:
-            if line.strip().startswith("| Day") or line.strip().startswith("|Day"):
-                in_table = True
-                table_lines.append(line)
-            elif in_table and line.strip().startswith("|"):
-                table_lines.append(line)
-            elif in_table and (line.strip() == "" or not "|" in line):
-                in_table = False
-            elif not in_table and not table_lines:
-                summary_lines.append(line)
-        rest = "\n".join(lines[len(summary_lines) + len(table_lines):])
-        summary = "\n".join(summary_lines)
-        table = "\n".join(table_lines)
-
-        if summary.strip():
-            st.markdown(summary)
-        week_table = extract_markdown_table(table)
-        if week_table is not None and not week_table.empty:
-            st.markdown("#### 🗓️ Weekly Schedule")
-            st.table(week_table)
-        else:
-            st.info("No structured table found. Please check the plan below.")
+        # Structured plans (default) render the validated WeeklyPlan directly;
+        # PLAN_RESPONSE_MODE=stream renders Markdown progressively as it arrives
+        structured = os.getenv('PLAN_RESPONSE_MODE', 'structured') != 'stream'
+        summary_box = st.empty()
+        schedule_heading = st.empty()
+        table_box = st.empty()
         if rec['caution_flags']:
             st.markdown("<div class='focus-area'><b>⚠️ Cautions:</b><ul>" + "".join(f"<li>{c}</li>" for c in rec['caution_flags']) + "</ul></div>", unsafe_allow_html=True)
-        if rest.strip():
-            st.markdown("#### 📋 Coach's Advice")
-            st.markdown(rest)
+        advice_heading = st.empty()
+        advice_box = st.empty()
+
+        handler = new_llm_handler()
+        if structured:
+            weekly_plan = handler.get_structured_plan(rec)
+            summary_box.markdown(weekly_plan.summary)
+            schedule_heading.markdown("#### 🗓️ Weekly Schedule")
+            week_table = pd.DataFrame(plan_table_rows(weekly_plan), columns=TABLE_COLUMNS)
+            if not week_table['Notes'].any():
+                week_table = week_table.drop(columns='Notes')
+            table_box.table(week_table.set_index('Day'))
+            if weekly_plan.advice:
+                advice_heading.markdown("#### 📋 Coach's Advice")
+                advice_box.markdown(weekly_plan.advice)
+        else:
+            parser = PlanStreamParser()
+            summary_lines, columns, rows, advice_lines = [], [], [], []
+
+            def render(events):
+                for section, value in events:
+                    if section == 'summary':
+                        summary_lines.append(value)
+                    elif section == 'table_header':
+                        columns[:] = value
+                        schedule_heading.markdown("#### 🗓️ Weekly Schedule")
+                    elif section == 'table_row':
+                        rows.append((value + [''] * len(columns))[:len(columns)])
+                        table_box.table(pd.DataFrame(rows, columns=columns))
+                    elif section == 'advice':
+                        advice_lines.append(value)
+                # Show the line still being written while the summary streams in
+                if parser.section == 'summary':
+                    summary_box.markdown("\n".join(summary_lines + [parser.pending]))
+                else:
+                    summary_box.markdown("\n".join(summary_lines))
+                advice = "\n".join(advice_lines + [parser.pending]) if parser.section == 'advice' else ""
+                if advice.strip():
+                    advice_heading.markdown("#### 📋 Coach's Advice")
+                    advice_box.markdown(advice)
+
+            for chunk in handler.stream_friendly_plan(rec):
+                render(parser.feed(chunk))
+            render(parser.close())
+
+            if not rows:
+                table_box.info("No structured table found. Please check the plan below.")
+        source = {"cache": "cache", "llm": "Gemini", "template": "local template"}.get(handler.last_source)
+        if source and handler.cache is not None:
+            cache_stats = handler.cache.stats()
+            st.caption(f"Plan served from {source} · cache hit rate {cache_stats['hit_rate']:.0%}")
 else:
     st.info("Fill in your details on the left and click **Generate My Plan**!")
-st.markdown("</div>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("</div>", unsafe_allow_html=True)
+
+# --- Per-rerun timing ---
+with st.sidebar.expander("⏱️ Performance"):
+    timing = timer.summary()
+    st.markdown(
+        f"**This run:** {timing['total']:.0f} ms  \n"
+        f"Loading: {timing.get('load', 0.0):.1f} ms · Computing: {timing.get('compute', 0.0):.1f} ms · "
+        f"Rendering/other: {timing['other']:.1f} ms"
+    )
+    st.markdown("**Loaded once per process:**  \n" + "  \n".join(
+        f"{name}: {'not installed' if seconds is None else f'{seconds * 1000:.0f} ms'}"
+        for name, seconds in resource_load_times.items()
+    ))
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+App Resources
+Process-wide registry of the app's long-lived objects, with warm-up and rerun timing.
+
+Streamlit reruns app.py on every interaction, but imported modules stay
+loaded, so resources registered here are built once per process: the
+recommender (rules and cluster profiles), the mileage predictor, the cluster
+assigner, the profile outlier detector, and the LLM client with its response
+cache. warm_up() loads them all ahead of the first request, and RerunTimer
+splits each rerun into loading and computing time.
+"""
+
+import argparse
+import copy
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ResourceRegistry:
+    """
+    Lazily built, process-wide resources keyed by name.
+    Safe to use from Streamlit's concurrent session threads.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._resources = {}
+        self._load_times = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """
+        Register a factory for a resource.
+
+        Args:
+            name: Resource name
+            factory: Zero-argument callable that builds the resource
+        """
+        self._factories[name] = factory
+
+    def get(self, name):
+        """
+        Get a resource, building it on first use.
+
+        Args:
+            name: Registered resource name
+
+        Returns:
+            The shared resource
+
+        Raises:
+            KeyError: If no factory is registered under name
+        """
+        if name in self._resources:
+            return self._resources[name]
+        factory = self._factories[name]
+        with self._lock:
+            if name not in self._resources:
+                start = time.perf_counter()
+                self._resources[name] = factory()
+                self._load_times[name] = time.perf_counter() - start
+        return self._resources[name]
+
+    def warm_up(self, names=None, skip_missing=False):
+        """
+        Build resources ahead of the first request.
+
+        Args:
+            names: Resources to load (defaults to all registered)
+            skip_missing: Skip resources whose optional dependency isn't
+                installed instead of raising ImportError
+
+        Returns:
+            Dict of resource name -> load time in seconds (0 if already
+            loaded, None if skipped)
+        """
+        times = {}
+        for name in names or list(self._factories):
+            loaded = name in self._resources
+            try:
+                self.get(name)
+            except ImportError:
+                if not skip_missing:
+                    raise
+                times[name] = None
+                continue
+            times[name] = 0.0 if loaded else self._load_times[name]
+        return times
+
+    def loaded(self):
+        """Dict of loaded resource name -> seconds it took to build."""
+        return dict(self._load_times)
+
+    def clear(self):
+        """Drop every built resource; the next get() rebuilds it."""
+        with self._lock:
+            self._resources.clear()
+            self._load_times.clear()
+
+
+class RerunTimer:
+    """
+    Accumulates wall time per phase ('load', 'compute', ...) for one script run.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block under a phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def summary(self):
+        """
+        Milliseconds per phase, plus 'other' for untimed script time and 'total'.
+
+        Returns:
+            Dict of phase name -> milliseconds
+        """
+        total = time.perf_counter() - self.start
+        summary = {name: seconds * 1000 for name, seconds in self.phases.items()}
+        summary['other'] = max(total - sum(self.phases.values()), 0.0) * 1000
+        summary['total'] = total * 1000
+        return summary
+
+
+def _load_recommender():
+    from recommender import RunningRecommender
+    return RunningRecommender()
+
+
+def _load_predictor():
+    from mileage_predictor import LOOKBACK, get_predictor
+    predictor = get_predictor()
+    # First call initializes the backend's buffers/session
+    predictor.predict([10.0] * LOOKBACK)
+    return predictor
+
+
+def _load_cluster_assigner():
+    from cluster_assignment import assign_cluster, get_assigner
+    assign_cluster([10.0] * 6, 3)
+    return get_assigner()
+
+
+def _load_outlier_detector():
+    from outlier_detection import get_detector
+    return get_detector()
+
+
+def _load_llm_handler():
+    from llm_handler import LLMHandler
+    return LLMHandler()
+
+
+registry = ResourceRegistry()
+registry.register('recommender', _load_recommender)
+registry.register('mileage_predictor', _load_predictor)
+registry.register('cluster_assigner', _load_cluster_assigner)
+registry.register('outlier_detector', _load_outlier_detector)
+registry.register('llm_handler', _load_llm_handler)
+
+
+def warm_up(names=None, skip_missing=False):
+    """Load the app's resources; see ResourceRegistry.warm_up."""
+    return registry.warm_up(names, skip_missing)
+
+
+def get_recommender():
+    """Shared RunningRecommender."""
+    return registry.get('recommender')
+
+
+def get_mileage_predictor():
+    """Shared mileage predictor (backend chosen by MILEAGE_PREDICTOR_BACKEND)."""
+    return registry.get('mileage_predictor')
+
+
+def get_cluster_assigner():
+    """Shared ClusterAssigner."""
+    return registry.get('cluster_assigner')
+
+
+def get_outlier_detector():
+    """Shared OutlierDetector (saved DBSCAN model)."""
+    return registry.get('outlier_detector')
+
+
+def new_llm_handler():
+    """
+    LLM handler for one request.
+
+    The Gemini client and response cache are built once; each request gets a
+    shallow copy so per-request fields like last_source aren't shared
+    between sessions.
+    """
+    return copy.copy(registry.get('llm_handler'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up the app's models and clients")
+    parser.add_argument('names', nargs='*', help="Resources to load (default: all)")
+    args = parser.parse_args()
+
+    for name, seconds in warm_up(args.names or None, skip_missing=True).items():
+        status = "not installed" if seconds is None else f"{seconds * 1000:8.1f} ms"
+        print(f"{name:<20} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: cluster assignment (sklearn scaler + KMeans.predict vs NumPy nearest centroid)
+Run from the repository root: python benchmarks/bench_cluster_assignment.py
+"""
+
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from cluster_assignment import PROFILE_FEATURES, ClusterAssigner, profile_features
+
+ROSTER_SIZES = (115, 10_000, 1_000_000)
+
+
+def best_time(fn, repeats=5):
+    """Fastest of several runs, in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    # The saved models were fitted on DataFrames; arrays are fine for benchmarking
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    kmeans = joblib.load('models/kmeans_model.pkl')
+    scaler = joblib.load('models/clustering_scaler.pkl')
+    start = time.perf_counter()
+    assigner = ClusterAssigner()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    weekly = pd.read_csv('data/featured-data.csv')
+    one = profile_features(weekly)[list(PROFILE_FEATURES)].to_numpy()[:1]
+    rng = np.random.default_rng(0)
+
+    print("="*80)
+    print("CLUSTER ASSIGNMENT BENCHMARK")
+    print("="*80)
+    print(f"Model load:                        {load_ms:8.1f} ms")
+    print(f"Roster profiles from weekly rows:  {best_time(lambda: profile_features(weekly)):8.1f} ms")
+
+    n = 1000
+    sk_us = best_time(lambda: [kmeans.predict(scaler.transform(one)) for _ in range(n)]) * 1000 / n
+    np_us = best_time(lambda: [assigner.assign(one) for _ in range(n)]) * 1000 / n
+    print(f"Single athlete, sklearn:           {sk_us:8.1f} us")
+    print(f"Single athlete, NumPy:             {np_us:8.1f} us")
+
+    for size in ROSTER_SIZES:
+        X = rng.normal(size=(size, len(PROFILE_FEATURES))) * scaler.scale_ + scaler.mean_
+        sk_ms = best_time(lambda: kmeans.predict(scaler.transform(X)))
+        np_ms = best_time(lambda: assigner.assign(X))
+        print(f"Roster of {size:>9,}: sklearn {sk_ms:8.2f} ms   NumPy {np_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: loading data/ tables from CSV vs the Parquet feature store
+Run from the repository root: python benchmarks/bench_feature_store.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from feature_store import STORE_DIR, TABLES, load_table, read_csv_table
+
+
+def best_time(fn, repeats=10):
+    """Fastest of several runs, in milliseconds."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    print("="*80)
+    print("FEATURE STORE BENCHMARK (CSV vs Parquet)")
+    print("="*80)
+    print(f"{'table':<20}{'CSV':>10}{'Parquet':>10}{'3 cols':>10}{'1 athlete':>11}"
+          f"{'CSV MB':>9}{'PQ MB':>8}")
+
+    for name in TABLES:
+        csv_frame = read_csv_table(name)
+        parquet_frame = load_table(name)
+        athlete = [int(parquet_frame['athlete'].iloc[0])]
+        columns = list(parquet_frame.columns[:3])
+
+        csv_ms = best_time(lambda: read_csv_table(name))
+        parquet_ms = best_time(lambda: load_table(name))
+        projected_ms = best_time(lambda: load_table(name, columns=columns))
+        athlete_ms = best_time(lambda: load_table(name, athletes=athlete))
+
+        csv_mb = csv_frame.memory_usage(deep=True).sum() / 1e6
+        parquet_mb = parquet_frame.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<20}{csv_ms:8.2f}ms{parquet_ms:8.2f}ms{projected_ms:8.2f}ms{athlete_ms:9.2f}ms"
+              f"{csv_mb:9.2f}{parquet_mb:8.2f}")
+
+    print(f"\nStore size on disk: {sum(p.stat().st_size for p in STORE_DIR.glob('*.parquet')) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
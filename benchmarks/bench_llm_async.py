@@ -0,0 +1,52 @@
+"""
+Benchmark: serial vs asyncio plan generation for a roster, against the offline stub model
+Run from the repository root: python benchmarks/bench_llm_async.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from llm_handler import AsyncLLMHandler, LLMHandler
+from llm_http import StubModel
+from recommender import RunningRecommender
+
+ROSTER = 100
+DISTINCT = 60
+LATENCY = 0.25
+JITTER = 0.25
+
+
+def main():
+    recommender = RunningRecommender()
+    distinct = [recommender.get_recommendation(i % 3, 8.0 + i, 9.0 + i, 10.0 + i % 25, 3 + i % 4)
+                for i in range(DISTINCT)]
+    # Some runners share a plan, as on a real roster
+    roster = [distinct[i % DISTINCT] for i in range(ROSTER)]
+
+    print("="*80)
+    print(f"LLM GENERATION BENCHMARK ({ROSTER} plans, {DISTINCT} distinct, "
+          f"{LATENCY * 1000:.0f}-{(LATENCY + JITTER) * 1000:.0f} ms per call)")
+    print("="*80)
+
+    model = StubModel(latency=LATENCY, jitter=JITTER, seed=0)
+    handler = LLMHandler(model=model, cache=None)
+    start = time.perf_counter()
+    for rec in roster:
+        handler.get_friendly_plan(rec)
+    serial = time.perf_counter() - start
+    print(f"Serial LLMHandler:           {serial:6.2f} s  ({model.calls} upstream calls)")
+
+    for concurrency in (4, 16, 64):
+        model = StubModel(latency=LATENCY, jitter=JITTER, seed=0)
+        handler = AsyncLLMHandler(model=model, cache=None, max_concurrency=concurrency)
+        start = time.perf_counter()
+        handler.get_friendly_plans(roster)
+        elapsed = time.perf_counter() - start
+        print(f"Async, concurrency {concurrency:>3}:     {elapsed:6.2f} s  ({model.calls} upstream calls, "
+              f"{handler.stats['coalesced']} coalesced, {serial / elapsed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: LLM response cache lookups (memory LRU hit, SQLite hit, miss + write)
+Run from the repository root: python benchmarks/bench_llm_cache.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from llm_cache import ResponseCache, prompt_key, round_recommendation
+from llm_handler import LLMHandler
+from recommender import RunningRecommender
+
+PLAN = "| Day | Activity | Mileage (mi) |\n" * 40
+N = 2000
+
+
+def per_call_us(fn, n=N):
+    """Mean time per call over n calls, in microseconds."""
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    recommender = RunningRecommender()
+    handler = LLMHandler(model=object(), cache=None)
+    rec = recommender.get_recommendation(1, 20.0, 21.0, 15.0, 4)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp) / 'cache.sqlite', memory_entries=N)
+        keys = [f'{i:064x}' for i in range(N)]
+
+        key_us = per_call_us(lambda i: prompt_key(handler._build_prompt(round_recommendation(rec))))
+        write_us = per_call_us(lambda i: cache.put(keys[i], PLAN))
+        memory_us = per_call_us(lambda i: cache.get(keys[i]))
+        cache._memory.clear()
+        disk_us = per_call_us(lambda i: cache.get(keys[i]))
+        miss_us = per_call_us(lambda i: cache.get('missing'))
+        cache.close()
+
+    print("="*80)
+    print("LLM RESPONSE CACHE BENCHMARK")
+    print("="*80)
+    print(f"Round + build prompt + hash:  {key_us:8.1f} us")
+    print(f"Write (both tiers):           {write_us:8.1f} us")
+    print(f"Memory LRU hit:               {memory_us:8.1f} us")
+    print(f"SQLite hit:                   {disk_us:8.1f} us")
+    print(f"Miss:                         {miss_us:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
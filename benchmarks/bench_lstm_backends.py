@@ -0,0 +1,74 @@
+"""
+Benchmark: Keras vs NumPy vs ONNX LSTM backends (cold start, peak memory, batch latency)
+Run from the repository root: python benchmarks/bench_lstm_backends.py
+Each backend is measured in a fresh subprocess so imports and memory are not shared.
+Set MILEAGE_PREDICTOR_ONNX_THREADS to compare onnxruntime thread counts.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKENDS = ['keras', 'numpy', 'onnx']
+BATCH_SIZES = [1, 256, None]  # None = every sequence in featured-data.csv
+
+WORKER = """
+import json, resource, sys, time
+start = time.perf_counter()
+from mileage_predictor import get_predictor
+predictor = get_predictor(sys.argv[1])
+cold_start = time.perf_counter() - start
+
+sys.path.insert(0, 'benchmarks')
+from bench_mileage_predictor import all_sequences
+X = all_sequences()
+
+latency = {}
+for size in json.loads(sys.argv[2]):
+    batch = X if size is None else X[:size]
+    predictor.predict_batch(batch)  # warm up
+    times = []
+    for _ in range(5):
+        t = time.perf_counter()
+        predictor.predict_batch(batch)
+        times.append(time.perf_counter() - t)
+    latency[str(len(batch))] = min(times)
+
+print(json.dumps({
+    'cold_start': cold_start,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'latency': latency,
+}))
+"""
+
+
+def measure(backend):
+    """Run the worker for one backend and return its measurements."""
+    result = subprocess.run(
+        [sys.executable, '-c', WORKER, backend, json.dumps(BATCH_SIZES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {backend: measure(backend) for backend in BACKENDS}
+
+    print("="*80)
+    print("LSTM BACKEND BENCHMARK")
+    print("="*80)
+    print(f"{'':24}" + "".join(f"{backend:>14}" for backend in BACKENDS))
+    print(f"{'Cold start (import+load)':24}"
+          + "".join(f"{results[b]['cold_start']*1000:11.1f} ms" for b in BACKENDS))
+    print(f"{'Peak RSS':24}"
+          + "".join(f"{results[b]['max_rss_mb']:11.1f} MB" for b in BACKENDS))
+    for size in results[BACKENDS[0]]['latency']:
+        label = f"predict_batch ({int(size):,})"
+        print(f"{label:24}"
+              + "".join(f"{results[b]['latency'][size]*1000:11.2f} ms" for b in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: notebook-style LSTM fitting vs the tf.data training pipeline
+Run from the repository root: python benchmarks/bench_lstm_training.py [--copies 1 10] [--epochs 2]
+
+Grows the window set by repeating featured-data.csv's windows with mileage
+scaled by a random factor per copy, then times epochs of the same model fit
+three ways: the notebook's model.fit on in-memory arrays with batch 32, the
+tf.data pipeline at lstm_training's batch size, and the pipeline under mixed
+bfloat16 precision.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from lstm_training import BATCH_SIZE, build_model, configure_tensorflow, fit_scalers, make_dataset  # noqa: E402
+from sequence_builder import load_sequences  # noqa: E402
+
+NOTEBOOK_BATCH_SIZE = 32
+
+
+def grow_windows(X, y, copies, rng):
+    """Copies of every window, each scaled by its own factor."""
+    factor = rng.uniform(0.8, 1.2, (copies, 1))
+    X = (np.asarray(X)[None] * factor[:, :, None]).reshape(-1, X.shape[1])
+    y = (np.asarray(y)[None] * factor).reshape(-1)
+    return X, y
+
+
+def seconds_per_epoch(model, epochs, *args, **kwargs):
+    start = time.perf_counter()
+    model.fit(*args, epochs=epochs, verbose=0, **kwargs)
+    return (time.perf_counter() - start) / epochs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSTM training throughput")
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--epochs', type=int, default=2)
+    args = parser.parse_args()
+
+    sequences = load_sequences('data/featured-data.csv')
+    rng = np.random.default_rng(0)
+    print("LSTM TRAINING: seconds per epoch")
+    print("="*80)
+    print(f"{'Windows':>10}{'notebook (b=32)':>18}{f'tf.data (b={BATCH_SIZE})':>18}{'+ bfloat16':>14}")
+    for copies in args.copies:
+        X, y = grow_windows(sequences['X'], sequences['y'], copies, rng)
+        scaler_X, scaler_y = fit_scalers(X, y)
+
+        X_scaled = scaler_X.transform(X.reshape(-1, 1)).reshape(-1, X.shape[1], 1)
+        y_scaled = scaler_y.transform(y.reshape(-1, 1)).ravel()
+        dataset = make_dataset(X, y, scaler_X, scaler_y, BATCH_SIZE, shuffle=True)
+        with configure_tensorflow(precision='float32'):
+            notebook = seconds_per_epoch(build_model(), args.epochs, X_scaled, y_scaled,
+                                         batch_size=NOTEBOOK_BATCH_SIZE, shuffle=True)
+            pipeline = seconds_per_epoch(build_model(), args.epochs, dataset, shuffle=False)
+        with configure_tensorflow(precision='mixed_bfloat16'):
+            bfloat16 = seconds_per_epoch(build_model(), args.epochs, dataset, shuffle=False)
+        print(f"{len(y):>10,}{notebook:>17.2f}s{pipeline:>17.2f}s{bfloat16:>13.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark: scoring every 6-week sequence in featured-data.csv with one predict_batch call
+Run from the repository root: python benchmarks/bench_mileage_predictor.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from mileage_predictor import LOOKBACK, get_predictor
+
+
+def all_sequences(path='data/featured-data.csv'):
+    """Every 6-week window of weekly mileage, per athlete in time order."""
+    weekly = pd.read_csv(path, usecols=['athlete', 'timestamp', 'weekly_mileage'])
+    weekly = weekly.sort_values(['athlete', 'timestamp'])
+    windows = [
+        np.lib.stride_tricks.sliding_window_view(group.to_numpy(), LOOKBACK)
+        for _, group in weekly.groupby('athlete')['weekly_mileage']
+        if len(group) >= LOOKBACK
+    ]
+    return np.concatenate(windows)
+
+
+def main():
+    X = all_sequences()
+    
+    start = time.perf_counter()
+    predictor = get_predictor()
+    load_time = time.perf_counter() - start
+    
+    predictor.predict_batch(X[:LOOKBACK])  # warm up graph tracing
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        predictions = predictor.predict_batch(X)
+        times.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    predictor.predict(X[0])
+    single_time = time.perf_counter() - start
+    
+    print("="*80)
+    print(f"MILEAGE PREDICTOR BENCHMARK ({len(X):,} sequences)")
+    print("="*80)
+    print(f"Model load:           {load_time*1000:9.1f} ms")
+    print(f"predict_batch (all):  {min(times)*1000:9.1f} ms")
+    print(f"predict (single):     {single_time*1000:9.1f} ms")
+    print(f"Mean prediction:      {predictions.mean():9.1f} mi")
+
+
+if __name__ == "__main__":
+    main()
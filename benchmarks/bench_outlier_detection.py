@@ -0,0 +1,74 @@
+"""
+Benchmark: brute-force vs KD-tree k-distance curves and DBSCAN
+Run from the repository root: python benchmarks/bench_outlier_detection.py [--sizes 10000 100000]
+
+Builds synthetic rosters by resampling the real athlete profiles with noise
+(standardized, 6 features) and times the k-distance curve and a DBSCAN fit
+with brute-force neighbor search (skipped above BRUTE_LIMIT) and with the
+KD-tree used by outlier_detection, plus the knee search and flagging a
+roster against the saved core profiles.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cluster_assignment import PROFILE_FEATURES  # noqa: E402
+from outlier_detection import get_detector, k_distance_curve, knee_eps  # noqa: E402
+from reclustering import roster_profiles  # noqa: E402
+
+BRUTE_LIMIT = 100_000
+MIN_SAMPLES = 5
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tree-backed DBSCAN outlier detection")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    from sklearn.cluster import DBSCAN
+
+    rng = np.random.default_rng(0)
+    scaler = joblib.load('models/clustering_scaler.pkl')
+    base = roster_profiles(pd.read_csv('data/featured-data.csv'))[list(PROFILE_FEATURES)].to_numpy()
+    detector = get_detector()
+
+    print("="*80)
+    print("DBSCAN OUTLIER DETECTION: brute force vs KD-tree")
+    print("="*80)
+    print(f"{'Athletes':>10}{'k-dist brute':>14}{'k-dist tree':>13}{'DBSCAN brute':>14}{'DBSCAN tree':>13}"
+          f"{'knee eps':>10}{'flag':>8}")
+    for size in args.sizes:
+        raw = base[rng.integers(0, len(base), size)] * rng.normal(1.0, 0.05, (size, base.shape[1]))
+        X = scaler.transform(raw)
+
+        curve, tree_curve = timed(k_distance_curve, X, MIN_SAMPLES)
+        eps = knee_eps(curve)
+        fit = lambda algorithm: DBSCAN(eps=eps, min_samples=MIN_SAMPLES, algorithm=algorithm).fit(X)  # noqa: E731
+        tree_labels, tree_fit = timed(fit, 'kd_tree')
+        if size <= BRUTE_LIMIT:
+            _, brute_curve = timed(k_distance_curve, X, MIN_SAMPLES, algorithm='brute')
+            brute_labels, brute_fit = timed(fit, 'brute')
+            assert np.array_equal(brute_labels.labels_, tree_labels.labels_)
+            brute = f"{brute_curve:>13.2f}s", f"{brute_fit:>13.2f}s"
+        else:
+            brute = f"{'-':>14}", f"{'-':>14}"
+        _, flag = timed(detector.flag, raw)
+        print(f"{size:>10,}{brute[0]}{tree_curve:>12.2f}s{brute[1]}{tree_fit:>12.2f}s{eps:>10.3f}{flag:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
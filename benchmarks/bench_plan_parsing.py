@@ -0,0 +1,64 @@
+"""
+Benchmark: per-request plan parsing (Markdown scraping vs structured JSON)
+Run from the repository root: python benchmarks/bench_plan_parsing.py
+"""
+
+import re
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from plan_parser import parse_plan
+from plan_schema import plan_from_json, plan_to_json, plan_to_markdown, validate_plan
+from plan_templates import build_plan
+from recommender import RunningRecommender
+
+N = 2000
+
+
+def scrape_markdown(text):
+    """The app's former line scanner plus extract_markdown_table."""
+    lines = text.splitlines()
+    summary_lines, table_lines, in_table = [], [], False
+    for line in lines:
+        if line.strip().startswith("| Day") or line.strip().startswith("|Day"):
+            in_table = True
+            table_lines.append(line)
+        elif in_table and line.strip().startswith("|"):
+            table_lines.append(line)
+        elif in_table and (line.strip() == "" or "|" not in line):
+            in_table = False
+        elif not in_table and not table_lines:
+            summary_lines.append(line)
+    table_str = "\n".join(l for l in table_lines if not re.match(r"^\|\s*:?-+:?\s*\|", l))
+    df = pd.read_csv(StringIO(table_str), sep="|").dropna(axis=1, how='all')
+    return df.loc[:, ~df.columns.str.contains('^Unnamed')]
+
+
+def per_call_us(fn, text):
+    start = time.perf_counter()
+    for _ in range(N):
+        fn(text)
+    return (time.perf_counter() - start) / N * 1e6
+
+
+def main():
+    plan = build_plan(RunningRecommender().get_recommendation(2, 30.0, 33.0, 25.0, 5, 13.1, 6))
+    markdown = plan_to_markdown(plan)
+    as_json = plan_to_json(plan)
+
+    print("="*80)
+    print("PLAN PARSING BENCHMARK (per response)")
+    print("="*80)
+    print(f"Markdown scrape + pd.read_csv:     {per_call_us(scrape_markdown, markdown):8.1f} us")
+    print(f"Incremental Markdown parser:       {per_call_us(parse_plan, markdown):8.1f} us")
+    print(f"JSON validate_plan (model output): {per_call_us(validate_plan, as_json):8.1f} us")
+    print(f"JSON plan_from_json (cache hit):   {per_call_us(plan_from_json, as_json):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: vectorized multi-week simulation vs a per-athlete, per-week loop
+Run from the repository root: python benchmarks/bench_plan_simulator.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app_resources import get_mileage_predictor, get_recommender, warm_up
+from plan_simulator import PlanSimulator, make_scenarios, recovery_ratio
+
+ATHLETES = 2000
+WEEKS = 20
+ADHERENCE = [1.0, 0.9, 0.75, 0.5, 0.0]
+LOOP_ATHLETES = 50
+
+
+def make_roster(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(5, 45, n)
+    return {
+        'recent_mileage': base[:, None] * rng.uniform(0.8, 1.2, (n, 6)),
+        'cluster_id': rng.integers(0, 3, n),
+        'training_days': rng.integers(2, 7, n),
+        'goal_race_distance': rng.choice([6.2, 13.1, 26.2], n),
+        'weeks_until_race': rng.integers(12, WEEKS + 1, n).astype(float),
+    }
+
+
+def loop_simulation(roster, adherence):
+    """The same rollout with one predict and get_recommendation call per athlete-week."""
+    predictor, recommender = get_mileage_predictor(), get_recommender()
+    for i in range(len(roster['cluster_id'])):
+        window = list(roster['recent_mileage'][i])
+        days = int(roster['training_days'][i])
+        fatigue = window[-1] / recovery_ratio(days)
+        for week in range(int(roster['weeks_until_race'][i])):
+            current = window[-1]
+            predicted = predictor.predict(window[-6:])
+            rec = recommender.get_recommendation(
+                int(roster['cluster_id'][i]), current, predicted, fatigue, days,
+                roster['goal_race_distance'][i], roster['weeks_until_race'][i] - week)
+            low, high = recommender.volume_changes[rec['action']]
+            prescribed = min(max(predicted, current * (1 + low / 100)), current * (1 + high / 100))
+            run = max(current + adherence * (prescribed - current), 0.0)
+            window.append(run)
+            fatigue = run / recovery_ratio(days)
+            if rec['action'] == 'build_consistency':
+                days = min(days + 1, 7)
+
+
+def main():
+    warm_up(['recommender', 'mileage_predictor'])
+    roster = make_roster(ATHLETES)
+    simulator = PlanSimulator()
+    scenarios = make_scenarios(adherence=ADHERENCE)
+    rows = ATHLETES * len(ADHERENCE)
+
+    print("="*80)
+    print(f"PLAN SIMULATION BENCHMARK ({ATHLETES:,} athletes x {len(ADHERENCE)} scenarios, "
+          f"12-{WEEKS} weeks to race)")
+    print("="*80)
+
+    sample = {name: values[:LOOP_ATHLETES] for name, values in roster.items()}
+    start = time.perf_counter()
+    for adherence in ADHERENCE:
+        loop_simulation(sample, adherence)
+    loop = (time.perf_counter() - start) / (LOOP_ATHLETES * len(ADHERENCE)) * rows
+    print(f"Per-athlete loop (extrapolated from {LOOP_ATHLETES} athletes): {loop:7.2f} s")
+
+    start = time.perf_counter()
+    result = simulator.simulate(roster['recent_mileage'], roster['cluster_id'], roster['training_days'],
+                                goal_race_distance=roster['goal_race_distance'],
+                                weeks_until_race=roster['weeks_until_race'], scenarios=scenarios)
+    vectorized = time.perf_counter() - start
+    weeks = int(np.sum(result['action'] >= 0))
+    print(f"Vectorized simulator:                           {vectorized:7.2f} s  "
+          f"({weeks:,} athlete-weeks, {loop / vectorized:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: raw export ingestion vs pd.read_csv + pd.to_datetime
+Run from the repository root: python benchmarks/bench_raw_ingest.py [--scales 10 100] [--workers N]
+
+Builds exports 10x and 100x the size of data/raw-data-kaggle.csv (the rows
+repeated) in a temporary directory and times, for each size:
+  • pandas: pd.read_csv(sep=';') + pd.to_datetime(format=...) + the
+    notebook's filters (feature_engineering.read_raw_runs + clean_runs)
+  • pandas, inferred dates: pd.read_csv + pd.to_datetime(dayfirst=True)
+    without a format (parsing only, no cleaning)
+  • raw_ingest: fixed-format integer date parsing and one-mask filtering,
+    in one process and split into files across a process pool
+Every method must produce the same number of clean runs.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from feature_engineering import clean_runs, read_raw_runs  # noqa: E402
+from raw_ingest import ingest  # noqa: E402
+
+RAW_PATH = Path('data/raw-data-kaggle.csv')
+
+
+def pandas_inferred(path):
+    runs = pd.read_csv(path, sep=';')
+    runs['timestamp'] = pd.to_datetime(runs['timestamp'], dayfirst=True)
+    return runs
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark raw export ingestion")
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100], help="Multiples of the raw file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes for the pooled run")
+    args = parser.parse_args()
+
+    header, body = RAW_PATH.read_bytes().split(b'\n', 1)
+    print("="*80)
+    print(f"RAW INGESTION ({RAW_PATH}, {os.cpu_count()} CPUs, pool of {args.workers})")
+    print("="*80)
+    print(f"{'Size':>6}{'Rows':>11}{'MB':>8}{'read_csv+to_datetime':>22}{'inferred':>10}"
+          f"{'ingest':>9}{'pooled':>9}{'speedup':>9}")
+
+    with tempfile.TemporaryDirectory(prefix='bench-ingest-') as tmp:
+        for scale in args.scales:
+            path = Path(tmp) / f'x{scale}.csv'
+            path.write_bytes(header + b'\n' + body * scale)
+            # The same rows as one file per copy, for the pool
+            parts = Path(tmp) / f'x{scale}-parts'
+            parts.mkdir()
+            for i in range(max(args.workers, 1) * 2):
+                copies = scale // (args.workers * 2) + (i < scale % (args.workers * 2))
+                (parts / f'part-{i:03d}.csv').write_bytes(header + b'\n' + body * copies)
+
+            baseline, baseline_time = timed(lambda: clean_runs(read_raw_runs(path)))
+            inferred = f"{timed(pandas_inferred, path)[1]:.2f}s" if scale <= 10 else '-'
+            runs, ingest_time = timed(ingest, path, workers=1)
+            pooled, pooled_time = timed(ingest, parts, workers=args.workers)
+            assert len(runs) == len(baseline) == len(pooled)
+
+            rows = body.count(b'\n') * scale
+            print(f"{scale:>5}x{rows:>11,}{path.stat().st_size / 2**20:>8.0f}{baseline_time:>21.2f}s"
+                  f"{inferred:>10}{ingest_time:>8.2f}s{pooled_time:>8.2f}s"
+                  f"{baseline_time / min(ingest_time, pooled_time):>8.1f}x")
+            path.unlink()
+    print("\n(inferred dates timed at 10x only; the pool only pays off with more than one CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: k-sweep with full KMeans (notebook) vs warm-started MiniBatchKMeans
+Run from the repository root: python benchmarks/bench_reclustering.py [--sizes 20000 200000] [--workers N]
+
+Builds synthetic rosters by resampling the real athlete profiles with noise
+and sweeps k = 2..10. The notebook's approach refits KMeans(n_init=20) from
+scratch for every k and scores silhouette on every athlete (quadratic; only
+timed on the smallest roster). The reclustering sweep warm-starts
+MiniBatchKMeans from the saved centroids and scores a silhouette sample.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cluster_assignment import PROFILE_FEATURES  # noqa: E402
+from reclustering import DEFAULT_K_RANGE, load_current, roster_profiles, sweep  # noqa: E402
+
+FULL_SILHOUETTE_LIMIT = 20_000
+
+
+def synthetic_roster(profiles, size, rng):
+    X = profiles[list(PROFILE_FEATURES)].to_numpy()
+    rows = X[rng.integers(0, len(X), size)]
+    return rows * rng.normal(1.0, 0.05, rows.shape)
+
+
+def notebook_sweep(X):
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    for k in DEFAULT_K_RANGE:
+        labels = KMeans(n_clusters=k, random_state=42, n_init=20).fit_predict(X)
+        silhouette_score(X, labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the re-clustering k-sweep")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20_000, 200_000, 1_000_000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    profiles = roster_profiles(pd.read_csv('data/featured-data.csv'))
+    old_scaler, old_kmeans = load_current()
+
+    print("="*80)
+    print(f"RE-CLUSTERING K-SWEEP (k = {DEFAULT_K_RANGE.start}..{DEFAULT_K_RANGE.stop - 1}, "
+          f"{os.cpu_count()} CPUs, pool of {args.workers})")
+    print("="*80)
+    print(f"{'Athletes':>10}{'KMeans n_init=20':>18}{'MiniBatch warm':>16}{'speedup':>9}{'best k':>8}")
+    for size in args.sizes:
+        X_raw = synthetic_roster(profiles, size, rng)
+        scaler = StandardScaler().fit(X_raw)
+        X = scaler.transform(X_raw)
+        previous = scaler.transform(old_scaler.inverse_transform(old_kmeans.cluster_centers_))
+
+        start = time.perf_counter()
+        results = sweep(X, previous, workers=args.workers)
+        fast = time.perf_counter() - start
+        best = max(results, key=lambda r: r['silhouette'])['k']
+        if size <= FULL_SILHOUETTE_LIMIT:
+            start = time.perf_counter()
+            notebook_sweep(X)
+            slow = time.perf_counter() - start
+            print(f"{size:>10,}{slow:>17.1f}s{fast:>15.1f}s{slow / fast:>8.1f}x{best:>8}")
+        else:
+            print(f"{size:>10,}{'-':>18}{fast:>15.1f}s{'':>9}{best:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: per-athlete get_recommendation loop vs get_recommendations_batch
+Run from the repository root: python benchmarks/bench_recommender_batch.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from recommender import RunningRecommender
+
+
+def make_roster(n, seed=42):
+    """Random roster covering all clusters, rule branches and race phases."""
+    rng = np.random.default_rng(seed)
+    current = rng.uniform(3, 70, n).round(1)
+    return pd.DataFrame({
+        "cluster_id": rng.integers(0, 3, n),
+        "current_weekly_mileage": current,
+        "predicted_next_week_mileage": current * rng.uniform(0.8, 1.3, n),
+        "current_fatigue_index": rng.uniform(0, 60, n).round(1),
+        "training_days_per_week": rng.integers(1, 8, n),
+        "goal_race_distance": np.where(rng.random(n) < 0.5, np.nan,
+                                       rng.choice([3.1, 6.2, 13.1, 26.2], n)),
+        "weeks_until_race": rng.integers(1, 21, n).astype(float),
+    })
+
+
+def best_of(func, repeat):
+    """Best wall-clock time of several runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n=100_000):
+    recommender = RunningRecommender()
+    roster = make_roster(n)
+    
+    # Per-athlete kwargs are built up front so only get_recommendation is timed
+    kwargs = [
+        {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()}
+        for row in roster.to_dict("records")
+    ]
+    
+    loop_time = best_of(lambda: [recommender.get_recommendation(**kw) for kw in kwargs], 3)
+    batch_time = best_of(lambda: recommender.get_recommendations_batch(roster), 10)
+    
+    print("="*80)
+    print(f"RECOMMENDER BENCHMARK ({n:,} athletes)")
+    print("="*80)
+    print(f"Per-athlete loop: {loop_time*1000:9.1f} ms")
+    print(f"Batch:            {batch_time*1000:9.1f} ms")
+    print(f"Speedup:          {loop_time/batch_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: per-athlete loop vs batched roster plan generation
+Run from the repository root: python benchmarks/bench_roster_plans.py [--copies N] [--workers W]
+
+The 116-athlete weekly table is replicated under new athlete IDs to make a
+larger roster. The loop baseline predicts, assigns, recommends and renders
+one athlete at a time, as the app does; the batched runs use roster_plans.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app_resources import get_cluster_assigner, get_mileage_predictor, get_recommender, warm_up
+from plan_templates import build_plan
+from roster_plans import LOOKBACK, generate_roster_plans, latest_weeks, read_weekly
+
+
+def make_roster(copies):
+    weekly = read_weekly('data/featured-data.csv')
+    offset = int(weekly['athlete'].max()) + 1
+    return pd.concat([weekly.assign(athlete=weekly['athlete'] + i * offset) for i in range(copies)],
+                     ignore_index=True)
+
+
+def loop_baseline(weekly):
+    """One athlete at a time: predict, cluster, recommend, render."""
+    predictor, assigner, recommender = get_mileage_predictor(), get_cluster_assigner(), get_recommender()
+    latest, mileage = latest_weeks(weekly)
+    profiles = assigner.assign_weekly(weekly, recent_weeks=LOOKBACK)
+    for (athlete, row), history in zip(latest.iterrows(), mileage):
+        if row['weeks'] < LOOKBACK:
+            continue
+        predicted = predictor.predict(history)
+        cluster_id = assigner.assign_one(profiles.loc[athlete, :'avg_recovery_ratio'].to_dict())
+        rec = recommender.get_recommendation(cluster_id, history[-1], predicted,
+                                             row['fatigue'], row['training_days'])
+        build_plan(rec)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=20, help="Copies of the 116-athlete table")
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    weekly = make_roster(args.copies)
+    athletes = weekly['athlete'].nunique()
+    warm_up(['recommender', 'mileage_predictor', 'cluster_assigner'])
+
+    print("="*80)
+    print(f"ROSTER PLAN BENCHMARK ({athletes:,} athletes, {len(weekly):,} weekly rows)")
+    print("="*80)
+
+    start = time.perf_counter()
+    loop_baseline(weekly)
+    baseline = time.perf_counter() - start
+    print(f"Per-athlete loop (no output):  {baseline:6.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, workers in (("Batched, in-process", 0), (f"Batched, {args.workers} workers", args.workers)):
+            output = Path(tmp) / f'{workers}.jsonl'
+            summary = generate_roster_plans(weekly, output, workers=workers)
+            print(f"{label + ':':<30} {summary['seconds']:6.2f} s  "
+                  f"({baseline / summary['seconds']:4.1f}x, {output.stat().st_size / 1e6:.1f} MB JSONL)")
+        summary = generate_roster_plans(weekly, Path(tmp) / '0.jsonl')
+        print(f"{'Resume of a finished run:':<30} {summary['seconds']:6.2f} s  ({summary['skipped']:,} skipped)")
+
+
+if __name__ == "__main__":
+    main()
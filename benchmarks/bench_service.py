@@ -0,0 +1,155 @@
+"""
+Load test: recommendation service against a local stub LLM server
+Run from the repository root: python benchmarks/bench_service.py [--requests N] [--concurrency C]
+
+Starts the stub Gemini endpoint (llm_http.create_stub_app) and the service
+(LLM_BACKEND=http, so plans go over the pooled HTTP client) under uvicorn,
+then sends concurrent requests to each endpoint and reports p50/p99 latency
+and requests per second. The load generator, service and stub share the
+machine's CPUs, so on small hosts the numbers include client overhead.
+Requires uvicorn, starlette and httpx.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+STUB_LATENCY = 0.2
+BATCH_SIZE = 100
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(target, port, env):
+    """Run an ASGI app factory under uvicorn in a subprocess."""
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', target, '--factory', '--port', str(port),
+         '--log-level', 'warning', '--no-access-log'],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(client, url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:g}s")
+
+
+def athlete(rng):
+    history = [round(rng.uniform(5, 45), 1) for _ in range(6)]
+    return {
+        'recent_mileage': history,
+        'current_fatigue_index': round(rng.uniform(5, 45), 1),
+        'training_days_per_week': rng.randint(2, 6),
+    }
+
+
+async def load(client, url, bodies, concurrency):
+    """
+    Send every body with at most `concurrency` requests in flight.
+
+    Returns:
+        (latencies in seconds, wall time in seconds, error count)
+    """
+    queue = list(reversed(bodies))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            body = queue.pop()
+            start = time.perf_counter()
+            response = await client.post(url, json=body)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start, errors
+
+
+async def run(args):
+    import httpx
+
+    stub_port, service_port = free_port(), free_port()
+    cache_dir = tempfile.mkdtemp(prefix='bench-service-')
+    env = dict(os.environ, LLM_STUB_LATENCY=str(args.stub_latency))
+    stub = start_server('llm_http:create_stub_app', stub_port, env)
+    env = dict(os.environ, LLM_BACKEND='http', LLM_HTTP_URL=f'http://127.0.0.1:{stub_port}',
+               LLM_CACHE_PATH=str(Path(cache_dir) / 'cache.sqlite'),
+               LLM_MAX_CONCURRENCY=str(args.concurrency))
+    service = start_server('service:create_app', service_port, env)
+
+    base = f'http://127.0.0.1:{service_port}'
+    rng = random.Random(0)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+            await wait_ready(client, f'http://127.0.0.1:{stub_port}/')
+            await wait_ready(client, f'{base}/health')
+
+            print("="*80)
+            print(f"SERVICE LOAD TEST ({args.requests} requests per endpoint, concurrency {args.concurrency}, "
+                  f"stub LLM {args.stub_latency * 1000:.0f} ms)")
+            print("="*80)
+            print(f"{'Endpoint':<28}{'p50 (ms)':>10}{'p99 (ms)':>10}{'req/s':>10}{'errors':>8}")
+
+            scenarios = [
+                ('/recommend', [athlete(rng) for _ in range(args.requests)]),
+                ('/recommend/batch', [{'athletes': [athlete(rng) for _ in range(BATCH_SIZE)]}
+                                      for _ in range(max(args.requests // 10, 1))]),
+                ('/predict-mileage', [{'recent_mileage': athlete(rng)['recent_mileage']}
+                                      for _ in range(args.requests)]),
+                ('/plan', [athlete(rng) for _ in range(args.requests)]),
+            ]
+            # Second pass over the same plans is served from the response cache
+            scenarios.append(('/plan (cached)', scenarios[-1][1]))
+            for name, bodies in scenarios:
+                latencies, elapsed, errors = await load(client, base + name.split()[0], bodies, args.concurrency)
+                label = f"{name} x{BATCH_SIZE}" if name == '/recommend/batch' else name
+                print(f"{label:<28}{np.percentile(latencies, 50) * 1000:10.1f}"
+                      f"{np.percentile(latencies, 99) * 1000:10.1f}{len(bodies) / elapsed:10.0f}{errors:8d}")
+
+            llm = (await client.get(f'{base}/health')).json()['llm']
+            print(f"\nUpstream LLM calls: {llm['stats']['upstream_calls']}, "
+                  f"cache hit rate {llm['cache']['hit_rate']:.0%}")
+    finally:
+        for process in (service, stub):
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the recommendation service")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight")
+    parser.add_argument('--stub-latency', type=float, default=STUB_LATENCY,
+                        help="Seconds per stub LLM call")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
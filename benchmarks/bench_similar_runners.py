@@ -0,0 +1,90 @@
+"""
+Benchmark: similar-runners index build, incremental add and query latency
+Run from the repository root: python benchmarks/bench_similar_runners.py [--copies 1 10 50]
+
+Grows the roster by copying every athlete of featured-data.csv under new ids
+with their mileage and pace scaled by a random factor, builds the index in a
+temporary directory, then times adding 1% more athletes, opening the index
+(memory-mapped) and single queries: a brute-force scan of every window,
+exact search (nprobe=None) and the default inverted-file probe, with its
+recall of the exact 20 nearest.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from similar_runners import DEFAULT_K, SimilarRunnersIndex  # noqa: E402
+
+QUERIES = 200
+
+
+def grow_roster(weekly, copies, rng, first_id=0):
+    """Copies of every athlete under new ids, each with its own mileage scale."""
+    frames = []
+    athletes = weekly['athlete'].to_numpy()
+    ids, codes = np.unique(athletes, return_inverse=True)
+    for copy in range(copies):
+        frame = weekly.copy()
+        factor = rng.uniform(0.8, 1.2, len(ids))[codes]
+        frame['athlete'] = first_id + copy * len(ids) + codes
+        frame['weekly_mileage'] *= factor
+        frame['avg_weekly_pace_km'] *= rng.uniform(0.95, 1.05, len(ids))[codes]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def per_query_ms(func, queries):
+    start = time.perf_counter()
+    results = [func(q) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the similar-runners index")
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    weekly = pd.read_csv('data/featured-data.csv', parse_dates=['timestamp'])
+    rng = np.random.default_rng(0)
+    print("SIMILAR RUNNERS INDEX: build, add and query")
+    print("="*80)
+    print(f"{'Windows':>10}{'build':>9}{'add 1%':>9}{'open':>9}{'brute':>10}{'exact':>10}{'probe':>10}{'recall':>8}")
+    for copies in args.copies:
+        roster = weekly if copies == 1 else grow_roster(weekly, copies, rng)
+        extra = grow_roster(weekly[weekly['athlete'].isin(weekly['athlete'].unique()[:max(1, copies)])], 1, rng,
+                            first_id=10**7)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            index = SimilarRunnersIndex.build(roster, Path(tmp) / 'index')
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            index.add_weekly(extra)
+            add = time.perf_counter() - start
+            start = time.perf_counter()
+            index = SimilarRunnersIndex(Path(tmp) / 'index')
+            opened = (time.perf_counter() - start) * 1000
+
+            vectors = np.concatenate([np.asarray(s['vectors']) for s in index.segments])
+            queries = vectors[rng.choice(len(vectors), QUERIES)] + rng.normal(0, 0.05, (QUERIES, vectors.shape[1]))
+
+            def brute(q):
+                return np.sort(np.sqrt(((vectors - q) ** 2).sum(axis=1)))[:DEFAULT_K]
+
+            truth, brute_ms = per_query_ms(brute, queries)
+            _, exact_ms = per_query_ms(lambda q: index.search(q, nprobe=None), queries)
+            probed, probe_ms = per_query_ms(lambda q: index.search(q), queries)
+            recall = np.mean([np.mean(p['distance'] <= t[-1] + 1e-5) for p, t in zip(probed, truth)])
+        print(f"{len(index):>10,}{build:>8.2f}s{add:>8.2f}s{opened:>7.1f}ms{brute_ms:>8.2f}ms"
+              f"{exact_ms:>8.2f}ms{probe_ms:>8.2f}ms{recall:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
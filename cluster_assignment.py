@@ -0,0 +1,259 @@
+"""
+Cluster Assignment
+Assigns runners to training-profile clusters with the saved KMeans model.
+
+The clustering scaler and KMeans centroids are loaded once and applied as
+plain NumPy: standardize, then pick the nearest centroid. A single athlete or
+a whole roster is one vectorized distance computation, with no sklearn call
+per request.
+
+Profile features are the per-athlete means from notebooks/clustering_prep.ipynb,
+computed from weekly history (featured-data.csv rows or the app's inputs).
+"""
+
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MODELS_DIR = Path(__file__).resolve().parent / 'models'
+PROFILES_PATH = MODELS_DIR.parent / 'data' / 'cluster_profiles.json'
+
+# Profile feature -> weekly column it averages, in the scaler/KMeans order
+PROFILE_FEATURES = {
+    'avg_weekly_mileage': 'weekly_mileage',
+    'avg_pace_km': 'avg_weekly_pace_km',
+    'avg_training_days': 'actual_training_days',
+    'avg_fatigue_index': 'fatigue_index',
+    'avg_consistency_index': 'consistency_index',
+    'avg_recovery_ratio': 'recovery_ratio',
+}
+
+# KMeans label -> recommender cluster_id. cluster_profiles.json is keyed by
+# KMeans label (0 Consistent Cruiser, 1 Foundation Builder, 2 Competitive Peak);
+# recommendation_rules.json by experience level (0 Foundation, 1 Cruiser, 2 Peak).
+# Re-clustered models record the map per label in cluster_profiles.json
+# ('recommender_cluster_id'), which takes precedence.
+KMEANS_TO_RECOMMENDER = {0: 1, 1: 0, 2: 2}
+
+
+class ClusterAssigner:
+    """
+    Nearest-centroid cluster assignment from the saved scaler and KMeans model.
+    """
+
+    def __init__(self,
+                 kmeans_path=MODELS_DIR / 'kmeans_model.pkl',
+                 scaler_path=MODELS_DIR / 'clustering_scaler.pkl',
+                 label_map=None,
+                 profiles_path=PROFILES_PATH):
+        """
+        Load the models and keep only the arrays needed for assignment.
+
+        Args:
+            kmeans_path: Path to the fitted KMeans model
+            scaler_path: Path to the fitted StandardScaler
+            label_map: KMeans label -> recommender cluster_id (defaults to
+                the map recorded in profiles_path, else KMEANS_TO_RECOMMENDER)
+            profiles_path: cluster_profiles.json for the model
+
+        Raises:
+            ValueError: If a KMeans label has no recommender cluster_id
+        """
+        import joblib
+
+        kmeans = joblib.load(kmeans_path)
+        scaler = joblib.load(scaler_path)
+
+        self.centers = np.asarray(kmeans.cluster_centers_, dtype=np.float64)
+        self._mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self._inv_scale = 1.0 / np.asarray(scaler.scale_, dtype=np.float64)
+        self._offset = self._mean * self._inv_scale
+
+        # Fold standardization into the centroids: with z = (x - mean) / scale,
+        # |z - c|^2 - |z|^2 = x.(-2c/scale) + (|c|^2 + 2 c.(mean/scale))
+        self._weights = -2.0 * self.centers * self._inv_scale
+        self._bias = (self.centers ** 2).sum(axis=1) + 2.0 * self.centers @ self._offset
+
+        label_map = load_label_map(profiles_path) if label_map is None else label_map
+        missing = [label for label in range(len(self.centers)) if label not in label_map]
+        if missing:
+            raise ValueError(f"No recommender cluster_id for KMeans labels {missing}; "
+                             f"re-cluster with reclustering.py to record them")
+        self._cluster_ids = np.array([label_map[label] for label in range(len(self.centers))])
+
+    def assign(self, features):
+        """
+        Assign clusters to a batch of profile feature rows.
+
+        Missing features (NaN) are treated as the population mean.
+
+        Args:
+            features: Array-like of shape (N, 6) in PROFILE_FEATURES order,
+                or a DataFrame with those columns
+
+        Raises:
+            ValueError: If the rows do not have 6 features
+
+        Returns:
+            Dict of arrays: cluster_id (recommender IDs), kmeans_label and
+            distance (to the nearest centroid, in standardized units)
+        """
+        if isinstance(features, pd.DataFrame):
+            features = features[list(PROFILE_FEATURES)].to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        if X.shape[1] != len(PROFILE_FEATURES):
+            raise ValueError(f"Expected {len(PROFILE_FEATURES)} profile features, got {X.shape[1]}")
+
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self._mean, X)
+
+        # One (k, 6) x (6, N) product scores every row against every centroid
+        scores = self._weights @ X.T
+        scores += self._bias[:, np.newaxis]
+        labels = scores.argmin(axis=0)
+
+        Z = X * self._inv_scale
+        Z -= self._offset
+        nearest = np.einsum('ij,ij->i', Z, Z) + scores[labels, np.arange(len(labels))]
+
+        return {
+            'cluster_id': self._cluster_ids[labels],
+            'kmeans_label': labels,
+            'distance': np.sqrt(np.maximum(nearest, 0.0)),
+        }
+
+    def assign_one(self, features):
+        """
+        Assign a cluster to one athlete.
+
+        Args:
+            features: Dict keyed by PROFILE_FEATURES or a sequence of 6 values
+
+        Returns:
+            Recommender cluster_id as an int
+        """
+        if isinstance(features, dict):
+            features = [features.get(name, np.nan) for name in PROFILE_FEATURES]
+        return int(self.assign([features])['cluster_id'][0])
+
+    def assign_weekly(self, weekly, recent_weeks=None):
+        """
+        Assign clusters to every athlete in a weekly feature table.
+
+        Args:
+            weekly: Weekly features (featured-data.csv columns)
+            recent_weeks: Only average each athlete's latest N weeks
+
+        Returns:
+            DataFrame indexed by athlete with profile features, cluster_id,
+            kmeans_label and distance
+        """
+        profiles = profile_features(weekly, recent_weeks)
+        assignment = self.assign(profiles)
+        for column, values in assignment.items():
+            profiles[column] = values
+        return profiles
+
+
+def load_label_map(profiles_path=PROFILES_PATH):
+    """
+    KMeans label -> recommender cluster_id for a cluster_profiles.json.
+
+    Args:
+        profiles_path: cluster_profiles.json, keyed by KMeans label
+
+    Returns:
+        The recorded 'recommender_cluster_id' of every label, or
+        KMEANS_TO_RECOMMENDER when the file does not record them
+    """
+    try:
+        with open(profiles_path) as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        return dict(KMEANS_TO_RECOMMENDER)
+    if profiles and all('recommender_cluster_id' in profile for profile in profiles.values()):
+        return {int(label): int(profile['recommender_cluster_id']) for label, profile in profiles.items()}
+    return dict(KMEANS_TO_RECOMMENDER)
+
+
+def profile_features(weekly, recent_weeks=None):
+    """
+    Average weekly features into one clustering profile per athlete.
+
+    Args:
+        weekly: Weekly features with athlete, timestamp and the PROFILE_FEATURES
+            source columns
+        recent_weeks: Only average each athlete's latest N weeks
+
+    Returns:
+        DataFrame indexed by athlete with PROFILE_FEATURES columns
+    """
+    if recent_weeks is not None:
+        weekly = weekly.sort_values(['athlete', 'timestamp']).groupby('athlete').tail(recent_weeks)
+    profiles = weekly.groupby('athlete')[list(PROFILE_FEATURES.values())].mean()
+    profiles.columns = list(PROFILE_FEATURES)
+    return profiles
+
+
+def profile_from_recent_mileage(recent_mileage, training_days, pace_km=None):
+    """
+    Build a profile from the app's inputs: recent weekly mileage and run days.
+
+    Applies the feature engineering formulas (recovery ratio, fatigue index,
+    4-week rolling std) to the entered weeks. Pace is left missing unless
+    given, which assign() treats as the population mean.
+
+    Args:
+        recent_mileage: Weekly mileage, oldest first
+        training_days: Runs per week
+        pace_km: Average pace in min/km, if known
+
+    Returns:
+        Dict keyed by PROFILE_FEATURES
+    """
+    mileage = pd.Series(recent_mileage, dtype=np.float64)
+    days = min(int(training_days), 7)
+    recovery_ratio = (7 - days) / max(days, 1) or 0.1
+
+    return {
+        'avg_weekly_mileage': mileage.mean(),
+        'avg_pace_km': np.nan if pace_km is None else float(pace_km),
+        'avg_training_days': float(days),
+        'avg_fatigue_index': (mileage / recovery_ratio).mean(),
+        'avg_consistency_index': mileage.rolling(window=4, min_periods=2).std().mean(),
+        'avg_recovery_ratio': recovery_ratio,
+    }
+
+
+_assigner = None
+_assigner_lock = threading.Lock()
+
+
+def get_assigner():
+    """Get the process-wide ClusterAssigner, loading the models on first use."""
+    global _assigner
+    if _assigner is None:
+        with _assigner_lock:
+            if _assigner is None:
+                _assigner = ClusterAssigner()
+    return _assigner
+
+
+def assign_cluster(recent_mileage, training_days, pace_km=None):
+    """
+    Recommender cluster_id for a runner described by the app's inputs.
+
+    Args:
+        recent_mileage: Weekly mileage, oldest first
+        training_days: Runs per week
+        pace_km: Average pace in min/km, if known
+
+    Returns:
+        Recommender cluster_id as an int
+    """
+    profile = profile_from_recent_mileage(recent_mileage, training_days, pace_km)
+    return get_assigner().assign_one(profile)
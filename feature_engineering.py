@@ -0,0 +1,627 @@
+"""
+Feature Engineering Pipeline
+Turns the raw Strava export into weekly training features (featured-data.csv).
+
+Mirrors notebooks/data_exploration.ipynb (cleaning) and
+notebooks/feature_engineering.ipynb (weekly aggregation and features), with a
+streaming mode whose memory does not grow with the export:
+
+  1. Raw runs are read in chunks, cleaned, and reduced to partial weekly sums
+     per (athlete, week). Runs are never held in memory all at once.
+  2. The export lists each athlete's runs as one contiguous block, so an
+     athlete is finalized - weekly aggregates, features, filters - and
+     yielded as soon as their block ends. Only the athlete whose block is
+     still open, plus athletes whose runs appear in more than one block
+     (found by a cheap first pass over the athlete column), are carried
+     between chunks.
+
+WeeklyFeatureBuilder computes the per-athlete features in (athlete, week)
+order, carrying each athlete's previous weeks, rolling window and cumulative
+mileage across batch boundaries. IncrementalFeatureUpdater reuses the same
+state to fold newly uploaded runs into an existing table, recomputing only the
+affected athlete's weeks.
+
+The default is one feature + filter pass, as in a clean top-to-bottom
+notebook run. The committed data/featured-data.csv instead came from
+re-running the notebook's "Part 2" cell (features + filters) in the same
+session, each re-run recomputing the features on the already-filtered weeks;
+reproduce_shipped=True replays SHIPPED_FEATURE_PASSES of them to regenerate
+that file. The pass count was found by matching the file, not chosen.
+
+Usage:
+    python feature_engineering.py data/raw-data-kaggle.csv featured.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAW_PATH = Path(__file__).resolve().parent / 'data' / 'raw-data-kaggle.csv'
+RAW_SEPARATOR = ';'
+RAW_TIMESTAMP_FORMAT = '%d/%m/%Y %H:%M'
+MILES_PER_METER = 0.000621371
+
+# Weeks in the rolling std behind consistency_index
+CONSISTENCY_WINDOW = 4
+
+# Feature/filter passes that reproduce the committed data/featured-data.csv
+# (compatibility only; see reproduce_shipped)
+SHIPPED_FEATURE_PASSES = 8
+
+# Weekly aggregate columns (finalize_weeks output)
+WEEKLY_COLUMNS = [
+    'athlete', 'timestamp', 'weekly_distance_m', 'weekly_mileage', 'weekly_time_s',
+    'avg_weekly_pace_km', 'avg_weekly_pace_mile', 'weekly_elevation_m',
+    'average heart rate (bpm)', 'training_days',
+]
+
+# Column order of data/featured-data.csv
+FEATURE_COLUMNS = [
+    'athlete', 'timestamp', 'weekly_distance_m', 'weekly_mileage', 'weekly_time_s',
+    'avg_weekly_pace_km', 'avg_weekly_pace_mile', 'weekly_elevation_m',
+    'average heart rate (bpm)', 'training_days', 'weekly_mileage_change',
+    'consistency_index', 'rest_days', 'recovery_ratio', 'fatigue_index',
+    'cumulative_mileage', 'training_intensity', 'actual_training_days',
+]
+
+# Per (athlete, week) sums that can be merged across chunks
+_PARTIAL_SUMS = {
+    'distance (m)': 'weekly_distance_m',
+    'distance_miles': 'weekly_mileage',
+    'elapsed time (s)': 'weekly_time_s',
+    'pace_min_per_km': 'pace_km_sum',
+    'pace_min_per_mile': 'pace_mile_sum',
+    'elevation gain (m)': 'weekly_elevation_m',
+    'average heart rate (bpm)': 'heart_rate_sum',
+}
+
+
+def read_raw_runs(path, chunksize=None):
+    """
+    Read the raw activity export.
+
+    Args:
+        path: Path to the ';'-separated raw CSV
+        chunksize: Rows per chunk, or None to read everything at once
+
+    Returns:
+        DataFrame, or an iterator of DataFrames when chunksize is set
+    """
+    return pd.read_csv(path, sep=RAW_SEPARATOR, chunksize=chunksize)
+
+
+def clean_runs(runs):
+    """
+    Drop invalid and unrealistic runs and add pace/distance columns.
+
+    Each row is handled independently, so this works on any chunk.
+
+    Args:
+        runs: Raw runs as read from the export
+
+    Returns:
+        Cleaned DataFrame with parsed timestamps
+    """
+    runs = runs[(runs['distance (m)'] > 0) & (runs['elapsed time (s)'] > 0)]
+    runs = runs[(runs['elapsed time (s)'] <= 43200) & (runs['elevation gain (m)'] <= 3000)].copy()
+
+    runs.loc[runs['average heart rate (bpm)'] == 0, 'average heart rate (bpm)'] = None
+    runs['timestamp'] = pd.to_datetime(runs['timestamp'], format=RAW_TIMESTAMP_FORMAT)
+
+    minutes = runs['elapsed time (s)'] / 60
+    runs['pace_min_per_km'] = minutes / (runs['distance (m)'] / 1000)
+    runs['distance_miles'] = runs['distance (m)'] * MILES_PER_METER
+    runs['pace_min_per_mile'] = minutes / runs['distance_miles']
+
+    heart_rate = runs['average heart rate (bpm)']
+    runs = runs[
+        (runs['distance (m)'] >= 500)
+        & (runs['pace_min_per_km'] >= 2) & (runs['pace_min_per_km'] <= 15)
+        & (heart_rate.isna() | ((heart_rate >= 60) & (heart_rate <= 220)))
+    ]
+    return runs
+
+
+def aggregate_partial_weeks(runs):
+    """
+    Reduce cleaned runs to mergeable weekly sums and counts.
+
+    Args:
+        runs: Output of clean_runs
+
+    Returns:
+        DataFrame indexed by (athlete, week) with sums, run and heart-rate counts
+    """
+    week = runs['timestamp'].dt.to_period('W').dt.to_timestamp().rename('timestamp')
+    grouped = runs.groupby([runs['athlete'], week])
+    partial = grouped[list(_PARTIAL_SUMS)].sum().rename(columns=_PARTIAL_SUMS)
+    partial['heart_rate_count'] = grouped['average heart rate (bpm)'].count()
+    partial['training_days'] = grouped.size()
+    return partial
+
+
+def merge_partial_weeks(partials):
+    """
+    Combine partial weekly sums from several chunks.
+
+    Args:
+        partials: Iterable of aggregate_partial_weeks outputs
+
+    Returns:
+        One partial frame with a row per (athlete, week)
+    """
+    partials = [partial for partial in partials if len(partial)]
+    if not partials:
+        return aggregate_partial_weeks(clean_runs(_empty_raw_runs()))
+    if len(partials) == 1:
+        return partials[0]
+    return pd.concat(partials).groupby(level=['athlete', 'timestamp']).sum()
+
+
+def finalize_weeks(partial):
+    """
+    Turn partial sums into the notebook's weekly aggregates.
+
+    Args:
+        partial: Output of aggregate_partial_weeks / merge_partial_weeks
+
+    Returns:
+        DataFrame sorted by athlete and week with one row per athlete-week
+    """
+    partial = partial.sort_index()
+    runs = partial['training_days']
+    heart_rate = partial['heart_rate_sum'] / partial['heart_rate_count'].where(partial['heart_rate_count'] > 0)
+
+    weekly = pd.DataFrame({
+        'weekly_distance_m': partial['weekly_distance_m'],
+        'weekly_mileage': partial['weekly_mileage'],
+        'weekly_time_s': partial['weekly_time_s'],
+        'avg_weekly_pace_km': partial['pace_km_sum'] / runs,
+        'avg_weekly_pace_mile': partial['pace_mile_sum'] / runs,
+        'weekly_elevation_m': partial['weekly_elevation_m'],
+        'average heart rate (bpm)': heart_rate,
+        'training_days': runs.astype('int64'),
+    })
+    return weekly.reset_index()
+
+
+class WeeklyFeatureBuilder:
+    """
+    Adds the per-athlete weekly features, carrying state between batches.
+
+    Feed weekly aggregates in chronological order per athlete; any batch
+    split gives the same result as computing everything in one frame.
+    """
+
+    def __init__(self):
+        """Start with no athlete history."""
+        # athlete -> {'recent': last CONSISTENCY_WINDOW - 1 mileages,
+        #             'cumulative': cumulative mileage, 'last_week': Timestamp}
+        self.state = {}
+
+    def add_weeks(self, weekly):
+        """
+        Compute features for new weeks and update the carried state.
+
+        Args:
+            weekly: Weekly aggregates (finalize_weeks output); every week must
+                come after the athlete's last week already seen
+
+        Returns:
+            DataFrame in FEATURE_COLUMNS order, before recreational filtering
+
+        Raises:
+            ValueError: If a week is not newer than the athlete's last week
+        """
+        weekly = weekly.sort_values(['athlete', 'timestamp'], kind='stable').reset_index(drop=True)
+        self._check_chronological(weekly)
+
+        history = self._history_rows(weekly['athlete'].unique())
+        new = weekly[['athlete', 'weekly_mileage']].assign(_cumulative_input=weekly['weekly_mileage'])
+        if len(history):
+            combined = pd.concat([history, new], ignore_index=True)
+            combined = combined.sort_values('athlete', kind='stable')
+        else:
+            combined = new
+
+        mileage = combined.groupby('athlete')['weekly_mileage']
+        combined['weekly_mileage_change'] = mileage.diff()
+        combined['consistency_index'] = mileage.transform(
+            lambda x: x.rolling(window=CONSISTENCY_WINDOW, min_periods=2).std()
+        )
+        combined['cumulative_mileage'] = combined.groupby('athlete')['_cumulative_input'].cumsum()
+
+        self._update_state(combined, weekly)
+
+        new_rows = combined.index >= len(history)
+        derived = combined[new_rows].sort_index()
+        derived.index = derived.index - len(history)
+
+        featured = weekly.copy()
+        for column in ('weekly_mileage_change', 'consistency_index', 'cumulative_mileage'):
+            featured[column] = derived[column]
+        return add_row_features(featured)[FEATURE_COLUMNS]
+
+    def _check_chronological(self, weekly):
+        """Reject weeks at or before an athlete's last processed week."""
+        if not self.state:
+            return
+        first_weeks = weekly.groupby('athlete')['timestamp'].min()
+        for athlete, first_week in first_weeks.items():
+            previous = self.state.get(athlete)
+            if previous is not None and first_week <= previous['last_week']:
+                raise ValueError(
+                    f"Athlete {athlete}: week {first_week.date()} is not after "
+                    f"already processed week {previous['last_week'].date()}"
+                )
+
+    def _history_rows(self, athletes):
+        """Carried weeks to prepend so diff/rolling/cumsum continue seamlessly."""
+        rows = []
+        for athlete in athletes:
+            previous = self.state.get(athlete)
+            if previous is None:
+                continue
+            recent = previous['recent']
+            # cumsum over [0, ..., 0, cumulative, new weeks...] continues the
+            # running total with the same additions as one long cumsum
+            cumulative_inputs = [0.0] * (len(recent) - 1) + [previous['cumulative']]
+            rows.extend(zip([athlete] * len(recent), recent, cumulative_inputs))
+        return pd.DataFrame(rows, columns=['athlete', 'weekly_mileage', '_cumulative_input'])
+
+    def _update_state(self, combined, weekly):
+        """Remember each athlete's latest weeks, running total and last week."""
+        tail = combined.groupby('athlete').tail(CONSISTENCY_WINDOW - 1)
+        last_weeks = weekly.groupby('athlete')['timestamp'].max()
+        cumulative = combined.groupby('athlete')['cumulative_mileage'].last()
+        for athlete, recent in tail.groupby('athlete')['weekly_mileage']:
+            self.state[athlete] = {
+                'recent': recent.tolist(),
+                'cumulative': cumulative[athlete],
+                'last_week': last_weeks[athlete],
+            }
+
+
+def add_row_features(weekly):
+    """
+    Add the features that depend only on the week itself.
+
+    Args:
+        weekly: Weekly aggregates
+
+    Returns:
+        Copy with rest, recovery, fatigue and intensity columns added
+    """
+    weekly = weekly.copy()
+    weekly['actual_training_days'] = weekly['training_days'].clip(upper=7)
+    weekly['rest_days'] = 7 - weekly['actual_training_days']
+    weekly['recovery_ratio'] = weekly['rest_days'] / weekly['actual_training_days'].replace(0, 1)
+    weekly.loc[weekly['recovery_ratio'] == 0, 'recovery_ratio'] = 0.1
+    weekly['fatigue_index'] = weekly['weekly_mileage'] / weekly['recovery_ratio']
+    weekly['training_intensity'] = 1 / weekly['avg_weekly_pace_km']
+    return weekly
+
+
+def filter_recreational(featured):
+    """
+    Keep recreational-runner weeks (3-70 miles, week-over-week change within 40).
+
+    Args:
+        featured: Weekly features
+
+    Returns:
+        Filtered DataFrame
+    """
+    change = featured['weekly_mileage_change']
+    return featured[
+        (featured['weekly_mileage'] <= 70)
+        & (change.isna() | (change.abs() <= 40))
+        & (featured['weekly_mileage'] >= 3)
+    ]
+
+
+class IncrementalFeatureUpdater:
+    """
+    Keeps the weekly feature table current as new runs are uploaded.
+
+    Per athlete it stores the mergeable weekly sums and the unfiltered weekly
+    features. New runs only recompute that athlete's weeks from the earliest
+    week they touch onward (cumulative_mileage shifts every later week);
+    earlier weeks and other athletes are left untouched. Matches a full
+    single-pass rebuild (build_features with the default reproduce_shipped=False).
+    """
+
+    def __init__(self):
+        """Start with an empty table."""
+        # athlete -> partial weekly sums indexed by week
+        self._partials = {}
+        # athlete -> unfiltered features (FEATURE_COLUMNS) in week order
+        self._features = {}
+
+    @classmethod
+    def from_raw(cls, raw_path=RAW_PATH, chunksize=100_000):
+        """
+        Build the table from a full raw export.
+
+        Args:
+            raw_path: Path to the raw activity export
+            chunksize: Rows per raw chunk
+
+        Returns:
+            IncrementalFeatureUpdater ready for add_runs
+        """
+        partial = merge_partial_weeks(
+            aggregate_partial_weeks(clean_runs(chunk))
+            for chunk in read_raw_runs(raw_path, chunksize=chunksize)
+        )
+        featured = WeeklyFeatureBuilder().add_weeks(finalize_weeks(partial))
+
+        updater = cls()
+        for athlete, athlete_partial in partial.groupby(level='athlete'):
+            updater._partials[athlete] = athlete_partial.droplevel('athlete')
+        for athlete, athlete_features in featured.groupby('athlete'):
+            updater._features[athlete] = athlete_features.reset_index(drop=True)
+        return updater
+
+    def add_runs(self, runs):
+        """
+        Fold newly uploaded runs into the table.
+
+        Args:
+            runs: Raw activity rows (export columns) for one or more athletes,
+                in any order and for any weeks
+
+        Returns:
+            Dict of athlete -> first recomputed week
+        """
+        partial = aggregate_partial_weeks(clean_runs(runs))
+        builder = WeeklyFeatureBuilder()
+        touched, recompute, kept = {}, {}, {}
+
+        for athlete, new in partial.groupby(level='athlete'):
+            new = new.droplevel('athlete')
+            start = new.index.min()
+            merged = self._merge_partial(athlete, new, start)
+            touched[athlete] = start
+            recompute[athlete] = merged[merged.index >= start]
+
+            previous = self._features.get(athlete)
+            if previous is not None:
+                previous = previous[previous['timestamp'] < start]
+            if previous is not None and len(previous):
+                kept[athlete] = previous
+                builder.state[athlete] = {
+                    'recent': previous['weekly_mileage'].iloc[-(CONSISTENCY_WINDOW - 1):].tolist(),
+                    'cumulative': previous['cumulative_mileage'].iloc[-1],
+                    'last_week': previous['timestamp'].iloc[-1],
+                }
+
+        if not touched:
+            return touched
+
+        # One builder pass over every touched athlete's recomputed weeks
+        recomputed = builder.add_weeks(finalize_weeks(pd.concat(recompute, names=['athlete'])))
+        for athlete, rows in recomputed.groupby('athlete'):
+            if athlete in kept:
+                rows = pd.concat([kept[athlete], rows])
+            self._features[athlete] = rows.reset_index(drop=True)
+        return touched
+
+    def features(self):
+        """
+        The stored feature table, filtered like featured-data.csv.
+
+        Returns:
+            DataFrame in FEATURE_COLUMNS order, sorted by athlete and week
+        """
+        if not self._features:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+        featured = pd.concat([self._features[athlete] for athlete in sorted(self._features)])
+        return filter_recreational(featured).reset_index(drop=True)
+
+    def athlete_features(self, athlete):
+        """
+        One athlete's rows of the filtered feature table.
+
+        Args:
+            athlete: Athlete ID
+
+        Returns:
+            DataFrame in FEATURE_COLUMNS order (empty for unknown athletes)
+        """
+        featured = self._features.get(athlete)
+        if featured is None:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+        return filter_recreational(featured).reset_index(drop=True)
+
+    def _merge_partial(self, athlete, new, start):
+        """Add an athlete's new weekly sums to the stored ones."""
+        current = self._partials.get(athlete)
+        if current is None:
+            merged = new.sort_index()
+        else:
+            before = current[current.index < start]
+            after = current[current.index >= start].add(new, fill_value=0)
+            merged = pd.concat([before, after.astype(current.dtypes.to_dict())])
+        self._partials[athlete] = merged
+        return merged
+
+
+def build_features(raw_path=RAW_PATH, reproduce_shipped=False):
+    """
+    Build the featured dataset in memory, as the notebooks do.
+
+    Args:
+        raw_path: Path to the raw activity export
+        reproduce_shipped: Replay the SHIPPED_FEATURE_PASSES feature + filter
+            passes behind the committed featured-data.csv instead of one
+
+    Returns:
+        DataFrame of featured weeks, sorted by athlete and week
+    """
+    weekly = finalize_weeks(aggregate_partial_weeks(clean_runs(read_raw_runs(raw_path))))
+    return featurize_weeks(weekly, reproduce_shipped).reset_index(drop=True)
+
+
+def featurize_weeks(weekly, reproduce_shipped=False):
+    """
+    Features and recreational filtering for complete athlete histories.
+
+    Args:
+        weekly: finalize_weeks output holding every week of its athletes
+        reproduce_shipped: See build_features
+
+    Returns:
+        Filtered DataFrame in FEATURE_COLUMNS order
+    """
+    passes = SHIPPED_FEATURE_PASSES if reproduce_shipped else 1
+    for _ in range(passes - 1):
+        weekly = filter_recreational(WeeklyFeatureBuilder().add_weeks(weekly))[WEEKLY_COLUMNS]
+    return filter_recreational(WeeklyFeatureBuilder().add_weeks(weekly))
+
+
+def stream_features(raw_path=RAW_PATH, chunksize=100_000, reproduce_shipped=False):
+    """
+    Build the featured dataset chunk by chunk in bounded memory.
+
+    Raw runs are read `chunksize` rows at a time. Each athlete's weekly sums
+    are held only until their block of the export ends (their last block,
+    for athletes listed more than once); then their features are computed
+    and the sums dropped. Memory is bounded by one chunk plus the open
+    athletes' weeks, not by the size of the export.
+
+    Args:
+        raw_path: Path to the raw activity export
+        chunksize: Rows per raw chunk
+        reproduce_shipped: See build_features
+
+    Yields:
+        DataFrames of featured weeks for the athletes finished in each chunk,
+        sorted by athlete and week within a frame; athletes come in the order
+        their blocks end in the export
+    """
+    repeated = repeated_athletes(raw_path, chunksize)
+    closed_blocks = {}
+    pending = {}
+    open_athlete = None
+
+    for chunk in read_raw_runs(raw_path, chunksize=chunksize):
+        if not len(chunk):
+            continue
+        for athlete, weeks in aggregate_partial_weeks(clean_runs(chunk)).groupby(level='athlete'):
+            pending.setdefault(athlete, []).append(weeks)
+
+        blocks = _block_athletes(chunk['athlete'].to_numpy())
+        ended = list(blocks[:-1])
+        if open_athlete is not None and blocks[0] != open_athlete:
+            ended.insert(0, open_athlete)
+        open_athlete = blocks[-1]
+
+        featured = _finish_athletes(ended, repeated, closed_blocks, pending, reproduce_shipped)
+        if featured is not None:
+            yield featured
+
+    if open_athlete is not None:
+        featured = _finish_athletes([open_athlete], repeated, closed_blocks, pending, reproduce_shipped)
+        if featured is not None:
+            yield featured
+
+
+def repeated_athletes(raw_path, chunksize=100_000):
+    """
+    Athletes whose runs appear in more than one contiguous block of the export.
+
+    Reads only the athlete column.
+
+    Args:
+        raw_path: Path to the raw activity export
+        chunksize: Rows per chunk
+
+    Returns:
+        Dict of athlete -> number of blocks, for athletes with two or more
+    """
+    blocks = {}
+    previous = None
+    for chunk in pd.read_csv(raw_path, sep=RAW_SEPARATOR, usecols=['athlete'], chunksize=chunksize):
+        for athlete in _block_athletes(chunk['athlete'].to_numpy()):
+            if athlete != previous:
+                blocks[athlete] = blocks.get(athlete, 0) + 1
+            previous = athlete
+    return {athlete: count for athlete, count in blocks.items() if count > 1}
+
+
+def _block_athletes(athletes):
+    """Athlete of each run of consecutive equal ids, in order."""
+    if not len(athletes):
+        return athletes
+    return athletes[np.concatenate([[0], np.flatnonzero(athletes[1:] != athletes[:-1]) + 1])]
+
+
+def _finish_athletes(ended, repeated, closed_blocks, pending, reproduce_shipped):
+    """Featurize athletes whose last block just ended and drop their sums."""
+    finished = []
+    for athlete in ended:
+        closed_blocks[athlete] = closed_blocks.get(athlete, 0) + 1
+        if closed_blocks[athlete] >= repeated.get(athlete, 1):
+            del closed_blocks[athlete]
+            finished.append(athlete)
+    partials = [weeks for athlete in finished for weeks in pending.pop(athlete, [])]
+    if not partials:
+        return None
+    featured = featurize_weeks(finalize_weeks(merge_partial_weeks(partials)), reproduce_shipped)
+    return featured.reset_index(drop=True) if len(featured) else None
+
+
+def write_features(raw_path, output_path, chunksize=100_000, reproduce_shipped=False):
+    """
+    Stream features from a raw export into a CSV.
+
+    Args:
+        raw_path: Path to the raw activity export
+        output_path: Where to write the featured CSV
+        chunksize: Rows per raw chunk
+        reproduce_shipped: See build_features
+
+    Returns:
+        Number of weeks written
+    """
+    rows = 0
+    pd.DataFrame(columns=FEATURE_COLUMNS).to_csv(output_path, index=False)
+    for featured in stream_features(raw_path, chunksize=chunksize, reproduce_shipped=reproduce_shipped):
+        featured.to_csv(output_path, mode='a', header=False, index=False)
+        rows += len(featured)
+    return rows
+
+
+def _empty_raw_runs():
+    """An empty frame with the raw export's columns."""
+    return pd.DataFrame({
+        'athlete': np.array([], dtype='int64'),
+        'gender': np.array([], dtype=object),
+        'timestamp': np.array([], dtype=object),
+        'distance (m)': np.array([], dtype='float64'),
+        'elapsed time (s)': np.array([], dtype='int64'),
+        'elevation gain (m)': np.array([], dtype='float64'),
+        'average heart rate (bpm)': np.array([], dtype='float64'),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build weekly training features from a raw Strava export")
+    parser.add_argument('raw_path')
+    parser.add_argument('output_path')
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Raw rows per chunk")
+    parser.add_argument('--reproduce-shipped', action='store_true',
+                        help=f"Replay the {SHIPPED_FEATURE_PASSES} feature + filter passes behind "
+                             f"the committed data/featured-data.csv")
+    args = parser.parse_args()
+
+    rows = write_features(args.raw_path, args.output_path, chunksize=args.chunksize,
+                          reproduce_shipped=args.reproduce_shipped)
+    print(f"Saved {rows} weeks to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
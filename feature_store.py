@@ -0,0 +1,218 @@
+"""
+Feature Store
+Typed Parquet copies of the data/ CSV tables with projection and athlete filtering.
+
+Each table is one Parquet file sorted by athlete. Row groups never split an
+athlete, so row-group statistics act as athlete partitions: loading a few
+athletes reads only their row groups. Dtypes are fixed on write (int32
+athlete, date32 timestamp, float32 metrics), so loaders skip CSV parsing and
+pd.to_datetime.
+
+Rebuild after regenerating the CSVs with:
+    python feature_store.py build
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+STORE_DIR = DATA_DIR / 'feature_store'
+
+# Store table name -> source CSV in data/
+TABLES = {
+    'weekly_features': 'featured-data.csv',
+    'athlete_profiles': 'athlete_profiles.csv',
+    'athlete_clusters': 'athlete_profiles_clustered_k3.csv',
+    'scaled_clustering': 'scaled_clustering_data.csv',
+}
+
+# Rows per row group; athletes are never split across row groups
+ROW_GROUP_ROWS = 2048
+
+
+def read_csv_table(name, data_dir=DATA_DIR):
+    """
+    Read one of the source CSVs the way the notebooks use it.
+
+    scaled_clustering_data.csv is keyed by athlete_profiles row position, so
+    its athlete IDs are looked up from athlete_profiles.csv.
+
+    Args:
+        name: Table name from TABLES
+        data_dir: Directory holding the CSVs
+
+    Returns:
+        DataFrame with an 'athlete' column
+    """
+    _check_table(name)
+    data_dir = Path(data_dir)
+    path = data_dir / TABLES[name]
+
+    if name == 'weekly_features':
+        table = pd.read_csv(path)
+        table['timestamp'] = pd.to_datetime(table['timestamp'])
+    elif name == 'athlete_clusters':
+        table = pd.read_csv(path, index_col=0)
+    elif name == 'scaled_clustering':
+        table = pd.read_csv(path, index_col=0)
+        profiles = pd.read_csv(data_dir / TABLES['athlete_profiles'], usecols=['athlete'])
+        table.insert(0, 'athlete', profiles['athlete'].iloc[table.index].to_numpy())
+    else:
+        table = pd.read_csv(path)
+    return table.reset_index(drop=True)
+
+
+def to_arrow(table):
+    """
+    Convert a DataFrame to an Arrow table with the store's dtypes.
+
+    Args:
+        table: DataFrame with an 'athlete' column
+
+    Returns:
+        pyarrow.Table sorted by athlete (and timestamp when present)
+    """
+    sort_keys = ['athlete'] + (['timestamp'] if 'timestamp' in table else [])
+    table = table.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+
+    fields = []
+    for column, dtype in table.dtypes.items():
+        if column == 'athlete':
+            arrow_type = pa.int32()
+        elif column == 'timestamp':
+            arrow_type = pa.date32()
+        elif column == 'cluster':
+            arrow_type = pa.int8()
+        elif pd.api.types.is_integer_dtype(dtype):
+            arrow_type = pa.int32()
+        elif pd.api.types.is_float_dtype(dtype):
+            arrow_type = pa.float32()
+        else:
+            raise ValueError(f"Unsupported column '{column}' with dtype {dtype}")
+        fields.append(pa.field(column, arrow_type))
+
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    return arrow_table.cast(pa.schema(fields))
+
+
+def write_table(name, table, store_dir=STORE_DIR):
+    """
+    Write a table to the store.
+
+    Args:
+        name: Table name
+        table: DataFrame with an 'athlete' column
+        store_dir: Store directory
+
+    Returns:
+        Path of the written Parquet file
+    """
+    arrow_table = to_arrow(table)
+    path = Path(store_dir) / f'{name}.parquet'
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with pq.ParquetWriter(path, arrow_table.schema, compression='zstd') as writer:
+        for start, stop in _row_group_bounds(arrow_table['athlete'].to_numpy()):
+            writer.write_table(arrow_table.slice(start, stop - start), row_group_size=stop - start)
+    return path
+
+
+def build_store(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    Convert every CSV in TABLES to Parquet.
+
+    Args:
+        data_dir: Directory holding the CSVs
+        store_dir: Store directory
+
+    Returns:
+        Dict of table name -> written path
+    """
+    return {name: write_table(name, read_csv_table(name, data_dir), store_dir) for name in TABLES}
+
+
+def load_table(name, columns=None, athletes=None, store_dir=STORE_DIR):
+    """
+    Load a table from the store.
+
+    Args:
+        name: Table name from TABLES
+        columns: Columns to read, or None for all
+        athletes: Athlete IDs to keep, or None for all; only the row groups
+            containing them are read
+        store_dir: Store directory
+
+    Returns:
+        DataFrame with store dtypes (timestamp as datetime64)
+    """
+    _check_table(name)
+
+    filters = None
+    if athletes is not None:
+        filters = [('athlete', 'in', [int(athlete) for athlete in athletes])]
+
+    arrow_table = pq.read_table(Path(store_dir) / f'{name}.parquet',
+                                columns=columns, filters=filters)
+    return arrow_table.to_pandas(date_as_object=False)
+
+
+def load_weekly_features(columns=None, athletes=None, store_dir=STORE_DIR):
+    """Weekly training features (featured-data.csv)."""
+    return load_table('weekly_features', columns, athletes, store_dir)
+
+
+def load_athlete_profiles(columns=None, athletes=None, store_dir=STORE_DIR):
+    """Per-athlete averages (athlete_profiles.csv)."""
+    return load_table('athlete_profiles', columns, athletes, store_dir)
+
+
+def load_athlete_clusters(columns=None, athletes=None, store_dir=STORE_DIR):
+    """Athlete profiles with their KMeans cluster (athlete_profiles_clustered_k3.csv)."""
+    return load_table('athlete_clusters', columns, athletes, store_dir)
+
+
+def load_scaled_clustering(columns=None, athletes=None, store_dir=STORE_DIR):
+    """Standardized clustering features (scaled_clustering_data.csv)."""
+    return load_table('scaled_clustering', columns, athletes, store_dir)
+
+
+def _check_table(name):
+    """Raise KeyError for names not in TABLES."""
+    if name not in TABLES:
+        raise KeyError(f"Unknown feature store table '{name}'. Choose from: {', '.join(TABLES)}")
+
+
+def _row_group_bounds(athletes):
+    """(start, stop) row ranges of about ROW_GROUP_ROWS that end on athlete boundaries."""
+    if len(athletes) == 0:
+        return [(0, 0)]
+    boundaries = list((athletes[1:] != athletes[:-1]).nonzero()[0] + 1) + [len(athletes)]
+
+    bounds, start = [], 0
+    for boundary in boundaries:
+        if boundary - start >= ROW_GROUP_ROWS or boundary == len(athletes):
+            bounds.append((start, boundary))
+            start = boundary
+    return bounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet feature store tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Convert the data/ CSVs to Parquet")
+    build.add_argument('--data-dir', default=DATA_DIR)
+    build.add_argument('--store-dir', default=STORE_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        for name, path in build_store(args.data_dir, args.store_dir).items():
+            print(f"Saved {name} to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+LLM Response Cache
+Two-tier cache for generated training plans: an in-memory LRU over a SQLite file.
+
+Plans are keyed by a hash of the prompt built from the recommendation, after
+rounding its numeric fields, so runners with the same cluster, action,
+cautions and race phase share one response. The SQLite tier survives app
+restarts and is shared by processes on the same machine; entries expire after
+a TTL, and the least recently used ones are evicted once the file exceeds its
+size budget. Hits in the memory tier refresh the entry's access time on disk
+too, and the hit/miss counters are summed in the same file, both written in
+batches rather than per lookup.
+"""
+
+import argparse
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_PATH = Path(__file__).resolve().parent / 'data' / 'cache' / 'llm_responses.sqlite'
+
+# Defaults, overridable with LLM_CACHE_* environment variables
+MEMORY_ENTRIES = 256
+TTL_HOURS = 24 * 7
+MAX_DISK_MB = 64
+
+# Hit/miss counters, kept per instance and summed across processes in SQLite
+COUNTERS = ('memory_hits', 'disk_hits', 'misses', 'writes', 'evictions')
+
+# Lookups between writes of pending counters and memory-hit access times
+FLUSH_EVERY = 64
+
+# Rounding step per numeric recommendation field; finer differences
+# don't change the plan a coach would write
+ROUNDING_STEPS = {
+    'current_mileage': 0.5,
+    'predicted_mileage': 0.5,
+    'mileage_change': 0.5,
+    'mileage_change_pct': 1.0,
+    'current_fatigue': 1.0,
+    'training_days': 1.0,
+}
+
+
+def round_recommendation(rec, steps=ROUNDING_STEPS):
+    """
+    Copy a recommendation with its numeric fields rounded for caching.
+
+    Args:
+        rec: Recommendation dict from RunningRecommender
+        steps: Field name -> rounding step
+
+    Returns:
+        New dict with rounded values
+    """
+    rounded = dict(rec)
+    for field, step in steps.items():
+        value = rounded.get(field)
+        if value is not None:
+            rounded[field] = round(round(float(value) / step) * step, 6)
+    return rounded
+
+
+def prompt_key(prompt, model_name=''):
+    """
+    Content hash of a prompt and the model it is sent to.
+
+    Args:
+        prompt: Full prompt text
+        model_name: Model identifier, so switching models doesn't reuse plans
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256(model_name.encode())
+    digest.update(b'\0')
+    digest.update(prompt.encode())
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    In-memory LRU in front of a persistent SQLite store, with TTL and size limits.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES,
+                 ttl_hours=TTL_HOURS, max_disk_mb=MAX_DISK_MB):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite file, or None for a memory-only cache
+            memory_entries: Maximum entries held in the LRU tier
+            ttl_hours: Hours before an entry expires
+            max_disk_mb: Size budget of the SQLite tier in megabytes
+        """
+        self.memory_entries = memory_entries
+        self.ttl = ttl_hours * 3600
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(COUNTERS, 0)
+        # Not yet written to SQLite: counter deltas and memory-hit access times
+        self._pending = dict.fromkeys(COUNTERS, 0)
+        self._touched = {}
+
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._db.executemany('INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                                 [(name,) for name in COUNTERS])
+
+    def get(self, key):
+        """
+        Look up a response.
+
+        Args:
+            key: Cache key from prompt_key
+
+        Returns:
+            Cached text, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    if self._db is not None:
+                        self._touched[key] = now
+                    self._count('memory_hits')
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, created FROM responses WHERE key = ? AND created > ?',
+                    (key, now - self.ttl)).fetchone()
+                if row is not None:
+                    self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+                    self._remember(key, row[0], row[1])
+                    self._count('disk_hits')
+                    return row[0]
+
+            self._count('misses')
+            return None
+
+    def put(self, key, value):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key: Cache key from prompt_key
+            value: Response text
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._count('writes')
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, size, created, accessed) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, value, len(value.encode()), now, now))
+                # Eviction orders by access time, so memory hits must be on disk first
+                self._flush()
+                self._evict(now)
+
+    def clear(self):
+        """Remove every entry and reset the statistics, including the stored totals."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM responses')
+                self._db.execute('UPDATE counters SET value = 0')
+            for name in COUNTERS:
+                self._stats[name] = 0
+                self._pending[name] = 0
+
+    def stats(self):
+        """
+        Hit-rate statistics since the cache was opened, and stored totals.
+
+        Returns:
+            Dict with hit/miss counts, hit_rate, and entry counts per tier;
+            with a SQLite tier, 'totals' holds the same counts and hit_rate
+            summed over every process that used the file
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            if self._db is not None:
+                self._flush()
+                count, size = self._db.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+                totals = dict(self._db.execute('SELECT name, value FROM counters'))
+                stats['totals'] = {name: totals.get(name, 0) for name in COUNTERS}
+                stats['totals']['hit_rate'] = _hit_rate(stats['totals'])
+        stats['hit_rate'] = _hit_rate(stats)
+        return stats
+
+    def flush(self):
+        """Write pending counters and memory-hit access times to SQLite."""
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+
+    def close(self):
+        """Flush and close the SQLite connection."""
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+                self._db.close()
+                self._db = None
+
+    def _count(self, name, n=1):
+        """Add to a counter, flushing once enough lookups are pending."""
+        self._stats[name] += n
+        self._pending[name] += n
+        if self._db is not None and sum(self._pending.values()) >= FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self):
+        """Write pending counters and access times in one transaction (lock held)."""
+        deltas = [(n, name) for name, n in self._pending.items() if n]
+        if not deltas and not self._touched:
+            return
+        with self._db:
+            self._db.execute('BEGIN')
+            self._db.executemany('UPDATE responses SET accessed = MAX(accessed, ?) WHERE key = ?',
+                                 [(accessed, key) for key, accessed in self._touched.items()])
+            self._db.executemany('UPDATE counters SET value = value + ? WHERE name = ?', deltas)
+        self._touched.clear()
+        self._pending = dict.fromkeys(COUNTERS, 0)
+
+    def _remember(self, key, value, created):
+        """Insert into the LRU tier, dropping the least recently used entry if full."""
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        """Drop expired rows, then least recently used rows until under the size budget."""
+        cursor = self._db.execute('DELETE FROM responses WHERE created <= ?', (now - self.ttl,))
+        evicted = cursor.rowcount
+
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total > self.max_disk_bytes:
+            excess = total - self.max_disk_bytes
+            freed = 0
+            stale = []
+            for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                stale.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._db.executemany('DELETE FROM responses WHERE key = ?', stale)
+            evicted += len(stale)
+            for (key,) in stale:
+                self._memory.pop(key, None)
+
+        if evicted:
+            self._count('evictions', evicted)
+
+
+def _hit_rate(counts):
+    lookups = counts['memory_hits'] + counts['disk_hits'] + counts['misses']
+    return (counts['memory_hits'] + counts['disk_hits']) / lookups if lookups else 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Get the process-wide response cache, configured from the environment.
+
+    LLM_CACHE_PATH sets the SQLite file ('' for memory only), and
+    LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL_HOURS and LLM_CACHE_MAX_MB
+    override the limits.
+
+    Returns:
+        ResponseCache instance
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = os.getenv('LLM_CACHE_PATH', str(CACHE_PATH))
+                _cache = ResponseCache(
+                    path=path or None,
+                    memory_entries=int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', MEMORY_ENTRIES)),
+                    ttl_hours=float(os.getenv('LLM_CACHE_TTL_HOURS', TTL_HOURS)),
+                    max_disk_mb=float(os.getenv('LLM_CACHE_MAX_MB', MAX_DISK_MB)),
+                )
+                # Counters batched since the last flush would be lost at exit
+                atexit.register(_cache.flush)
+    return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument('command', choices=['stats', 'clear'])
+    args = parser.parse_args()
+
+    cache = get_response_cache()
+    if args.command == 'clear':
+        cache.clear()
+        print("✓ Cache cleared")
+    else:
+        stats = cache.stats()
+        print(f"Entries on disk: {stats.get('disk_entries', 0)} ({stats.get('disk_bytes', 0) / 1024:.1f} KB)")
+        if 'totals' not in stats:
+            print("Memory-only cache (LLM_CACHE_PATH is empty): no stored counters")
+            return
+        # Totals over every process that used the file; this one made no lookups
+        totals = stats['totals']
+        print(f"Hits: {totals['memory_hits']} memory, {totals['disk_hits']} disk; "
+              f"misses: {totals['misses']} (hit rate {totals['hit_rate']:.1%})")
+        print(f"Writes: {totals['writes']}, evictions: {totals['evictions']}")
+
+
+if __name__ == "__main__":
+    main()
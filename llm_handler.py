@@ -3,38 +3,219 @@ Natural Language Generation Handler
 Converts structured recommendations into friendly, human-readable training plans
 using Gemini (Google AI Studio) API
 """
+import asyncio
+import functools
 import os
+import random
+import weakref
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from llm_cache import get_response_cache, prompt_key, round_recommendation
+from plan_schema import PLAN_SCHEMA, plan_from_json, plan_to_json, validate_plan
+from plan_templates import build_plan, render_plan
 
 # Load environment variables
 load_dotenv()
 
+# generation_config for schema-constrained JSON plans
+STRUCTURED_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': PLAN_SCHEMA,
+}
+
+# Output instructions appended to the prompt for text and structured plans
+MARKDOWN_FORMAT = """First, provide a summary of the types of workouts included this week (e.g., easy runs, long run, tempo, rest, cross-training).
+
+Then, provide the weekly schedule as a Markdown table with columns: 'Day', 'Activity', 'Mileage (mi)', 'Time (min)', and 'Pace'. 
+- For each day, fill in the appropriate columns (leave blank if not applicable).
+- For easy runs, use "easy/conversational pace" for pace.
+- For workouts, specify pace as "tempo pace", "interval pace", etc.
+- For rest/cross-training, leave mileage/time/pace blank.
+
+After the table, include a brief explanation and encouragement, but do NOT repeat the table or weekly schedule in prose.
+"""
+
+JSON_FORMAT = """Respond with a JSON object with these fields:
+- "summary": the types of workouts included this week (e.g., easy runs, long run, tempo, rest, cross-training).
+- "days": one entry for each day Monday to Sunday with "day", "activity", "mileage" (miles), "time_min" (minutes), "pace" and optional "notes".
+  - For easy runs, use "easy/conversational pace" for pace.
+  - For workouts, specify pace as "tempo pace", "interval pace", etc.
+  - For rest/cross-training, set mileage and time_min to null and pace to "".
+- "advice": a brief explanation and encouragement, without repeating the schedule.
+"""
+
+
+class GenerationError(Exception):
+    """All attempts to generate a plan failed."""
+
+
 class LLMHandler:
     """
     Handles Natural Language Generation for training plan recommendations.
-    Uses Gemini API to convert structured data into friendly, conversational text.
+    Uses Gemini API to convert structured data into friendly, conversational text,
+    with the local template renderer as a fast path or failover.
+
+    LLM_BACKEND selects the generator: 'gemini' (default), 'http' for the
+    REST API over a pooled client (llm_http.HttpModel, LLM_HTTP_URL),
+    'template' for local rendering only, or 'stub' for the offline
+    llm_http.StubModel.
     """
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in .env file.")
-        genai.configure(api_key=api_key)
-        # Use a supported model name for the Python SDK
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    def __init__(self, model=None, model_name='gemini-2.5-flash', cache=True, fallback=True):
+        """
+        Args:
+            model: Object with generate_content(prompt); defaults to Gemini
+            model_name: Gemini model to use, also part of the cache key
+            cache: True for the shared response cache, a ResponseCache, or None to disable
+            fallback: Render the plan locally when no API key is set or Gemini
+                fails, instead of raising or returning an error message
+        """
+        self.model_name = model_name
+        self.fallback = fallback
+        backend = os.getenv('LLM_BACKEND', 'gemini')
+        if model is None and backend == 'stub':
+            from llm_http import StubModel
+            model = StubModel()
+        if model is None and backend == 'http':
+            from llm_http import HttpModel
+            model = HttpModel(model_name)
+        if model is None and backend != 'template':
+            api_key = os.getenv('GEMINI_API_KEY')
+            if api_key:
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                # Use a supported model name for the Python SDK
+                model = genai.GenerativeModel(model_name)
+            elif not fallback:
+                raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in .env file.")
+        # None means every plan is rendered from the template
+        self.model = model
+        self.cache = get_response_cache() if cache is True else cache
+        self.last_cache_hit = False
+        self.last_source = None
 
     def get_friendly_plan(self, recommendation_dict):
         """
         Generate a friendly, human-readable training plan from structured recommendation.
+
+        With a cache, numeric fields are rounded before building the prompt and
+        plans for the same prompt are served from the cache. Errors are not cached.
+        last_source records where the plan came from: 'cache', 'llm' or 'template'.
         """
-        prompt = self._build_prompt(recommendation_dict)
+        self.last_cache_hit = False
+        if self.model is None:
+            return self._render_template(recommendation_dict)
+        prompt, key = self._prepare(recommendation_dict)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._cache_hit(cached)
         try:
             response = self.model.generate_content(prompt)
-            return response.text
+            text = response.text
         except Exception as e:
-            return f"Error generating training plan: {str(e)}"
+            return self._failed(recommendation_dict, e)
+        if key is not None:
+            self.cache.put(key, text)
+        self.last_source = 'llm'
+        return text
 
-    def _build_prompt(self, rec):
+    def stream_friendly_plan(self, recommendation_dict):
+        """
+        Generate a training plan, yielding text chunks as they arrive.
+
+        Cached and template plans are yielded as a single chunk. The full text
+        is cached once the stream completes. If the stream fails before any
+        text, the template plan is yielded instead; a stream that fails part
+        way ends with an error message.
+        """
+        self.last_cache_hit = False
+        if self.model is None:
+            yield self._render_template(recommendation_dict)
+            return
+        prompt, key = self._prepare(recommendation_dict)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield self._cache_hit(cached)
+                return
+        parts = []
+        self.last_source = 'llm'
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                parts.append(chunk.text)
+                yield chunk.text
+        except Exception as e:
+            if parts:
+                yield f"\n\nError generating training plan: {str(e)}"
+            else:
+                yield self._failed(recommendation_dict, e)
+            return
+        if key is not None:
+            self.cache.put(key, ''.join(parts))
+
+    def get_structured_plan(self, recommendation_dict):
+        """
+        Generate the plan as a validated WeeklyPlan using schema-constrained JSON output.
+
+        The validated plan is cached as canonical JSON, so cache hits skip
+        validation. Invalid or failed responses give the template plan.
+
+        Returns:
+            WeeklyPlan
+
+        Raises:
+            GenerationError: If generation fails and fallback is disabled
+        """
+        self.last_cache_hit = False
+        if self.model is None:
+            self.last_source = 'template'
+            return build_plan(recommendation_dict)
+        prompt, key = self._prepare(recommendation_dict, structured=True)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return plan_from_json(self._cache_hit(cached))
+        try:
+            response = self.model.generate_content(prompt, generation_config=STRUCTURED_CONFIG)
+            plan = validate_plan(response.text)
+        except Exception as e:
+            return self._structured_failed(recommendation_dict, e)
+        if key is not None:
+            self.cache.put(key, plan_to_json(plan))
+        self.last_source = 'llm'
+        return plan
+
+    def _structured_failed(self, rec, error):
+        if not self.fallback:
+            raise GenerationError(str(error)) from error
+        self.last_source = 'template'
+        return build_plan(rec)
+
+    def _cache_hit(self, text):
+        self.last_cache_hit = True
+        self.last_source = 'cache'
+        return text
+
+    def _render_template(self, rec):
+        self.last_source = 'template'
+        return render_plan(rec)
+
+    def _failed(self, rec, error):
+        """Template plan on failure when fallback is enabled, otherwise an error message."""
+        if self.fallback:
+            return self._render_template(rec)
+        self.last_source = None
+        return f"Error generating training plan: {str(error)}"
+
+    def _prepare(self, rec, structured=False):
+        """Build the prompt and its cache key (None when caching is disabled)."""
+        if self.cache is None:
+            return self._build_prompt(rec, structured), None
+        prompt = self._build_prompt(round_recommendation(rec), structured)
+        return prompt, prompt_key(prompt, self.model_name)
+
+    def _build_prompt(self, rec, structured=False):
         coach_instructions = (
             "You are an experienced running coach who creates personalized, encouraging training plans. "
             "Your tone is friendly, supportive, and motivating. "
@@ -67,14 +248,202 @@ RECOMMENDATION:
 {cautions}
 {race_info}
 
-First, provide a summary of the types of workouts included this week (e.g., easy runs, long run, tempo, rest, cross-training).
+"""
+        return prompt + (JSON_FORMAT if structured else MARKDOWN_FORMAT)
 
-Then, provide the weekly schedule as a Markdown table with columns: 'Day', 'Activity', 'Mileage (mi)', 'Time (min)', and 'Pace'. 
-- For each day, fill in the appropriate columns (leave blank if not applicable).
-- For easy runs, use "easy/conversational pace" for pace.
-- For workouts, specify pace as "tempo pace", "interval pace", etc.
-- For rest/cross-training, leave mileage/time/pace blank.
 
-After the table, include a brief explanation and encouragement, but do NOT repeat the table or weekly schedule in prose.
-"""
-        return prompt
\ No newline at end of file
+class AsyncLLMHandler(LLMHandler):
+    """
+    asyncio version of LLMHandler for concurrent plan generation.
+
+    Upstream calls are bounded by a semaphore, each attempt has a timeout and
+    failures are retried with jittered exponential backoff. Identical prompts
+    requested at the same time share one upstream call. A timed-out call to a
+    synchronous model keeps its slot until its worker thread returns, so the
+    bound holds for calls actually running upstream.
+    """
+    def __init__(self, model=None, model_name='gemini-2.5-flash', cache=True, fallback=True,
+                 max_concurrency=None, timeout=None, max_retries=None, backoff=0.5):
+        """
+        Args:
+            model: Object with generate_content(prompt), and optionally
+                generate_content_async(prompt); defaults to Gemini
+            model_name: Gemini model to use, also part of the cache key
+            cache: True for the shared response cache, a ResponseCache, or None to disable
+            fallback: Render the plan locally when no API key is set or every
+                attempt fails
+            max_concurrency: Maximum upstream calls in flight (env LLM_MAX_CONCURRENCY, default 8)
+            timeout: Seconds allowed per attempt (env LLM_TIMEOUT, default 30)
+            max_retries: Retries after the first attempt (env LLM_MAX_RETRIES, default 2)
+            backoff: Base delay in seconds, doubled on each retry
+        """
+        super().__init__(model=model, model_name=model_name, cache=cache, fallback=fallback)
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT', 30))
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', 2)) if max_retries is None else max_retries
+        self.backoff = backoff
+        self.stats = {'upstream_calls': 0, 'coalesced': 0, 'retries': 0, 'timeouts': 0, 'failures': 0}
+        # Semaphore and in-flight calls are bound to the event loop that uses them
+        self._loop_state = weakref.WeakKeyDictionary()
+
+    async def get_friendly_plan_async(self, recommendation_dict):
+        """
+        Generate a training plan without blocking the event loop.
+
+        Args:
+            recommendation_dict: Recommendation from RunningRecommender
+
+        Returns:
+            Plan text; if every attempt failed, the template plan (or an
+            error message without fallback)
+        """
+        self.last_cache_hit = False
+        if self.model is None:
+            return self._render_template(recommendation_dict)
+        prompt, key = self._prepare(recommendation_dict)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._cache_hit(cached)
+        else:
+            key = prompt_key(prompt, self.model_name)
+
+        try:
+            text = await self._shared_generation(prompt, key)
+        except GenerationError as e:
+            return self._failed(recommendation_dict, e)
+        self.last_source = 'llm'
+        return text
+
+    async def get_structured_plan_async(self, recommendation_dict):
+        """
+        Generate a validated WeeklyPlan without blocking the event loop.
+
+        Invalid JSON counts as a failed attempt and is retried.
+
+        Returns:
+            WeeklyPlan
+
+        Raises:
+            GenerationError: If every attempt failed and fallback is disabled
+        """
+        self.last_cache_hit = False
+        if self.model is None:
+            self.last_source = 'template'
+            return build_plan(recommendation_dict)
+        prompt, key = self._prepare(recommendation_dict, structured=True)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return plan_from_json(self._cache_hit(cached))
+        else:
+            key = prompt_key(prompt, self.model_name)
+        try:
+            text = await self._shared_generation(prompt, key, structured=True)
+        except GenerationError as e:
+            return self._structured_failed(recommendation_dict, e)
+        self.last_source = 'llm'
+        return plan_from_json(text)
+
+    async def get_friendly_plans_async(self, recommendations):
+        """
+        Generate plans for many recommendations concurrently.
+
+        Args:
+            recommendations: Iterable of recommendation dicts
+
+        Returns:
+            List of plan texts in input order
+        """
+        return await asyncio.gather(*(self.get_friendly_plan_async(rec) for rec in recommendations))
+
+    def get_friendly_plans(self, recommendations):
+        """Synchronous wrapper around get_friendly_plans_async."""
+        return asyncio.run(self.get_friendly_plans_async(recommendations))
+
+    def _state(self):
+        """Semaphore and in-flight task map for the running event loop."""
+        loop = asyncio.get_running_loop()
+        state = self._loop_state.get(loop)
+        if state is None:
+            state = (asyncio.Semaphore(self.max_concurrency), {})
+            self._loop_state[loop] = state
+        return state
+
+    async def _shared_generation(self, prompt, key, structured=False):
+        """Join the in-flight call for this prompt, or start one."""
+        semaphore, inflight = self._state()
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(prompt, key, semaphore, structured))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # Shield so one cancelled caller doesn't cancel the call others await
+        return await asyncio.shield(task)
+
+    async def _generate(self, prompt, key, semaphore, structured=False):
+        """
+        Call the model with timeout and retries, caching a successful response.
+
+        Structured responses are validated and returned as canonical plan JSON.
+
+        Raises:
+            GenerationError: If every attempt failed
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                # Full jitter keeps retries from many requests from lining up
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                await semaphore.acquire()
+                self.stats['upstream_calls'] += 1
+                try:
+                    call, cancellable = self._call_model(prompt, structured)
+                except BaseException:
+                    semaphore.release()
+                    raise
+                # The slot is freed when the call finishes, not when we stop waiting for it
+                call.add_done_callback(functools.partial(_release_call, semaphore))
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(call), self.timeout)
+                finally:
+                    if cancellable:
+                        call.cancel()
+                text = plan_to_json(validate_plan(response.text)) if structured else response.text
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                error = f"timed out after {self.timeout:g}s"
+                continue
+            except Exception as e:
+                error = str(e)
+                continue
+            if self.cache is not None:
+                self.cache.put(key, text)
+            return text
+        self.stats['failures'] += 1
+        raise GenerationError(error)
+
+    def _call_model(self, prompt, structured=False):
+        """
+        Start the model call, using the native async API when available.
+
+        Returns:
+            (future, cancellable): a native async call stops when cancelled;
+            a synchronous one runs in a worker thread that cannot be stopped
+        """
+        kwargs = {'generation_config': STRUCTURED_CONFIG} if structured else {}
+        if hasattr(self.model, 'generate_content_async'):
+            return asyncio.ensure_future(self.model.generate_content_async(prompt, **kwargs)), True
+        call = functools.partial(self.model.generate_content, prompt, **kwargs)
+        return asyncio.get_running_loop().run_in_executor(None, call), False
+
+
+def _release_call(semaphore, call):
+    """Done callback: free the call's slot, retrieving a late error so it isn't logged."""
+    semaphore.release()
+    if not call.cancelled():
+        call.exception()
@@ -0,0 +1,282 @@
+"""
+HTTP LLM Client
+Gemini generateContent calls over a pooled HTTP client, plus an offline stub model and server.
+
+HttpModel talks to the Gemini REST API (or anything serving the same
+endpoint) with one keep-alive connection pool per process instead of a new
+connection per plan, so a long-running service pays the TCP/TLS handshake
+once. StubModel stands in for Gemini offline, and create_stub_app() serves
+it behind that endpoint, which lets the service and its load test run end
+to end without an API key:
+
+    uvicorn llm_http:create_stub_app --factory --port 8001
+    LLM_BACKEND=http LLM_HTTP_URL=http://127.0.0.1:8001 uvicorn service:create_app --factory
+
+Requires httpx (and starlette for the stub server).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+GEMINI_API_URL = 'https://generativelanguage.googleapis.com'
+
+# Keep-alive pool size (env LLM_HTTP_MAX_CONNECTIONS)
+MAX_CONNECTIONS = 32
+
+# generation_config keys in the REST API's camelCase
+CONFIG_FIELDS = {
+    'response_mime_type': 'responseMimeType',
+    'response_schema': 'responseSchema',
+    'temperature': 'temperature',
+    'max_output_tokens': 'maxOutputTokens',
+}
+
+TextResponse = namedtuple('TextResponse', ['text'])
+TextResponse.__doc__ = "Generated text, shaped like a Gemini SDK response."
+
+
+def request_body(prompt, generation_config=None):
+    """
+    generateContent request body for a single-turn prompt.
+
+    Args:
+        prompt: Prompt text
+        generation_config: Optional dict in the SDK's snake_case form
+
+    Returns:
+        JSON-serializable dict
+    """
+    body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    if generation_config:
+        body['generationConfig'] = {CONFIG_FIELDS.get(k, k): v for k, v in generation_config.items()}
+    return body
+
+
+def response_text(data):
+    """
+    Text of the first candidate in a generateContent response.
+
+    Raises:
+        ValueError: If the response has no text (e.g. a blocked prompt)
+    """
+    try:
+        parts = data['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"Response has no candidates: {str(data)[:200]}") from e
+    return ''.join(part.get('text', '') for part in parts)
+
+
+class HttpModel:
+    """
+    Gemini model called over REST with pooled, keep-alive connections.
+
+    Drop-in for genai.GenerativeModel in LLMHandler and AsyncLLMHandler
+    (LLM_BACKEND=http). The synchronous client is shared across threads; the
+    async client is created per event loop, since httpx binds its pool to
+    the loop that first uses it.
+    """
+
+    def __init__(self, model_name='gemini-2.5-flash', base_url=None, api_key=None,
+                 max_connections=None, timeout=60.0, transport=None):
+        """
+        Args:
+            model_name: Gemini model in the request path
+            base_url: API root (env LLM_HTTP_URL, default the public Gemini API)
+            api_key: Sent as x-goog-api-key (env GEMINI_API_KEY; optional for local servers)
+            max_connections: Pool size per client (env LLM_HTTP_MAX_CONNECTIONS, default 32)
+            timeout: Seconds per request; AsyncLLMHandler applies its own timeout as well
+            transport: Optional httpx transport, e.g. httpx.ASGITransport in tests
+        """
+        import httpx
+
+        base_url = (base_url or os.getenv('LLM_HTTP_URL') or GEMINI_API_URL).rstrip('/')
+        self.url = f"{base_url}/v1beta/models/{model_name}:generateContent"
+        api_key = api_key or os.getenv('GEMINI_API_KEY')
+        self.headers = {'x-goog-api-key': api_key} if api_key else {}
+        max_connections = max_connections or int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', MAX_CONNECTIONS))
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.transport = transport
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        """
+        Blocking call on the shared client.
+
+        With stream=True the complete response is returned as a single chunk.
+        """
+        response = self._post(self.client, prompt, generation_config)
+        return iter([response]) if stream else response
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        """Non-blocking call on this event loop's pooled client."""
+        import asyncio
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+            self._async_clients[loop] = client
+        response = await client.post(self.url, json=request_body(prompt, generation_config),
+                                     headers=self.headers)
+        return self._parse(response)
+
+    @property
+    def client(self):
+        """Shared synchronous httpx.Client, created on first use."""
+        if self._client is None:
+            import httpx
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(limits=self.limits, timeout=self.timeout,
+                                                transport=self.transport)
+        return self._client
+
+    def close(self):
+        """Close the synchronous client's connections."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        """Close the running event loop's async client."""
+        import asyncio
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _post(self, client, prompt, generation_config):
+        response = client.post(self.url, json=request_body(prompt, generation_config), headers=self.headers)
+        return self._parse(response)
+
+    @staticmethod
+    def _parse(response):
+        response.raise_for_status()
+        return TextResponse(response_text(response.json()))
+
+
+class StubModel:
+    """
+    Offline stand-in for Gemini with configurable latency and failures.
+    Returns a deterministic plan in the format the app parses, or JSON when
+    called with a JSON generation_config. Enable in the app with LLM_BACKEND=stub.
+    """
+    def __init__(self, latency=None, jitter=0.0, failure_rate=0.0, seed=None,
+                 chunk_size=40, chunk_delay=0.0):
+        """
+        Args:
+            latency: Seconds per call, or to the first chunk when streaming
+                (env LLM_STUB_LATENCY, default 0)
+            jitter: Extra uniformly random latency in seconds
+            failure_rate: Probability that a call raises
+            seed: Seed for the latency and failure draws
+            chunk_size: Characters per streamed chunk
+            chunk_delay: Seconds between streamed chunks
+        """
+        self.latency = float(os.getenv('LLM_STUB_LATENCY', 0)) if latency is None else latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        if stream:
+            return self._stream(prompt)
+        time.sleep(self._delay())
+        return self._respond(prompt, generation_config)
+
+    def _stream(self, prompt):
+        time.sleep(self._delay())
+        text = self._respond(prompt).text
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield TextResponse(text[start:start + self.chunk_size])
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        await asyncio.sleep(self._delay())
+        return self._respond(prompt, generation_config)
+
+    def _delay(self):
+        return self.latency + self._random.uniform(0, self.jitter)
+
+    def _respond(self, prompt, generation_config=None):
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            raise RuntimeError("stub model failure")
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        if generation_config and generation_config.get('response_mime_type') == 'application/json':
+            return TextResponse(json.dumps({
+                'summary': "This week mixes easy runs, one long run and a rest day.",
+                'days': [
+                    {'day': 'Monday', 'activity': 'Rest', 'mileage': None, 'time_min': None, 'pace': ''},
+                    {'day': 'Tuesday', 'activity': 'Easy run', 'mileage': 3, 'time_min': 30,
+                     'pace': 'easy/conversational pace'},
+                    {'day': 'Thursday', 'activity': 'Tempo run', 'mileage': 4, 'time_min': 36,
+                     'pace': 'tempo pace', 'notes': '10 min warm-up'},
+                    {'day': 'Saturday', 'activity': 'Long run', 'mileage': 6, 'time_min': 60,
+                     'pace': 'easy/conversational pace'},
+                ],
+                'advice': f"Keep it steady and listen to your body. (stub plan {digest})",
+            }))
+        return TextResponse(
+            "This week mixes easy runs, one long run and a rest day.\n\n"
+            "| Day | Activity | Mileage (mi) | Time (min) | Pace |\n"
+            "|-----|----------|--------------|------------|------|\n"
+            "| Monday | Rest | | | |\n"
+            "| Tuesday | Easy run | 3 | 30 | easy/conversational pace |\n"
+            "| Thursday | Tempo run | 4 | 36 | tempo pace |\n"
+            "| Saturday | Long run | 6 | 60 | easy/conversational pace |\n\n"
+            f"Keep it steady and listen to your body. (stub plan {digest})"
+        )
+
+
+def create_stub_app(model=None):
+    """
+    ASGI app serving StubModel behind the generateContent endpoint.
+
+    Args:
+        model: StubModel to serve (default: StubModel() configured by
+            LLM_STUB_LATENCY)
+
+    Returns:
+        Starlette application
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    model = model or StubModel()
+
+    async def generate_content(request):
+        body = await request.json()
+        try:
+            prompt = ''.join(part.get('text', '') for part in body['contents'][-1]['parts'])
+        except (KeyError, IndexError, TypeError):
+            return JSONResponse({'error': {'code': 400, 'message': 'Invalid contents'}}, status_code=400)
+        config = {k: body.get('generationConfig', {}).get(v) for k, v in CONFIG_FIELDS.items()}
+        try:
+            response = await model.generate_content_async(prompt, generation_config=config)
+        except RuntimeError as e:
+            return JSONResponse({'error': {'code': 503, 'message': str(e)}}, status_code=503)
+        return JSONResponse({'candidates': [{'content': {'role': 'model',
+                                                         'parts': [{'text': response.text}]}}]})
+
+    app = Starlette(routes=[
+        Route('/v1beta/models/{model_name}:generateContent', generate_content, methods=['POST']),
+    ])
+    app.state.model = model
+    return app
@@ -0,0 +1,419 @@
+"""
+LSTM Training
+Retrains the next-week mileage LSTM from featured-data.csv, scored on athletes it never saw.
+
+Same model as notebooks/lstm_model.ipynb - LSTM(50) -> Dropout(0.2) ->
+Dense(1) on MinMax-scaled 6-week windows, Adam/MSE, early stopping on
+validation loss - with three changes:
+
+  • Athlete-grouped split. The notebook's shuffled train_test_split puts
+    weeks of the same athlete in both train and test, so its MAE is
+    measured on athletes the model already knows. Here whole athletes go to
+    train, validation or test, and the scalers are fit on training windows
+    only.
+  • Windows come from sequence_builder (memory-mapped cache) and reach the
+    model through a shuffled, batched, prefetched tf.data pipeline, with a
+    larger default batch than the notebook's 32 so an epoch is a few
+    hundred steps instead of thousands.
+  • Thread pools and mixed precision are configurable for CPU retrains.
+
+Each run writes to its own directory under models/runs/: the best epoch's
+checkpoint, its scalers, the numpy backend's .npz, the ONNX export, the
+test-split residuals behind mileage_forecast's bootstrap intervals and the
+metrics. The served models in models/ change only with --install, which
+copies the complete set so the predictor backends and forecast intervals
+always describe the same model.
+
+Usage:
+    python lstm_training.py data/featured-data.csv --batch-size 256 --threads 4
+    python lstm_training.py --install
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from mileage_forecast import DEFAULT_RESIDUALS_PATH
+from mileage_predictor import (DEFAULT_MODEL_PATH, DEFAULT_NPZ_PATH, DEFAULT_ONNX_PATH, DEFAULT_SCALER_X_PATH,
+                               DEFAULT_SCALER_Y_PATH, LOOKBACK, MODELS_DIR, export_numpy_weights,
+                               export_onnx_model)
+from sequence_builder import FEATURES_PATH, load_sequences
+
+# Each training run gets a timestamped directory here
+RUNS_DIR = MODELS_DIR / 'runs'
+
+# Architecture and optimizer (see notebooks/lstm_model.ipynb)
+UNITS = 50
+DROPOUT = 0.2
+LEARNING_RATE = 1e-3
+
+EPOCHS = 100
+PATIENCE = 10
+BATCH_SIZE = 256
+
+# Shares of athletes held out for testing, then for validation from the rest
+TEST_SIZE = 0.2
+VALIDATION_SIZE = 0.2
+
+SEED = 42
+
+# Keras dtype policies; mixed policies compute in 16 bits with float32 weights
+PRECISIONS = ('float32', 'mixed_bfloat16', 'mixed_float16')
+
+METRICS_NAME = 'lstm_metrics.json'
+
+# Files a run writes, by role; install() copies all of them into models/
+RUN_FILES = {
+    'model': DEFAULT_MODEL_PATH.name,
+    'scaler_X': DEFAULT_SCALER_X_PATH.name,
+    'scaler_y': DEFAULT_SCALER_Y_PATH.name,
+    'npz': DEFAULT_NPZ_PATH.name,
+    'onnx': DEFAULT_ONNX_PATH.name,
+    'residuals': DEFAULT_RESIDUALS_PATH.name,
+    'metrics': METRICS_NAME,
+}
+
+
+def athlete_split(athletes, test_size=TEST_SIZE, validation_size=VALIDATION_SIZE, seed=SEED):
+    """
+    Assign every window to train, validation or test by athlete.
+
+    Args:
+        athletes: Athlete id of each window (N,)
+        test_size: Share of athletes held out for the test set
+        validation_size: Share of the remaining athletes used for early stopping
+        seed: Random state
+
+    Returns:
+        Dict of index arrays: train, validation and test
+
+    Raises:
+        ValueError: If there are too few athletes for three non-empty parts
+    """
+    athletes = np.asarray(athletes)
+    ids = np.unique(athletes)
+    n_test = int(round(len(ids) * test_size))
+    n_validation = int(round((len(ids) - n_test) * validation_size))
+    if min(n_test, n_validation, len(ids) - n_test - n_validation) < 1:
+        raise ValueError(f"Need more athletes to split: {len(ids)} with test_size={test_size}, "
+                         f"validation_size={validation_size}")
+    shuffled = np.random.default_rng(seed).permutation(ids)
+    part = np.zeros(len(ids), dtype=np.int8)
+    part[np.searchsorted(ids, shuffled[:n_test])] = 2
+    part[np.searchsorted(ids, shuffled[n_test:n_test + n_validation])] = 1
+    window_part = part[np.searchsorted(ids, athletes)]
+    return {name: np.flatnonzero(window_part == code)
+            for code, name in enumerate(('train', 'validation', 'test'))}
+
+
+@contextmanager
+def configure_tensorflow(intra_op_threads=None, inter_op_threads=None, precision='float32', seed=SEED):
+    """
+    Set TensorFlow's thread pools, the Keras dtype policy and random seeds.
+
+    Used as a context manager: the previous global dtype policy is restored
+    on exit, so a mixed precision run does not leak into the rest of the
+    process. Thread counts can only be set before TensorFlow runs its first
+    op in the process, and stay set.
+
+    Args:
+        intra_op_threads: Threads inside one op (None: TensorFlow default, all cores)
+        inter_op_threads: Ops run in parallel (None: TensorFlow default)
+        precision: One of PRECISIONS
+        seed: Seed for Python, NumPy and TensorFlow
+
+    Raises:
+        ValueError: For an unknown precision
+        RuntimeError: If thread counts are set after TensorFlow initialized
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Choose from: {', '.join(PRECISIONS)}")
+    import keras
+    import tensorflow as tf
+
+    if intra_op_threads is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads is not None:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    previous = keras.mixed_precision.global_policy().name
+    keras.mixed_precision.set_global_policy(precision)
+    keras.utils.set_random_seed(seed)
+    try:
+        yield
+    finally:
+        keras.mixed_precision.set_global_policy(previous)
+
+
+def fit_scalers(X, y):
+    """MinMax scalers for inputs (all weeks pooled) and targets, as in the notebook."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler_X = MinMaxScaler(feature_range=(0, 1)).fit(np.asarray(X, dtype=np.float64).reshape(-1, 1))
+    scaler_y = MinMaxScaler(feature_range=(0, 1)).fit(np.asarray(y, dtype=np.float64).reshape(-1, 1))
+    return scaler_X, scaler_y
+
+
+def make_dataset(X, y, scaler_X, scaler_y, batch_size=BATCH_SIZE, shuffle=False, seed=SEED, data_threads=None):
+    """
+    Scaled windows as a batched, prefetched tf.data pipeline.
+
+    Scaling is one vectorized pass into float32 arrays; the dataset then
+    slices batches from them and prefetches the next batch while the current
+    one trains.
+
+    Args:
+        X, y: Windows (N, lookback) and targets (N,) in miles
+        scaler_X, scaler_y: Fitted MinMax scalers
+        batch_size: Windows per step
+        shuffle: Reshuffle the windows every epoch
+        seed: Shuffle seed
+        data_threads: Size of the pipeline's private thread pool (None: shared pool)
+
+    Returns:
+        tf.data.Dataset of (X (batch, lookback, 1), y (batch, 1)) float32 pairs
+    """
+    import tensorflow as tf
+
+    X_scaled = (np.asarray(X, dtype=np.float64) * scaler_X.scale_[0] + scaler_X.min_[0]).astype(np.float32)
+    y_scaled = (np.asarray(y, dtype=np.float64) * scaler_y.scale_[0] + scaler_y.min_[0]).astype(np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices((X_scaled[:, :, np.newaxis], y_scaled[:, np.newaxis]))
+    if shuffle:
+        dataset = dataset.shuffle(len(X_scaled), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    if data_threads is not None:
+        options = tf.data.Options()
+        options.threading.private_threadpool_size = data_threads
+        dataset = dataset.with_options(options)
+    return dataset
+
+
+def build_model(lookback=LOOKBACK, units=UNITS, dropout=DROPOUT, learning_rate=LEARNING_RATE):
+    """
+    The notebook's LSTM -> Dropout -> Dense(1), compiled with Adam and MSE.
+
+    The output layer stays float32 under a mixed precision policy, and the
+    layer stack is the one mileage_predictor exports to numpy and ONNX.
+    """
+    import keras
+
+    model = keras.Sequential([
+        keras.Input(shape=(lookback, 1)),
+        keras.layers.LSTM(units, return_sequences=False),
+        keras.layers.Dropout(dropout),
+        keras.layers.Dense(1, dtype='float32'),
+    ])
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss='mse', metrics=['mae'])
+    return model
+
+
+def predict(model, X, scaler_X, scaler_y, batch_size=4096):
+    """Predictions in miles for windows (N, lookback)."""
+    predicted = model.predict(make_dataset(X, np.zeros(len(X)), scaler_X, scaler_y, batch_size), verbose=0)
+    return scaler_y.inverse_transform(np.asarray(predicted, dtype=np.float64).reshape(-1, 1)).ravel()
+
+
+def evaluate(y, predicted, X):
+    """
+    Errors in miles on a set of windows.
+
+    Args:
+        y: Actual next-week mileage (N,)
+        predicted: predict output (N,)
+        X: The windows, for the baseline
+
+    Returns:
+        Dict with mae, rmse and windows, plus the last-week baseline's
+        (next week = this week) mae for comparison
+    """
+    y = np.asarray(y, dtype=np.float64)
+    errors = predicted - y
+    return {
+        'mae': float(np.abs(errors).mean()),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+        'last_week_mae': float(np.abs(np.asarray(X)[:, -1] - y).mean()),
+        'windows': int(len(y)),
+    }
+
+
+def train(source=FEATURES_PATH,
+          output_dir=None,
+          epochs=EPOCHS,
+          batch_size=BATCH_SIZE,
+          patience=PATIENCE,
+          learning_rate=LEARNING_RATE,
+          test_size=TEST_SIZE,
+          validation_size=VALIDATION_SIZE,
+          intra_op_threads=None,
+          inter_op_threads=None,
+          data_threads=None,
+          precision='float32',
+          seed=SEED,
+          export_onnx=True,
+          verbose=1):
+    """
+    Train the mileage LSTM with an athlete-grouped split into a run directory.
+
+    Writes RUN_FILES under the names mileage_predictor and mileage_forecast
+    load: the best checkpoint, scaler_X.pkl, scaler_y.pkl, the numpy
+    backend's .npz, the ONNX export, the test split's residuals and
+    lstm_metrics.json. The served models are untouched; see install().
+
+    Args:
+        source: Weekly features path or DataFrame (see sequence_builder.load_sequences)
+        output_dir: Run directory (default: a new timestamped one in RUNS_DIR)
+        epochs: Maximum epochs
+        batch_size: Windows per step
+        patience: Epochs without validation improvement before stopping
+        learning_rate: Adam learning rate
+        test_size, validation_size: See athlete_split
+        intra_op_threads, inter_op_threads, precision: See configure_tensorflow
+        data_threads: See make_dataset
+        seed: Seed for the split, shuffling and weight initialization
+        export_onnx: Also write the ONNX export (needs onnx)
+        verbose: Keras fit verbosity
+
+    Returns:
+        Dict with test and validation metrics (see evaluate), epochs run,
+        best_epoch, seconds, athletes per part, and paths (role -> Path)
+    """
+    import joblib
+    import keras
+
+    output_dir = Path(output_dir) if output_dir is not None else RUNS_DIR / time.strftime('%Y%m%d-%H%M%S')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {role: output_dir / name for role, name in RUN_FILES.items()}
+    if not export_onnx:
+        del paths['onnx']
+
+    sequences = load_sequences(source, lookback=LOOKBACK)
+    X, y, athletes = sequences['X'], sequences['y'], sequences['athlete']
+    parts = athlete_split(athletes, test_size, validation_size, seed)
+    train_X, train_y = X[parts['train']], y[parts['train']]
+    scaler_X, scaler_y = fit_scalers(train_X, train_y)
+
+    with configure_tensorflow(intra_op_threads, inter_op_threads, precision, seed):
+        train_data = make_dataset(train_X, train_y, scaler_X, scaler_y, batch_size, shuffle=True, seed=seed,
+                                  data_threads=data_threads)
+        validation_data = make_dataset(X[parts['validation']], y[parts['validation']], scaler_X, scaler_y,
+                                       batch_size, data_threads=data_threads)
+
+        model = build_model(LOOKBACK, learning_rate=learning_rate)
+        callbacks = [
+            keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True,
+                                          verbose=verbose),
+            keras.callbacks.ModelCheckpoint(paths['model'], monitor='val_loss', save_best_only=True,
+                                            verbose=verbose),
+        ]
+        start = time.perf_counter()
+        history = model.fit(train_data, validation_data=validation_data, epochs=epochs, callbacks=callbacks,
+                            shuffle=False, verbose=verbose)
+        seconds = time.perf_counter() - start
+
+        predicted = {name: predict(model, X[parts[name]], scaler_X, scaler_y)
+                     for name in ('validation', 'test')}
+
+    joblib.dump(scaler_X, paths['scaler_X'])
+    joblib.dump(scaler_y, paths['scaler_y'])
+    export_numpy_weights(paths['model'], paths['scaler_X'], paths['scaler_y'], paths['npz'])
+    if export_onnx:
+        export_onnx_model(paths['model'], paths['scaler_X'], paths['scaler_y'], paths['onnx'])
+    test_y = np.asarray(y[parts['test']], dtype=np.float64)
+    np.savez(paths['residuals'], predicted=predicted['test'], residual=test_y - predicted['test'])
+
+    val_loss = history.history['val_loss']
+    result = {
+        'test': evaluate(test_y, predicted['test'], X[parts['test']]),
+        'validation': evaluate(y[parts['validation']], predicted['validation'], X[parts['validation']]),
+        'epochs': len(val_loss),
+        'best_epoch': int(np.argmin(val_loss)) + 1,
+        'seconds': seconds,
+        'athletes': {name: int(len(np.unique(athletes[index]))) for name, index in parts.items()},
+        'batch_size': batch_size,
+        'precision': precision,
+        'seed': seed,
+    }
+    with open(paths['metrics'], 'w') as f:
+        json.dump(result, f, indent=2)
+    result['paths'] = paths
+    return result
+
+
+def install(run_dir, models_dir=MODELS_DIR):
+    """
+    Make a training run the served model.
+
+    Copies every RUN_FILES entry - model, scalers, numpy and ONNX exports and
+    the bootstrap residuals - so no served file is left from another model.
+    Each file is copied beside its target first and then renamed over it.
+
+    Args:
+        run_dir: Directory written by train()
+        models_dir: Served models directory
+
+    Returns:
+        List of installed paths
+
+    Raises:
+        FileNotFoundError: If the run is missing any file (e.g. trained
+            without the ONNX export); nothing is installed then
+    """
+    run_dir, models_dir = Path(run_dir), Path(models_dir)
+    missing = [name for name in RUN_FILES.values() if not (run_dir / name).exists()]
+    if missing:
+        raise FileNotFoundError(f"{run_dir} is not a complete run, missing: {', '.join(missing)}")
+    installed = []
+    for name in RUN_FILES.values():
+        staging = models_dir / f'.{name}.installing'
+        shutil.copy2(run_dir / name, staging)
+        os.replace(staging, models_dir / name)
+        installed.append(models_dir / name)
+    return installed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the mileage LSTM with an athlete-grouped split")
+    parser.add_argument('input', nargs='?', default=FEATURES_PATH, help="Weekly features")
+    parser.add_argument('--output-dir', help="Run directory (default: a new one under models/runs/)")
+    parser.add_argument('--install', action='store_true',
+                        help="Serve the trained model: copy it with its exports and residuals into models/")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--patience', type=int, default=PATIENCE)
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+    parser.add_argument('--threads', type=int, help="TensorFlow intra-op threads (default: all cores)")
+    parser.add_argument('--inter-op-threads', type=int, help="TensorFlow inter-op threads")
+    parser.add_argument('--data-threads', type=int, help="tf.data private thread pool size")
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--no-onnx', action='store_true', help="Skip the ONNX export (cannot --install)")
+    parser.add_argument('--quiet', action='store_true', help="No per-epoch progress")
+    args = parser.parse_args()
+    if args.install and args.no_onnx:
+        parser.error("--install needs the ONNX export")
+
+    result = train(args.input, args.output_dir, epochs=args.epochs, batch_size=args.batch_size,
+                   patience=args.patience, learning_rate=args.learning_rate,
+                   intra_op_threads=args.threads, inter_op_threads=args.inter_op_threads,
+                   data_threads=args.data_threads, precision=args.precision, seed=args.seed,
+                   export_onnx=not args.no_onnx, verbose=0 if args.quiet else 2)
+
+    test = result['test']
+    print(f"Trained {result['epochs']} epochs in {result['seconds']:.1f}s (best epoch {result['best_epoch']})")
+    print(f"Held-out athletes ({result['athletes']['test']}, {test['windows']} windows): "
+          f"MAE {test['mae']:.2f} mi | RMSE {test['rmse']:.2f} mi | last-week baseline MAE "
+          f"{test['last_week_mae']:.2f} mi")
+    run_dir = result['paths']['model'].parent
+    print(f"Wrote {run_dir}")
+    if args.install:
+        install(run_dir)
+        print(f"Installed into {MODELS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Mileage Forecast Intervals
+Monte Carlo samples and prediction intervals around the LSTM's next-week mileage.
+
+The LSTM is off by 9.1 mi RMSE on the notebook's test split, so a single
+predicted number hides a wide range of likely weeks. Two samplers give that
+range, both as one vectorized draw of (athletes, samples):
+
+  • bootstrap (default): the model's held-out errors (actual - predicted,
+    saved to models/lstm_residuals.npz) resampled and added to the
+    prediction. Errors grow with mileage, so residuals are drawn from the
+    bin of predictions closest in size.
+  • mc_dropout: the numpy backend run with its Dropout layer active. This
+    only captures the weights' uncertainty and is much narrower than the
+    actual errors; compare with `python mileage_forecast.py evaluate`.
+
+RunningRecommender.get_recommendation_with_uncertainty turns the samples
+into probabilities for each action and caution flag. `python lstm_training.py
+--install` installs a retrained model together with its residuals; for a
+model trained elsewhere, refresh them with:
+    python mileage_forecast.py save-residuals
+"""
+
+import argparse
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from mileage_predictor import FEATURES_PATH, MODELS_DIR, get_predictor, load_notebook_test_split
+
+DEFAULT_RESIDUALS_PATH = MODELS_DIR / 'lstm_residuals.npz'
+
+# Samples per athlete and central interval reported by default
+DEFAULT_SAMPLES = 200
+DEFAULT_INTERVAL = 0.8
+
+# Prediction-size bins the bootstrap draws residuals from
+RESIDUAL_BINS = 5
+
+METHODS = ('bootstrap', 'mc_dropout')
+
+
+def save_residuals(path=DEFAULT_RESIDUALS_PATH, data_path=FEATURES_PATH, backend=None):
+    """
+    Save the predictor's errors on the notebook's held-out test split.
+
+    Args:
+        path: Output .npz path
+        data_path: Path to featured-data.csv
+        backend: Predictor backend (default: the configured one)
+
+    Returns:
+        Path of the written file
+    """
+    X_test, y_test = load_notebook_test_split(data_path)
+    predicted = get_predictor(backend).predict_batch(X_test)
+    np.savez(path, predicted=predicted, residual=y_test - predicted)
+    return Path(path)
+
+
+class ResidualBootstrap:
+    """
+    Samples next-week mileage as prediction + a held-out residual from the
+    same prediction-size bin.
+    """
+
+    def __init__(self, predicted, residual, bins=RESIDUAL_BINS):
+        """
+        Args:
+            predicted: Held-out predictions, shape (M,)
+            residual: Matching actual - predicted errors, shape (M,)
+            bins: Number of equal-count prediction bins
+        """
+        predicted = np.asarray(predicted, dtype=np.float64)
+        residual = np.asarray(residual, dtype=np.float64)
+        # Inner bin edges at prediction quantiles
+        self.edges = np.quantile(predicted, np.linspace(0, 1, bins + 1)[1:-1])
+        bin_index = np.searchsorted(self.edges, predicted, side='right')
+        order = np.lexsort((residual, bin_index))
+        # Residuals grouped by bin, with each bin's start and size
+        self.residuals = residual[order]
+        self.counts = np.bincount(bin_index, minlength=bins)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+
+    @classmethod
+    def load(cls, path=DEFAULT_RESIDUALS_PATH, bins=RESIDUAL_BINS):
+        """Build from a file written by save_residuals."""
+        with np.load(path) as data:
+            return cls(data['predicted'], data['residual'], bins)
+
+    def sample(self, predicted, samples, rng):
+        """
+        Args:
+            predicted: Point predictions, shape (N,)
+            samples: Draws per prediction
+            rng: numpy Generator
+
+        Returns:
+            Array (N, samples) of sampled mileage, floored at 0
+        """
+        predicted = np.asarray(predicted, dtype=np.float64)
+        bins = np.searchsorted(self.edges, predicted, side='right')
+        offsets = (rng.random((len(predicted), samples)) * self.counts[bins][:, None]).astype(np.int64)
+        draws = self.residuals[self.starts[bins][:, None] + offsets]
+        return np.maximum(predicted[:, None] + draws, 0.0)
+
+
+class MileageForecaster:
+    """
+    Prediction intervals for next week's mileage from Monte Carlo samples.
+    """
+
+    def __init__(self, method='bootstrap', samples=DEFAULT_SAMPLES, seed=None,
+                 residuals_path=DEFAULT_RESIDUALS_PATH, predictor=None):
+        """
+        Args:
+            method: 'bootstrap' or 'mc_dropout'
+            samples: Draws per athlete
+            seed: Seed for reproducible samples
+            residuals_path: Residuals file for the bootstrap
+            predictor: Mileage predictor (default: the shared one; mc_dropout
+                needs the numpy backend and loads it if necessary)
+
+        Raises:
+            ValueError: For an unknown method
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(METHODS)}")
+        self.method = method
+        self.samples = samples
+        self.rng = np.random.default_rng(seed)
+        self.predictor = predictor or get_predictor('numpy' if method == 'mc_dropout' else None)
+        self.bootstrap = ResidualBootstrap.load(residuals_path) if method == 'bootstrap' else None
+
+    def sample(self, sequences, samples=None):
+        """
+        Draw next-week mileage samples for many athletes in one pass.
+
+        Args:
+            sequences: Array-like (N, 6) of weekly mileage, oldest first
+            samples: Draws per athlete (default: self.samples)
+
+        Returns:
+            Array of shape (N, samples) in miles
+        """
+        samples = samples or self.samples
+        if self.method == 'mc_dropout':
+            return np.maximum(self.predictor.predict_dropout_samples(sequences, samples, self.rng), 0.0)
+        return self.bootstrap.sample(self.predictor.predict_batch(sequences), samples, self.rng)
+
+    def forecast(self, sequences, interval=DEFAULT_INTERVAL, samples=None):
+        """
+        Point prediction with a central prediction interval.
+
+        Args:
+            sequences: Array-like (N, 6) of weekly mileage, oldest first
+            interval: Central coverage of lower..upper, e.g. 0.8 for 10%-90%
+            samples: Draws per athlete (default: self.samples)
+
+        Returns:
+            Dict of (N,) arrays: predicted (the model's point prediction),
+            median, lower, upper, std, plus samples (N, samples)
+        """
+        draws = self.sample(sequences, samples)
+        tail = (1 - interval) / 2
+        lower, median, upper = np.quantile(draws, [tail, 0.5, 1 - tail], axis=1)
+        return {
+            'predicted': self.predictor.predict_batch(sequences),
+            'median': median,
+            'lower': lower,
+            'upper': upper,
+            'std': draws.std(axis=1),
+            'samples': draws,
+        }
+
+
+def interval_coverage(forecaster, sequences, actual, interval=DEFAULT_INTERVAL):
+    """
+    Share of actual weeks that fall inside the forecast interval.
+
+    Args:
+        forecaster: MileageForecaster
+        sequences: Array (N, 6) of input weeks
+        actual: Array (N,) of the weeks that followed
+        interval: Nominal coverage
+
+    Returns:
+        Dict with coverage and mean interval width in miles
+    """
+    result = forecaster.forecast(sequences, interval)
+    inside = (actual >= result['lower']) & (actual <= result['upper'])
+    return {'coverage': float(inside.mean()), 'width': float((result['upper'] - result['lower']).mean())}
+
+
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+
+def get_forecaster():
+    """Get the process-wide bootstrap MileageForecaster, loading the residuals on first use."""
+    global _forecaster
+    if _forecaster is None:
+        with _forecaster_lock:
+            if _forecaster is None:
+                _forecaster = MileageForecaster()
+    return _forecaster
+
+
+def forecast_next_week_mileage(recent_mileage, interval=DEFAULT_INTERVAL):
+    """
+    Forecast one athlete's next week with a prediction interval.
+
+    Args:
+        recent_mileage: Last 6 weeks of mileage, oldest first
+        interval: Central coverage of the interval
+
+    Returns:
+        Dict with predicted, median, lower, upper and std as floats, and
+        samples (1-D array) for get_recommendation_with_uncertainty
+    """
+    result = get_forecaster().forecast([recent_mileage], interval)
+    forecast = {name: float(values[0]) for name, values in result.items() if name != 'samples'}
+    forecast['samples'] = result['samples'][0]
+    return forecast
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mileage forecast interval tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    save = subparsers.add_parser('save-residuals', help="Save held-out errors for the bootstrap")
+    save.add_argument('--output', default=DEFAULT_RESIDUALS_PATH)
+    evaluate = subparsers.add_parser('evaluate', help="Check interval coverage on held-out weeks")
+    evaluate.add_argument('--interval', type=float, default=DEFAULT_INTERVAL)
+    args = parser.parse_args()
+
+    if args.command == 'save-residuals':
+        print(f"Saved residuals to {save_residuals(args.output)}")
+        return
+
+    # Calibrate the bootstrap on half of the held-out split, score on the other half
+    X_test, y_test = load_notebook_test_split()
+    half = np.random.default_rng(0).permutation(len(y_test)) < len(y_test) // 2
+    predictor = get_predictor()
+    predicted = predictor.predict_batch(X_test[half])
+    bootstrap = MileageForecaster('bootstrap', seed=0, residuals_path=DEFAULT_RESIDUALS_PATH)
+    bootstrap.bootstrap = ResidualBootstrap(predicted, y_test[half] - predicted)
+    for name, forecaster in (('bootstrap', bootstrap), ('mc_dropout', MileageForecaster('mc_dropout', seed=0))):
+        result = interval_coverage(forecaster, X_test[~half], y_test[~half], args.interval)
+        print(f"{name:>10}: {result['coverage']:.1%} of weeks inside the {args.interval:.0%} interval "
+              f"(mean width {result['width']:.1f} mi)")
+
+
+if __name__ == "__main__":
+    main()
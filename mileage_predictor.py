@@ -0,0 +1,559 @@
+"""
+LSTM Mileage Predictor
+Predicts next week's mileage from the last 6 weeks using the trained LSTM.
+The model and its scalers are loaded once per process and reused.
+
+Interchangeable backends:
+  • keras: the saved Keras model (needs TensorFlow)
+  • numpy: the same weights exported to .npz and run with a pure-NumPy
+    forward pass (no TensorFlow or scikit-learn import)
+  • onnx: the model exported to ONNX and run with onnxruntime
+
+onnx (for export-onnx) and onnxruntime (for the onnx backend) are listed in
+requirements.txt but are optional: they are imported only when used, and the
+keras and numpy backends run without them.
+
+Pick one with MILEAGE_PREDICTOR_BACKEND in the environment or .env file.
+Re-export after retraining with:
+    python mileage_predictor.py export-npz
+    python mileage_predictor.py export-onnx
+"""
+
+import argparse
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Backend settings can live in the same .env file as the API keys
+load_dotenv()
+
+MODELS_DIR = Path(__file__).resolve().parent / 'models'
+
+# Weekly features the notebook's test split is drawn from
+FEATURES_PATH = Path(__file__).resolve().parent / 'data' / 'featured-data.csv'
+
+# Number of past weeks the LSTM looks at (see notebooks/lstm_model.ipynb)
+LOOKBACK = 6
+
+DEFAULT_MODEL_PATH = MODELS_DIR / 'lstm_model_best.keras'
+DEFAULT_NPZ_PATH = MODELS_DIR / 'lstm_model_best.npz'
+DEFAULT_ONNX_PATH = MODELS_DIR / 'lstm_model_best.onnx'
+DEFAULT_SCALER_X_PATH = MODELS_DIR / 'scaler_X.pkl'
+DEFAULT_SCALER_Y_PATH = MODELS_DIR / 'scaler_y.pkl'
+
+# Backend used by get_predictor() when none is given. "auto" picks numpy when
+# the exported weights exist and falls back to keras otherwise.
+BACKEND_ENV_VAR = 'MILEAGE_PREDICTOR_BACKEND'
+# onnxruntime intra-op thread count; 0 lets onnxruntime use every core
+ONNX_THREADS_ENV_VAR = 'MILEAGE_PREDICTOR_ONNX_THREADS'
+
+
+class MileagePredictor:
+    """
+    Base class: input validation and MinMax scaling around a model forward pass.
+
+    Both scalers were fit on a single column, so scaling is one multiply-add
+    with the scalers' scale_/min_ values. Subclasses set those and implement
+    _forward on scaled (N, 6) input.
+    """
+
+    backend = None
+
+    def predict_batch(self, sequences):
+        """
+        Predict next week's mileage for many 6-week sequences in one pass.
+
+        Args:
+            sequences: Array-like of shape (N, 6), weekly mileage oldest first
+
+        Returns:
+            NumPy array of shape (N,) with predicted mileage
+        """
+        X = self._check_sequences(sequences)
+        if len(X) == 0:
+            return np.empty(0)
+
+        X_scaled = X * self._x_scale + self._x_min
+        y_scaled = self._forward(X_scaled)
+        return (y_scaled - self._y_min) / self._y_scale
+
+    def predict(self, recent_mileage):
+        """
+        Predict next week's mileage for a single athlete.
+
+        Args:
+            recent_mileage: Last 6 weeks of mileage, oldest first
+
+        Returns:
+            Predicted mileage as a float
+        """
+        return float(self.predict_batch([recent_mileage])[0])
+
+    def _forward(self, X_scaled):
+        """Run the model on scaled sequences of shape (N, 6)."""
+        raise NotImplementedError
+
+    def _set_scaling(self, x_scale, x_min, y_scale, y_min):
+        """Store the input/output MinMax parameters as plain floats."""
+        self._x_scale = np.float32(x_scale)
+        self._x_min = np.float32(x_min)
+        self._y_scale = float(y_scale)
+        self._y_min = float(y_min)
+
+    def _check_sequences(self, sequences):
+        """Validate input and return a float32 array of shape (N, 6)."""
+        X = np.asarray(sequences, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != LOOKBACK:
+            raise ValueError(f"Expected sequences of shape (N, {LOOKBACK}), got {X.shape}")
+        return X
+
+
+class KerasMileagePredictor(MileagePredictor):
+    """
+    Runs the saved Keras model.
+    """
+
+    backend = 'keras'
+
+    def __init__(self,
+                 model_path=DEFAULT_MODEL_PATH,
+                 scaler_X_path=DEFAULT_SCALER_X_PATH,
+                 scaler_y_path=DEFAULT_SCALER_Y_PATH):
+        """
+        Load the model and scalers.
+
+        Args:
+            model_path: Path to the saved Keras model
+            scaler_X_path: Path to the input MinMaxScaler
+            scaler_y_path: Path to the output MinMaxScaler
+        """
+        # Imported here so the numpy backend never pulls in TensorFlow
+        import joblib
+        import keras
+
+        self.model = keras.models.load_model(model_path)
+        self.scaler_X = joblib.load(scaler_X_path)
+        self.scaler_y = joblib.load(scaler_y_path)
+        self._set_scaling(self.scaler_X.scale_[0], self.scaler_X.min_[0],
+                          self.scaler_y.scale_[0], self.scaler_y.min_[0])
+
+    def _forward(self, X_scaled):
+        """Run the model on scaled sequences of shape (N, 6)."""
+        # Calling the model directly runs one graph execution for the whole
+        # batch, without model.predict()'s per-call dataset setup.
+        y = self.model(X_scaled[:, :, np.newaxis], training=False)
+        return np.asarray(y, dtype=np.float64).reshape(-1)
+
+
+class NumpyMileagePredictor(MileagePredictor):
+    """
+    Pure-NumPy forward pass of the LSTM(50) -> Dropout -> Dense(1) model.
+    """
+
+    backend = 'numpy'
+
+    def __init__(self, weights_path=DEFAULT_NPZ_PATH):
+        """
+        Load weights exported by export_numpy_weights.
+
+        Args:
+            weights_path: Path to the .npz weights file
+        """
+        with np.load(weights_path) as weights:
+            kernel = weights['lstm_kernel']
+            self.recurrent_kernel = weights['lstm_recurrent_kernel']
+            bias = weights['lstm_bias']
+            self.dense_kernel = weights['dense_kernel']
+            self.dense_bias = weights['dense_bias']
+            self._set_scaling(weights['x_scale'], weights['x_min'],
+                              weights['y_scale'], weights['y_min'])
+            # Older exports don't record the dropout rate (needed for MC dropout only)
+            self.dropout_rate = float(weights['dropout_rate']) if 'dropout_rate' in weights else None
+
+        if kernel.shape[0] != 1:
+            raise ValueError(f"Expected a single input feature, got {kernel.shape[0]}")
+        self.units = self.recurrent_kernel.shape[0]
+        # With one input feature, x_t @ kernel is a scalar times a row
+        self.input_kernel = kernel[0]
+        self.bias = bias
+
+    def _forward(self, X_scaled):
+        """Run the LSTM cells and dense head on scaled (N, 6) input."""
+        # Dropout is inactive at inference time
+        y = self._hidden(X_scaled) @ self.dense_kernel + self.dense_bias
+        return y.astype(np.float64).reshape(-1)
+
+    def predict_dropout_samples(self, sequences, samples=100, rng=None):
+        """
+        Monte Carlo dropout: predictions with the Dropout layer left active.
+
+        The dropout sits between the LSTM and the dense head, so the LSTM
+        runs once and every sample is a masked dot product of its final
+        hidden state, all in one batched matmul.
+
+        Args:
+            sequences: Array-like of shape (N, 6), weekly mileage oldest first
+            samples: Dropout samples per sequence
+            rng: numpy Generator (default: a fresh unseeded one)
+
+        Returns:
+            Array of shape (N, samples) in miles
+
+        Raises:
+            ValueError: If the weights file has no dropout rate (re-export it)
+        """
+        if not self.dropout_rate:
+            raise ValueError("Weights have no dropout_rate; re-export with 'python mileage_predictor.py export-npz'")
+        rng = rng or np.random.default_rng()
+        X = self._check_sequences(sequences)
+        h = self._hidden(X * self._x_scale + self._x_min)
+
+        keep = 1.0 - self.dropout_rate
+        masks = rng.random((len(X), samples, self.units), dtype=np.float32) < keep
+        weighted = (h * self.dense_kernel[:, 0] / np.float32(keep))[:, :, np.newaxis]
+        y_scaled = np.matmul(masks.astype(np.float32), weighted)[:, :, 0] + self.dense_bias[0]
+        return (y_scaled.astype(np.float64) - self._y_min) / self._y_scale
+
+    def _hidden(self, X_scaled):
+        """Final LSTM hidden state (N, units) for scaled (N, 6) input."""
+        n, steps = X_scaled.shape
+        u = self.units
+
+        # Input contributions for every timestep at once: (N, steps, 4u)
+        x_proj = X_scaled[:, :, np.newaxis] * self.input_kernel + self.bias
+
+        h = np.zeros((n, u), dtype=np.float32)
+        c = np.zeros((n, u), dtype=np.float32)
+        for t in range(steps):
+            z = x_proj[:, t] + h @ self.recurrent_kernel
+            # Keras gate order: input, forget, cell candidate, output
+            i = _sigmoid(z[:, :u])
+            f = _sigmoid(z[:, u:2 * u])
+            g = np.tanh(z[:, 2 * u:3 * u])
+            o = _sigmoid(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+        return h
+
+
+class OnnxMileagePredictor(MileagePredictor):
+    """
+    Runs the ONNX export of the model with onnxruntime on CPU.
+    """
+
+    backend = 'onnx'
+
+    def __init__(self, model_path=DEFAULT_ONNX_PATH, intra_op_threads=None):
+        """
+        Create the inference session.
+
+        Args:
+            model_path: Path to the .onnx file written by export_onnx_model
+            intra_op_threads: Threads per operator; defaults to
+                MILEAGE_PREDICTOR_ONNX_THREADS or onnxruntime's own default
+        """
+        import onnxruntime as ort
+
+        if intra_op_threads is None:
+            intra_op_threads = int(os.getenv(ONNX_THREADS_ENV_VAR, '0'))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+
+        scaling = self.session.get_modelmeta().custom_metadata_map
+        self._set_scaling(float(scaling['x_scale']), float(scaling['x_min']),
+                          float(scaling['y_scale']), float(scaling['y_min']))
+        self._input_name = self.session.get_inputs()[0].name
+
+    def _forward(self, X_scaled):
+        """Run the session on scaled sequences of shape (N, 6)."""
+        (y,) = self.session.run(None, {self._input_name: X_scaled})
+        return y.astype(np.float64).reshape(-1)
+
+
+def _sigmoid(x):
+    """Logistic sigmoid, written with tanh to stay finite for large |x|."""
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def load_lstm_weights(model_path=DEFAULT_MODEL_PATH,
+                      scaler_X_path=DEFAULT_SCALER_X_PATH,
+                      scaler_y_path=DEFAULT_SCALER_Y_PATH):
+    """
+    Read the LSTM/Dense weights and scaler parameters out of the Keras model.
+
+    Args:
+        model_path: Path to the saved Keras model
+        scaler_X_path: Path to the input MinMaxScaler
+        scaler_y_path: Path to the output MinMaxScaler
+
+    Returns:
+        Dict of float32 arrays in Keras layout (gate order i, f, c, o)
+
+    Raises:
+        ValueError: If the model is not the LSTM -> Dropout -> Dense(1)
+            architecture the exported backends implement
+    """
+    keras_predictor = KerasMileagePredictor(model_path, scaler_X_path, scaler_y_path)
+    model = keras_predictor.model
+
+    layer_types = [type(layer).__name__ for layer in model.layers]
+    if layer_types != ['LSTM', 'Dropout', 'Dense']:
+        raise ValueError(f"Unsupported architecture for export: {layer_types}")
+    lstm, dropout, dense = model.layers
+    lstm_config = lstm.get_config()
+    if (lstm_config['activation'] != 'tanh'
+            or lstm_config['recurrent_activation'] != 'sigmoid'
+            or lstm_config['return_sequences'] or lstm_config['go_backwards']
+            or dense.get_config()['activation'] != 'linear'):
+        raise ValueError("Unsupported LSTM/Dense configuration for export")
+
+    kernel, recurrent_kernel, bias = lstm.get_weights()
+    dense_kernel, dense_bias = dense.get_weights()
+    return {
+        'lstm_kernel': kernel.astype(np.float32),
+        'lstm_recurrent_kernel': recurrent_kernel.astype(np.float32),
+        'lstm_bias': bias.astype(np.float32),
+        'dense_kernel': dense_kernel.astype(np.float32),
+        'dense_bias': dense_bias.astype(np.float32),
+        'x_scale': keras_predictor.scaler_X.scale_[0],
+        'x_min': keras_predictor.scaler_X.min_[0],
+        'y_scale': keras_predictor.scaler_y.scale_[0],
+        'y_min': keras_predictor.scaler_y.min_[0],
+        'dropout_rate': np.float64(dropout.get_config()['rate']),
+    }
+
+
+def export_numpy_weights(model_path=DEFAULT_MODEL_PATH,
+                         scaler_X_path=DEFAULT_SCALER_X_PATH,
+                         scaler_y_path=DEFAULT_SCALER_Y_PATH,
+                         output_path=DEFAULT_NPZ_PATH):
+    """
+    Export the Keras LSTM weights and scaler parameters to a compact .npz file.
+
+    Args:
+        model_path: Path to the saved Keras model
+        scaler_X_path: Path to the input MinMaxScaler
+        scaler_y_path: Path to the output MinMaxScaler
+        output_path: Where to write the .npz file
+
+    Returns:
+        Path of the written file
+    """
+    np.savez(output_path, **load_lstm_weights(model_path, scaler_X_path, scaler_y_path))
+    return Path(output_path)
+
+
+def export_onnx_model(model_path=DEFAULT_MODEL_PATH,
+                      scaler_X_path=DEFAULT_SCALER_X_PATH,
+                      scaler_y_path=DEFAULT_SCALER_Y_PATH,
+                      output_path=DEFAULT_ONNX_PATH):
+    """
+    Export the Keras LSTM to ONNX for the onnxruntime backend.
+
+    The graph takes scaled sequences of shape (N, 6) and returns scaled
+    predictions of shape (N, 1). Scaler parameters are stored in the model
+    metadata so the predictor can load them without scikit-learn.
+
+    Args:
+        model_path: Path to the saved Keras model
+        scaler_X_path: Path to the input MinMaxScaler
+        scaler_y_path: Path to the output MinMaxScaler
+        output_path: Where to write the .onnx file
+
+    Returns:
+        Path of the written file
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = load_lstm_weights(model_path, scaler_X_path, scaler_y_path)
+    units = weights['lstm_recurrent_kernel'].shape[0]
+
+    def onnx_gate_order(matrix):
+        # Keras stacks gates as i, f, c, o; the ONNX LSTM op expects i, o, f, c
+        i, f, c, o = np.split(matrix, 4, axis=-1)
+        return np.concatenate([i, o, f, c], axis=-1)
+
+    W = onnx_gate_order(weights['lstm_kernel']).T[np.newaxis]
+    R = onnx_gate_order(weights['lstm_recurrent_kernel']).T[np.newaxis]
+    B = np.concatenate([onnx_gate_order(weights['lstm_bias']),
+                        np.zeros(4 * units, dtype=np.float32)])[np.newaxis]
+
+    initializers = [
+        numpy_helper.from_array(W, 'W'),
+        numpy_helper.from_array(R, 'R'),
+        numpy_helper.from_array(B, 'B'),
+        numpy_helper.from_array(weights['dense_kernel'], 'dense_kernel'),
+        numpy_helper.from_array(weights['dense_bias'], 'dense_bias'),
+        numpy_helper.from_array(np.array([LOOKBACK, -1, 1], dtype=np.int64), 'input_shape'),
+        numpy_helper.from_array(np.array([-1, units], dtype=np.int64), 'state_shape'),
+    ]
+    nodes = [
+        # The ONNX LSTM op is time-major: (6, N, 1) in, Y_h of shape (1, N, units) out
+        helper.make_node('Transpose', ['sequences'], ['time_major'], perm=[1, 0]),
+        helper.make_node('Reshape', ['time_major', 'input_shape'], ['lstm_input']),
+        helper.make_node('LSTM', ['lstm_input', 'W', 'R', 'B'], ['', 'Y_h'],
+                         hidden_size=units),
+        helper.make_node('Reshape', ['Y_h', 'state_shape'], ['h']),
+        helper.make_node('MatMul', ['h', 'dense_kernel'], ['dense']),
+        helper.make_node('Add', ['dense', 'dense_bias'], ['prediction']),
+    ]
+    graph = helper.make_graph(
+        nodes, 'mileage_lstm',
+        inputs=[helper.make_tensor_value_info('sequences', TensorProto.FLOAT, ['N', LOOKBACK])],
+        outputs=[helper.make_tensor_value_info('prediction', TensorProto.FLOAT, ['N', 1])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 14)])
+    # Opset 14 needs IR version 7; pinning it keeps older onnxruntime releases working
+    model.ir_version = 7
+    helper.set_model_props(model, {
+        name: repr(float(weights[name])) for name in ('x_scale', 'x_min', 'y_scale', 'y_min')
+    })
+    onnx.checker.check_model(model)
+    onnx.save(model, output_path)
+    return Path(output_path)
+
+
+BACKENDS = {
+    'keras': KerasMileagePredictor,
+    'numpy': NumpyMileagePredictor,
+    'onnx': OnnxMileagePredictor,
+}
+
+
+def resolve_backend(backend=None):
+    """
+    Resolve a backend name, reading MILEAGE_PREDICTOR_BACKEND when none is given.
+
+    "auto" (the default) selects numpy if the exported weights exist,
+    otherwise keras.
+    """
+    backend = backend or os.getenv(BACKEND_ENV_VAR, 'auto')
+    if backend == 'auto':
+        backend = 'numpy' if DEFAULT_NPZ_PATH.exists() else 'keras'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown mileage predictor backend '{backend}'. "
+                         f"Choose from: {', '.join(BACKENDS)}")
+    return backend
+
+
+_predictors = {}
+_predictor_lock = threading.Lock()
+
+
+def get_predictor(backend=None):
+    """Get the process-wide predictor for a backend, loading it on first use."""
+    backend = resolve_backend(backend)
+    if backend not in _predictors:
+        with _predictor_lock:
+            if backend not in _predictors:
+                _predictors[backend] = BACKENDS[backend]()
+    return _predictors[backend]
+
+
+def predict_next_week_mileage(recent_mileage):
+    """
+    Predict next week's mileage from the last 6 weeks (oldest first).
+
+    Args:
+        recent_mileage: Sequence of 6 weekly mileage values
+
+    Returns:
+        Predicted mileage as a float
+    """
+    return get_predictor().predict(recent_mileage)
+
+
+def predict_batch(sequences):
+    """
+    Predict next week's mileage for an array of shape (N, 6).
+
+    Args:
+        sequences: Array-like of 6-week sequences, oldest week first
+
+    Returns:
+        NumPy array of shape (N,) with predicted mileage
+    """
+    return get_predictor().predict_batch(sequences)
+
+
+def load_notebook_test_split(path=FEATURES_PATH):
+    """
+    Rebuild the held-out test set from notebooks/lstm_model.ipynb.
+
+    Athletes with at least 7 weeks, every 6-week window with the following
+    week as target, then the notebook's shuffled 80/20 split (random_state=42).
+
+    Args:
+        path: Path to featured-data.csv
+
+    Returns:
+        Tuple (X_test, y_test) in miles, shapes (N, 6) and (N,)
+    """
+    from sklearn.model_selection import train_test_split
+
+    from sequence_builder import load_sequences
+
+    sequences = load_sequences(path, lookback=LOOKBACK)
+    _, test = train_test_split(np.arange(len(sequences['y'])), test_size=0.2,
+                               random_state=42, shuffle=True)
+    return sequences['X'][test], sequences['y'][test]
+
+
+def evaluate_backend(backend=None, path=FEATURES_PATH):
+    """
+    Score a backend on the notebook's test split (the notebook reports MAE 7.04 mi).
+
+    Args:
+        backend: Backend name, or None for the configured default
+        path: Path to featured-data.csv
+
+    Returns:
+        Dict with 'mae' and 'rmse' in miles
+    """
+    X_test, y_test = load_notebook_test_split(path)
+    errors = get_predictor(backend).predict_batch(X_test) - y_test
+    return {
+        'mae': float(np.abs(errors).mean()),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LSTM mileage predictor tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_npz = subparsers.add_parser('export-npz', help="Export Keras weights for the numpy backend")
+    export_npz.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    export_npz.add_argument('--output', default=DEFAULT_NPZ_PATH)
+
+    export_onnx = subparsers.add_parser('export-onnx', help="Export the model for the onnx backend")
+    export_onnx.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    export_onnx.add_argument('--output', default=DEFAULT_ONNX_PATH)
+
+    evaluate = subparsers.add_parser('evaluate', help="Score backends on the notebook's test split")
+    evaluate.add_argument('backends', nargs='*', default=list(BACKENDS))
+
+    args = parser.parse_args()
+    if args.command == 'export-npz':
+        path = export_numpy_weights(model_path=args.model, output_path=args.output)
+        print(f"Saved NumPy weights to {path}")
+    elif args.command == 'export-onnx':
+        path = export_onnx_model(model_path=args.model, output_path=args.output)
+        print(f"Saved ONNX model to {path}")
+    elif args.command == 'evaluate':
+        for backend in args.backends:
+            metrics = evaluate_backend(backend)
+            print(f"{backend:>6}: MAE {metrics['mae']:.2f} mi | RMSE {metrics['rmse']:.2f} mi")
+
+
+if __name__ == "__main__":
+    main()
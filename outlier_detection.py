@@ -0,0 +1,246 @@
+"""
+Profile Outlier Detection
+Flags athletes whose training profile lies outside every dense region, before cluster routing.
+
+notebooks/clustering.ipynb picked DBSCAN's eps (1.65, min_samples 5) by eye
+from a brute-force k-distance curve (visualizations/dbscan_eps_selection.png).
+Here both the k-distance curve and DBSCAN's neighborhood queries run on a
+KD-tree, so they scale as N log N rather than N^2, and eps can be chosen
+automatically at the curve's knee (Kneedle: the point farthest below the
+chord from the first to the last distance).
+
+An athlete is an outlier when no DBSCAN core profile lies within eps of
+theirs - exactly DBSCAN's noise label for the fitted roster, and the same
+rule for new athletes. By default the detector uses the saved
+models/dbscan_model.pkl (its eps, min_samples and core profiles) in the
+clustering scaler's standardized space, so it lines up with ClusterAssigner.
+
+Usage:
+    python outlier_detection.py data/featured-data.csv --eps knee
+"""
+
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cluster_assignment import MODELS_DIR, PROFILE_FEATURES, profile_features
+
+DBSCAN_PATH = MODELS_DIR / 'dbscan_model.pkl'
+SCALER_PATH = MODELS_DIR / 'clustering_scaler.pkl'
+
+# Spatial index for k-distance and neighborhood queries
+TREE_ALGORITHM = 'kd_tree'
+LEAF_SIZE = 30
+
+
+def k_distance_curve(X, k, algorithm=TREE_ALGORITHM, leaf_size=LEAF_SIZE):
+    """
+    Sorted distance from every point to its k-th nearest neighbor.
+
+    The point itself counts as the first neighbor, as in the notebook's
+    NearestNeighbors(n_neighbors=5) curve and DBSCAN's min_samples.
+
+    Args:
+        X: Scaled profiles (N, 6)
+        k: Neighbor rank (DBSCAN's min_samples)
+        algorithm: NearestNeighbors algorithm ('kd_tree', 'ball_tree', 'brute')
+        leaf_size: Tree leaf size
+
+    Returns:
+        Ascending array of N distances
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    tree = NearestNeighbors(n_neighbors=k, algorithm=algorithm, leaf_size=leaf_size).fit(X)
+    distances, _ = tree.kneighbors(X)
+    return np.sort(distances[:, -1])
+
+
+def knee_eps(curve):
+    """
+    eps at the knee of a sorted k-distance curve (Kneedle).
+
+    Both axes are scaled to [0, 1]; the knee is the point where the curve
+    falls farthest below the straight line from its first to its last value.
+
+    Args:
+        curve: Ascending k-distances (k_distance_curve output)
+
+    Returns:
+        Distance at the knee as a float
+
+    Raises:
+        ValueError: If the curve has fewer than 3 points
+    """
+    curve = np.asarray(curve, dtype=np.float64)
+    if len(curve) < 3:
+        raise ValueError(f"Need at least 3 points to find a knee, got {len(curve)}")
+    span = curve[-1] - curve[0]
+    if span <= 0:
+        return float(curve[0])
+    x = np.linspace(0.0, 1.0, len(curve))
+    y = (curve - curve[0]) / span
+    return float(curve[np.argmax(x - y)])
+
+
+class OutlierDetector:
+    """
+    DBSCAN-noise test against a fixed set of core profiles, on a KD-tree.
+    """
+
+    def __init__(self, model_path=DBSCAN_PATH, scaler_path=SCALER_PATH, model=None):
+        """
+        Load a fitted DBSCAN model and the clustering scaler.
+
+        Args:
+            model_path: Path to a fitted sklearn DBSCAN (joblib)
+            scaler_path: Path to the clustering StandardScaler
+            model: Fitted DBSCAN to use instead of loading model_path
+        """
+        import joblib
+        from sklearn.neighbors import KDTree
+
+        model = model if model is not None else joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+
+        self.model = model
+        self.eps = float(model.eps)
+        self.min_samples = int(model.min_samples)
+        self.labels_ = getattr(model, 'labels_', None)
+        self.core = np.asarray(model.components_, dtype=np.float64)
+        self._mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self._scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self._tree = KDTree(self.core, leaf_size=LEAF_SIZE) if len(self.core) else None
+
+    @classmethod
+    def fit(cls, profiles, eps=None, min_samples=None, model_path=DBSCAN_PATH, scaler_path=SCALER_PATH):
+        """
+        Run DBSCAN on a roster with tree-backed neighborhood queries.
+
+        Args:
+            profiles: DataFrame with PROFILE_FEATURES columns (or raw array)
+            eps: Neighborhood radius; 'knee' picks it from the k-distance
+                curve; None keeps the saved model's eps
+            min_samples: Core point threshold (default: the saved model's)
+            model_path: Saved DBSCAN supplying the defaults
+            scaler_path: Clustering scaler
+
+        Returns:
+            OutlierDetector whose labels_ are the roster's DBSCAN labels
+        """
+        import joblib
+        from sklearn.cluster import DBSCAN
+
+        saved = joblib.load(model_path)
+        min_samples = int(saved.min_samples if min_samples is None else min_samples)
+        scaler = joblib.load(scaler_path)
+        X = _standardize(profiles, scaler.mean_, scaler.scale_)
+        if eps is None:
+            eps = saved.eps
+        elif eps == 'knee':
+            eps = knee_eps(k_distance_curve(X, min_samples))
+        model = DBSCAN(eps=float(eps), min_samples=min_samples, algorithm=TREE_ALGORITHM,
+                       leaf_size=LEAF_SIZE).fit(X)
+        return cls(scaler_path=scaler_path, model=model)
+
+    def flag(self, features):
+        """
+        Flag outlier profiles.
+
+        Missing features (NaN) are treated as the population mean.
+
+        Args:
+            features: Array-like (N, 6) in PROFILE_FEATURES order, or a
+                DataFrame with those columns
+
+        Returns:
+            Dict of arrays: outlier (bool) and core_distance (to the nearest
+            core profile, in standardized units)
+        """
+        X = _standardize(features, self._mean, self._scale)
+        if self._tree is None:
+            return {'outlier': np.ones(len(X), dtype=bool), 'core_distance': np.full(len(X), np.inf)}
+        distance, _ = self._tree.query(X, k=1)
+        distance = distance[:, 0]
+        return {'outlier': distance > self.eps, 'core_distance': distance}
+
+    def flag_weekly(self, weekly, recent_weeks=None):
+        """
+        Flag every athlete in a weekly feature table.
+
+        Args:
+            weekly: Weekly features (featured-data.csv columns)
+            recent_weeks: Only average each athlete's latest N weeks
+
+        Returns:
+            DataFrame indexed by athlete with profile features, outlier and
+            core_distance
+        """
+        profiles = profile_features(weekly, recent_weeks)
+        for column, values in self.flag(profiles).items():
+            profiles[column] = values
+        return profiles
+
+    def save(self, path=DBSCAN_PATH):
+        """Write the underlying DBSCAN model (same format as models/dbscan_model.pkl)."""
+        import joblib
+        joblib.dump(self.model, path)
+        return Path(path)
+
+
+def _standardize(features, mean, scale):
+    """Raw profile features -> the clustering scaler's standardized space, NaN -> 0 (the mean)."""
+    import pandas as pd
+
+    if isinstance(features, pd.DataFrame):
+        features = features[list(PROFILE_FEATURES)].to_numpy(dtype=np.float64)
+    X = np.atleast_2d(np.asarray(features, dtype=np.float64))
+    if X.shape[1] != len(PROFILE_FEATURES):
+        raise ValueError(f"Expected {len(PROFILE_FEATURES)} profile features, got {X.shape[1]}")
+    return np.nan_to_num((X - mean) / scale, nan=0.0)
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """Get the process-wide OutlierDetector from the saved DBSCAN model."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = OutlierDetector()
+    return _detector
+
+
+def main():
+    from roster_plans import WEEKLY_PATH, read_weekly
+
+    parser = argparse.ArgumentParser(description="Flag outlier athlete profiles with DBSCAN")
+    parser.add_argument('input', nargs='?', default=WEEKLY_PATH, help="Weekly features (CSV or Parquet)")
+    parser.add_argument('--eps', default=None, help="Radius, 'knee' for automatic, or omit for the saved eps")
+    parser.add_argument('--min-samples', type=int, help="Core point threshold (default: saved)")
+    parser.add_argument('--save', help="Write the fitted model (e.g. models/dbscan_model.pkl)")
+    args = parser.parse_args()
+
+    profiles = profile_features(read_weekly(args.input)).dropna()
+    eps = args.eps if args.eps in (None, 'knee') else float(args.eps)
+    start = time.perf_counter()
+    detector = OutlierDetector.fit(profiles, eps=eps, min_samples=args.min_samples)
+    elapsed = time.perf_counter() - start
+
+    outliers = detector.labels_ == -1
+    print(f"DBSCAN on {len(profiles)} athletes in {elapsed:.2f}s: eps={detector.eps:.3f}, "
+          f"min_samples={detector.min_samples}, {outliers.sum()} outliers ({outliers.mean():.1%})")
+    for athlete in profiles.index[outliers][:20]:
+        print(f"  {athlete}")
+    if args.save:
+        print(f"Wrote {detector.save(args.save)}")
+
+
+if __name__ == "__main__":
+    main()
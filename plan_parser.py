@@ -0,0 +1,123 @@
+"""
+Plan Stream Parser
+Splits LLM plan text into summary, schedule table and coach's advice while it streams in.
+
+Generated plans follow the layout requested in LLMHandler._build_prompt: a
+workout summary, a Markdown table starting with a "| Day" header row, then
+free-form advice. The parser consumes chunks of any size and emits each part
+as soon as its line is complete, so the app can render the plan progressively
+instead of waiting for the full response.
+"""
+
+import re
+
+# Header row that opens the weekly schedule table
+TABLE_HEADER = re.compile(r'^\|\s*Day\b')
+
+# Markdown alignment row, e.g. |-----|:---:|
+ALIGNMENT_ROW = re.compile(r'^\|\s*:?-+:?\s*\|')
+
+
+def split_row(line):
+    """
+    Split a Markdown table row into stripped cell values.
+
+    Args:
+        line: Row text such as "| Monday | Rest | |"
+
+    Returns:
+        List of cell strings
+    """
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for streamed plan text.
+
+    feed() returns (section, value) events for every line completed by the
+    chunk:
+        ('summary', line)       a line of the workout summary
+        ('table_header', cells) column names of the schedule table
+        ('table_row', cells)    one schedule row
+        ('advice', line)        a line after the table
+    Text without a schedule table is reported entirely as summary.
+    """
+
+    def __init__(self):
+        self.section = 'summary'
+        self._buffer = ''
+
+    @property
+    def pending(self):
+        """Text of the current, not yet complete line."""
+        return self._buffer
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of streamed text.
+
+        Args:
+            chunk: Next piece of the response
+
+        Returns:
+            List of (section, value) events for lines completed by this chunk
+        """
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        events = []
+        for line in lines:
+            events.extend(self._parse_line(line))
+        return events
+
+    def close(self):
+        """
+        Flush the final line once the stream has ended.
+
+        Returns:
+            List of remaining (section, value) events
+        """
+        line, self._buffer = self._buffer, ''
+        return self._parse_line(line) if line else []
+
+    def _parse_line(self, line):
+        stripped = line.strip()
+        if self.section == 'summary':
+            if TABLE_HEADER.match(stripped):
+                self.section = 'table'
+                return [('table_header', split_row(stripped))]
+            return [('summary', line)]
+
+        if self.section == 'table':
+            if stripped.startswith('|'):
+                if ALIGNMENT_ROW.match(stripped):
+                    return []
+                return [('table_row', split_row(stripped))]
+            self.section = 'advice'
+
+        return [('advice', line)]
+
+
+def parse_plan(text):
+    """
+    Parse a complete plan.
+
+    Args:
+        text: Full response text
+
+    Returns:
+        Dict with summary (str), columns (list), rows (list of cell lists)
+        and advice (str)
+    """
+    parser = PlanStreamParser()
+    plan = {'summary': [], 'columns': [], 'rows': [], 'advice': []}
+    for section, value in parser.feed(text) + parser.close():
+        if section == 'table_header':
+            plan['columns'] = value
+        elif section == 'table_row':
+            plan['rows'].append(value)
+        else:
+            plan[section].append(value)
+    plan['summary'] = '\n'.join(plan['summary'])
+    plan['advice'] = '\n'.join(plan['advice'])
+    return plan
@@ -0,0 +1,183 @@
+"""
+Structured Plan Schema
+Typed weekly-plan objects for schema-constrained LLM output.
+
+In structured mode Gemini is asked for JSON matching PLAN_SCHEMA instead of
+Markdown. The response is validated once into a WeeklyPlan, which the app
+renders directly and the response cache stores as canonical JSON.
+"""
+
+import json
+import math
+from collections import namedtuple
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Display columns of the schedule table
+TABLE_COLUMNS = ['Day', 'Activity', 'Mileage (mi)', 'Time (min)', 'Pace', 'Notes']
+
+# Gemini response_schema (OpenAPI subset)
+PLAN_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'summary': {'type': 'STRING', 'description': 'Types of workouts included this week'},
+        'days': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'day': {'type': 'STRING', 'enum': DAYS},
+                    'activity': {'type': 'STRING'},
+                    'mileage': {'type': 'NUMBER', 'nullable': True},
+                    'time_min': {'type': 'INTEGER', 'nullable': True},
+                    'pace': {'type': 'STRING'},
+                    'notes': {'type': 'STRING'},
+                },
+                'required': ['day', 'activity'],
+            },
+        },
+        'advice': {'type': 'STRING', 'description': 'Brief explanation and encouragement'},
+    },
+    'required': ['summary', 'days', 'advice'],
+}
+
+PlanDay = namedtuple('PlanDay', ['day', 'activity', 'mileage', 'time_min', 'pace', 'notes'])
+PlanDay.__doc__ = "One day of the schedule; mileage and time_min are None on rest days."
+
+WeeklyPlan = namedtuple('WeeklyPlan', ['summary', 'days', 'advice'])
+WeeklyPlan.__doc__ = "Validated weekly plan: summary text, seven PlanDay rows and advice text."
+
+
+class PlanValidationError(ValueError):
+    """Structured plan data does not match the schema."""
+
+
+def validate_plan(data):
+    """
+    Validate and normalize plan data into a WeeklyPlan.
+
+    Numbers given as strings are converted, missing days are filled in as
+    rest days and days are put in weekday order.
+
+    Args:
+        data: Dict parsed from the model's JSON (or a JSON string)
+
+    Returns:
+        WeeklyPlan
+
+    Raises:
+        PlanValidationError: If required fields are missing or malformed
+    """
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise PlanValidationError(f"Plan is not valid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise PlanValidationError("Plan must be a JSON object")
+    for field in ('summary', 'days', 'advice'):
+        if field not in data:
+            raise PlanValidationError(f"Plan is missing '{field}'")
+    if not isinstance(data['days'], list):
+        raise PlanValidationError("'days' must be a list")
+
+    by_day = {}
+    for entry in data['days']:
+        if not isinstance(entry, dict):
+            raise PlanValidationError("Each day must be an object")
+        day = str(entry.get('day', '')).strip().title()
+        if day not in DAYS:
+            raise PlanValidationError(f"Unknown day: {entry.get('day')!r}")
+        if day in by_day:
+            raise PlanValidationError(f"Duplicate day: {day}")
+        by_day[day] = PlanDay(
+            day=day,
+            activity=_text(entry.get('activity')) or 'Rest',
+            mileage=_number(entry.get('mileage'), 'mileage', float),
+            time_min=_number(entry.get('time_min'), 'time_min', lambda v: int(round(float(v)))),
+            pace=_text(entry.get('pace')),
+            notes=_text(entry.get('notes')),
+        )
+
+    days = [by_day.get(day, PlanDay(day, 'Rest', None, None, '', '')) for day in DAYS]
+    return WeeklyPlan(summary=_text(data['summary']), days=days, advice=_text(data['advice']))
+
+
+def plan_to_dict(plan):
+    """JSON-serializable dict of a WeeklyPlan."""
+    return {
+        'summary': plan.summary,
+        'days': [day._asdict() for day in plan.days],
+        'advice': plan.advice,
+    }
+
+
+def plan_from_json(text):
+    """
+    Load a WeeklyPlan from canonical JSON written by plan_to_json.
+
+    Skips validation, so only use it for trusted text such as cache entries.
+    """
+    data = json.loads(text)
+    return WeeklyPlan(summary=data['summary'],
+                      days=[PlanDay(**day) for day in data['days']],
+                      advice=data['advice'])
+
+
+def plan_to_json(plan):
+    """Canonical JSON text of a WeeklyPlan, as stored in the response cache."""
+    return json.dumps(plan_to_dict(plan), separators=(',', ':'), ensure_ascii=False)
+
+
+def plan_table_rows(plan):
+    """
+    Schedule rows for display, in TABLE_COLUMNS order.
+
+    Args:
+        plan: WeeklyPlan
+
+    Returns:
+        List of row lists with blanks for missing values
+    """
+    return [[day.day, day.activity,
+             '' if day.mileage is None else f"{day.mileage:g}",
+             '' if day.time_min is None else str(day.time_min),
+             day.pace, day.notes]
+            for day in plan.days]
+
+
+def plan_to_markdown(plan):
+    """
+    Render a WeeklyPlan in the Markdown layout of text-mode responses.
+
+    Args:
+        plan: WeeklyPlan
+
+    Returns:
+        Summary, Day/Activity/Mileage (mi)/Time (min)/Pace table and advice
+    """
+    rows = ["| Day | Activity | Mileage (mi) | Time (min) | Pace |",
+            "|-----|----------|--------------|------------|------|"]
+    for row in plan_table_rows(plan):
+        rows.append("|" + "|".join(f" {cell} " if cell else " " for cell in row[:5]) + "|")
+    table = "\n".join(rows)
+    return f"{plan.summary}\n\n{table}\n\n{plan.advice}"
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _number(value, field, convert):
+    """Convert an optional non-negative number, treating blanks as None."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        if isinstance(value, bool) or not math.isfinite(float(value)):
+            raise ValueError(value)
+        number = convert(value)
+    except (TypeError, ValueError) as e:
+        raise PlanValidationError(f"'{field}' must be a number, got {value!r}") from e
+    if number < 0:
+        raise PlanValidationError(f"'{field}' must not be negative")
+    return number
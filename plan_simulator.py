@@ -0,0 +1,289 @@
+"""
+Multi-Week Plan Simulator
+Rolls recommendations forward week by week, for many athletes and what-if scenarios at once.
+
+get_recommendation looks one week ahead. The simulator repeats that step
+through a training block: predict next week's mileage from the last 6 weeks,
+apply the recommended action's volume change (volume_change_pct in the rule
+table), recompute recovery ratio and fatigue from the mileage run, shift the
+history window and run the rules again, until race day or the horizon.
+
+Everything is vectorized over athletes x scenarios: each week is one LSTM
+predict_batch and one get_recommendations_batch call over all rows, so a
+20-week block for thousands of athlete-scenario pairs takes seconds.
+Scenarios are what-ifs applied to every athlete, such as following the plan
+only partly (adherence), a different number of run days or another race date.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Weeks simulated when no athlete has a race date
+DEFAULT_WEEKS = 16
+
+# Scenario parameters and their defaults; NaN keeps the athlete's own value
+SCENARIO_DEFAULTS = {
+    'adherence': 1.0,
+    'training_days': np.nan,
+    'goal_race_distance': np.nan,
+    'weeks_until_race': np.nan,
+}
+
+# Actions that add a run day from the following week
+ADD_DAY_ACTIONS = ('build_consistency',)
+
+# Output arrays of simulate(), each of shape (athletes, scenarios, weeks)
+SIMULATION_ARRAYS = ('predicted', 'mileage', 'fatigue', 'training_days', 'weeks_until_race', 'action')
+
+
+def recovery_ratio(training_days):
+    """Rest days per training day, 0.1 for 7-day weeks (as in feature_engineering)."""
+    days = np.clip(training_days, 0, 7)
+    ratio = (7 - days) / np.where(days == 0, 1, days)
+    return np.where(ratio == 0, 0.1, ratio)
+
+
+def make_scenarios(**params):
+    """
+    Build a scenario table from parameter lists.
+
+    Args:
+        **params: SCENARIO_DEFAULTS names -> equal-length lists (scalars are
+            broadcast); e.g. adherence=[1.0, 0.8], training_days=[nan, 5]
+
+    Returns:
+        Dict of SCENARIO_DEFAULTS names -> float arrays of shape (S,)
+
+    Raises:
+        ValueError: For unknown parameter names
+    """
+    unknown = set(params) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {', '.join(sorted(unknown))}")
+    values = [np.atleast_1d(np.asarray(params.get(name, default), dtype=float))
+              for name, default in SCENARIO_DEFAULTS.items()]
+    return dict(zip(SCENARIO_DEFAULTS, np.broadcast_arrays(*values)))
+
+
+class PlanSimulator:
+    """
+    Vectorized week-by-week rollout of predictions and recommendations.
+    """
+
+    def __init__(self, recommender=None, predictor=None):
+        """
+        Args:
+            recommender: RunningRecommender (default: the shared instance)
+            predictor: Mileage predictor with predict_batch (default: the
+                shared one, backend from MILEAGE_PREDICTOR_BACKEND)
+        """
+        from app_resources import get_mileage_predictor, get_recommender
+        self.recommender = recommender or get_recommender()
+        self.predictor = predictor or get_mileage_predictor()
+
+    def simulate(self, recent_mileage, cluster_id, training_days, current_fatigue_index=None,
+                 goal_race_distance=None, weeks_until_race=None, scenarios=None, weeks=None):
+        """
+        Simulate every athlete under every scenario.
+
+        Args:
+            recent_mileage: Array (A, 6) of weekly mileage, oldest first
+            cluster_id: Array (A,) of recommender cluster IDs
+            training_days: Array (A,) of run days per week
+            current_fatigue_index: Optional array (A,); defaults to the
+                latest week's mileage / recovery ratio
+            goal_race_distance, weeks_until_race: Optional arrays (A,), NaN
+                for athletes without a race
+            scenarios: make_scenarios() table (default: one scenario that
+                follows the plan exactly)
+            weeks: Weeks to simulate (default: until the latest race, or
+                DEFAULT_WEEKS without races)
+
+        Returns:
+            Dict of arrays of shape (A, S, W) keyed by SIMULATION_ARRAYS:
+            predicted (LSTM forecast), mileage (run), fatigue and
+            training_days (at the start of the week, as seen by the rules),
+            weeks_until_race, and action (index into the 'actions' list).
+            Weeks after race day are NaN, with action -1. Also 'actions',
+            the action names.
+        """
+        history = np.atleast_2d(np.asarray(recent_mileage, dtype=np.float64))
+        n_athletes = len(history)
+        scenarios = scenarios or make_scenarios()
+        n_scenarios = len(scenarios['adherence'])
+
+        def per_row(athlete_values, scenario_values=None):
+            """(A,) athlete values with (S,) overrides -> flat (A*S,) array."""
+            values = np.broadcast_to(np.asarray(athlete_values, dtype=np.float64), (n_athletes,))
+            grid = np.repeat(values[:, None], n_scenarios, axis=1)
+            if scenario_values is not None:
+                grid = np.where(np.isnan(scenario_values)[None, :], grid, scenario_values[None, :])
+            return grid.ravel()
+
+        none = np.full(n_athletes, np.nan)
+        window = np.repeat(history, n_scenarios, axis=0)
+        cluster = per_row(cluster_id).astype(int)
+        days = np.clip(np.round(per_row(training_days, scenarios['training_days'])), 1, 7)
+        race_distance = per_row(none if goal_race_distance is None else goal_race_distance,
+                                scenarios['goal_race_distance'])
+        race_weeks = per_row(none if weeks_until_race is None else weeks_until_race,
+                             scenarios['weeks_until_race'])
+        race_distance[np.isnan(race_weeks)] = np.nan
+        adherence = per_row(1.0, scenarios['adherence'])
+        if current_fatigue_index is None:
+            fatigue = window[:, -1] / recovery_ratio(days)
+        else:
+            fatigue = per_row(current_fatigue_index)
+
+        if weeks is None:
+            weeks = int(np.ceil(np.nanmax(race_weeks))) if (~np.isnan(race_weeks)).any() else DEFAULT_WEEKS
+
+        rows = len(window)
+        out = {name: np.full((weeks, rows), np.nan) for name in SIMULATION_ARRAYS}
+        out['action'] = np.full((weeks, rows), -1, dtype=np.int16)
+        actions, changes, add_day = None, None, None
+
+        for week in range(weeks):
+            weeks_left = race_weeks - week
+            active = np.isnan(weeks_left) | (weeks_left > 0)
+            if not active.any():
+                break
+            rows_active = np.flatnonzero(active)
+            current = window[rows_active, -1]
+            predicted = self.predictor.predict_batch(window[rows_active])
+            batch = self.recommender.get_recommendations_batch(
+                cluster_id=cluster[rows_active],
+                current_weekly_mileage=current,
+                predicted_next_week_mileage=predicted,
+                current_fatigue_index=fatigue[rows_active],
+                training_days_per_week=days[rows_active],
+                goal_race_distance=race_distance[rows_active],
+                weeks_until_race=weeks_left[rows_active],
+            )
+            codes = batch['action'].codes
+            if actions is None:
+                actions = list(batch['action'].categories)
+                changes = np.array([self.recommender.volume_changes[a] for a in actions]) / 100
+                add_day = np.isin(actions, ADD_DAY_ACTIONS)
+
+            # The prescribed week: the forecast held inside the action's change band
+            low, high = changes[codes, 0], changes[codes, 1]
+            prescribed = np.clip(predicted, current * (1 + low), current * (1 + high))
+            prescribed = np.where(current > 0, prescribed, predicted)
+            run = np.maximum(current + adherence[rows_active] * (prescribed - current), 0.0)
+
+            out['predicted'][week, rows_active] = predicted
+            out['mileage'][week, rows_active] = run
+            out['fatigue'][week, rows_active] = fatigue[rows_active]
+            out['training_days'][week, rows_active] = days[rows_active]
+            out['weeks_until_race'][week, rows_active] = weeks_left[rows_active]
+            out['action'][week, rows_active] = codes
+
+            window[rows_active] = np.column_stack([window[rows_active, 1:], run])
+            fatigue[rows_active] = run / recovery_ratio(days[rows_active])
+            days[rows_active] = np.minimum(days[rows_active] + add_day[codes], 7)
+
+        result = {name: values.T.reshape(n_athletes, n_scenarios, weeks) for name, values in out.items()}
+        result['actions'] = actions or []
+        return result
+
+    def simulate_weekly(self, weekly, scenarios=None, weeks=None, goal_race_distance=None,
+                        weeks_until_race=None):
+        """
+        Simulate every athlete in a weekly feature table from their latest 6 weeks.
+
+        Clusters are assigned from the recent weeks' profile, as in
+        roster_plans; athletes with less history are left out.
+
+        Args:
+            weekly: featured-data.csv rows
+            scenarios, weeks: As in simulate
+            goal_race_distance, weeks_until_race: Scalars or arrays over the
+                returned athletes (use scenarios for per-scenario races)
+
+        Returns:
+            (athletes, result): athlete IDs in row order and the simulate() result
+        """
+        from app_resources import get_cluster_assigner
+        from roster_plans import LOOKBACK, latest_weeks
+
+        latest, mileage = latest_weeks(weekly)
+        ready = (latest['weeks'] == LOOKBACK).to_numpy()
+        athletes = latest.index[ready]
+        profiles = get_cluster_assigner().assign_weekly(weekly[weekly['athlete'].isin(athletes)],
+                                                        recent_weeks=LOOKBACK)
+        result = self.simulate(
+            mileage[ready],
+            cluster_id=profiles['cluster_id'].reindex(athletes).to_numpy(),
+            training_days=latest['training_days'].to_numpy()[ready],
+            current_fatigue_index=latest['fatigue'].to_numpy()[ready],
+            goal_race_distance=goal_race_distance,
+            weeks_until_race=weeks_until_race,
+            scenarios=scenarios,
+            weeks=weeks,
+        )
+        return athletes, result
+
+
+def simulation_frame(result, athletes=None):
+    """
+    Long-format DataFrame of a simulation: one row per athlete, scenario and week.
+
+    Weeks after race day are dropped and actions are given by name.
+
+    Args:
+        result: PlanSimulator.simulate output
+        athletes: Optional athlete IDs for the first axis
+
+    Returns:
+        DataFrame with athlete, scenario, week and the SIMULATION_ARRAYS columns
+    """
+    n_athletes, n_scenarios, n_weeks = result['action'].shape
+    athlete_ids = np.arange(n_athletes) if athletes is None else np.asarray(athletes)
+    frame = pd.DataFrame({
+        'athlete': np.repeat(athlete_ids, n_scenarios * n_weeks),
+        'scenario': np.tile(np.repeat(np.arange(n_scenarios), n_weeks), n_athletes),
+        'week': np.tile(np.arange(1, n_weeks + 1), n_athletes * n_scenarios),
+        **{name: result[name].ravel() for name in SIMULATION_ARRAYS},
+    })
+    frame = frame[frame['action'] >= 0].reset_index(drop=True)
+    frame['action'] = pd.Categorical.from_codes(frame['action'], result['actions'])
+    return frame
+
+
+def main():
+    from roster_plans import WEEKLY_PATH, read_weekly
+
+    parser = argparse.ArgumentParser(description="Simulate a training block for every athlete")
+    parser.add_argument('--input', default=WEEKLY_PATH, help="Weekly features (CSV or Parquet)")
+    parser.add_argument('--weeks', type=int, default=DEFAULT_WEEKS, help="Weeks to simulate")
+    parser.add_argument('--race', type=float, help="Goal race distance in miles, on the last week")
+    parser.add_argument('--adherence', type=float, nargs='+', default=[1.0],
+                        help="Scenarios: share of each prescribed change actually run")
+    parser.add_argument('--output', help="Write the long-format table to this CSV")
+    args = parser.parse_args()
+
+    weekly = read_weekly(args.input)
+    start = time.perf_counter()
+    scenarios = make_scenarios(adherence=args.adherence)
+    athletes, result = PlanSimulator().simulate_weekly(
+        weekly, scenarios=scenarios, weeks=args.weeks,
+        goal_race_distance=args.race, weeks_until_race=args.weeks if args.race else None)
+    elapsed = time.perf_counter() - start
+
+    print(f"Simulated {len(athletes)} athletes x {len(args.adherence)} scenarios x {args.weeks} weeks "
+          f"in {elapsed:.2f}s")
+    for s, adherence in enumerate(args.adherence):
+        mileage = result['mileage'][:, s]
+        print(f"  adherence {adherence:.0%}: median mileage week 1 {np.nanmedian(mileage[:, 0]):.1f} -> "
+              f"week {args.weeks} {np.nanmedian(mileage[:, -1]):.1f}")
+    if args.output:
+        simulation_frame(result, athletes).to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Template Plan Renderer
+Builds the weekly training plan locally from a recommendation, without an LLM.
+
+Produces the same layout the app parses from Gemini: a workout summary, a
+Markdown Day/Activity/Mileage/Time/Pace table and the coach's advice. The week
+is laid out from the training days, the target mileage is split across the
+sessions, and the quality sessions follow the runner's cluster, so the plan
+is deterministic and renders in well under a millisecond. LLMHandler uses it
+when no API key is configured, when Gemini fails, or with LLM_BACKEND=template.
+build_plan() gives the same plan as a structured WeeklyPlan.
+"""
+
+from functools import lru_cache
+from textwrap import dedent
+
+from plan_schema import DAYS, PlanDay, WeeklyPlan, plan_to_markdown
+from recommender import RULES_PATH, load_volume_changes
+
+# Run days (indexes into DAYS) for 1-7 training days; the long run is on Sunday
+RUN_DAYS = {
+    1: [6],
+    2: [2, 6],
+    3: [1, 3, 6],
+    4: [1, 2, 4, 6],
+    5: [0, 1, 3, 4, 6],
+    6: [0, 1, 2, 3, 5, 6],
+    7: [0, 1, 2, 3, 4, 5, 6],
+}
+
+# Quality sessions per cluster (0 Foundation, 1 Cruiser, 2 Peak)
+QUALITY_SESSIONS = {
+    0: [],
+    1: ['tempo'],
+    2: ['interval', 'tempo'],
+}
+
+# Share of the weekly mileage per session type, relative to an easy run
+SESSION_WEIGHTS = {'easy': 1.0, 'tempo': 1.2, 'interval': 1.1, 'long': 2.0}
+
+SESSION_ACTIVITIES = {
+    'easy': ("Easy run", "easy/conversational pace"),
+    'tempo': ("Tempo run", "tempo pace"),
+    'interval': ("Interval workout", "interval pace"),
+    'long': ("Long run", "easy/conversational pace"),
+}
+
+# Easy pace in min/mile per cluster; workouts are run faster than easy pace
+EASY_PACE = {0: 11.5, 1: 10.0, 2: 8.5}
+PACE_FACTORS = {'easy': 1.0, 'long': 1.05, 'tempo': 0.88, 'interval': 0.95}
+
+MILEAGE_STEP = 0.5
+
+# Human-friendly names for the recommender's action codes, shown in the app
+ACTION_NAMES = {
+    "progressive_build": "Progressive Build",
+    "recovery_week": "Recovery Week",
+    "gradual_build": "Gradual Build",
+    "taper": "Taper Phase",
+    "mandatory_recovery": "Mandatory Recovery",
+    "build_consistency": "Build Consistency",
+    "slow_progression": "Slow Progression",
+    "balanced_progression": "Balanced Progression",
+    "moderate_increase": "Moderate Increase",
+    "recovery_focus": "Recovery Focus",
+    "reduce_volume": "Reduce Volume",
+    "maintain_or_build": "Maintain or Build",
+    "progressive_overload": "Progressive Overload",
+}
+# Normalized display name ('taper_phase') -> action code
+ACTION_CODES = {name.lower().replace(' ', '_'): code for code, name in ACTION_NAMES.items()}
+
+ENCOURAGEMENT = {
+    0: "Every run counts - consistency now builds the base for everything that follows.",
+    1: "You're building real fitness. Keep the easy days easy so the quality day counts.",
+    2: "Trust the work you've put in. Sharp sessions and real recovery make the engine.",
+}
+
+
+def action_code(action):
+    """Normalize an action code or its display name ('Taper Phase') to the code."""
+    code = str(action).strip().lower().replace(' ', '_')
+    return ACTION_CODES.get(code, code)
+
+
+def action_name(action):
+    """Display name for an action code, e.g. 'Taper Phase' for 'taper'."""
+    code = action_code(action)
+    return ACTION_NAMES.get(code, code.replace('_', ' ').title())
+
+
+@lru_cache(maxsize=None)
+def volume_changes(rules_path=RULES_PATH):
+    """Per-action (low, high) weekly change bands in percent, from the rule table."""
+    return load_volume_changes(rules_path)
+
+
+def target_mileage(rec, changes=None):
+    """
+    Weekly mileage for the plan.
+
+    The predicted mileage held inside the action's volume_change_pct band
+    relative to the current mileage - the same prescription plan_simulator
+    applies, so coaches' edits to the rule table reach both.
+
+    Args:
+        rec: Recommendation dict
+        changes: Action -> (low, high) percent bands (default: the shipped
+            rule table's)
+
+    Returns:
+        Target weekly mileage
+    """
+    predicted = float(rec['predicted_mileage'])
+    current = float(rec['current_mileage'])
+    changes = volume_changes() if changes is None else changes
+    band = changes.get(action_code(rec['action']))
+    if band is not None and current > 0:
+        low, high = band
+        return min(max(predicted, current * (1 + low / 100)), current * (1 + high / 100))
+    return max(predicted, 0.0)
+
+
+def reduces_volume(rec, changes=None):
+    """Whether the action cuts volume below the current week (recovery and taper weeks)."""
+    changes = volume_changes() if changes is None else changes
+    band = changes.get(action_code(rec['action']))
+    return band is not None and band[1] < 0
+
+
+def weekly_sessions(rec):
+    """
+    Session type for each day of the week.
+
+    Args:
+        rec: Recommendation dict
+
+    Returns:
+        List of 7 entries: 'easy', 'tempo', 'interval', 'long' or None for rest
+    """
+    days = min(max(int(round(float(rec['training_days']))), 1), 7)
+    run_days = RUN_DAYS[days]
+
+    quality = QUALITY_SESSIONS.get(rec.get('cluster_id'), [])
+    # Recovery and taper weeks keep every run easy
+    if reduces_volume(rec) or days < 3:
+        quality = []
+    quality = quality[:days - 2] if days > 2 else []
+
+    sessions = [None] * 7
+    for day in run_days:
+        sessions[day] = 'easy'
+    sessions[run_days[-1]] = 'long'
+    # Every other run day, skipping the Monday after the long run
+    candidates = [day for day in run_days[:-1] if day != 0]
+    for session, day in zip(quality, candidates[::2] + candidates[1::2]):
+        sessions[day] = session
+    return sessions
+
+
+def day_mileage(sessions, target):
+    """
+    Split the weekly target across the run days by session weight.
+
+    Args:
+        sessions: Output of weekly_sessions
+        target: Weekly mileage
+
+    Returns:
+        List of 7 mileages (0 on rest days), rounded to MILEAGE_STEP
+    """
+    weights = [SESSION_WEIGHTS[s] if s else 0.0 for s in sessions]
+    total = sum(weights)
+    return [round(target * w / total / MILEAGE_STEP) * MILEAGE_STEP for w in weights]
+
+
+def build_days(rec):
+    """
+    Schedule for the week.
+
+    Args:
+        rec: Recommendation dict
+
+    Returns:
+        List of seven PlanDay rows, Monday first
+    """
+    sessions = weekly_sessions(rec)
+    miles = day_mileage(sessions, target_mileage(rec))
+    easy_pace = EASY_PACE.get(rec.get('cluster_id'), EASY_PACE[1])
+    active_recovery = rec.get('cluster_id') in (1, 2)
+
+    days = []
+    rest_days = 0
+    for day, session, distance in zip(DAYS, sessions, miles):
+        if session is None:
+            rest_days += 1
+            activity = "Active recovery or cross-training" if active_recovery and rest_days == 2 else "Rest"
+            days.append(PlanDay(day, activity, None, None, '', ''))
+            continue
+        activity, pace = SESSION_ACTIVITIES[session]
+        minutes = round(distance * easy_pace * PACE_FACTORS[session])
+        days.append(PlanDay(day, activity, distance, minutes, pace, ''))
+    return days
+
+
+def render_summary(rec):
+    """Workout summary paragraph above the table."""
+    sessions = weekly_sessions(rec)
+    counts = {s: sessions.count(s) for s in SESSION_ACTIVITIES}
+    rest = sessions.count(None)
+
+    parts = []
+    for session in ('easy', 'tempo', 'interval', 'long'):
+        n = counts[session]
+        if n:
+            name = SESSION_ACTIVITIES[session][0].lower()
+            parts.append(f"{n} {name}{'s' if n > 1 else ''}")
+    if rest:
+        parts.append(f"{rest} rest day{'s' if rest > 1 else ''}")
+    listed = ", ".join(parts[:-1]) + f" and {parts[-1]}" if len(parts) > 1 else parts[0]
+
+    return (f"**{action_name(rec['action'])} week for a {rec['cluster_name']}.** "
+            f"This week includes {listed}, for about {target_mileage(rec):.1f} miles in total.\n\n"
+            f"Volume: {rec['volume_recommendation']}.")
+
+
+def render_advice(rec):
+    """Coach's advice below the table."""
+    sections = [
+        f"**Intensity:** {rec['intensity_focus']}",
+        f"**Recovery:** {_clean(rec['recovery_advice'])}",
+    ]
+    if rec.get('weekly_structure'):
+        sections.append(f"**How this week fits your level:**\n{_clean(rec['weekly_structure'])}")
+    if rec.get('race_specific_advice'):
+        sections.append(_clean(rec['race_specific_advice']))
+    if rec.get('caution_flags'):
+        sections.append("**Watch out for:**\n" + "\n".join(f"- {flag}" for flag in rec['caution_flags']))
+    sections.append(ENCOURAGEMENT.get(rec.get('cluster_id'), ENCOURAGEMENT[1]))
+    return "\n\n".join(sections)
+
+
+def build_plan(rec):
+    """
+    Build the complete plan as a structured WeeklyPlan.
+
+    Args:
+        rec: Recommendation dict from RunningRecommender (action may be a
+            code or its display name)
+
+    Returns:
+        WeeklyPlan
+    """
+    return WeeklyPlan(summary=render_summary(rec), days=build_days(rec), advice=render_advice(rec))
+
+
+def render_plan(rec):
+    """
+    Render a complete plan: summary, schedule table and advice.
+
+    Args:
+        rec: Recommendation dict from RunningRecommender (action may be a
+            code or its display name)
+
+    Returns:
+        Plan text in the layout the app parses
+    """
+    return plan_to_markdown(build_plan(rec))
+
+
+def _clean(text):
+    """Dedent the multi-line advice strings from the rules file, with • bullets as Markdown."""
+    lines = dedent(str(text)).strip().splitlines()
+    return "\n".join(f"- {line[1:].strip()}" if line.startswith('•') else line for line in lines)
@@ -0,0 +1,392 @@
+"""
+Athlete Re-Clustering
+Refits the training-profile clusters on a full roster with MiniBatchKMeans.
+
+notebooks/clustering.ipynb fits KMeans on 115 athlete profiles and refits
+from scratch for every k in its elbow/silhouette sweep. Here:
+
+  • Profiles are the six PROFILE_FEATURES averaged per athlete from weekly
+    rows (the columns of scaled_clustering_data.csv), standardized with a
+    scaler refitted on the roster.
+  • Each k is a MiniBatchKMeans fit, warm-started from the saved
+    models/kmeans_model.pkl centroids (moved into the new scaled space, plus
+    D^2-sampled seeds when k is larger). The k-sweep runs across a process
+    pool and scores silhouette on a sample, so neither is quadratic in the
+    roster size.
+  • New centroids are matched to the saved ones (minimum total distance), so
+    KMeans label i keeps meaning the same profile after a refit. Every label
+    records its recommender cluster_id in cluster_profiles.json
+    ('recommender_cluster_id'), which ClusterAssigner uses as its label map:
+    the cluster_id -> rules mapping cannot flip silently, even for a new k.
+    A refit that leaves a rule table cluster without a label (k=2 against
+    three rule clusters) is reported and not written.
+
+Usage:
+    python reclustering.py data/featured-data.csv --sweep 2 10 --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from cluster_assignment import MODELS_DIR, PROFILE_FEATURES, PROFILES_PATH, load_label_map, profile_features
+from recommender import RULES_PATH
+
+# Rows per MiniBatchKMeans step and athletes scored for silhouette
+BATCH_SIZE = 4096
+SILHOUETTE_SAMPLE = 5_000
+
+DEFAULT_K_RANGE = range(2, 11)
+
+MILES_PER_KM = 1.60934
+
+# cluster_profiles.json characteristics -> profile feature averaged
+CHARACTERISTICS = {
+    'mileage': 'avg_weekly_mileage',
+    'pace': 'avg_pace_km',
+    'training_days': 'avg_training_days',
+    'fatigue': 'avg_fatigue_index',
+    'consistency': 'avg_consistency_index',
+    'recovery': 'avg_recovery_ratio',
+}
+
+
+def roster_profiles(weekly):
+    """
+    Per-athlete clustering profiles, dropping athletes with missing features.
+
+    Args:
+        weekly: Weekly features (featured-data.csv columns)
+
+    Returns:
+        DataFrame indexed by athlete with PROFILE_FEATURES columns
+    """
+    return profile_features(weekly).dropna()
+
+
+def load_current(models_dir=MODELS_DIR):
+    """
+    The deployed scaler and KMeans model.
+
+    Returns:
+        (scaler, kmeans)
+    """
+    import joblib
+    return (joblib.load(Path(models_dir) / 'clustering_scaler.pkl'),
+            joblib.load(Path(models_dir) / 'kmeans_model.pkl'))
+
+
+def warm_start_centers(X, previous, k, rng):
+    """
+    Initial centroids for k clusters from the previous ones.
+
+    Args:
+        X: Scaled profiles (N, 6)
+        previous: Previous centroids in the same scaled space (m, 6)
+        k: Clusters wanted
+        rng: numpy Generator
+
+    Returns:
+        Array (k, 6), or None when k < m (fit falls back to k-means++)
+    """
+    if k < len(previous):
+        return None
+    centers = list(previous)
+    sample = X[rng.choice(len(X), min(len(X), SILHOUETTE_SAMPLE), replace=False)]
+    while len(centers) < k:
+        # Next seed drawn proportional to squared distance from the current ones
+        d2 = ((sample[:, np.newaxis, :] - np.array(centers)[np.newaxis]) ** 2).sum(axis=2).min(axis=1)
+        centers.append(sample[rng.choice(len(sample), p=d2 / d2.sum())])
+    return np.array(centers)
+
+
+def fit_k(X, k, init=None, seed=42, batch_size=BATCH_SIZE, silhouette_sample=SILHOUETTE_SAMPLE):
+    """
+    Fit MiniBatchKMeans for one k and score it.
+
+    Args:
+        X: Scaled profiles (N, 6)
+        k: Number of clusters
+        init: Initial centroids (k, 6), or None for k-means++
+        seed: Random state for the fit and the silhouette sample
+        batch_size: Rows per mini-batch
+        silhouette_sample: Athletes sampled for the silhouette score
+
+    Returns:
+        Dict with k, model, inertia, silhouette and davies_bouldin
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+    model = MiniBatchKMeans(n_clusters=k, init='k-means++' if init is None else init,
+                            n_init=3 if init is None else 1, batch_size=batch_size,
+                            random_state=seed).fit(X)
+    labels = model.labels_
+    scored = len(np.unique(labels)) > 1
+    return {
+        'k': k,
+        'model': model,
+        'inertia': float(model.inertia_),
+        'silhouette': float(silhouette_score(X, labels, sample_size=min(len(X), silhouette_sample),
+                                             random_state=seed)) if scored else float('nan'),
+        'davies_bouldin': float(davies_bouldin_score(X, labels)) if scored else float('nan'),
+    }
+
+
+def sweep(X, previous, k_range=DEFAULT_K_RANGE, workers=None, seed=42, batch_size=BATCH_SIZE,
+          silhouette_sample=SILHOUETTE_SAMPLE):
+    """
+    Fit and score every k, warm-started from the previous centroids.
+
+    Args:
+        X: Scaled profiles (N, 6)
+        previous: Previous centroids in X's scaled space
+        k_range: Values of k
+        workers: Processes (None: os.cpu_count(); 1 fits in this process)
+        seed, batch_size, silhouette_sample: As in fit_k
+
+    Returns:
+        List of fit_k results in k order
+    """
+    rng = np.random.default_rng(seed)
+    ks = list(k_range)
+    inits = [warm_start_centers(X, previous, k, rng) for k in ks]
+    args = [(X, k, init, seed, batch_size, silhouette_sample) for k, init in zip(ks, inits)]
+    workers = min(workers or os.cpu_count() or 1, len(ks))
+    if workers == 1:
+        return [fit_k(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fit_k, *zip(*args)))
+
+
+def match_labels(centers, previous):
+    """
+    Relabel new centroids so they keep the previous labels.
+
+    Args:
+        centers: New centroids (k, 6)
+        previous: Previous centroids (m, 6), same space
+
+    Returns:
+        (order, matched): order[i] is the new centroid that gets label i;
+        matched[i] is the previous label it continues, or -1 for a new cluster.
+        Matched labels keep their number when k >= m; unmatched clusters take
+        the labels after them.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    distance = np.linalg.norm(centers[:, np.newaxis] - previous[np.newaxis], axis=2)
+    rows, cols = linear_sum_assignment(distance)
+    if len(centers) >= len(previous):
+        new = [i for i in range(len(centers)) if i not in set(rows)]
+        order = np.concatenate([rows[np.argsort(cols)], new]).astype(int)
+        matched = np.concatenate([np.sort(cols), np.full(len(new), -1)]).astype(int)
+    else:
+        # Fewer clusters: every new centroid continues one previous label
+        order = rows[np.argsort(cols)]
+        matched = np.sort(cols)
+    return order, matched
+
+
+def relabel(model, order):
+    """Reorder a fitted KMeans model's centroids (and labels) in place."""
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    model.cluster_centers_ = model.cluster_centers_[order]
+    model.labels_ = inverse[model.labels_]
+    if hasattr(model, '_counts'):
+        model._counts = model._counts[order]
+    return model
+
+
+def cluster_profiles(profiles, labels, matched, previous_profiles, recommender_ids):
+    """
+    cluster_profiles.json entries for the refitted clusters.
+
+    Matched clusters keep their name, description and recommendation;
+    characteristics and athlete counts are recomputed. New clusters get a
+    placeholder name to be written up.
+
+    Args:
+        profiles: Roster profiles (DataFrame, PROFILE_FEATURES columns)
+        labels: Refitted label per athlete
+        matched: match_labels matched array
+        previous_profiles: Current cluster_profiles.json dict
+        recommender_ids: Recommender cluster_id per label
+
+    Returns:
+        Dict keyed by str(label)
+    """
+    result = {}
+    for label, previous in enumerate(matched):
+        members = profiles[labels == label]
+        means = members.mean()
+        entry = dict(previous_profiles.get(str(previous), {})) if previous >= 0 else {
+            'name': f"Cluster {label}",
+            'description': "New cluster from re-clustering; not yet described.\n",
+            'recommendation': "",
+        }
+        entry['num_athletes'] = int(len(members))
+        entry['characteristics'] = {name: float(means[feature]) for name, feature in CHARACTERISTICS.items()}
+        entry['characteristics']['pace'] *= MILES_PER_KM
+        entry['recommender_cluster_id'] = int(recommender_ids[label])
+        result[str(label)] = entry
+    return result
+
+
+def refit(profiles, k=None, k_range=None, workers=None, seed=42, models_dir=MODELS_DIR,
+          profiles_path=PROFILES_PATH, batch_size=BATCH_SIZE, silhouette_sample=SILHOUETTE_SAMPLE):
+    """
+    Re-cluster a roster, warm-started from and label-matched to the saved model.
+
+    Args:
+        profiles: Roster profiles (roster_profiles output)
+        k: Clusters in the refitted model (default: the saved model's k);
+            'best' picks the highest silhouette in the sweep
+        k_range: Values of k to sweep (default: just k)
+        workers: Processes for the sweep
+        seed: Random state
+        models_dir: Directory with the current scaler and KMeans model
+        profiles_path: Current cluster_profiles.json
+        batch_size, silhouette_sample: As in fit_k
+
+    Returns:
+        Dict with scaler, model (relabelled), labels, profiles (JSON entries),
+        sweep (per-k scores without models) and centroid_shift (per label,
+        standardized units; NaN for new clusters)
+
+    Raises:
+        ValueError: If k is not in the sweep
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    old_scaler, old_kmeans = load_current(models_dir)
+    with open(profiles_path) as f:
+        previous_profiles = json.load(f)
+
+    X_raw = profiles[list(PROFILE_FEATURES)].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(X_raw)
+    X = scaler.transform(X_raw)
+    # Saved centroids -> raw feature units -> the new scaled space
+    previous = scaler.transform(old_scaler.inverse_transform(old_kmeans.cluster_centers_))
+
+    k = len(previous) if k is None else k
+    k_range = sorted(set(k_range or []) | ({k} if k != 'best' else set()))
+    results = sweep(X, previous, k_range, workers, seed, batch_size, silhouette_sample)
+    if k == 'best':
+        chosen = max(results, key=lambda r: r['silhouette'])
+    else:
+        chosen = next(r for r in results if r['k'] == k)
+
+    order, matched = match_labels(chosen['model'].cluster_centers_, previous)
+    model = relabel(chosen['model'], order)
+    # Each cluster keeps (or, if new, inherits from the nearest saved centroid) its recommender ID
+    label_map = load_label_map(profiles_path)
+    nearest = np.linalg.norm(model.cluster_centers_[:, np.newaxis] - previous[np.newaxis], axis=2).argmin(axis=1)
+    recommender_ids = [label_map[int(m if m >= 0 else n)] for m, n in zip(matched, nearest)]
+    shift = [float(np.linalg.norm(model.cluster_centers_[i] - previous[m])) if m >= 0 else float('nan')
+             for i, m in enumerate(matched)]
+
+    return {
+        'scaler': scaler,
+        'model': model,
+        'labels': model.labels_,
+        'profiles': cluster_profiles(profiles, model.labels_, matched, previous_profiles, recommender_ids),
+        'sweep': [{name: value for name, value in r.items() if name != 'model'} for r in results],
+        'centroid_shift': shift,
+    }
+
+
+def uncovered_clusters(result, rules_path=RULES_PATH):
+    """
+    Recommender cluster_ids in the rule table that no refitted label maps to.
+
+    Args:
+        result: refit output
+        rules_path: recommendation_rules.json
+
+    Returns:
+        Sorted list of cluster_ids no athlete could be assigned to
+    """
+    with open(rules_path, encoding='utf-8') as f:
+        rule_clusters = {int(key) for key in json.load(f)['clusters']}
+    mapped = {entry['recommender_cluster_id'] for entry in result['profiles'].values()}
+    return sorted(rule_clusters - mapped)
+
+
+def write_artifacts(result, models_dir=MODELS_DIR, profiles_path=PROFILES_PATH, rules_path=RULES_PATH):
+    """
+    Save the refitted scaler, model, sweep scores and cluster_profiles.json.
+
+    Returns:
+        List of written paths
+
+    Raises:
+        ValueError: If some recommender cluster_id in the rule table would
+            have no label (e.g. k below the number of rule clusters); nothing
+            is written
+    """
+    import joblib
+
+    uncovered = uncovered_clusters(result, rules_path)
+    if uncovered:
+        raise ValueError(f"Refit with k={len(result['profiles'])} leaves recommender cluster_id(s) "
+                         f"{uncovered} without a label; deploy a larger k")
+    models_dir = Path(models_dir)
+    paths = [models_dir / 'clustering_scaler.pkl', models_dir / 'kmeans_model.pkl',
+             models_dir / 'kmeans_sweep.json', Path(profiles_path)]
+    joblib.dump(result['scaler'], paths[0])
+    joblib.dump(result['model'], paths[1])
+    with open(paths[2], 'w') as f:
+        json.dump(result['sweep'], f, indent=4)
+    with open(paths[3], 'w') as f:
+        json.dump(result['profiles'], f, indent=4)
+    return paths
+
+
+def main():
+    from roster_plans import WEEKLY_PATH, read_weekly
+
+    parser = argparse.ArgumentParser(description="Re-cluster athletes with warm-started MiniBatchKMeans")
+    parser.add_argument('input', nargs='?', default=WEEKLY_PATH, help="Weekly features (CSV or Parquet)")
+    parser.add_argument('--k', default=None, help="Clusters to deploy: a number or 'best' (default: current k)")
+    parser.add_argument('--sweep', type=int, nargs=2, metavar=('MIN', 'MAX'), help="Also score k in MIN..MAX")
+    parser.add_argument('--workers', type=int, help="Processes for the sweep (default: all CPUs)")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--profiles', default=PROFILES_PATH, help="cluster_profiles.json to read and update")
+    parser.add_argument('--dry-run', action='store_true', help="Report without writing artifacts")
+    args = parser.parse_args()
+
+    profiles = roster_profiles(read_weekly(args.input))
+    k = args.k if args.k in (None, 'best') else int(args.k)
+    k_range = range(args.sweep[0], args.sweep[1] + 1) if args.sweep else None
+    start = time.perf_counter()
+    result = refit(profiles, k, k_range, args.workers, models_dir=args.models_dir, profiles_path=args.profiles)
+    elapsed = time.perf_counter() - start
+
+    print(f"Re-clustered {len(profiles)} athletes in {elapsed:.2f}s")
+    print(f"{'k':>4}{'inertia':>14}{'silhouette':>12}{'davies-bouldin':>16}")
+    for row in result['sweep']:
+        print(f"{row['k']:>4}{row['inertia']:>14.1f}{row['silhouette']:>12.3f}{row['davies_bouldin']:>16.3f}")
+    for label, entry in result['profiles'].items():
+        shift = result['centroid_shift'][int(label)]
+        print(f"  {label}: {entry['name']:<32} {entry['num_athletes']:>7} athletes -> rules "
+              f"{entry['recommender_cluster_id']}, centroid moved {shift:.2f}")
+    uncovered = uncovered_clusters(result)
+    if uncovered:
+        message = f"No label maps to recommender cluster_id(s) {uncovered}; use a larger --k"
+        if not args.dry_run:
+            parser.exit(1, f"{message}, nothing written\n")
+        print(message)
+    elif not args.dry_run:
+        for path in write_artifacts(result, args.models_dir, args.profiles):
+            print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
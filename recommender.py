@@ -4,8 +4,40 @@ Uses cluster profiles and athlete metrics to generate training advice
 """
 
 import json
+from bisect import bisect_left
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+
+# Athlete metrics a rule condition can test, in compiled feature order.
+# weeks_until_race is missing (never matches) when no race date is given.
+RULE_FEATURES = (
+    "fatigue",
+    "mileage",
+    "mileage_change_pct",
+    "abs_mileage_change_pct",
+    "training_days",
+    "weeks_until_race",
+)
+
+# Cluster profiles and rule table shipped with the app
+CLUSTER_PROFILES_PATH = Path(__file__).resolve().parent / 'data' / 'cluster_profiles.json'
+RULES_PATH = CLUSTER_PROFILES_PATH.with_name('recommendation_rules.json')
+
+# Comparison operators allowed in rule conditions
+RULE_OPERATORS = ("lt", "le", "gt", "ge")
+
+# Columns produced by get_recommendations_batch, in output order.
+BATCH_COLUMNS = [
+    "cluster_id", "cluster_name", "current_mileage", "predicted_mileage",
+    "mileage_change", "mileage_change_pct", "current_fatigue", "training_days",
+    "action", "volume_recommendation", "intensity_focus", "recovery_advice",
+    "weekly_structure", "caution_flags", "goal_race", "weeks_until_race",
+    "race_specific_advice",
+]
+
 
 class RunningRecommender:
     """
@@ -13,28 +45,102 @@ class RunningRecommender:
     based on athlete cluster, current metrics, and goals.
     """
     
-    def __init__(self, cluster_profiles_path='data/cluster_profiles.json'):
+    def __init__(self, cluster_profiles_path=CLUSTER_PROFILES_PATH, rules_path=None):
         """
-        Initialize the recommender with cluster profiles.
+        Initialize the recommender with cluster profiles and the rule table.
         
         Args:
             cluster_profiles_path: Path to cluster_profiles.json file
+            rules_path: Path to the rule table JSON. Defaults to
+                recommendation_rules.json next to the cluster profiles.
         """
         self.cluster_profiles = self._load_cluster_profiles(cluster_profiles_path)
+        if rules_path is None:
+            rules_path = Path(cluster_profiles_path).with_name('recommendation_rules.json')
+        self._compile_rules(self._load_rules(rules_path))
         
     def _load_cluster_profiles(self, path):
         """Load cluster profiles from JSON file."""
         with open(path, 'r') as f:
             return json.load(f)
     
+    def _load_rules(self, path):
+        """Load the recommendation rule table from JSON file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _compile_rules(self, table):
+        """
+        Compile the rule table into flat lookup structures.
+        
+        Each condition becomes a half-open interval lo <= value < hi on one
+        feature (strict bounds are nudged with np.nextafter), so a rule is a
+        tuple of (feature_index, lo, hi) and evaluating it is a few float
+        comparisons. Race phases become a sorted list of week bounds searched
+        with bisect.
+        
+        Args:
+            table: Parsed rule table (see data/recommendation_rules.json)
+            
+        Raises:
+            ValueError: If a rule uses an unknown feature, operator or action
+        """
+        self._actions = {}
+        for action, spec in table["actions"].items():
+            self._actions[action] = (spec["volume_recommendation"], spec.get("caution_flag"))
+        self.volume_changes = volume_change_bands(table)
+        
+        self._cluster_names = {}
+        self._cluster_advice = {}
+        self._cluster_rules = {}
+        for key, cluster in table["clusters"].items():
+            cluster_id = int(key)
+            self._cluster_names[cluster_id] = cluster["name"]
+            self._cluster_advice[cluster_id] = {
+                field: cluster[field]
+                for field in ("intensity_focus", "recovery_advice", "weekly_structure")
+            }
+            rules = []
+            for rule in cluster["rules"]:
+                if rule["action"] not in self._actions:
+                    raise ValueError(f"Cluster {key}: unknown action '{rule['action']}'")
+                conditions = tuple(
+                    self._compile_condition(feature, op, threshold)
+                    for feature, ops in rule.get("when", {}).items()
+                    for op, threshold in ops.items()
+                )
+                rules.append((conditions, rule["action"]))
+            self._cluster_rules[cluster_id] = rules
+        
+        self._race_names = {float(distance): name for distance, name in table["race_names"].items()}
+        
+        phases = sorted(table["race_phases"], key=lambda p: p.get("max_weeks", np.inf))
+        self._phase_bounds = [phase["max_weeks"] for phase in phases if "max_weeks" in phase]
+        self._phase_advice = [phase["advice"] for phase in phases]
+        if len(self._phase_advice) != len(self._phase_bounds) + 1:
+            raise ValueError("race_phases needs exactly one phase without max_weeks")
+    
+    def _compile_condition(self, feature, op, threshold):
+        """Convert one comparison into a (feature_index, lo, hi) interval."""
+        if feature not in RULE_FEATURES:
+            raise ValueError(f"Unknown rule feature '{feature}'")
+        if op not in RULE_OPERATORS:
+            raise ValueError(f"Unknown rule operator '{op}'")
+        threshold = float(threshold)
+        lo, hi = -np.inf, np.inf
+        if op == "lt":
+            hi = threshold
+        elif op == "le":
+            hi = np.nextafter(threshold, np.inf)
+        elif op == "gt":
+            lo = np.nextafter(threshold, np.inf)
+        else:
+            lo = threshold
+        return RULE_FEATURES.index(feature), float(lo), float(hi)
+    
     def get_cluster_name(self, cluster_id):
         """Get the human-readable name for a cluster."""
-        cluster_map = {
-            0: "Foundation Builder",
-            1: "Consistent Cruiser", 
-            2: "Competitive Peak"
-        }
-        return cluster_map.get(cluster_id, "Unknown")
+        return self._cluster_names.get(cluster_id, "Unknown")
     
     def get_recommendation(self, 
                           cluster_id,
@@ -60,8 +166,9 @@ class RunningRecommender:
             Dictionary with recommendation details
         """
         
-        # Get cluster profile
-        cluster_profile = self.cluster_profiles[str(cluster_id)]
+        # cluster_id is the rule table's; cluster_profiles.json is keyed by KMeans label
+        if cluster_id not in self._cluster_rules:
+            raise KeyError(str(cluster_id))
         cluster_name = self.get_cluster_name(cluster_id)
         
         # Calculate mileage change
@@ -87,24 +194,14 @@ class RunningRecommender:
         }
         
         # Apply cluster-specific rules
-        if cluster_id == 0:  # Foundation Builder
-            recommendation = self._foundation_builder_rules(recommendation, 
-                                                            current_fatigue_index,
-                                                            training_days_per_week,
-                                                            mileage_change_pct)
-        
-        elif cluster_id == 1:  # Consistent Cruiser
-            recommendation = self._consistent_cruiser_rules(recommendation,
-                                                           current_fatigue_index,
-                                                           current_weekly_mileage,
-                                                           mileage_change_pct)
-        
-        elif cluster_id == 2:  # Competitive Peak
-            recommendation = self._competitive_peak_rules(recommendation,
-                                                         current_fatigue_index,
-                                                         current_weekly_mileage,
-                                                         mileage_change_pct,
-                                                         weeks_until_race)
+        if cluster_id in self._cluster_rules:
+            recommendation = self._apply_cluster_rules(recommendation,
+                                                       cluster_id,
+                                                       current_fatigue_index,
+                                                       current_weekly_mileage,
+                                                       mileage_change_pct,
+                                                       training_days_per_week,
+                                                       weeks_until_race)
         
         # Apply race-specific adjustments if goal race provided
         if goal_race_distance and weeks_until_race:
@@ -114,184 +211,446 @@ class RunningRecommender:
         
         return recommendation
     
-    def _foundation_builder_rules(self, rec, fatigue, training_days, mileage_change_pct):
-        """Rules for Foundation Builder cluster (Cluster 0)."""
-        
-        # Check training frequency
-        if training_days < 3:
-            rec["action"] = "build_consistency"
-            rec["volume_recommendation"] = "Maintain current volume, focus on adding 1 more training day"
-            rec["caution_flags"].append("Training frequency below 3 days/week - prioritize consistency")
-        
-        # Check for overtraining
-        elif fatigue > 20:
-            rec["action"] = "recovery_focus"
-            rec["volume_recommendation"] = "Reduce mileage by 10-15% this week"
-            rec["caution_flags"].append("Elevated fatigue for beginner level - add recovery day")
-        
-        # Check for excessive mileage increase
-        elif mileage_change_pct > 15:
-            rec["action"] = "slow_progression"
-            rec["volume_recommendation"] = "Cap increase to 10% per week to avoid injury"
-            rec["caution_flags"].append("Predicted increase exceeds 10% rule - risk of overuse injury")
-        
-        # Normal progression
-        else:
-            rec["action"] = "gradual_build"
-            rec["volume_recommendation"] = "Increase mileage by 5-10% (0.5-1 mile)"
-        
-        # Standard Foundation Builder advice
-        rec["intensity_focus"] = "Easy pace only - focus on time on feet, not speed"
-        rec["recovery_advice"] = "Take at least 2 full rest days. Prioritize sleep and nutrition."
-        rec["weekly_structure"] = """
-        Suggested Week:
-        • 3-4 easy runs (20-30 min each)
-        • 1 longer easy run (gradually build to 40-60 min)
-        • 2-3 complete rest days
-        • Optional: 1-2 days of light cross-training (walking, cycling)
+    def get_recommendations_batch(self,
+                                  athletes=None,
+                                  cluster_id=None,
+                                  current_weekly_mileage=None,
+                                  predicted_next_week_mileage=None,
+                                  current_fatigue_index=None,
+                                  training_days_per_week=None,
+                                  goal_race_distance=None,
+                                  weeks_until_race=None):
         """
+        Generate recommendations for many athletes at once.
         
-        return rec
+        Evaluates the same rules as get_recommendation, but with NumPy masks
+        over whole columns instead of one Python call per athlete.
+        
+        Args:
+            athletes: Optional DataFrame (or dict of arrays) with columns named
+                like the get_recommendation arguments. Any keyword argument
+                passed explicitly overrides the matching column.
+            cluster_id, current_weekly_mileage, predicted_next_week_mileage,
+            current_fatigue_index, training_days_per_week: Array-likes of
+                equal length (scalars are broadcast).
+            goal_race_distance, weeks_until_race: Optional array-likes;
+                use NaN (or 0) for athletes without a goal race.
+            
+        Returns:
+            Dictionary of equal-length columns keyed by BATCH_COLUMNS, the same
+            fields as the get_recommendation dict (pass it to pd.DataFrame for
+            a table). Numeric fields are NumPy arrays, text fields are
+            pandas Categoricals, and caution_flags is a Categorical of tuples
+            instead of lists. goal_race, weeks_until_race and
+            race_specific_advice are missing (NaN) for rows without race
+            adjustments.
+        """
+        columns = {
+            "cluster_id": cluster_id,
+            "current_weekly_mileage": current_weekly_mileage,
+            "predicted_next_week_mileage": predicted_next_week_mileage,
+            "current_fatigue_index": current_fatigue_index,
+            "training_days_per_week": training_days_per_week,
+            "goal_race_distance": goal_race_distance,
+            "weeks_until_race": weeks_until_race,
+        }
+        if athletes is not None:
+            for name in columns:
+                if columns[name] is None and name in athletes:
+                    columns[name] = athletes[name]
+        
+        required = list(columns)[:5]
+        missing = [name for name in required if columns[name] is None]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        
+        arrays = [np.atleast_1d(np.asarray(columns[name], dtype=float)) for name in required]
+        arrays = np.broadcast_arrays(*arrays)
+        cluster, current, predicted, fatigue, days = arrays
+        n = len(cluster)
+        
+        def optional(values):
+            if values is None:
+                return np.full(n, np.nan)
+            values = np.asarray(values, dtype=float)
+            return np.broadcast_to(values, (n,))
+        race_distance = optional(columns["goal_race_distance"])
+        weeks = optional(columns["weeks_until_race"])
+        
+        # Calculate mileage change
+        mileage_change = predicted - current
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mileage_change_pct = mileage_change / current * 100
+        no_mileage = current <= 0
+        if no_mileage.any():
+            mileage_change_pct[no_mileage] = 0.0
+        
+        # Truthiness of weeks_until_race / goal_race_distance in the scalar path
+        has_weeks = ~np.isnan(weeks) & (weeks != 0)
+        has_race = ~np.isnan(race_distance) & (race_distance != 0) & has_weeks
+        
+        # Same KeyError as the per-athlete path for unknown clusters
+        cluster_ids = list(self._cluster_rules)
+        in_clusters = [cluster == cid for cid in cluster_ids]
+        unknown = ~np.logical_or.reduce(in_clusters) if in_clusters else np.ones(n, dtype=bool)
+        if unknown.any():
+            raise KeyError(str(int(np.unique(cluster[unknown])[0])))
+        
+        # Feature columns in RULE_FEATURES order; missing weeks never match
+        features = (
+            fatigue,
+            current,
+            mileage_change_pct,
+            np.abs(mileage_change_pct),
+            days,
+            np.where(has_weeks, weeks, np.nan),
+        )
+        
+        # Index of the first matching rule per cluster, built with integer
+        # arithmetic rather than masked assignment:
+        #     first = 0 if rule matches else 1 + first(remaining rules)
+        # Each cluster's slots are followed by a "no rule matched" slot, and
+        # slot_actions maps every slot to an action code (-1 = none).
+        actions = list(self._actions)
+        slot_actions = []
+        slot = np.zeros(n, dtype=np.int16)
+        for cid, in_cluster in zip(cluster_ids, in_clusters):
+            first = np.zeros(n, dtype=np.int16)
+            for conditions, _ in reversed(self._cluster_rules[cid]):
+                matches = np.ones(n, dtype=bool)
+                for feature, lo, hi in conditions:
+                    if lo > -np.inf:
+                        matches &= features[feature] >= lo
+                    if hi < np.inf:
+                        matches &= features[feature] < hi
+                first = ~matches * (first + np.int16(1))
+            slot += in_cluster * (first + np.int16(len(slot_actions)))
+            slot_actions.extend(actions.index(action) for _, action in self._cluster_rules[cid])
+            slot_actions.append(-1)
+        slot_actions.append(-1)
+        slot += unknown * np.int16(len(slot_actions) - 1)
+        action_idx = np.array(slot_actions, dtype=np.int16).take(slot)
+        
+        # Text columns are categoricals over the rule outputs, so each distinct
+        # string is stored once and the per-row cost is a single integer code.
+        def lookup(values, codes):
+            return pd.Categorical.from_codes(codes, values, validate=False)
+        
+        cluster_idx = np.full(n, -1, dtype=np.int16)
+        for k, in_cluster in enumerate(in_clusters):
+            cluster_idx += in_cluster * np.int16(k + 1)
+        def cluster_lookup(field):
+            return lookup([self._cluster_advice[cid][field] for cid in cluster_ids], cluster_idx)
+        
+        # caution_flags: at most one flag per action, as shared immutable tuples
+        flag_values = [()]
+        flag_codes = []
+        for action in actions:
+            caution = self._actions[action][1]
+            flags = (caution,) if caution else ()
+            if flags not in flag_values:
+                flag_values.append(flags)
+            flag_codes.append(flag_values.index(flags))
+        flag_codes = np.array(flag_codes + [0], dtype=np.int8)
+        
+        # Race-specific adjustments, formatted once per distinct race distance
+        race_names = []
+        race_advice = []
+        race_idx = np.full(n, -1, dtype=np.int16)
+        advice_idx = np.full(n, -1, dtype=np.int16)
+        if has_race.any():
+            phase_idx = np.searchsorted(self._phase_bounds, weeks, side='left').astype(np.int16)
+            # Standard distances first, then any other distances present
+            distances = list(self._race_names)
+            other = has_race & ~np.isin(race_distance, distances)
+            if other.any():
+                distances.extend(pd.unique(race_distance[other]))
+            for distance in distances:
+                rows = has_race & (race_distance == distance)
+                race_name = self._race_name(distance)
+                race_idx += rows * np.int16(len(race_names) + 1)
+                advice_idx += rows * (phase_idx + np.int16(len(race_advice) + 1))
+                race_names.append(race_name)
+                race_advice.extend(template.format(race_name=race_name)
+                                   for template in self._phase_advice)
+        
+        return {
+            "cluster_id": cluster.astype(int),
+            "cluster_name": lookup([self.get_cluster_name(cid) for cid in cluster_ids],
+                                   cluster_idx),
+            "current_mileage": current,
+            "predicted_mileage": predicted,
+            "mileage_change": mileage_change,
+            "mileage_change_pct": mileage_change_pct,
+            "current_fatigue": fatigue,
+            "training_days": days,
+            "action": lookup(actions, action_idx),
+            "volume_recommendation": lookup([self._actions[a][0] for a in actions], action_idx),
+            "intensity_focus": cluster_lookup("intensity_focus"),
+            "recovery_advice": cluster_lookup("recovery_advice"),
+            "weekly_structure": cluster_lookup("weekly_structure"),
+            "caution_flags": lookup(pd.Index(flag_values, tupleize_cols=False),
+                                    flag_codes.take(action_idx)),
+            "goal_race": lookup(race_names, race_idx),
+            "weeks_until_race": np.where(has_race, weeks, np.nan),
+            "race_specific_advice": lookup(race_advice, advice_idx),
+        }
     
-    def _consistent_cruiser_rules(self, rec, fatigue, mileage, mileage_change_pct):
-        """Rules for Consistent Cruiser cluster (Cluster 1)."""
-        
-        # Check fatigue level
-        if fatigue > 30:
-            rec["action"] = "recovery_week"
-            rec["volume_recommendation"] = "Reduce mileage by 20% for recovery"
-            rec["caution_flags"].append("High fatigue - implement recovery week")
-        
-        # Check for stagnation
-        elif abs(mileage_change_pct) < 2 and mileage < 25:
-            rec["action"] = "progressive_overload"
-            rec["volume_recommendation"] = "Increase mileage by 10% (2-3 miles) to continue progression"
-        
-        # Check for excessive increase
-        elif mileage_change_pct > 12:
-            rec["action"] = "moderate_increase"
-            rec["volume_recommendation"] = "Cap increase to 10-12% to balance progression and recovery"
-            rec["caution_flags"].append("Predicted increase high - moderate to safer level")
-        
-        # Normal progression
-        else:
-            rec["action"] = "balanced_progression"
-            rec["volume_recommendation"] = "Increase mileage by 8-10% (1.5-2 miles)"
-        
-        # Standard Consistent Cruiser advice
-        rec["intensity_focus"] = "Add 1 quality workout: tempo run (20 min at comfortably hard pace)"
-        rec["recovery_advice"] = "Active recovery on rest days: easy cycling, swimming, or yoga"
-        rec["weekly_structure"] = """
-        Suggested Week:
-        • 3 easy runs (30-45 min each)
-        • 1 tempo run or hill workout (30-40 min total)
-        • 1 long run (60-90 min)
-        • 2 rest or active recovery days
+    def get_outcome_probabilities_batch(self,
+                                        predicted_samples,
+                                        cluster_id,
+                                        current_weekly_mileage,
+                                        current_fatigue_index,
+                                        training_days_per_week,
+                                        goal_race_distance=None,
+                                        weeks_until_race=None):
         """
+        Probability of each action and caution flag under uncertain predictions.
         
-        return rec
+        Runs the rules once per sampled next-week mileage, as a single
+        get_recommendations_batch call over all athletes x samples, and counts
+        how often each action fires. Caution flags come from the action, so a
+        flag's probability is the total probability of the actions that raise it.
+        
+        Args:
+            predicted_samples: Array-like (N, K) of sampled next-week mileage
+                (e.g. from mileage_forecast.MileageForecaster.sample)
+            cluster_id, current_weekly_mileage, current_fatigue_index,
+            training_days_per_week, goal_race_distance, weeks_until_race:
+                Array-likes of length N (scalars are broadcast), as in
+                get_recommendations_batch
+            
+        Returns:
+            Dictionary with actions (names), action_probabilities (N, actions),
+            caution_flags (flag texts) and caution_probabilities (N, flags)
+        """
+        samples = np.atleast_2d(np.asarray(predicted_samples, dtype=float))
+        n, k = samples.shape
+        
+        def per_sample(values):
+            if values is None:
+                return None
+            return np.repeat(np.broadcast_to(np.asarray(values, dtype=float), (n,)), k)
+        
+        batch = self.get_recommendations_batch(
+            cluster_id=per_sample(cluster_id),
+            current_weekly_mileage=per_sample(current_weekly_mileage),
+            predicted_next_week_mileage=samples.ravel(),
+            current_fatigue_index=per_sample(current_fatigue_index),
+            training_days_per_week=per_sample(training_days_per_week),
+            goal_race_distance=per_sample(goal_race_distance),
+            weeks_until_race=per_sample(weeks_until_race),
+        )
+        actions = list(batch["action"].categories)
+        codes = batch["action"].codes.reshape(n, k).astype(np.int64)
+        counts = np.zeros((n, len(actions)))
+        np.add.at(counts, (np.repeat(np.arange(n), k), codes.ravel()), 1)
+        action_probabilities = counts / k
+        
+        flags = list(dict.fromkeys(self._actions[a][1] for a in actions if self._actions[a][1]))
+        raises = np.array([[self._actions[a][1] == flag for flag in flags] for a in actions],
+                          dtype=float).reshape(len(actions), len(flags))
+        return {
+            "actions": actions,
+            "action_probabilities": action_probabilities,
+            "caution_flags": flags,
+            "caution_probabilities": action_probabilities @ raises,
+        }
     
-    def _competitive_peak_rules(self, rec, fatigue, mileage, mileage_change_pct, weeks_until_race):
-        """Rules for Competitive Peak cluster (Cluster 2)."""
-        
-        # Critical fatigue check
-        if fatigue > 45:
-            rec["action"] = "mandatory_recovery"
-            rec["volume_recommendation"] = "Cut mileage by 30-40% immediately"
-            rec["caution_flags"].append("CRITICAL: Fatigue approaching overtraining - mandatory rest")
-        
-        # High fatigue warning
-        elif fatigue > 35:
-            rec["action"] = "reduce_volume"
-            rec["volume_recommendation"] = "Reduce mileage by 15-20% this week"
-            rec["caution_flags"].append("High fatigue - prioritize recovery to avoid injury")
-        
-        # Taper phase (if race approaching)
-        elif weeks_until_race and weeks_until_race <= 2:
-            rec["action"] = "taper"
-            rec["volume_recommendation"] = "Reduce volume by 20-40% while maintaining intensity"
-            rec["caution_flags"].append("Taper phase - prioritize freshness over fitness")
-        
-        # Peak training phase
-        elif mileage >= 30:
-            rec["action"] = "maintain_or_build"
-            rec["volume_recommendation"] = "Maintain current volume or increase by max 5% (1-2 miles)"
-        
-        # Building to peak
+    def get_recommendation_with_uncertainty(self,
+                                            cluster_id,
+                                            current_weekly_mileage,
+                                            predicted_samples,
+                                            current_fatigue_index,
+                                            training_days_per_week,
+                                            goal_race_distance=None,
+                                            weeks_until_race=None,
+                                            interval=0.8):
+        """
+        Recommendation for the median forecast, with how likely each outcome is.
+        
+        Args:
+            predicted_samples: 1-D array of sampled next-week mileage
+            interval: Central coverage of the reported prediction interval
+            Other arguments as in get_recommendation
+            
+        Returns:
+            The get_recommendation dict for the median sample, plus
+            predicted_interval ([lower, upper] miles),
+            mileage_change_pct_interval, action_probabilities and
+            caution_probabilities (dicts of name -> probability, omitting
+            outcomes that never occurred)
+        """
+        samples = np.asarray(predicted_samples, dtype=float).ravel()
+        tail = (1 - interval) / 2
+        lower, median, upper = np.quantile(samples, [tail, 0.5, 1 - tail])
+        rec = self.get_recommendation(cluster_id, current_weekly_mileage, float(median),
+                                      current_fatigue_index, training_days_per_week,
+                                      goal_race_distance, weeks_until_race)
+        
+        outcomes = self.get_outcome_probabilities_batch(
+            samples[np.newaxis, :], cluster_id, current_weekly_mileage, current_fatigue_index,
+            training_days_per_week, goal_race_distance, weeks_until_race)
+        rec["predicted_interval"] = [float(lower), float(upper)]
+        if current_weekly_mileage > 0:
+            rec["mileage_change_pct_interval"] = [float((lower - current_weekly_mileage) / current_weekly_mileage * 100),
+                                                  float((upper - current_weekly_mileage) / current_weekly_mileage * 100)]
         else:
-            rec["action"] = "progressive_build"
-            rec["volume_recommendation"] = "Increase mileage by 5-8% (1.5-2.5 miles)"
-        
-        # Standard Competitive Peak advice
-        rec["intensity_focus"] = "2 quality sessions: 1 interval workout + 1 tempo run"
-        rec["recovery_advice"] = """
-        Critical recovery protocols:
-        • 8+ hours sleep nightly
-        • Post-run nutrition within 30 minutes
-        • Weekly sports massage or foam rolling
-        • Monitor morning heart rate for overtraining signs
+            rec["mileage_change_pct_interval"] = [0.0, 0.0]
+        rec["action_probabilities"] = {
+            action: float(p) for action, p in zip(outcomes["actions"], outcomes["action_probabilities"][0]) if p > 0
+        }
+        rec["caution_probabilities"] = {
+            flag: float(p) for flag, p in zip(outcomes["caution_flags"], outcomes["caution_probabilities"][0]) if p > 0
+        }
+        return rec
+
+    def get_recommendation_with_similar_runners(self,
+                                                cluster_id,
+                                                recent_mileage,
+                                                predicted_next_week_mileage,
+                                                current_fatigue_index,
+                                                training_days_per_week,
+                                                goal_race_distance=None,
+                                                weeks_until_race=None,
+                                                k=20,
+                                                pace_km=None,
+                                                index=None):
         """
-        rec["weekly_structure"] = """
-        Suggested Week:
-        • 2-3 easy runs (45-60 min each)
-        • 1 interval session (track repeats or fartlek)
-        • 1 tempo run (30-40 min at threshold pace)
-        • 1 long run (90-120 min)
-        • 1-2 rest or very easy recovery days
+        Recommendation plus what runners with a similar recent block ran next.
+
+        Args:
+            recent_mileage: Last 6 weeks of mileage, oldest first (the last
+                week is the current weekly mileage)
+            k: Number of similar runners' weeks to summarize
+            pace_km: Average pace in min/km, if known
+            index: SimilarRunnersIndex (default: the shared one)
+            Other arguments as in get_recommendation
+
+        Returns:
+            The get_recommendation dict plus similar_runners: k, athletes,
+            and next_week_mileage and change_pct quantiles (p10 ... p90)
         """
+        from similar_runners import get_index
+
+        rec = self.get_recommendation(cluster_id, float(recent_mileage[-1]), predicted_next_week_mileage,
+                                      current_fatigue_index, training_days_per_week,
+                                      goal_race_distance, weeks_until_race)
+        if index is None:
+            index = get_index()
+        rec["similar_runners"] = index.similar(recent_mileage, training_days_per_week, pace_km, k=k)
+        return rec
+
+    def _set_action(self, rec, action):
+        """Set the action code with its volume advice and caution flag."""
+        volume, caution = self._actions[action]
+        rec["action"] = action
+        rec["volume_recommendation"] = volume
+        if caution:
+            rec["caution_flags"].append(caution)
+    
+    def _apply_cluster_advice(self, rec, cluster_id):
+        """Attach the standard intensity, recovery and weekly advice for a cluster."""
+        rec.update(self._cluster_advice[cluster_id])
+    
+    def _apply_cluster_rules(self, rec, cluster_id, fatigue, mileage, mileage_change_pct,
+                             training_days, weeks_until_race):
+        """Apply the first matching rule of a cluster, then its standard advice."""
+        values = (
+            fatigue,
+            mileage,
+            mileage_change_pct,
+            abs(mileage_change_pct),
+            training_days,
+            weeks_until_race if weeks_until_race else np.nan,
+        )
+        
+        for conditions, action in self._cluster_rules[cluster_id]:
+            for feature, lo, hi in conditions:
+                if not lo <= values[feature] < hi:
+                    break
+            else:
+                self._set_action(rec, action)
+                break
+        
+        self._apply_cluster_advice(rec, cluster_id)
         
         return rec
     
+    def _race_name(self, race_distance):
+        """Get the display name for a race distance in miles."""
+        return self._race_names.get(race_distance, f"{race_distance} mile race")
+    
     def _apply_race_adjustments(self, rec, race_distance, weeks_until_race):
         """Apply race-specific adjustments to recommendation."""
         
-        race_names = {
-            3.1: "5K",
-            6.2: "10K", 
-            13.1: "Half Marathon",
-            26.2: "Marathon"
-        }
-        
-        race_name = race_names.get(race_distance, f"{race_distance} mile race")
+        race_name = self._race_name(race_distance)
         
         # Add race context
         rec["goal_race"] = race_name
         rec["weeks_until_race"] = weeks_until_race
         
-        # Taper recommendations
-        if weeks_until_race <= 2:
-            rec["race_specific_advice"] = f"""
-            TAPER PHASE for {race_name}:
-            • Reduce volume by 20-40%
-            • Maintain workout intensity but reduce duration
-            • Prioritize rest and mental preparation
-            • No new workouts or experiments
-            • Focus on race logistics and nutrition plan
-            """
-        
-        # Peak training phase
-        elif weeks_until_race <= 8:
-            rec["race_specific_advice"] = f"""
-            PEAK TRAINING for {race_name}:
-            • Include race-pace specific workouts
-            • Practice race-day nutrition strategy
-            • Simulate race conditions (time of day, terrain)
-            • Build mental toughness with challenging sessions
-            """
-        
-        # Base building phase
-        else:
-            rec["race_specific_advice"] = f"""
-            BASE BUILDING for {race_name}:
-            • Focus on aerobic base development
-            • Gradually build weekly mileage
-            • Limited intensity work (80/20 easy/hard split)
-            • Establish consistent training routine
-            """
+        # Taper / peak training / base building phase
+        phase = bisect_left(self._phase_bounds, weeks_until_race)
+        rec["race_specific_advice"] = self._phase_advice[phase].format(race_name=race_name)
         
         return rec
 
 
+def volume_change_bands(table):
+    """
+    Allowed mileage change per action, as (low, high) percent of the current week.
+
+    Actions without a volume_change_pct leave the prediction unchanged.
+
+    Args:
+        table: Parsed rule table (see data/recommendation_rules.json)
+
+    Returns:
+        Dict of action code -> (low, high)
+    """
+    return {
+        action: tuple(float(pct) for pct in spec.get("volume_change_pct", (-np.inf, np.inf)))
+        for action, spec in table["actions"].items()
+    }
+
+
+def load_volume_changes(rules_path=RULES_PATH):
+    """Read the per-action volume change bands from a rule table file."""
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        return volume_change_bands(json.load(f))
+
+
+def batch_records(batch):
+    """
+    Convert get_recommendations_batch columns to one dict per athlete.
+
+    The dicts are JSON-ready and match get_recommendation: NumPy scalars
+    become Python numbers, missing values (NaN) become None and caution flag
+    tuples become lists.
+    
+    Args:
+        batch: Dictionary of columns from get_recommendations_batch
+        
+    Returns:
+        List of recommendation dicts
+    """
+    columns = {name: [_plain(value) for value in np.asarray(column, dtype=object)]
+               for name, column in batch.items()}
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _plain(value):
+    """Python value for a NumPy/pandas cell; NaN -> None, tuples -> lists."""
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
 # Testing function
 def test_recommender():
     """Test the recommender with sample data."""
@@ -0,0 +1,386 @@
+"""
+Roster Plan Generation
+Scores every athlete in a weekly feature table and writes next week's plans as JSONL.
+
+For each athlete the latest LOOKBACK weeks are taken from featured-data.csv
+(or a Parquet copy such as the feature store's weekly_features table), then
+the whole chunk is scored in batches: LSTM mileage prediction, cluster
+assignment from the recent weeks' profile (flagged 'profile_outlier' when it
+lies outside every DBSCAN dense region, see outlier_detection), vectorized
+recommendations and the plan. Scoring runs in the main process or a process
+pool (--workers) while a writer thread serializes and appends finished
+chunks, so CPU work overlaps with output I/O.
+
+Runs are resumable: athletes already in the output file are skipped, and a
+line torn by an interruption is dropped before appending. --shard i/n picks
+a stable 1/n of the athletes, so shards can run on separate nodes:
+
+    python roster_plans.py --shard 0/4 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cluster_assignment import PROFILE_FEATURES
+from plan_schema import plan_to_dict
+from recommender import batch_records
+
+# Weekly features scored by the CLI
+WEEKLY_PATH = Path(__file__).resolve().parent / 'data' / 'featured-data.csv'
+
+# Weeks of history per athlete (the LSTM's input window)
+LOOKBACK = 6
+
+# Columns read from the input table
+INPUT_COLUMNS = ['athlete', 'timestamp', *PROFILE_FEATURES.values()]
+
+PLAN_MODES = ('template', 'llm', 'none')
+
+# Athletes per scoring batch
+CHUNK_SIZE = 512
+
+
+def read_weekly(path):
+    """
+    Read the weekly feature columns the roster run needs.
+
+    Args:
+        path: CSV or Parquet (.parquet) file with featured-data.csv columns
+
+    Returns:
+        DataFrame with INPUT_COLUMNS, timestamp as datetime64
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        weekly = pd.read_parquet(path, columns=INPUT_COLUMNS)
+    else:
+        weekly = pd.read_csv(path, usecols=INPUT_COLUMNS)
+    weekly['timestamp'] = pd.to_datetime(weekly['timestamp'])
+    return weekly
+
+
+def parse_shard(text):
+    """
+    Parse a --shard value 'i/n' into (i, n) with 0 <= i < n.
+
+    Raises:
+        ValueError: If the value is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError as e:
+        raise ValueError(f"Shard must look like 'i/n', got {text!r}") from e
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {text!r}")
+    return index, count
+
+
+def shard_mask(athletes, index, count):
+    """
+    Boolean mask of the athletes that belong to shard index of count.
+
+    Athletes are assigned by a CRC32 of their ID, so the split does not
+    depend on input order or on which other athletes are present.
+    """
+    if count == 1:
+        return np.ones(len(athletes), dtype=bool)
+    buckets = np.array([zlib.crc32(str(athlete).encode()) % count for athlete in athletes])
+    return buckets == index
+
+
+def completed_athletes(path):
+    """
+    Athletes already written to an output file.
+
+    A partially written last line (from an interrupted run) is truncated so
+    new records can be appended cleanly.
+
+    Args:
+        path: JSONL output path
+
+    Returns:
+        Set of athlete IDs
+    """
+    path = Path(path)
+    if not path.exists():
+        return set()
+    done = set()
+    valid_bytes = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['athlete'])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+    if valid_bytes < path.stat().st_size:
+        with open(path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def latest_weeks(weekly, lookback=LOOKBACK):
+    """
+    Each athlete's most recent weeks as a fixed-width array.
+
+    Args:
+        weekly: Weekly rows with athlete, timestamp, weekly_mileage,
+            fatigue_index and actual_training_days
+        lookback: Number of weeks to keep
+
+    Returns:
+        (latest, mileage): DataFrame indexed by athlete with week (latest
+        timestamp), weeks (history length, at most lookback), and the latest
+        week's training_days and fatigue; and an (n_athletes, lookback)
+        array of weekly mileage, oldest first and NaN-padded on the left
+    """
+    weekly = weekly.sort_values(['athlete', 'timestamp'], kind='stable')
+    from_end = weekly.groupby('athlete', sort=False).cumcount(ascending=False).to_numpy()
+    recent = weekly[from_end < lookback]
+    from_end = from_end[from_end < lookback]
+
+    codes, athletes = pd.factorize(recent['athlete'], sort=False)
+    mileage = np.full((len(athletes), lookback), np.nan)
+    mileage[codes, lookback - 1 - from_end] = recent['weekly_mileage'].to_numpy(dtype=np.float64)
+
+    last = recent[from_end == 0]
+    latest = pd.DataFrame({
+        'week': last['timestamp'].to_numpy(),
+        'weeks': np.bincount(codes, minlength=len(athletes)),
+        'training_days': last['actual_training_days'].clip(upper=7).to_numpy(dtype=np.float64),
+        'fatigue': last['fatigue_index'].to_numpy(dtype=np.float64),
+    }, index=pd.Index(athletes, name='athlete'))
+    return latest, mileage
+
+
+def score_chunk(weekly, plans='template'):
+    """
+    Predict, cluster and recommend for every athlete in a chunk of rows.
+
+    Runs in pool workers, each of which loads the models once.
+
+    Args:
+        weekly: All weekly rows of the chunk's athletes
+        plans: 'template' to attach the locally rendered plan, otherwise no plan
+
+    Returns:
+        List of output records in athlete order; athletes with fewer than
+        LOOKBACK weeks get an 'error' record instead
+    """
+    from app_resources import (get_cluster_assigner, get_mileage_predictor, get_outlier_detector,
+                               get_recommender)
+    from plan_templates import build_plan
+
+    latest, mileage = latest_weeks(weekly)
+    ready = (latest['weeks'] == LOOKBACK).to_numpy()
+
+    records = {}
+    for athlete, row in latest[~ready].iterrows():
+        records[athlete] = _record(athlete, row['week'], error=(
+            f"needs {LOOKBACK} weeks of history, has {row['weeks']}"))
+
+    if ready.any():
+        athletes = latest.index[ready]
+        history = mileage[ready]
+        predicted = get_mileage_predictor().predict_batch(history)
+        profiles = get_cluster_assigner().assign_weekly(weekly[weekly['athlete'].isin(athletes)],
+                                                        recent_weeks=LOOKBACK).reindex(athletes)
+        outliers = get_outlier_detector().flag(profiles)['outlier']
+        batch = get_recommender().get_recommendations_batch(
+            cluster_id=profiles['cluster_id'].to_numpy(),
+            current_weekly_mileage=history[:, -1],
+            predicted_next_week_mileage=predicted,
+            current_fatigue_index=latest['fatigue'].to_numpy()[ready],
+            training_days_per_week=latest['training_days'].to_numpy()[ready],
+        )
+        weeks = latest['week'].to_numpy()[ready]
+        rows = zip(athletes, weeks, history, outliers, batch_records(batch))
+        for athlete, week, recent, outlier, rec in rows:
+            record = _record(athlete, week, recent_mileage=recent.tolist(), profile_outlier=bool(outlier),
+                             recommendation=rec)
+            if plans == 'template':
+                record['plan'] = plan_to_dict(build_plan(rec))
+            records[athlete] = record
+    return [records[athlete] for athlete in latest.index]
+
+
+def _record(athlete, week, **fields):
+    week = pd.Timestamp(week)
+    return {
+        'athlete': int(athlete) if isinstance(athlete, (int, np.integer)) else athlete,
+        'week': week.date().isoformat(),
+        'plan_week': (week + pd.Timedelta(days=7)).date().isoformat(),
+        **fields,
+    }
+
+
+def add_llm_plans(records, handler):
+    """Generate structured plans for a chunk concurrently with AsyncLLMHandler."""
+    scored = [record for record in records if 'recommendation' in record]
+
+    async def generate():
+        return await asyncio.gather(*(handler.get_structured_plan_async(record['recommendation'])
+                                      for record in scored))
+
+    for record, plan in zip(scored, asyncio.run(generate())):
+        record['plan'] = plan_to_dict(plan)
+
+
+class JsonlWriter:
+    """
+    Appends record batches to a JSONL file from a background thread.
+
+    put() blocks when `depth` batches are waiting, which keeps memory bounded
+    when scoring outpaces the disk.
+    """
+
+    def __init__(self, path, depth=4):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.written = 0
+        self._queue = queue.Queue(maxsize=depth)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='jsonl-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, records):
+        """Queue a batch of records for writing."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(records)
+
+    def close(self):
+        """Write the remaining batches and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                records = self._queue.get()
+                if records is None:
+                    return
+                if self._error is not None:
+                    continue
+                try:
+                    f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+                    # A chunk is durable before the next one starts, so a resume
+                    # loses at most the chunk being written
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.written += len(records)
+                except Exception as e:
+                    self._error = e
+
+
+def generate_roster_plans(source, output, shard=(0, 1), workers=0, chunk_size=CHUNK_SIZE,
+                          plans='template', llm_handler=None):
+    """
+    Score a roster and append one JSONL record per athlete to output.
+
+    Args:
+        source: Weekly features, as a path (CSV or Parquet) or DataFrame
+        output: JSONL path; athletes already in it are skipped
+        shard: (index, count) share of the athletes to process
+        workers: Scoring processes (0 or 1 scores in this process)
+        chunk_size: Athletes per scoring batch
+        plans: 'template', 'llm' (AsyncLLMHandler structured plans) or 'none'
+        llm_handler: AsyncLLMHandler for plans='llm' (default: one from the environment)
+
+    Returns:
+        Dict with athletes (in the shard), skipped (already done), written and seconds
+    """
+    if plans not in PLAN_MODES:
+        raise ValueError(f"plans must be one of {', '.join(PLAN_MODES)}")
+    start = time.perf_counter()
+    weekly = read_weekly(source) if not isinstance(source, pd.DataFrame) else source
+
+    athletes = weekly['athlete'].unique()
+    athletes = athletes[shard_mask(athletes, *shard)]
+    done = completed_athletes(output)
+    todo = [athlete for athlete in athletes if athlete not in done]
+    chunk_of = pd.Series(np.arange(len(todo)) // chunk_size, index=pd.Index(todo, dtype=athletes.dtype))
+    weekly = weekly[weekly['athlete'].isin(todo)]
+    chunks = (chunk for _, chunk in weekly.groupby(weekly['athlete'].map(chunk_of), sort=True))
+
+    if plans == 'llm' and llm_handler is None:
+        from llm_handler import AsyncLLMHandler
+        llm_handler = AsyncLLMHandler()
+    score_plans = 'template' if plans == 'template' else 'none'
+
+    writer = JsonlWriter(output)
+    try:
+        for records in _score_chunks(chunks, score_plans, workers):
+            if plans == 'llm':
+                add_llm_plans(records, llm_handler)
+            writer.put(records)
+    finally:
+        writer.close()
+    return {
+        'athletes': len(athletes),
+        'skipped': len(athletes) - len(todo),
+        'written': writer.written,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _score_chunks(chunks, plans, workers):
+    """Yield scored chunks in order, keeping a bounded number in flight in the pool."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk, plans)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(score_chunk, chunk, plans))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate next week's plans for a whole roster")
+    parser.add_argument('--input', default=WEEKLY_PATH,
+                        help="Weekly features, CSV or .parquet (default: data/featured-data.csv)")
+    parser.add_argument('--output', help="JSONL output (default: roster_plans[.shard-i-of-n].jsonl)")
+    parser.add_argument('--shard', default='0/1', help="Process shard i of n, e.g. 2/8")
+    parser.add_argument('--workers', type=int, default=0, help="Scoring processes (default: in-process)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Athletes per batch")
+    parser.add_argument('--plans', choices=PLAN_MODES, default='template',
+                        help="Plan generator: local template, LLM (structured) or none")
+    args = parser.parse_args()
+
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    output = args.output or ('roster_plans.jsonl' if shard[1] == 1
+                             else f'roster_plans.shard-{shard[0]}-of-{shard[1]}.jsonl')
+
+    summary = generate_roster_plans(args.input, output, shard=shard, workers=args.workers,
+                                    chunk_size=args.chunk_size, plans=args.plans)
+    print(f"Shard {shard[0]}/{shard[1]}: {summary['athletes']} athletes, "
+          f"{summary['skipped']} already done, {summary['written']} written to {output} "
+          f"in {summary['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+LSTM Sequence Builder
+Builds every 6-week mileage window at once and caches them as memory-mapped .npy files.
+
+Replaces the per-athlete create_sequences loop in notebooks/lstm_model.ipynb:
+weekly rows are sorted into one contiguous array, sliding_window_view gives
+all windows as a view, and windows that cross an athlete boundary are masked
+out. Results are saved under a key hashed from the source data, so training,
+evaluation and batch scoring open the same arrays with np.load(mmap_mode='r')
+instead of rebuilding or copying them.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(__file__).resolve().parent / 'data' / 'cache' / 'sequences'
+
+# Weekly features the LSTM windows are built from
+FEATURES_PATH = Path(__file__).resolve().parent / 'data' / 'featured-data.csv'
+
+# Past weeks per window (see notebooks/lstm_model.ipynb)
+LOOKBACK = 6
+
+# Bump when the window layout changes so stale caches are not reused
+CACHE_VERSION = 1
+
+SEQUENCE_ARRAYS = ('X', 'y', 'athlete', 'target_week')
+
+
+def build_sequences(weekly, lookback=LOOKBACK, feature_col='weekly_mileage'):
+    """
+    Build every (lookback weeks -> next week) window for all athletes.
+
+    Gives the same windows, in the same order, as the notebook's loop over
+    athletes with at least lookback + 1 weeks.
+
+    Args:
+        weekly: DataFrame with athlete, timestamp and feature_col columns
+        lookback: Number of past weeks per window
+        feature_col: Column to build windows from
+
+    Returns:
+        Dict of arrays: X (N, lookback), y (N,), athlete (N,) and
+        target_week (N,) as datetime64 of the predicted week
+    """
+    weekly = weekly.sort_values(['athlete', 'timestamp'], kind='stable')
+    values = weekly[feature_col].to_numpy(dtype=np.float64)
+    athletes = weekly['athlete'].to_numpy()
+    weeks = pd.to_datetime(weekly['timestamp']).to_numpy(dtype='datetime64[D]')
+
+    if len(values) <= lookback:
+        return _empty_sequences(lookback)
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, lookback + 1)
+    # A window is valid when its first and last week belong to the same athlete
+    valid = athletes[:-lookback] == athletes[lookback:]
+
+    windows = windows[valid]
+    return {
+        'X': np.ascontiguousarray(windows[:, :lookback]),
+        'y': windows[:, lookback].copy(),
+        'athlete': athletes[:-lookback][valid],
+        'target_week': weeks[lookback:][valid],
+    }
+
+
+def load_sequences(source=FEATURES_PATH, lookback=LOOKBACK,
+                   feature_col='weekly_mileage', cache_dir=CACHE_DIR):
+    """
+    Load windows from the cache, building and saving them on a miss.
+
+    Args:
+        source: Path to a weekly features CSV/Parquet file, or a DataFrame
+        lookback: Number of past weeks per window
+        feature_col: Column to build windows from
+        cache_dir: Root directory of the cache
+
+    Returns:
+        Dict of read-only memory-mapped arrays (see build_sequences)
+    """
+    key = cache_key(source, lookback, feature_col)
+    entry = Path(cache_dir) / key
+    if not all((entry / f'{name}.npy').exists() for name in SEQUENCE_ARRAYS):
+        weekly = _read_weekly(source, feature_col)
+        _save_sequences(build_sequences(weekly, lookback, feature_col), entry)
+    return {name: np.load(entry / f'{name}.npy', mmap_mode='r') for name in SEQUENCE_ARRAYS}
+
+
+def cache_key(source, lookback=LOOKBACK, feature_col='weekly_mileage'):
+    """
+    Hash the source data and window settings into a cache key.
+
+    Files are hashed by content, DataFrames by their athlete, timestamp and
+    feature values, so editing the data invalidates the cache.
+
+    Args:
+        source: Path or DataFrame
+        lookback: Number of past weeks per window
+        feature_col: Column to build windows from
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256(f'v{CACHE_VERSION}:{lookback}:{feature_col}:'.encode())
+    if isinstance(source, pd.DataFrame):
+        columns = source[['athlete', 'timestamp', feature_col]]
+        digest.update(pd.util.hash_pandas_object(columns, index=False).to_numpy().tobytes())
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+def _read_weekly(source, feature_col):
+    """Read the columns needed for windows from a path or DataFrame."""
+    if isinstance(source, pd.DataFrame):
+        return source
+    columns = ['athlete', 'timestamp', feature_col]
+    if str(source).endswith('.parquet'):
+        return pd.read_parquet(source, columns=columns)
+    return pd.read_csv(source, usecols=columns)
+
+
+def _save_sequences(sequences, entry):
+    """Write arrays to a temporary directory, then move it into place."""
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix='.tmp-'))
+    try:
+        for name in SEQUENCE_ARRAYS:
+            np.save(staging / f'{name}.npy', sequences[name])
+        os.replace(staging, entry)
+    except OSError:
+        # Another process finished the same entry first
+        if not entry.exists():
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _empty_sequences(lookback):
+    """Sequences dict with no windows."""
+    return {
+        'X': np.empty((0, lookback)),
+        'y': np.empty(0),
+        'athlete': np.empty(0, dtype=np.int64),
+        'target_week': np.empty(0, dtype='datetime64[D]'),
+    }
@@ -0,0 +1,288 @@
+"""
+Recommendation Service
+Headless HTTP API for recommendations, mileage predictions and training plans.
+
+A Starlette (ASGI) app that keeps the recommender, mileage predictor and
+cluster assigner resident from startup (app_resources.warm_up) and shares
+one AsyncLLMHandler - with its response cache, concurrency limit, request
+coalescing and, for LLM_BACKEND=http, a pooled keep-alive HTTP client -
+across all requests. Model calls run in Starlette's thread pool, so a large
+batch does not stall other requests on the event loop. Run with:
+
+    uvicorn service:create_app --factory --port 8000
+
+Endpoints (JSON bodies):
+    POST /recommend          one athlete -> recommendation
+    POST /recommend/batch    {"athletes": [...]} -> recommendations (vectorized)
+    POST /predict-mileage    {"recent_mileage": [6 weeks]} or {"sequences": [[...], ...]}
+    POST /plan               athlete (+ "format": "structured" | "markdown") -> plan
+    GET  /health             loaded resources and LLM stats
+
+An athlete is cluster_id, current_weekly_mileage, predicted_next_week_mileage,
+current_fatigue_index, training_days_per_week and optionally
+goal_race_distance and weeks_until_race. With recent_mileage (last 6 weeks,
+oldest first) the current and predicted mileage and the cluster can be left
+out and are derived from the history.
+"""
+
+import copy
+import math
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from app_resources import get_cluster_assigner, get_mileage_predictor, get_recommender, registry, warm_up
+from cluster_assignment import PROFILE_FEATURES, profile_from_recent_mileage
+from plan_schema import plan_to_dict
+from recommender import batch_records
+
+# Resources loaded at startup; the LLM handler is owned by the app
+SERVICE_RESOURCES = ['recommender', 'mileage_predictor', 'cluster_assigner']
+
+REQUIRED_FIELDS = ['current_fatigue_index', 'training_days_per_week']
+OPTIONAL_FIELDS = ['goal_race_distance', 'weeks_until_race']
+# Required unless recent_mileage is given
+DERIVED_FIELDS = ['current_weekly_mileage', 'predicted_next_week_mileage', 'cluster_id']
+
+# Weeks of history in recent_mileage and /predict-mileage sequences
+LOOKBACK = 6
+
+# Largest accepted /recommend/batch and /predict-mileage request
+MAX_BATCH = 10000
+
+PLAN_FORMATS = ('structured', 'markdown')
+
+
+class RequestError(ValueError):
+    """Invalid request body; reported as HTTP 422."""
+
+
+def parse_athlete(data):
+    """
+    Validate one athlete from a request body.
+
+    Args:
+        data: Request dict
+
+    Returns:
+        (athlete, history): keyword arguments for
+        RunningRecommender.get_recommendation, with predicted mileage and
+        cluster_id left as None when they are to be derived, and the
+        recent_mileage list (or None)
+
+    Raises:
+        RequestError: If a field is missing or not a number
+    """
+    if not isinstance(data, dict):
+        raise RequestError("Athlete must be a JSON object")
+    athlete = {name: _number(data, name) for name in REQUIRED_FIELDS}
+    for name in OPTIONAL_FIELDS:
+        athlete[name] = _number(data, name) if data.get(name) is not None else None
+
+    history = data.get('recent_mileage')
+    if history is not None:
+        history = _sequence(history, 'recent_mileage', LOOKBACK)
+    for name in DERIVED_FIELDS:
+        if data.get(name) is None and history is None:
+            raise RequestError(f"'{name}' or 'recent_mileage' is required")
+        athlete[name] = _number(data, name) if data.get(name) is not None else None
+
+    if athlete['current_weekly_mileage'] is None:
+        athlete['current_weekly_mileage'] = history[-1]
+    if athlete['cluster_id'] is not None:
+        if athlete['cluster_id'] not in (0, 1, 2):
+            raise RequestError("'cluster_id' must be 0, 1 or 2")
+        athlete['cluster_id'] = int(athlete['cluster_id'])
+    return athlete, history
+
+
+def resolve_athletes(parsed):
+    """
+    Fill in predicted mileage and cluster_id from the athletes' histories.
+
+    Predictions and cluster assignments for the whole request run as one
+    batch each on the resident models.
+
+    Args:
+        parsed: List of parse_athlete results
+
+    Returns:
+        List of complete athlete dicts
+    """
+    athletes = [athlete for athlete, _ in parsed]
+    need_prediction = [i for i, (athlete, _) in enumerate(parsed)
+                       if athlete['predicted_next_week_mileage'] is None]
+    if need_prediction:
+        sequences = np.array([parsed[i][1] for i in need_prediction])
+        for i, predicted in zip(need_prediction, get_mileage_predictor().predict_batch(sequences)):
+            athletes[i]['predicted_next_week_mileage'] = float(predicted)
+
+    need_cluster = [i for i, (athlete, _) in enumerate(parsed) if athlete['cluster_id'] is None]
+    if need_cluster:
+        profiles = [profile_from_recent_mileage(parsed[i][1], athletes[i]['training_days_per_week'])
+                    for i in need_cluster]
+        profiles = np.array([[profile[name] for name in PROFILE_FEATURES] for profile in profiles])
+        for i, cluster_id in zip(need_cluster, get_cluster_assigner().assign(profiles)['cluster_id']):
+            athletes[i]['cluster_id'] = int(cluster_id)
+    return athletes
+
+
+def recommend_athlete(data):
+    """
+    Recommendation for one athlete request body.
+
+    Args:
+        data: Request dict (see parse_athlete)
+
+    Returns:
+        Recommendation dict from RunningRecommender.get_recommendation
+    """
+    athlete, = resolve_athletes([parse_athlete(data)])
+    return get_recommender().get_recommendation(**athlete)
+
+
+def recommend_athletes(data):
+    """
+    Recommendations for a {"athletes": [...]} request body, as one batch.
+
+    Args:
+        data: Request dict
+
+    Returns:
+        {'recommendations': [...]} in request order
+    """
+    athletes = resolve_athletes([parse_athlete(athlete) for athlete in _list(data, 'athletes')])
+    columns = {name: [athlete[name] if athlete[name] is not None else np.nan for athlete in athletes]
+               for name in athletes[0]}
+    return {'recommendations': batch_records(get_recommender().get_recommendations_batch(columns))}
+
+
+def predict_athlete_mileage(data):
+    """
+    Next-week mileage for a /predict-mileage request body.
+
+    Args:
+        data: {"recent_mileage": [6 weeks]} or {"sequences": [[...], ...]}
+
+    Returns:
+        {'predicted_mileage': float} or {'predicted_mileage': [float, ...]}
+    """
+    predictor = get_mileage_predictor()
+    if isinstance(data, dict) and 'recent_mileage' in data:
+        history = _sequence(data['recent_mileage'], 'recent_mileage', LOOKBACK)
+        return {'predicted_mileage': float(predictor.predict(history))}
+    sequences = [_sequence(seq, 'sequences', LOOKBACK) for seq in _list(data, 'sequences')]
+    return {'predicted_mileage': predictor.predict_batch(np.asarray(sequences)).tolist()}
+
+
+def _number(data, name):
+    value = data.get(name)
+    if value is None:
+        raise RequestError(f"'{name}' is required")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(f"'{name}' must be a number")
+    return float(value)
+
+
+def _sequence(value, name, length):
+    if not isinstance(value, list) or len(value) != length:
+        raise RequestError(f"'{name}' must be a list of {length} numbers")
+    return [_number({name: v}, name) for v in value]
+
+
+def _list(data, name):
+    value = data.get(name) if isinstance(data, dict) else None
+    if not isinstance(value, list) or not value:
+        raise RequestError(f"'{name}' must be a non-empty list")
+    if len(value) > MAX_BATCH:
+        raise RequestError(f"'{name}' has more than {MAX_BATCH} entries")
+    return value
+
+
+def create_app(llm_handler=None, warm=True):
+    """
+    Build the ASGI application.
+
+    Args:
+        llm_handler: AsyncLLMHandler to share across requests (default: one
+            configured from the environment, built at startup)
+        warm: Load the models at startup instead of on the first request
+
+    Returns:
+        Starlette application
+    """
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if warm:
+            warm_up(SERVICE_RESOURCES)
+        if app.state.llm is None:
+            from llm_handler import AsyncLLMHandler
+            app.state.llm = AsyncLLMHandler()
+        yield
+        aclose = getattr(app.state.llm.model, 'aclose', None)
+        if aclose is not None:
+            await aclose()
+
+    async def body(request):
+        try:
+            return await request.json()
+        except ValueError as e:
+            raise RequestError(f"Body is not valid JSON: {e}") from e
+
+    def endpoint(handler):
+        async def wrapped(request):
+            try:
+                return JSONResponse(await handler(request))
+            except RequestError as e:
+                return JSONResponse({'error': str(e)}, status_code=422)
+        return wrapped
+
+    async def recommend(request):
+        return await run_in_threadpool(recommend_athlete, await body(request))
+
+    async def recommend_batch(request):
+        return await run_in_threadpool(recommend_athletes, await body(request))
+
+    async def predict_mileage(request):
+        return await run_in_threadpool(predict_athlete_mileage, await body(request))
+
+    async def plan(request):
+        data = await body(request)
+        plan_format = data.get('format', 'structured') if isinstance(data, dict) else None
+        if plan_format not in PLAN_FORMATS:
+            raise RequestError(f"'format' must be one of {', '.join(PLAN_FORMATS)}")
+        rec = await run_in_threadpool(recommend_athlete, data)
+        # Shallow copy: shared client, cache and stats; per-request last_source
+        handler = copy.copy(request.app.state.llm)
+        if plan_format == 'structured':
+            result = plan_to_dict(await handler.get_structured_plan_async(rec))
+        else:
+            result = await handler.get_friendly_plan_async(rec)
+        return {'recommendation': rec, 'plan': result, 'source': handler.last_source}
+
+    async def health(request):
+        llm = request.app.state.llm
+        return {
+            'status': 'ok',
+            'resources': {name: round(seconds * 1000, 1) for name, seconds in registry.loaded().items()},
+            'llm': {
+                'model': type(llm.model).__name__ if llm and llm.model is not None else 'template',
+                'stats': dict(llm.stats) if llm else {},
+                'cache': llm.cache.stats() if llm and llm.cache is not None else None,
+            },
+        }
+
+    app = Starlette(lifespan=lifespan, routes=[
+        Route('/recommend', endpoint(recommend), methods=['POST']),
+        Route('/recommend/batch', endpoint(recommend_batch), methods=['POST']),
+        Route('/predict-mileage', endpoint(predict_mileage), methods=['POST']),
+        Route('/plan', endpoint(plan), methods=['POST']),
+        Route('/health', endpoint(health), methods=['GET']),
+    ])
+    app.state.llm = llm_handler
+    return app
@@ -0,0 +1,412 @@
+"""
+Similar Runners Index
+Nearest-neighbor search over athletes' 6-week training windows, and what those runners ran next.
+
+Every window of LOOKBACK weeks in featured-data.csv (the LSTM's windows,
+from sequence_builder) becomes one vector: the window's clustering profile
+(the six PROFILE_FEATURES averaged over it, standardized like
+ClusterAssigner) followed by its weekly mileage in the same units as
+avg_weekly_mileage. Each vector keeps the week that followed it, so a query
+returns the mileage that the k most similar runners actually ran next.
+
+The index is a directory of .npy files opened with np.load(mmap_mode='r'),
+so loading it reads only meta.json and the coarse centroids. Vectors are
+grouped into cells around k-means centroids (an inverted file): a query
+scans only the rows of the `nprobe` nearest cells, which keeps it under a
+millisecond as the roster grows; nprobe=None scans every cell (exact
+search). add_weekly appends new windows as a new segment without touching
+existing files; compact() merges segments.
+
+Usage:
+    python similar_runners.py build data/featured-data.csv
+    python similar_runners.py add new-athletes.csv
+    python similar_runners.py query 18 19 20 21 20 22 --days 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cluster_assignment import MODELS_DIR, PROFILE_FEATURES, profile_from_recent_mileage
+from sequence_builder import FEATURES_PATH, LOOKBACK, build_sequences
+
+INDEX_DIR = MODELS_DIR / 'similar_runners'
+
+DEFAULT_K = 20
+DEFAULT_NPROBE = 8
+
+# Quantiles reported for the neighbors' next week
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Per-row arrays stored in every segment besides the vectors
+PAYLOAD_ARRAYS = ('athlete', 'week', 'current', 'next')
+
+INDEX_VERSION = 1
+
+
+def window_vectors(weekly, mean, scale, lookback=LOOKBACK):
+    """
+    Vectors and next-week payload for every window in a weekly table.
+
+    Args:
+        weekly: Weekly features (featured-data.csv columns)
+        mean, scale: Standardization of the PROFILE_FEATURES columns
+        lookback: Weeks per window
+
+    Returns:
+        (vectors, payload): float32 array (N, 6 + lookback) and a dict of
+        PAYLOAD_ARRAYS - athlete, week (datetime64[D] of the following
+        week), current (last window week's mileage) and next (the
+        following week's mileage)
+    """
+    mileage = build_sequences(weekly, lookback)
+    profile = np.column_stack([
+        _window_mean(build_sequences(weekly, lookback, feature_col=column)['X'])
+        for column in PROFILE_FEATURES.values()
+    ]) if len(mileage['y']) else np.empty((0, len(PROFILE_FEATURES)))
+    vectors = _vectors(profile, mileage['X'], mean, scale)
+    payload = {
+        'athlete': mileage['athlete'],
+        'week': mileage['target_week'].astype('datetime64[D]'),
+        'current': mileage['X'][:, -1],
+        'next': mileage['y'],
+    }
+    return vectors, payload
+
+
+def _window_mean(windows):
+    """Mean over each window, ignoring missing weeks (consistency starts NaN)."""
+    with np.errstate(invalid='ignore'):
+        counts = (~np.isnan(windows)).sum(axis=1)
+        return np.where(counts > 0, np.nansum(windows, axis=1) / np.maximum(counts, 1), np.nan)
+
+
+def _vectors(profile, mileage_windows, mean, scale):
+    """Standardized profile (NaN -> mean) then mileage in avg_weekly_mileage units."""
+    z = np.nan_to_num((np.asarray(profile, dtype=np.float64) - mean) / scale, nan=0.0)
+    shape = np.asarray(mileage_windows, dtype=np.float64) / scale[0]
+    return np.hstack([z, shape]).astype(np.float32)
+
+
+def _keys(athlete, week):
+    """One int64 per (athlete, week) for duplicate checks."""
+    return (np.asarray(athlete, dtype=np.int64) << 20) | np.asarray(week, dtype='datetime64[D]').astype(np.int64)
+
+
+class SimilarRunnersIndex:
+    """
+    Memory-mapped inverted-file k-NN index of training windows.
+    """
+
+    def __init__(self, path=INDEX_DIR):
+        """
+        Open an index built with build().
+
+        Args:
+            path: Index directory
+
+        Raises:
+            FileNotFoundError: If no index exists at path
+        """
+        self.path = Path(path)
+        meta_path = self.path / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No similar-runners index at {self.path}; "
+                                    f"build one with 'python similar_runners.py build'")
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        self.lookback = self.meta['lookback']
+        self._mean = np.array(self.meta['mean'])
+        self._scale = np.array(self.meta['scale'])
+        self.centroids = np.load(self.path / 'centroids.npy')
+        self._centroid_norms = (self.centroids.astype(np.float64) ** 2).sum(axis=1)
+        self.segments = [self._open_segment(name) for name in self.meta['segments']]
+
+    def _open_segment(self, name):
+        directory = self.path / name
+        segment = {'name': name, 'offsets': np.load(directory / 'offsets.npy')}
+        for array in ('vectors', *PAYLOAD_ARRAYS):
+            segment[array] = np.load(directory / f'{array}.npy', mmap_mode='r')
+        return segment
+
+    def __len__(self):
+        return sum(len(segment['next']) for segment in self.segments)
+
+    @classmethod
+    def build(cls, weekly, path=INDEX_DIR, n_cells=None, seed=0, scaler_path=MODELS_DIR / 'clustering_scaler.pkl'):
+        """
+        Build an index from a weekly feature table, replacing any at path.
+
+        Args:
+            weekly: Weekly features (featured-data.csv columns)
+            path: Index directory
+            n_cells: Inverted-file cells (default: about sqrt(windows))
+            seed: Random state for the cell centroids
+            scaler_path: Clustering scaler whose standardization the index keeps
+
+        Returns:
+            The opened SimilarRunnersIndex
+        """
+        import joblib
+        from sklearn.cluster import MiniBatchKMeans
+
+        scaler = joblib.load(scaler_path)
+        mean, scale = np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)
+        vectors, payload = window_vectors(weekly, mean, scale)
+        if not len(vectors):
+            raise ValueError(f"No {LOOKBACK}-week windows to index")
+        n_cells = min(n_cells or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        centroids = MiniBatchKMeans(n_clusters=n_cells, n_init=1, random_state=seed,
+                                    batch_size=4096).fit(vectors).cluster_centers_.astype(np.float32)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix='.building-', dir=path.parent))
+        try:
+            np.save(staging / 'centroids.npy', centroids)
+            meta = {'version': INDEX_VERSION, 'lookback': LOOKBACK, 'mean': mean.tolist(),
+                    'scale': scale.tolist(), 'segments': []}
+            _write_segment(staging / 'seg-00000', vectors, payload, centroids)
+            meta['segments'].append('seg-00000')
+            _write_meta(staging, meta)
+            if path.exists():
+                shutil.rmtree(path)
+            os.replace(staging, path)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return cls(path)
+
+    def add_weekly(self, weekly):
+        """
+        Add the windows of new athletes (or new weeks) as a new segment.
+
+        Windows already in the index - same athlete and following week -
+        are skipped. Existing segments and the cell centroids are unchanged.
+
+        Args:
+            weekly: Weekly features; each athlete's full recent history, so
+                their windows can be formed
+
+        Returns:
+            Number of windows added
+        """
+        vectors, payload = window_vectors(weekly, self._mean, self._scale, self.lookback)
+        new_keys = _keys(payload['athlete'], payload['week'])
+        existing = np.concatenate([_keys(s['athlete'], s['week']) for s in self.segments] or [[]])
+        fresh = ~np.isin(new_keys, existing)
+        if not fresh.any():
+            return 0
+        vectors = vectors[fresh]
+        payload = {name: values[fresh] for name, values in payload.items()}
+
+        name = f"seg-{int(self.meta['segments'][-1].split('-')[1]) + 1:05d}"
+        staging = Path(tempfile.mkdtemp(prefix='.adding-', dir=self.path))
+        _write_segment(staging, vectors, payload, self.centroids)
+        os.replace(staging, self.path / name)
+        self.meta['segments'].append(name)
+        _write_meta(self.path, self.meta)
+        self.segments.append(self._open_segment(name))
+        return int(fresh.sum())
+
+    def compact(self):
+        """Merge all segments into one (new files, then the old ones are removed)."""
+        if len(self.segments) <= 1:
+            return
+        vectors = np.concatenate([np.asarray(s['vectors']) for s in self.segments])
+        payload = {name: np.concatenate([np.asarray(s[name]) for s in self.segments]) for name in PAYLOAD_ARRAYS}
+        old = list(self.meta['segments'])
+        name = f"seg-{int(old[-1].split('-')[1]) + 1:05d}"
+        staging = Path(tempfile.mkdtemp(prefix='.compacting-', dir=self.path))
+        _write_segment(staging, vectors, payload, self.centroids)
+        os.replace(staging, self.path / name)
+        self.meta['segments'] = [name]
+        _write_meta(self.path, self.meta)
+        self.segments = [self._open_segment(name)]
+        for stale in old:
+            shutil.rmtree(self.path / stale, ignore_errors=True)
+
+    def query_vector(self, recent_mileage, training_days, pace_km=None):
+        """
+        Vector for an athlete described by the app's inputs.
+
+        Args:
+            recent_mileage: Last LOOKBACK weeks of mileage, oldest first
+            training_days: Runs per week
+            pace_km: Average pace in min/km, if known
+
+        Returns:
+            float32 array (6 + LOOKBACK,)
+
+        Raises:
+            ValueError: If recent_mileage does not have LOOKBACK weeks
+        """
+        if len(recent_mileage) != self.lookback:
+            raise ValueError(f"Expected {self.lookback} weeks of mileage, got {len(recent_mileage)}")
+        profile = profile_from_recent_mileage(recent_mileage, training_days, pace_km)
+        return _vectors([[profile[name] for name in PROFILE_FEATURES]], [recent_mileage],
+                        self._mean, self._scale)[0]
+
+    def search(self, vector, k=DEFAULT_K, nprobe=DEFAULT_NPROBE, exclude_athlete=None):
+        """
+        The k nearest windows to one vector.
+
+        Args:
+            vector: Query vector (query_vector output)
+            k: Neighbors
+            nprobe: Cells scanned, nearest first (None: all, exact search)
+            exclude_athlete: Leave out this athlete's own windows
+
+        Returns:
+            Dict of arrays of length <= k, nearest first: distance plus the
+            PAYLOAD_ARRAYS
+        """
+        q = np.asarray(vector, dtype=np.float32)
+        n_cells = len(self.centroids)
+        if nprobe is None or nprobe >= n_cells:
+            cells = np.arange(n_cells)
+        else:
+            scores = self._centroid_norms - 2.0 * (self.centroids @ q)
+            cells = np.argpartition(scores, nprobe)[:nprobe]
+
+        distances, rows = [], []
+        for s, segment in enumerate(self.segments):
+            offsets = segment['offsets']
+            for cell in cells:
+                start, end = offsets[cell], offsets[cell + 1]
+                if start == end:
+                    continue
+                diff = segment['vectors'][start:end] - q
+                cell_rows = np.arange(start, end)
+                if exclude_athlete is not None:
+                    keep = segment['athlete'][start:end] != exclude_athlete
+                    diff, cell_rows = diff[keep], cell_rows[keep]
+                distances.append(np.einsum('ij,ij->i', diff, diff))
+                rows.append(np.column_stack([np.full(len(cell_rows), s), cell_rows]))
+        if not distances:
+            return {name: np.empty(0) for name in ('distance', *PAYLOAD_ARRAYS)}
+        distances = np.concatenate(distances)
+        rows = np.concatenate(rows)
+
+        top = np.argpartition(distances, k)[:k] if len(distances) > k else np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind='stable')]
+        result = {'distance': np.sqrt(distances[top])}
+        for name in PAYLOAD_ARRAYS:
+            result[name] = np.array([self.segments[s][name][i] for s, i in rows[top]])
+        return result
+
+    def similar(self, recent_mileage, training_days, pace_km=None, k=DEFAULT_K, nprobe=DEFAULT_NPROBE,
+                exclude_athlete=None):
+        """
+        What the k most similar runners ran the week after a window like this one.
+
+        Args:
+            recent_mileage: Last LOOKBACK weeks of mileage, oldest first
+            training_days: Runs per week
+            pace_km: Average pace in min/km, if known
+            k, nprobe, exclude_athlete: As in search
+
+        Returns:
+            Dict with k (neighbors found), athletes (distinct), and
+            next_week_mileage and change_pct, each a dict of quantile
+            ('p10', ..., 'p90') -> value; the quantile dicts are empty when
+            no neighbors were found
+        """
+        found = self.search(self.query_vector(recent_mileage, training_days, pace_km), k, nprobe,
+                            exclude_athlete)
+        summary = {'k': int(len(found['next'])), 'athletes': int(len(np.unique(found['athlete']))),
+                   'next_week_mileage': {}, 'change_pct': {}}
+        if not len(found['next']):
+            return summary
+        names = [f"p{round(q * 100)}" for q in QUANTILES]
+        change = np.where(found['current'] > 0, (found['next'] - found['current']) / np.where(
+            found['current'] > 0, found['current'], 1) * 100, 0.0)
+        summary['next_week_mileage'] = dict(zip(names, np.quantile(found['next'], QUANTILES).tolist()))
+        summary['change_pct'] = dict(zip(names, np.quantile(change, QUANTILES).tolist()))
+        return summary
+
+
+def _write_segment(directory, vectors, payload, centroids):
+    """Save one segment with its rows grouped by nearest centroid."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    cells = np.empty(len(vectors), dtype=np.int64)
+    norms = (centroids.astype(np.float64) ** 2).sum(axis=1)
+    for start in range(0, len(vectors), 65536):
+        block = vectors[start:start + 65536].astype(np.float64)
+        cells[start:start + 65536] = (norms - 2.0 * block @ centroids.T.astype(np.float64)).argmin(axis=1)
+    order = np.argsort(cells, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=len(centroids)))])
+    np.save(directory / 'offsets.npy', offsets.astype(np.int64))
+    np.save(directory / 'vectors.npy', vectors[order])
+    for name in PAYLOAD_ARRAYS:
+        np.save(directory / f'{name}.npy', np.asarray(payload[name])[order])
+
+
+def _write_meta(directory, meta):
+    """Replace meta.json atomically, so readers see the old or the new segment list."""
+    temporary = Path(directory) / 'meta.json.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(temporary, Path(directory) / 'meta.json')
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Get the process-wide SimilarRunnersIndex, opening models/similar_runners on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarRunnersIndex()
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the similar-runners index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Index every window of a weekly table")
+    build.add_argument('input', nargs='?', default=FEATURES_PATH)
+    build.add_argument('--cells', type=int, help="Inverted-file cells (default: sqrt(windows))")
+    add = subparsers.add_parser('add', help="Add new athletes' windows as a segment")
+    add.add_argument('input')
+    subparsers.add_parser('compact', help="Merge segments")
+    query = subparsers.add_parser('query', help="Next-week mileage of similar runners")
+    query.add_argument('mileage', type=float, nargs=LOOKBACK, help="Last 6 weeks, oldest first")
+    query.add_argument('--days', type=int, default=3, help="Runs per week")
+    query.add_argument('--k', type=int, default=DEFAULT_K)
+    for sub in (build, add, query, subparsers.choices['compact']):
+        sub.add_argument('--index', default=INDEX_DIR, help="Index directory")
+    args = parser.parse_args()
+
+    from roster_plans import read_weekly
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        index = SimilarRunnersIndex.build(read_weekly(args.input), args.index, n_cells=args.cells)
+        print(f"Indexed {len(index)} windows in {len(index.centroids)} cells "
+              f"({time.perf_counter() - start:.2f}s) -> {args.index}")
+    elif args.command == 'add':
+        added = SimilarRunnersIndex(args.index).add_weekly(read_weekly(args.input))
+        print(f"Added {added} windows ({time.perf_counter() - start:.2f}s)")
+    elif args.command == 'compact':
+        SimilarRunnersIndex(args.index).compact()
+        print("Compacted")
+    else:
+        summary = SimilarRunnersIndex(args.index).similar(args.mileage, args.days, k=args.k)
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Tests for the app resource registry
+Checks once-per-process loading, warm-up, per-request handlers and rerun timing
+"""
+
+import threading
+import time
+
+import pytest
+
+from app_resources import (RerunTimer, ResourceRegistry, get_recommender,
+                           new_llm_handler, registry, warm_up)
+
+
+def test_factory_runs_once_across_threads():
+    """Concurrent first use builds the resource a single time."""
+    calls = []
+
+    def slow_factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    local = ResourceRegistry()
+    local.register('slow', slow_factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(local.get('slow'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert local.loaded()['slow'] >= 0.05
+
+
+def test_warm_up_reports_load_times_and_skips_missing():
+    """warm_up returns build times, 0 when already loaded, None for missing deps."""
+    def missing():
+        raise ImportError("No module named 'tensorflow'")
+
+    local = ResourceRegistry()
+    local.register('fast', dict)
+    local.register('optional', missing)
+
+    first = local.warm_up(skip_missing=True)
+    assert first['fast'] >= 0 and first['optional'] is None
+    assert local.warm_up(['fast'])['fast'] == 0.0
+    with pytest.raises(ImportError):
+        local.warm_up(['optional'])
+
+
+def test_app_resources_are_shared():
+    """The app's recommender is built once and reused."""
+    print("\n" + "="*80)
+    print("TEST: app resource warm-up")
+    print("="*80)
+
+    times = warm_up(skip_missing=True)
+    assert set(times) == {'recommender', 'mileage_predictor', 'cluster_assigner', 'outlier_detector',
+                          'llm_handler'}
+    assert get_recommender() is get_recommender()
+    assert warm_up(['recommender'])['recommender'] == 0.0
+    for name, seconds in registry.loaded().items():
+        print(f"✓ {name}: {seconds * 1000:.1f} ms")
+
+
+def test_llm_handlers_share_client_not_request_state():
+    """Per-request handlers share the model and cache but not last_source."""
+    first, second = new_llm_handler(), new_llm_handler()
+    assert first is not second
+    assert first.model is second.model and first.cache is second.cache
+
+    first.last_source = 'cache'
+    assert second.last_source is None
+
+
+def test_rerun_timer_phases():
+    timer = RerunTimer()
+    with timer.phase('load'):
+        time.sleep(0.01)
+    with timer.phase('compute'):
+        time.sleep(0.02)
+    with timer.phase('compute'):
+        time.sleep(0.01)
+
+    summary = timer.summary()
+    assert summary['load'] >= 10 and summary['compute'] >= 30
+    assert summary['total'] >= summary['load'] + summary['compute']
+    assert summary['other'] >= 0
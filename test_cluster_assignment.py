@@ -0,0 +1,110 @@
+"""
+Tests for nearest-centroid cluster assignment
+Checks agreement with the saved sklearn models and the recommender cluster IDs
+"""
+
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from cluster_assignment import (KMEANS_TO_RECOMMENDER, PROFILE_FEATURES,
+                                assign_cluster, get_assigner,
+                                profile_features, profile_from_recent_mileage)
+
+
+def _load_profiles():
+    profiles = pd.read_csv('data/athlete_profiles_clustered_k3.csv', index_col=0).set_index('athlete')
+    return profiles[profiles['cluster'] >= 0]
+
+
+def test_matches_sklearn_predict():
+    """Same labels as scaler.transform + kmeans.predict on the clustered roster."""
+    print("\n" + "="*80)
+    print("TEST: nearest-centroid vs sklearn KMeans.predict")
+    print("="*80)
+
+    profiles = _load_profiles()
+    kmeans = joblib.load('models/kmeans_model.pkl')
+    scaler = joblib.load('models/clustering_scaler.pkl')
+    X = profiles[list(PROFILE_FEATURES)]
+    scaled = pd.DataFrame(scaler.transform(X.to_numpy()), columns=X.columns)
+    expected = kmeans.predict(scaled)
+
+    result = get_assigner().assign(X)
+    np.testing.assert_array_equal(result['kmeans_label'], expected)
+    np.testing.assert_array_equal(result['kmeans_label'], profiles['cluster'])
+    print(f"✓ {len(X)} athletes assigned identically")
+
+
+def test_recommender_ids_match_cluster_names():
+    """KMeans labels map to the recommender cluster with the same profile name."""
+    kmeans_names = json.load(open('data/cluster_profiles.json'))
+    rule_names = json.load(open('data/recommendation_rules.json'))['clusters']
+
+    for label, cluster_id in KMEANS_TO_RECOMMENDER.items():
+        rule_name = rule_names[str(cluster_id)]['name']
+        assert rule_name.split()[-1] in kmeans_names[str(label)]['name']
+
+
+def test_roster_from_weekly_features():
+    """Profiles built from featured-data.csv reproduce the saved clusters."""
+    weekly = pd.read_csv('data/featured-data.csv')
+    assigned = get_assigner().assign_weekly(weekly)
+    profiles = _load_profiles()
+
+    common = assigned.index.intersection(profiles.index)
+    assert len(common) > 0.9 * len(profiles)
+    agreement = (assigned.loc[common, 'kmeans_label'] == profiles.loc[common, 'cluster']).mean()
+    assert agreement > 0.9
+    assert set(assigned['cluster_id']) <= {0, 1, 2}
+
+
+def test_single_matches_batch():
+    """assign_one gives the same cluster as the batch path."""
+    assigner = get_assigner()
+    profiles = _load_profiles()[list(PROFILE_FEATURES)]
+    batch = assigner.assign(profiles)['cluster_id']
+    for i in range(0, len(profiles), 17):
+        assert assigner.assign_one(profiles.iloc[i].to_dict()) == batch[i]
+
+
+def test_missing_features_use_population_mean():
+    """NaN features fall back to the scaler mean instead of failing."""
+    assigner = get_assigner()
+    mean = joblib.load('models/clustering_scaler.pkl').mean_
+    with_nan = mean.copy()
+    with_nan[1] = np.nan
+
+    assert assigner.assign_one(with_nan) == assigner.assign_one(mean)
+    assert assigner.assign_one({'avg_weekly_mileage': 12.0}) in (0, 1, 2)
+
+
+def test_profile_from_recent_mileage():
+    """App inputs produce ordered clusters: low volume -> Foundation, high -> Peak."""
+    profile = profile_from_recent_mileage([10.0] * 6, 3)
+    assert profile['avg_recovery_ratio'] == pytest.approx(4 / 3)
+    assert profile['avg_consistency_index'] == 0.0
+    assert np.isnan(profile['avg_pace_km'])
+
+    assert assign_cluster([5, 6, 4, 5, 6, 5], 2) == 0
+    assert assign_cluster([60, 65, 62, 70, 68, 66], 6) == 2
+
+
+def test_profile_features_recent_weeks():
+    """recent_weeks averages only each athlete's latest weeks."""
+    weekly = pd.DataFrame({
+        'athlete': [1, 1, 1, 2],
+        'timestamp': pd.to_datetime(['2020-01-13', '2020-01-06', '2020-01-20', '2020-01-06']),
+        'weekly_mileage': [20.0, 10.0, 30.0, 5.0],
+    })
+    for column in PROFILE_FEATURES.values():
+        if column != 'weekly_mileage':
+            weekly[column] = 1.0
+
+    profiles = profile_features(weekly, recent_weeks=2)
+    assert profiles.loc[1, 'avg_weekly_mileage'] == 25.0
+    assert profiles.loc[2, 'avg_weekly_mileage'] == 5.0
+    assert list(profiles.columns) == list(PROFILE_FEATURES)
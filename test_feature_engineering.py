@@ -0,0 +1,231 @@
+"""
+Tests for the feature engineering pipeline
+Compares in-memory, chunked and incremental output with the notebooks and featured-data.csv
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import (FEATURE_COLUMNS, IncrementalFeatureUpdater,
+                                 WeeklyFeatureBuilder, aggregate_partial_weeks,
+                                 build_features, clean_runs, finalize_weeks,
+                                 read_raw_runs, repeated_athletes, stream_features,
+                                 write_features)
+
+
+RAW_PATH = 'data/raw-data-kaggle.csv'
+
+
+def _notebook_features():
+    """The notebook cells, run once top to bottom."""
+    data = pd.read_csv(RAW_PATH, sep=';')
+    data = data[(data['distance (m)'] > 0) & (data['elapsed time (s)'] > 0)].copy()
+    data = data[data['elapsed time (s)'] <= 43200]
+    data = data[data['elevation gain (m)'] <= 3000]
+    data.loc[data['average heart rate (bpm)'] == 0, 'average heart rate (bpm)'] = None
+    data['timestamp'] = pd.to_datetime(data['timestamp'], format='%d/%m/%Y %H:%M')
+    data['pace_min_per_km'] = (data['elapsed time (s)'] / 60) / (data['distance (m)'] / 1000)
+    data['distance_miles'] = data['distance (m)'] * 0.000621371
+    data['pace_min_per_mile'] = (data['elapsed time (s)'] / 60) / data['distance_miles']
+    data = data[data['distance (m)'] >= 500]
+    data = data[(data['pace_min_per_km'] >= 2) & (data['pace_min_per_km'] <= 15)]
+    data = data[(data['average heart rate (bpm)'].isna()) |
+                ((data['average heart rate (bpm)'] >= 60) & (data['average heart rate (bpm)'] <= 220))]
+
+    data = data.sort_values(by=['athlete', 'timestamp'])
+    data['week'] = data['timestamp'].dt.to_period('W')
+    weekly = data.groupby(['athlete', 'week']).agg({
+        'distance (m)': 'sum',
+        'distance_miles': 'sum',
+        'elapsed time (s)': 'sum',
+        'pace_min_per_km': 'mean',
+        'pace_min_per_mile': 'mean',
+        'elevation gain (m)': 'sum',
+        'average heart rate (bpm)': 'mean',
+        'timestamp': 'count',
+    }).rename(columns={'timestamp': 'training_days'})
+    weekly.reset_index(inplace=True)
+    weekly['week'] = weekly['week'].dt.to_timestamp()
+    weekly.rename(columns={
+        'distance (m)': 'weekly_distance_m',
+        'distance_miles': 'weekly_mileage',
+        'elapsed time (s)': 'weekly_time_s',
+        'pace_min_per_km': 'avg_weekly_pace_km',
+        'pace_min_per_mile': 'avg_weekly_pace_mile',
+        'elevation gain (m)': 'weekly_elevation_m',
+        'week': 'timestamp',
+    }, inplace=True)
+
+    weekly['weekly_mileage_change'] = weekly.groupby('athlete')['weekly_mileage'].diff()
+    weekly['consistency_index'] = weekly.groupby('athlete')['weekly_mileage'].transform(
+        lambda x: x.rolling(window=4, min_periods=2).std()
+    )
+    weekly['actual_training_days'] = weekly['training_days'].clip(upper=7)
+    weekly['rest_days'] = 7 - weekly['actual_training_days']
+    weekly['recovery_ratio'] = weekly['rest_days'] / weekly['actual_training_days'].replace(0, 1)
+    weekly.loc[weekly['recovery_ratio'] == 0, 'recovery_ratio'] = 0.1
+    weekly['fatigue_index'] = weekly['weekly_mileage'] / weekly['recovery_ratio']
+    weekly['cumulative_mileage'] = weekly.groupby('athlete')['weekly_mileage'].cumsum()
+    weekly['training_intensity'] = 1 / weekly['avg_weekly_pace_km']
+
+    weekly = weekly[weekly['weekly_mileage'] <= 70]
+    weekly = weekly[(weekly['weekly_mileage_change'].isna()) |
+                    (weekly['weekly_mileage_change'].abs() <= 40)]
+    weekly = weekly[weekly['weekly_mileage'] >= 3]
+    return weekly[FEATURE_COLUMNS].reset_index(drop=True)
+
+
+def _assert_same_features(actual, expected):
+    """Same rows and columns; values equal up to float summation order."""
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected,
+                                  check_exact=False, rtol=1e-12)
+
+
+def test_build_features_matches_notebook():
+    """One in-memory pass reproduces the notebook cells."""
+    print("\n" + "="*80)
+    print("TEST: build_features vs notebook")
+    print("="*80)
+
+    expected = _notebook_features()
+    _assert_same_features(build_features(RAW_PATH), expected)
+    print(f"✓ {len(expected)} weeks match")
+
+
+def _sorted(featured):
+    """Athlete and week order, as the notebook produces."""
+    return featured.sort_values(['athlete', 'timestamp'], kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunksize', [777, 5000])
+def test_stream_matches_notebook(chunksize):
+    """Chunked processing gives the same weeks as the notebook."""
+    streamed = pd.concat(stream_features(RAW_PATH, chunksize=chunksize))
+    _assert_same_features(_sorted(streamed), _notebook_features())
+
+
+def test_stream_finishes_each_athlete_once():
+    """Athletes are yielded when their block ends; a repeated block is merged before yielding."""
+    assert repeated_athletes(RAW_PATH, chunksize=1000) == {20181492: 2}
+
+    seen = set()
+    frames = list(stream_features(RAW_PATH, chunksize=1000))
+    for frame in frames:
+        athletes = set(frame['athlete'])
+        assert not athletes & seen
+        seen |= athletes
+    # Athletes are emitted as the export goes, not all at the end
+    assert len(frames) > 10
+    # The repeated athlete waits for their second block, near the end of the export
+    position = next(i for i, frame in enumerate(frames) if 20181492 in set(frame['athlete']))
+    assert position > len(frames) * 0.8
+
+
+def test_write_features(tmp_path):
+    """The streamed CSV holds the notebook's weeks."""
+    rows = write_features(RAW_PATH, tmp_path / 'featured.csv', chunksize=5000)
+    written = pd.read_csv(tmp_path / 'featured.csv', parse_dates=['timestamp'])
+    assert rows == len(written) and list(written.columns) == FEATURE_COLUMNS
+    _assert_same_features(_sorted(written), _notebook_features())
+
+
+def test_stream_reproduces_featured_csv():
+    """The committed featured-data.csv is reproduced from the raw export."""
+    print("\n" + "="*80)
+    print("TEST: stream_features vs data/featured-data.csv")
+    print("="*80)
+
+    expected = pd.read_csv('data/featured-data.csv')
+    expected['timestamp'] = pd.to_datetime(expected['timestamp'])
+
+    streamed = pd.concat(stream_features(RAW_PATH, chunksize=3000, reproduce_shipped=True))
+    _assert_same_features(_sorted(streamed), expected)
+    _assert_same_features(build_features(RAW_PATH, reproduce_shipped=True), expected)
+    print(f"✓ {len(expected)} weeks match")
+
+
+def test_builder_batches_match_single_batch():
+    """Splitting an athlete's history across batches does not change features."""
+    weekly = finalize_weeks(aggregate_partial_weeks(clean_runs(read_raw_runs(RAW_PATH))))
+    expected = WeeklyFeatureBuilder().add_weeks(weekly)
+
+    builder = WeeklyFeatureBuilder()
+    batches = [builder.add_weeks(weekly.iloc[start:start + 101])
+               for start in range(0, len(weekly), 101)]
+    _assert_same_features(pd.concat(batches), expected)
+
+
+def test_builder_rejects_old_weeks():
+    """Weeks must arrive in chronological order per athlete."""
+    weekly = finalize_weeks(aggregate_partial_weeks(clean_runs(read_raw_runs(RAW_PATH))))
+    builder = WeeklyFeatureBuilder()
+    builder.add_weeks(weekly.iloc[:50])
+    with pytest.raises(ValueError):
+        builder.add_weeks(weekly.iloc[40:60])
+
+
+def test_incremental_updates_match_full_rebuild():
+    """Uploading runs in batches gives the same table as rebuilding from scratch."""
+    print("\n" + "="*80)
+    print("TEST: incremental updates vs full rebuild")
+    print("="*80)
+
+    raw = read_raw_runs(RAW_PATH)
+    timestamps = pd.to_datetime(raw['timestamp'], format='%d/%m/%Y %H:%M')
+    rng = np.random.default_rng(0)
+
+    # Hold back each athlete's last three weeks, a random 2% backfill and
+    # one athlete entirely, then upload them in shuffled batches
+    held = (timestamps.groupby(raw['athlete']).transform('max') - timestamps) < pd.Timedelta(days=21)
+    held |= rng.random(len(raw)) < 0.02
+    held |= raw['athlete'] == raw['athlete'].iloc[0]
+
+    updater = IncrementalFeatureUpdater()
+    updater.add_runs(raw[~held])
+    uploads = raw[held].sample(frac=1, random_state=1)
+    for start in range(0, len(uploads), 400):
+        updater.add_runs(uploads.iloc[start:start + 400])
+
+    _assert_same_features(updater.features(), build_features(RAW_PATH))
+    print(f"✓ {held.sum()} runs uploaded in batches, table matches full rebuild")
+
+
+def test_incremental_update_only_touches_later_weeks():
+    """An upload recomputes one athlete from the uploaded week onward."""
+    updater = IncrementalFeatureUpdater.from_raw(RAW_PATH)
+    before = updater.features()
+    _assert_same_features(before, build_features(RAW_PATH))
+
+    athlete = before['athlete'].iloc[0]
+    week = before.loc[before['athlete'] == athlete, 'timestamp'].iloc[5]
+    run = pd.DataFrame([{
+        'athlete': athlete,
+        'gender': 'M',
+        'timestamp': (week + pd.Timedelta(days=2)).strftime('%d/%m/%Y 07:30'),
+        'distance (m)': 8000.0,
+        'elapsed time (s)': 2700,
+        'elevation gain (m)': 40.0,
+        'average heart rate (bpm)': 150.0,
+    }])
+    assert updater.add_runs(run) == {athlete: week}
+    after = updater.features()
+
+    def rows(table, condition):
+        return table[condition(table)].reset_index(drop=True)
+
+    # Other athletes and earlier weeks are unchanged
+    other = lambda t: t['athlete'] != athlete
+    earlier = lambda t: (t['athlete'] == athlete) & (t['timestamp'] < week)
+    _assert_same_features(rows(after, other), rows(before, other))
+    _assert_same_features(rows(after, earlier), rows(before, earlier))
+
+    # The touched week gains the run and every later week's total shifts
+    touched = lambda t: (t['athlete'] == athlete) & (t['timestamp'] == week)
+    new_week, old_week = rows(after, touched).iloc[0], rows(before, touched).iloc[0]
+    assert new_week['training_days'] == old_week['training_days'] + 1
+    assert new_week['weekly_distance_m'] == pytest.approx(old_week['weekly_distance_m'] + 8000.0)
+
+    later = lambda t: (t['athlete'] == athlete) & (t['timestamp'] > week)
+    np.testing.assert_allclose(rows(after, later)['cumulative_mileage'],
+                               rows(before, later)['cumulative_mileage'] + 8000.0 * 0.000621371)
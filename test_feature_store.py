@@ -0,0 +1,89 @@
+"""
+Tests for the Parquet feature store
+Checks dtypes, projection, athlete filtering and agreement with the source CSVs
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from feature_store import (STORE_DIR, TABLES, build_store, load_table,
+                           load_weekly_features, read_csv_table)
+
+
+def _assert_matches_csv(stored, csv):
+    """Same rows and values as the CSV, up to float32 precision."""
+    sort_keys = ['athlete'] + (['timestamp'] if 'timestamp' in csv else [])
+    csv = csv.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+    assert list(stored.columns) == list(csv.columns)
+    pd.testing.assert_frame_equal(stored, csv, check_dtype=False, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('name', list(TABLES))
+def test_committed_store_matches_csv(name):
+    """The committed Parquet files are up to date with data/*.csv."""
+    _assert_matches_csv(load_table(name), read_csv_table(name))
+
+
+def test_build_store_dtypes(tmp_path):
+    """Tables are written with compact fixed dtypes."""
+    print("\n" + "="*80)
+    print("TEST: feature store dtypes")
+    print("="*80)
+
+    build_store(store_dir=tmp_path)
+    weekly = load_weekly_features(store_dir=tmp_path)
+
+    schema = pq.read_schema(tmp_path / 'weekly_features.parquet')
+    assert str(schema.field('athlete').type) == 'int32'
+    assert str(schema.field('timestamp').type) == 'date32[day]'
+    assert str(schema.field('weekly_mileage').type) == 'float'
+    assert weekly['athlete'].dtype == np.int32
+    assert pd.api.types.is_datetime64_dtype(weekly['timestamp'])
+    assert weekly['weekly_mileage'].dtype == np.float32
+
+    clusters = load_table('athlete_clusters', store_dir=tmp_path)
+    assert clusters['cluster'].dtype == np.int8
+    print(f"✓ {len(weekly)} weekly rows, {len(clusters)} clustered athletes")
+
+
+def test_projection_and_athlete_filter():
+    """Loaders read only the requested columns and athletes."""
+    athletes = load_weekly_features(columns=['athlete'])['athlete'].unique()[[3, 40]]
+    weekly = load_weekly_features(columns=['athlete', 'timestamp', 'weekly_mileage'],
+                                  athletes=athletes)
+
+    assert list(weekly.columns) == ['athlete', 'timestamp', 'weekly_mileage']
+    assert set(weekly['athlete']) == set(athletes)
+
+    csv = read_csv_table('weekly_features')
+    assert len(weekly) == csv['athlete'].isin(athletes).sum()
+
+
+def test_row_groups_do_not_split_athletes():
+    """Each athlete lives in a single row group, so filters skip the others."""
+    metadata = pq.ParquetFile(STORE_DIR / 'weekly_features.parquet').metadata
+    assert metadata.num_row_groups > 1
+
+    ranges = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(0).statistics
+        ranges.append((stats.min, stats.max))
+    for (_, previous_max), (next_min, _) in zip(ranges, ranges[1:]):
+        assert previous_max < next_min
+
+
+def test_scaled_clustering_athletes():
+    """Scaled clustering rows are keyed by the profile they came from."""
+    scaled = read_csv_table('scaled_clustering')
+    profiles = read_csv_table('athlete_profiles')
+    assert scaled['athlete'].isin(profiles['athlete']).all()
+    assert scaled['athlete'].is_unique
+
+
+def test_unknown_table():
+    """Table names are validated."""
+    with pytest.raises(KeyError):
+        load_table('raw_runs')
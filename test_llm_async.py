@@ -0,0 +1,145 @@
+"""
+Tests for the asyncio LLM handler
+Checks concurrency limits, coalescing, timeouts and retries against the offline stub model
+"""
+
+import asyncio
+import threading
+import time
+
+from llm_cache import ResponseCache
+from llm_handler import AsyncLLMHandler, LLMHandler
+from llm_http import StubModel
+from recommender import RunningRecommender
+
+
+def _recommendations(n):
+    recommender = RunningRecommender()
+    return [recommender.get_recommendation(i % 3, 10.0 + i, 11.0 + i, 15.0, 4) for i in range(n)]
+
+
+class FlakyModel:
+    """Fails a fixed number of times, then answers."""
+
+    def __init__(self, failures, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay if self.calls <= self.failures else 0)
+        if self.calls <= self.failures:
+            raise RuntimeError("503 unavailable")
+        return type('Response', (), {'text': 'ok'})()
+
+
+class CountingModel:
+    """Synchronous model that records peak concurrency."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return type('Response', (), {'text': 'plan'})()
+
+
+def test_concurrent_batch_is_faster_than_serial():
+    """Twenty 50 ms calls finish in a few round trips, not twenty."""
+    print("\n" + "="*80)
+    print("TEST: async batch generation throughput")
+    print("="*80)
+
+    recs = _recommendations(20)
+    handler = AsyncLLMHandler(model=StubModel(latency=0.05), cache=None, max_concurrency=10)
+
+    start = time.perf_counter()
+    plans = handler.get_friendly_plans(recs)
+    elapsed = time.perf_counter() - start
+
+    serial = LLMHandler(model=StubModel(latency=0.05), cache=None)
+    assert plans == [serial.get_friendly_plan(rec) for rec in recs]
+    assert elapsed < 0.5
+    print(f"✓ 20 plans in {elapsed * 1000:.0f} ms (serial would take ~1000 ms)")
+
+
+def test_semaphore_bounds_upstream_calls():
+    """No more than max_concurrency calls are in flight."""
+    model = CountingModel()
+    handler = AsyncLLMHandler(model=model, cache=None, max_concurrency=3)
+    handler.get_friendly_plans(_recommendations(12))
+    assert model.peak <= 3
+    assert handler.stats['upstream_calls'] == 12
+
+
+def test_identical_prompts_are_coalesced():
+    """Simultaneous requests for the same plan share one upstream call."""
+    model = StubModel(latency=0.05)
+    handler = AsyncLLMHandler(model=model, cache=None)
+    rec = _recommendations(1)[0]
+
+    plans = handler.get_friendly_plans([rec] * 10)
+    assert len(set(plans)) == 1
+    assert model.calls == 1
+    assert handler.stats['coalesced'] == 9
+
+
+def test_retry_after_failures():
+    """Transient failures are retried with backoff."""
+    model = FlakyModel(failures=2)
+    handler = AsyncLLMHandler(model=model, cache=None, max_retries=2, backoff=0.001)
+    assert asyncio.run(handler.get_friendly_plan_async(_recommendations(1)[0])) == 'ok'
+    assert handler.stats['retries'] == 2
+
+
+def test_timeout_gives_error_after_retries():
+    """Each attempt is cut off at the timeout; the last error is reported."""
+    model = StubModel(latency=1.0)
+    handler = AsyncLLMHandler(model=model, cache=None, fallback=False, timeout=0.02,
+                              max_retries=1, backoff=0.001)
+
+    start = time.perf_counter()
+    plan = asyncio.run(handler.get_friendly_plan_async(_recommendations(1)[0]))
+    assert time.perf_counter() - start < 0.5
+    assert plan.startswith("Error generating training plan: timed out")
+    assert handler.stats['timeouts'] == 2 and handler.stats['failures'] == 1
+
+
+def test_timed_out_threads_keep_their_slot():
+    """A synchronous call that outlives its timeout still counts against max_concurrency."""
+    model = CountingModel(delay=0.2)
+    handler = AsyncLLMHandler(model=model, cache=None, fallback=False, max_concurrency=2, timeout=0.05,
+                              max_retries=2, backoff=0.001)
+    plans = handler.get_friendly_plans(_recommendations(4))
+    assert all(plan.startswith("Error generating training plan: timed out") for plan in plans)
+    assert handler.stats['timeouts'] == 12
+    assert model.peak <= 2
+
+
+def test_results_are_cached(tmp_path):
+    """Successful responses go to the cache and are served from it next time."""
+    model = StubModel()
+    handler = AsyncLLMHandler(model=model, cache=ResponseCache(tmp_path / 'cache.sqlite'))
+    recs = _recommendations(5)
+
+    first = handler.get_friendly_plans(recs)
+    second = handler.get_friendly_plans(recs)
+    assert first == second
+    assert model.calls == 5
+    assert handler.last_cache_hit
+
+
+def test_handler_reused_across_event_loops():
+    """A handler can serve several asyncio.run calls, as the app does."""
+    handler = AsyncLLMHandler(model=StubModel(), cache=None, max_concurrency=2)
+    for rec in _recommendations(3):
+        assert "stub plan" in asyncio.run(handler.get_friendly_plan_async(rec))
@@ -0,0 +1,169 @@
+"""
+Tests for the LLM response cache
+Checks key canonicalization, LRU/SQLite tiers, TTL and size eviction, and LLMHandler integration
+"""
+
+import sys
+import time
+
+import llm_cache
+from llm_cache import ResponseCache, prompt_key, round_recommendation
+from llm_handler import LLMHandler
+from recommender import RunningRecommender
+
+
+class FakeModel:
+    """Stands in for Gemini and counts calls."""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return type('Response', (), {'text': f"plan #{self.calls}"})()
+
+
+def _recommendation(mileage=20.0, predicted=21.0, fatigue=15.0):
+    return RunningRecommender().get_recommendation(
+        cluster_id=1,
+        current_weekly_mileage=mileage,
+        predicted_next_week_mileage=predicted,
+        current_fatigue_index=fatigue,
+        training_days_per_week=4,
+    )
+
+
+def test_rounding_shares_keys():
+    """Nearly identical recommendations build the same prompt."""
+    handler = LLMHandler(model=FakeModel(), cache=None)
+    a = handler._build_prompt(round_recommendation(_recommendation(20.1, 21.07, 15.2)))
+    b = handler._build_prompt(round_recommendation(_recommendation(19.9, 20.93, 14.8)))
+    c = handler._build_prompt(round_recommendation(_recommendation(25.0, 26.0, 15.0)))
+
+    assert prompt_key(a) == prompt_key(b)
+    assert prompt_key(a) != prompt_key(c)
+    assert prompt_key(a, 'gemini-2.5-flash') != prompt_key(a, 'gemini-2.5-pro')
+
+
+def test_handler_serves_repeats_from_cache(tmp_path):
+    """A repeat request skips the model and is counted as a hit."""
+    print("\n" + "="*80)
+    print("TEST: LLMHandler response cache")
+    print("="*80)
+
+    model = FakeModel()
+    handler = LLMHandler(model=model, cache=ResponseCache(tmp_path / 'cache.sqlite'))
+
+    first = handler.get_friendly_plan(_recommendation())
+    assert not handler.last_cache_hit
+    start = time.perf_counter()
+    second = handler.get_friendly_plan(_recommendation(20.05))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert second == first
+    assert handler.last_cache_hit
+    assert model.calls == 1
+    stats = handler.cache.stats()
+    assert stats['memory_hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+    print(f"✓ repeat served in {elapsed_ms:.2f} ms")
+
+
+def test_errors_are_not_cached(tmp_path):
+    """Failed generations are retried on the next request."""
+    cache = ResponseCache(tmp_path / 'cache.sqlite')
+    handler = LLMHandler(model=FakeModel(fail=True), cache=cache, fallback=False)
+    assert handler.get_friendly_plan(_recommendation()).startswith("Error generating")
+
+    handler.model = FakeModel()
+    assert handler.get_friendly_plan(_recommendation()) == "plan #1"
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """A new cache on the same file serves entries from SQLite."""
+    path = tmp_path / 'cache.sqlite'
+    ResponseCache(path).put('k', 'value')
+
+    reopened = ResponseCache(path)
+    assert reopened.get('k') == 'value'
+    assert reopened.get('k') == 'value'
+    stats = reopened.stats()
+    assert stats['disk_hits'] == 1 and stats['memory_hits'] == 1
+
+
+def test_memory_lru_eviction():
+    """The memory tier keeps only the most recently used entries."""
+    cache = ResponseCache(path=None, memory_entries=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    cache.get('a')
+    cache.put('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'
+
+
+def test_ttl_expiry(tmp_path):
+    """Expired entries miss in both tiers."""
+    cache = ResponseCache(tmp_path / 'cache.sqlite', ttl_hours=1)
+    cache.put('k', 'value')
+    cache.ttl = 0
+
+    assert cache.get('k') is None
+    assert ResponseCache(tmp_path / 'cache.sqlite', ttl_hours=0).get('k') is None
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path):
+    """Once over the size budget, the oldest accessed rows are removed."""
+    cache = ResponseCache(tmp_path / 'cache.sqlite', memory_entries=0, max_disk_mb=2.5 / 1024)
+    cache.put('old', 'x' * 1024)
+    cache.put('used', 'y' * 1024)
+    time.sleep(0.01)
+    cache.get('used')
+    cache.put('new', 'z' * 1024)
+
+    stats = cache.stats()
+    assert stats['disk_entries'] == 2
+    assert stats['evictions'] == 1
+    assert cache.get('old') is None
+    assert cache.get('used') is not None and cache.get('new') is not None
+
+
+def test_stats_command_reads_stored_counters(tmp_path, monkeypatch, capsys):
+    """The stats command, in a fresh process, reports the counters earlier processes stored."""
+    path = tmp_path / 'cache.sqlite'
+    cache = ResponseCache(path)
+    cache.put('k', 'value')
+    cache.get('k')
+    cache.get('missing')
+    cache.close()
+    reader = ResponseCache(path, memory_entries=0)
+    reader.get('k')
+    reader.close()
+
+    monkeypatch.setenv('LLM_CACHE_PATH', str(path))
+    monkeypatch.setattr(llm_cache, '_cache', None)
+    monkeypatch.setattr(sys, 'argv', ['llm_cache.py', 'stats'])
+    llm_cache.main()
+    output = capsys.readouterr().out
+    assert 'Entries on disk: 1' in output
+    assert 'Hits: 1 memory, 1 disk; misses: 1 (hit rate 66.7%)' in output
+    assert 'Writes: 1, evictions: 0' in output
+
+
+def test_memory_hits_keep_entries_from_eviction(tmp_path):
+    """An entry served only from memory counts as recently used on disk."""
+    cache = ResponseCache(tmp_path / 'cache.sqlite', max_disk_mb=2.5 / 1024)
+    cache.put('used', 'y' * 1024)
+    cache.put('old', 'x' * 1024)
+    time.sleep(0.01)
+    assert cache.get('used') is not None
+    assert cache.stats()['memory_hits'] == 1
+    cache.put('new', 'z' * 1024)
+
+    reopened = ResponseCache(tmp_path / 'cache.sqlite', memory_entries=0)
+    assert reopened.get('old') is None
+    assert reopened.get('used') is not None and reopened.get('new') is not None
@@ -0,0 +1,109 @@
+"""
+Tests for LSTM training
+Checks the athlete-grouped split, the tf.data pipeline and a short retrain into a temporary directory
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from lstm_training import (RUN_FILES, athlete_split, build_model, configure_tensorflow, fit_scalers, install,
+                           make_dataset, train)
+from mileage_predictor import KerasMileagePredictor, NumpyMileagePredictor
+from sequence_builder import load_sequences
+
+
+def test_athlete_split_is_disjoint():
+    """No athlete's windows appear in more than one part, and every window is used."""
+    print("\n" + "="*80)
+    print("TEST: Athlete-grouped train/validation/test split")
+    print("="*80)
+
+    athletes = load_sequences('data/featured-data.csv')['athlete']
+    parts = athlete_split(athletes)
+    groups = {name: set(np.unique(athletes[index])) for name, index in parts.items()}
+    assert not groups['train'] & groups['test']
+    assert not groups['train'] & groups['validation']
+    assert not groups['validation'] & groups['test']
+    np.testing.assert_array_equal(np.sort(np.concatenate(list(parts.values()))), np.arange(len(athletes)))
+    assert len(groups['test']) == round(len(np.unique(athletes)) * 0.2)
+    for name, index in athlete_split(athletes).items():
+        np.testing.assert_array_equal(index, parts[name])
+    with pytest.raises(ValueError):
+        athlete_split([1, 1, 2])
+    print(f"✓ {', '.join(f'{len(g)} {name}' for name, g in groups.items())} athletes")
+
+
+def test_dataset_batches_scaled_windows():
+    """The pipeline yields the notebook's scaled (batch, 6, 1) inputs and (batch, 1) targets."""
+    X = np.array([[10.0, 12, 15, 18, 20, 22], [4, 3, 5, 6, 4, 5], [55, 48, 52, 60, 45, 50]])
+    y = np.array([25.0, 6, 47])
+    scaler_X, scaler_y = fit_scalers(X, y)
+    batches = list(make_dataset(X, y, scaler_X, scaler_y, batch_size=2, data_threads=1))
+    assert [tuple(b[0].shape) for b in batches] == [(2, 6, 1), (1, 6, 1)]
+    inputs = np.concatenate([b[0].numpy() for b in batches])[:, :, 0]
+    targets = np.concatenate([b[1].numpy() for b in batches])[:, 0]
+    np.testing.assert_allclose(inputs, scaler_X.transform(X.reshape(-1, 1)).reshape(X.shape), rtol=1e-6)
+    np.testing.assert_allclose(targets, scaler_y.transform(y.reshape(-1, 1)).ravel(), rtol=1e-6)
+
+
+def test_model_layers_match_exporters():
+    """The trained model has the layer stack mileage_predictor can export."""
+    model = build_model()
+    assert [type(layer).__name__ for layer in model.layers] == ['LSTM', 'Dropout', 'Dense']
+    assert model.output_shape == (None, 1)
+
+
+def test_precision_policy_is_restored():
+    """A mixed precision run does not change the policy for the rest of the process."""
+    import keras
+
+    before = keras.mixed_precision.global_policy().name
+    with configure_tensorflow(precision='mixed_bfloat16'):
+        assert keras.mixed_precision.global_policy().name == 'mixed_bfloat16'
+        assert build_model().layers[-1].dtype_policy.name == 'float32'
+    assert keras.mixed_precision.global_policy().name == before
+
+
+def test_short_retrain_writes_loadable_models(tmp_path):
+    """A short run checkpoints a model the keras and numpy backends load and agree on."""
+    result = train(output_dir=tmp_path, epochs=2, patience=1, batch_size=512, verbose=0)
+    assert set(result['paths']) == set(RUN_FILES)
+    with np.load(tmp_path / 'lstm_residuals.npz') as residuals:
+        assert len(residuals['residual']) == result['test']['windows']
+
+    assert 1 <= result['best_epoch'] <= result['epochs'] <= 2
+    assert np.isfinite(result['test']['mae']) and result['test']['windows'] > 0
+    with open(tmp_path / 'lstm_metrics.json') as f:
+        assert json.load(f)['test'] == result['test']
+
+    sequences = np.array([[10.0, 12, 15, 18, 20, 22], [30, 28, 35, 33, 31, 36]])
+    keras_predictor = KerasMileagePredictor(tmp_path / 'lstm_model_best.keras', tmp_path / 'scaler_X.pkl',
+                                            tmp_path / 'scaler_y.pkl')
+    numpy_predictor = NumpyMileagePredictor(tmp_path / 'lstm_model_best.npz')
+    np.testing.assert_allclose(numpy_predictor.predict_batch(sequences), keras_predictor.predict_batch(sequences),
+                               rtol=1e-4, atol=1e-3)
+
+
+def test_install_copies_the_complete_run(tmp_path):
+    """Installing replaces every served file; an incomplete run installs nothing."""
+    run, served = tmp_path / 'run', tmp_path / 'models'
+    run.mkdir()
+    served.mkdir()
+    for name in RUN_FILES.values():
+        (run / name).write_text(f'new {name}')
+        (served / name).write_text(f'old {name}')
+
+    installed = install(run, served)
+    assert sorted(path.name for path in installed) == sorted(RUN_FILES.values())
+    assert all((served / name).read_text() == f'new {name}' for name in RUN_FILES.values())
+    assert sorted(p.name for p in served.iterdir()) == sorted(RUN_FILES.values())
+
+    (run / RUN_FILES['onnx']).unlink()
+    (run / RUN_FILES['model']).write_text('newer')
+    with pytest.raises(FileNotFoundError):
+        install(run, served)
+    assert (served / RUN_FILES['model']).read_text() == f"new {RUN_FILES['model']}"
@@ -0,0 +1,94 @@
+"""
+Tests for mileage forecast intervals
+Checks the vectorized samplers and the recommender's action and caution-flag probabilities
+"""
+
+import numpy as np
+import pytest
+
+from mileage_forecast import MileageForecaster, ResidualBootstrap
+from mileage_predictor import NumpyMileagePredictor
+from recommender import RunningRecommender
+
+HISTORY = np.array([
+    [10.0, 11.0, 10.5, 12.0, 11.5, 12.0],
+    [25.0, 26.0, 24.0, 27.0, 28.0, 27.5],
+    [38.0, 39.0, 40.0, 41.0, 40.0, 40.0],
+])
+
+
+@pytest.fixture(scope='module')
+def recommender():
+    return RunningRecommender()
+
+
+def test_bootstrap_samples_are_batched_and_seeded():
+    """One (N, K) draw per call, reproducible with a seed, intervals around the median."""
+    print("\n" + "="*80)
+    print("TEST: residual bootstrap forecast")
+    print("="*80)
+
+    first = MileageForecaster(seed=1).forecast(HISTORY, samples=300)
+    second = MileageForecaster(seed=1).forecast(HISTORY, samples=300)
+    assert first['samples'].shape == (3, 300)
+    np.testing.assert_array_equal(first['samples'], second['samples'])
+    assert (first['samples'] >= 0).all()
+    assert ((first['lower'] <= first['median']) & (first['median'] <= first['upper'])).all()
+    # Errors grow with mileage, so do the intervals
+    widths = first['upper'] - first['lower']
+    assert widths[2] > widths[0]
+    print(f"✓ 80% interval widths: {np.round(widths, 1).tolist()} mi")
+
+
+def test_bootstrap_draws_from_matching_bin():
+    """Residuals come only from the bin of similar-sized predictions."""
+    predicted = np.array([1.0, 2.0, 3.0, 101.0, 102.0, 103.0])
+    residual = np.array([-1.0, 0.0, 1.0, -10.0, 0.0, 10.0])
+    bootstrap = ResidualBootstrap(predicted, residual, bins=2)
+    draws = bootstrap.sample(np.array([2.0, 100.0]), 500, np.random.default_rng(0))
+    assert set(np.unique(draws[0] - 2.0)) <= {-1.0, 0.0, 1.0}
+    assert set(np.unique(draws[1] - 100.0)) == {-10.0, 0.0, 10.0}
+
+
+def test_mc_dropout_centres_on_point_prediction():
+    """Averaging many dropout samples recovers the deterministic prediction."""
+    predictor = NumpyMileagePredictor()
+    samples = predictor.predict_dropout_samples(HISTORY, samples=4000, rng=np.random.default_rng(0))
+    assert samples.shape == (3, 4000)
+    assert samples.mean(axis=1) == pytest.approx(predictor.predict_batch(HISTORY), abs=0.5)
+    assert (samples.std(axis=1) > 0).all()
+
+    predictor.dropout_rate = None
+    with pytest.raises(ValueError):
+        predictor.predict_dropout_samples(HISTORY)
+
+
+def test_probabilities_match_rules(recommender):
+    """Identical samples give probability 1 for the single recommendation's action."""
+    args = dict(cluster_id=[0, 1, 2], current_weekly_mileage=[12.0, 27.5, 40.0],
+                current_fatigue_index=[12.0, 27.5, 20.0], training_days_per_week=[3, 4, 3])
+    predicted = np.array([12.5, 40.0, 41.0])
+    outcomes = recommender.get_outcome_probabilities_batch(np.repeat(predicted[:, None], 50, axis=1), **args)
+
+    np.testing.assert_allclose(outcomes['action_probabilities'].sum(axis=1), 1.0)
+    for i in range(3):
+        rec = recommender.get_recommendation(args['cluster_id'][i], args['current_weekly_mileage'][i],
+                                             predicted[i], args['current_fatigue_index'][i],
+                                             args['training_days_per_week'][i])
+        assert outcomes['actions'][outcomes['action_probabilities'][i].argmax()] == rec['action']
+        fired = {flag for flag, p in zip(outcomes['caution_flags'], outcomes['caution_probabilities'][i]) if p}
+        assert fired == set(rec['caution_flags'])
+
+
+def test_caution_probability_is_sum_over_actions(recommender):
+    """A flag fires with the total probability of the actions that raise it."""
+    samples = np.linspace(20, 60, 200)
+    rec = recommender.get_recommendation_with_uncertainty(1, 27.5, samples, 27.5, 4)
+    assert sum(rec['action_probabilities'].values()) == pytest.approx(1.0)
+    assert rec['predicted_interval'][0] < np.median(samples) < rec['predicted_interval'][1]
+    assert rec['caution_probabilities'], "spread into large increases should raise a flag"
+    for flag, p in rec['caution_probabilities'].items():
+        expected = sum(q for action, q in rec['action_probabilities'].items()
+                       if recommender._actions[action][1] == flag)
+        assert p == pytest.approx(expected)
+    print(f"✓ Caution probabilities: {rec['caution_probabilities']}")
@@ -0,0 +1,120 @@
+"""
+Tests for the LSTM mileage predictor
+Checks batched inference against the notebook's sklearn + model.predict path
+and the NumPy/ONNX backends against the Keras model
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("keras")
+
+from mileage_predictor import (NumpyMileagePredictor, OnnxMileagePredictor,
+                               evaluate_backend, export_numpy_weights,
+                               export_onnx_model, get_predictor,
+                               load_notebook_test_split, predict_batch,
+                               predict_next_week_mileage)
+
+
+SEQUENCES = np.array([
+    [10.0, 12.0, 15.0, 18.0, 20.0, 22.0],
+    [24.7, 20.1, 19.5, 22.0, 25.3, 23.8],
+    [4.3, 3.5, 5.0, 6.2, 4.8, 5.5],
+    [55.1, 48.0, 52.3, 60.2, 45.0, 50.0],
+])
+
+
+def test_batch_matches_notebook_pipeline():
+    """Scaling, prediction and inverse scaling match the notebook steps."""
+    predictor = get_predictor('keras')
+    
+    X_scaled = predictor.scaler_X.transform(SEQUENCES.reshape(-1, 1)).reshape(-1, 6, 1)
+    y_scaled = predictor.model.predict(X_scaled, verbose=0)
+    expected = predictor.scaler_y.inverse_transform(y_scaled).ravel()
+    
+    np.testing.assert_allclose(predictor.predict_batch(SEQUENCES), expected, rtol=1e-4, atol=1e-3)
+
+
+def test_single_matches_batch():
+    """The single-sequence call returns the same value as the batch call."""
+    batch = predict_batch(SEQUENCES)
+    for sequence, expected in zip(SEQUENCES, batch):
+        prediction = predict_next_week_mileage(list(sequence))
+        assert isinstance(prediction, float)
+        assert prediction == pytest.approx(expected, abs=1e-3)
+
+
+def test_predictor_is_loaded_once():
+    """The process-wide predictor is reused between calls."""
+    assert get_predictor() is get_predictor()
+
+
+def test_rejects_wrong_shape():
+    """Sequences must be 6 weeks long."""
+    with pytest.raises(ValueError):
+        predict_batch([[10.0, 12.0, 15.0]])
+    assert predict_batch(np.empty((0, 6))).shape == (0,)
+
+
+def test_numpy_backend_matches_keras():
+    """The NumPy forward pass reproduces the Keras model, batched and single."""
+    keras_predictor = get_predictor('keras')
+    numpy_predictor = get_predictor('numpy')
+    
+    rng = np.random.default_rng(0)
+    sequences = np.vstack([SEQUENCES, rng.uniform(3, 70, size=(500, 6))])
+    np.testing.assert_allclose(numpy_predictor.predict_batch(sequences),
+                               keras_predictor.predict_batch(sequences),
+                               rtol=1e-4, atol=1e-3)
+    assert numpy_predictor.predict(SEQUENCES[0]) == pytest.approx(
+        keras_predictor.predict(SEQUENCES[0]), abs=1e-3)
+
+
+def test_exported_weights_are_current(tmp_path):
+    """A fresh export gives the same predictions as the committed .npz file."""
+    path = export_numpy_weights(output_path=tmp_path / 'weights.npz')
+    fresh = NumpyMileagePredictor(path)
+    np.testing.assert_allclose(fresh.predict_batch(SEQUENCES),
+                               get_predictor('numpy').predict_batch(SEQUENCES),
+                               rtol=1e-6)
+
+
+def test_onnx_backend_matches_keras(tmp_path):
+    """A fresh ONNX export reproduces the Keras model, with any thread count."""
+    pytest.importorskip("onnxruntime")
+    path = export_onnx_model(output_path=tmp_path / 'model.onnx')
+    
+    X_test, _ = load_notebook_test_split()
+    expected = get_predictor('keras').predict_batch(X_test)
+    for threads in (1, 2):
+        predictor = OnnxMileagePredictor(path, intra_op_threads=threads)
+        np.testing.assert_allclose(predictor.predict_batch(X_test), expected,
+                                   rtol=1e-4, atol=1e-3)
+
+
+@pytest.mark.parametrize('backend', ['keras', 'numpy', 'onnx'])
+def test_notebook_test_split_accuracy(backend):
+    """Every backend reproduces the notebook's test-set MAE of 7.04 miles."""
+    if backend == 'onnx':
+        pytest.importorskip("onnxruntime")
+    X_test, y_test = load_notebook_test_split()
+    assert X_test.shape == (2710, 6)
+    
+    metrics = evaluate_backend(backend)
+    assert round(metrics['mae'], 2) == 7.04
+    assert round(metrics['rmse'], 2) == 9.12
+
+
+def test_unknown_backend():
+    """Backend names are validated."""
+    with pytest.raises(ValueError):
+        get_predictor('torch')
+
+
+def test_test_split_loads_from_any_directory(tmp_path, monkeypatch):
+    """The default featured-data.csv path doesn't depend on the working directory."""
+    expected_X, expected_y = load_notebook_test_split()
+    monkeypatch.chdir(tmp_path)
+    X_test, y_test = load_notebook_test_split()
+    np.testing.assert_array_equal(X_test, expected_X)
+    np.testing.assert_array_equal(y_test, expected_y)
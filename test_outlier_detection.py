@@ -0,0 +1,86 @@
+"""
+Tests for profile outlier detection
+Checks the tree-backed DBSCAN stage against the saved model and brute-force sklearn
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from cluster_assignment import PROFILE_FEATURES
+from outlier_detection import OutlierDetector, get_detector, k_distance_curve, knee_eps
+from reclustering import roster_profiles
+
+
+@pytest.fixture(scope='module')
+def profiles():
+    return roster_profiles(pd.read_csv('data/featured-data.csv'))
+
+
+def test_saved_model_flags_notebook_outliers():
+    """The default detector reproduces the notebook's DBSCAN noise labels."""
+    print("\n" + "="*80)
+    print("TEST: DBSCAN outlier flags vs the saved model")
+    print("="*80)
+
+    scaled = pd.read_csv('data/scaled_clustering_data.csv', index_col=0).to_numpy()
+    saved = joblib.load('models/dbscan_model.pkl')
+    raw = joblib.load('models/clustering_scaler.pkl').inverse_transform(scaled)
+
+    detector = get_detector()
+    assert (detector.eps, detector.min_samples) == (saved.eps, saved.min_samples)
+    flags = detector.flag(raw)
+    np.testing.assert_array_equal(flags['outlier'], saved.labels_ == -1)
+    print(f"✓ {flags['outlier'].sum()} outliers, as in the notebook")
+
+
+def test_tree_dbscan_matches_brute_force(profiles):
+    """KD-tree fit gives sklearn's brute-force labels; flags equal its noise points."""
+    from sklearn.cluster import DBSCAN
+
+    detector = OutlierDetector.fit(profiles, eps=1.2)
+    scaler = joblib.load('models/clustering_scaler.pkl')
+    X = scaler.transform(profiles[list(PROFILE_FEATURES)].to_numpy())
+    brute = DBSCAN(eps=1.2, min_samples=detector.min_samples, algorithm='brute').fit(X)
+    np.testing.assert_array_equal(detector.labels_, brute.labels_)
+    np.testing.assert_array_equal(detector.flag(profiles)['outlier'], brute.labels_ == -1)
+
+    curve = k_distance_curve(X, 5)
+    np.testing.assert_allclose(curve, k_distance_curve(X, 5, algorithm='brute'))
+
+
+def test_knee_eps():
+    """The knee is where a flat k-distance curve turns upward."""
+    curve = np.concatenate([np.linspace(1.0, 1.2, 90), np.linspace(1.5, 5.0, 10)])
+    assert 1.15 <= knee_eps(curve) <= 1.5
+    assert knee_eps([2.0, 2.0, 2.0]) == 2.0
+    with pytest.raises(ValueError):
+        knee_eps([1.0, 2.0])
+
+
+def test_knee_fit_and_save(profiles, tmp_path):
+    """eps='knee' picks eps from the curve, and the saved model reloads as the default format."""
+    detector = OutlierDetector.fit(profiles, eps='knee')
+    assert 0 < detector.eps < 5
+    assert (detector.labels_ == -1).sum() < len(profiles) / 2
+
+    path = detector.save(tmp_path / 'dbscan.pkl')
+    reloaded = OutlierDetector(model_path=path)
+    np.testing.assert_array_equal(reloaded.flag(profiles)['outlier'], detector.labels_ == -1)
+
+
+def test_new_profiles():
+    """Far-off profiles are outliers; missing features count as the population mean."""
+    detector = get_detector()
+    mean = joblib.load('models/clustering_scaler.pkl').mean_
+    extreme = mean * [8, 1, 1, 20, 1, 1]
+    partial = mean.copy()
+    partial[1] = np.nan
+    flags = detector.flag([mean, extreme, partial])
+    assert flags['outlier'].tolist() == [False, True, False]
+    assert flags['core_distance'][1] > detector.eps
+
+    weekly = pd.read_csv('data/featured-data.csv')
+    flagged = detector.flag_weekly(weekly, recent_weeks=6)
+    assert flagged['outlier'].dtype == bool and len(flagged) == weekly['athlete'].nunique()
@@ -0,0 +1,118 @@
+"""
+Tests for streamed plan generation and the incremental plan parser
+Checks chunk-size independence, section splitting and time to first content
+"""
+
+import time
+
+from llm_cache import ResponseCache
+from llm_handler import LLMHandler
+from llm_http import StubModel
+from plan_parser import PlanStreamParser, parse_plan
+from recommender import RunningRecommender
+
+PLAN = """This week focuses on easy aerobic running.
+You'll do three runs and a rest day.
+
+| Day | Activity | Mileage (mi) | Time (min) | Pace |
+|-----|:--------:|--------------|------------|------|
+| Monday | Rest | | | |
+| Tuesday | Easy run | 3 | 30 | easy/conversational pace |
+|Saturday|Long run|6|60|easy/conversational pace|
+
+Great work! Keep the long run relaxed.
+Listen to your body."""
+
+
+def _recommendation():
+    return RunningRecommender().get_recommendation(1, 20.0, 21.0, 15.0, 4)
+
+
+def _events(chunks):
+    parser = PlanStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events + parser.close()
+
+
+def test_parse_plan_sections():
+    """Summary, header, rows (without the alignment row) and advice are split."""
+    plan = parse_plan(PLAN)
+    assert plan['summary'].startswith("This week") and plan['summary'].endswith("\n")
+    assert plan['columns'] == ['Day', 'Activity', 'Mileage (mi)', 'Time (min)', 'Pace']
+    assert plan['rows'][0] == ['Monday', 'Rest', '', '', '']
+    assert plan['rows'][2] == ['Saturday', 'Long run', '6', '60', 'easy/conversational pace']
+    assert len(plan['rows']) == 3
+    assert plan['advice'].strip() == "Great work! Keep the long run relaxed.\nListen to your body."
+
+
+def test_events_independent_of_chunking():
+    """Any chunking of the stream gives the same events."""
+    expected = _events([PLAN])
+    for size in (1, 2, 7, 40, 1000):
+        chunks = [PLAN[i:i + size] for i in range(0, len(PLAN), size)]
+        assert _events(chunks) == expected
+
+
+def test_rows_emitted_as_soon_as_complete():
+    """A table row is emitted when its newline arrives, before the rest of the plan."""
+    parser = PlanStreamParser()
+    head = PLAN[:PLAN.index("| Tuesday")]
+    events = parser.feed(head)
+    assert events[-1] == ('table_row', ['Monday', 'Rest', '', '', ''])
+    assert parser.section == 'table'
+    assert parser.feed("| Tuesday | Easy") == []
+    assert parser.pending == "| Tuesday | Easy"
+
+
+def test_plan_without_table_is_summary():
+    """Unstructured responses are reported as summary only."""
+    plan = parse_plan("Rest this week.\nYou earned it.")
+    assert plan['summary'] == "Rest this week.\nYou earned it."
+    assert plan['rows'] == [] and plan['advice'] == ''
+
+
+def test_stream_first_chunk_before_full_response():
+    """Time to first content is the first-token latency, not the full generation time."""
+    print("\n" + "="*80)
+    print("TEST: streaming time to first content")
+    print("="*80)
+
+    model = StubModel(latency=0.05, chunk_size=20, chunk_delay=0.01)
+    handler = LLMHandler(model=model, cache=None)
+
+    start = time.perf_counter()
+    stream = handler.stream_friendly_plan(_recommendation())
+    first = next(stream)
+    first_ms = (time.perf_counter() - start) * 1000
+    text = first + ''.join(stream)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    assert text == LLMHandler(model=StubModel(), cache=None).get_friendly_plan(_recommendation())
+    assert first_ms < total_ms / 2
+    assert parse_plan(text)['rows']
+    print(f"✓ first chunk {first_ms:.0f} ms, full plan {total_ms:.0f} ms")
+
+
+def test_stream_caches_full_text(tmp_path):
+    """The completed stream is cached and replayed as one chunk."""
+    model = StubModel(chunk_size=16)
+    handler = LLMHandler(model=model, cache=ResponseCache(tmp_path / 'cache.sqlite'))
+
+    streamed = list(handler.stream_friendly_plan(_recommendation()))
+    replay = list(handler.stream_friendly_plan(_recommendation()))
+
+    assert len(streamed) > 1
+    assert replay == [''.join(streamed)]
+    assert handler.last_cache_hit and model.calls == 1
+
+
+def test_stream_error_is_reported_and_not_cached(tmp_path):
+    """A failed stream ends with an error message and leaves the cache empty."""
+    cache = ResponseCache(tmp_path / 'cache.sqlite')
+    handler = LLMHandler(model=StubModel(failure_rate=1.0), cache=cache, fallback=False)
+    chunks = list(handler.stream_friendly_plan(_recommendation()))
+
+    assert chunks[-1].startswith("Error generating training plan")
+    assert cache.stats()['writes'] == 0
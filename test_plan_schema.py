@@ -0,0 +1,139 @@
+"""
+Tests for structured (JSON) plan output
+Checks schema validation, cache round trips and the structured generation paths
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from llm_cache import ResponseCache
+from llm_handler import AsyncLLMHandler, GenerationError, LLMHandler
+from llm_http import StubModel
+from plan_parser import parse_plan
+from plan_schema import (DAYS, PlanValidationError, WeeklyPlan, plan_from_json,
+                         plan_table_rows, plan_to_json, plan_to_markdown,
+                         validate_plan)
+from plan_templates import build_plan, render_plan
+from recommender import RunningRecommender
+
+
+def _recommendation():
+    return RunningRecommender().get_recommendation(2, 30.0, 33.0, 25.0, 5, 13.1, 6)
+
+
+class JsonModel:
+    """Returns a fixed response body for every call."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        assert generation_config['response_mime_type'] == 'application/json'
+        return type('Response', (), {'text': self.text})()
+
+
+def test_validate_normalizes_types_and_days():
+    """Numeric strings are converted, days sorted and missing days filled as rest."""
+    plan = validate_plan({
+        'summary': ' Easy week ',
+        'days': [
+            {'day': 'sunday', 'activity': 'Long run', 'mileage': '8', 'time_min': 80.4, 'pace': 'easy'},
+            {'day': 'Tuesday', 'activity': 'Easy run', 'mileage': 3, 'time_min': '30'},
+        ],
+        'advice': 'Nice work',
+    })
+    assert isinstance(plan, WeeklyPlan)
+    assert [day.day for day in plan.days] == DAYS
+    assert plan.days[6].mileage == 8.0 and plan.days[6].time_min == 80
+    assert plan.days[1].time_min == 30 and plan.days[1].pace == ''
+    assert plan.days[0].activity == 'Rest' and plan.days[0].mileage is None
+    assert plan.summary == 'Easy week'
+
+
+@pytest.mark.parametrize('data', [
+    'not json',
+    [],
+    {'summary': 'x', 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Funday', 'activity': 'Run'}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday'}, {'day': 'Monday'}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'mileage': 'far'}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'mileage': -1}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'mileage': True}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'mileage': float('nan')}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'mileage': 'inf'}], 'advice': 'y'},
+    {'summary': 'x', 'days': [{'day': 'Monday', 'time_min': float('inf')}], 'advice': 'y'},
+])
+def test_validate_rejects_malformed(data):
+    with pytest.raises(PlanValidationError):
+        validate_plan(data)
+
+
+def test_json_round_trip_and_markdown():
+    """Canonical JSON round-trips exactly; Markdown matches the text-mode layout."""
+    plan = build_plan(_recommendation())
+    assert plan_from_json(plan_to_json(plan)) == plan
+    assert validate_plan(plan_to_json(plan)) == plan
+    assert plan_to_markdown(plan) == render_plan(_recommendation())
+
+    parsed = parse_plan(plan_to_markdown(plan))
+    assert parsed['rows'] == [row[:5] for row in plan_table_rows(plan)]
+
+
+def test_structured_plan_is_cached_as_json(tmp_path):
+    """The validated plan is cached and a hit returns an identical object."""
+    print("\n" + "="*80)
+    print("TEST: structured plan generation and caching")
+    print("="*80)
+
+    model = StubModel()
+    cache = ResponseCache(tmp_path / 'cache.sqlite')
+    handler = LLMHandler(model=model, cache=cache)
+
+    plan = handler.get_structured_plan(_recommendation())
+    assert handler.last_source == 'llm'
+    assert plan.days[3].notes == '10 min warm-up'
+    again = handler.get_structured_plan(_recommendation())
+    assert again == plan and handler.last_source == 'cache'
+    assert model.calls == 1
+
+    # Text and structured plans for the same runner are cached separately
+    assert handler.get_friendly_plan(_recommendation()).startswith("This week mixes")
+    assert model.calls == 2
+    print(f"✓ {sum(day.mileage or 0 for day in plan.days):g} planned miles, cached as JSON")
+
+
+def test_invalid_json_falls_back_to_template():
+    """A response that fails validation gives the template plan, or raises without fallback."""
+    rec = _recommendation()
+    handler = LLMHandler(model=JsonModel('{"summary": "x"}'), cache=None)
+    assert handler.get_structured_plan(rec) == build_plan(rec)
+    assert handler.last_source == 'template'
+
+    strict = LLMHandler(model=JsonModel('{"summary": "x"}'), cache=None, fallback=False)
+    with pytest.raises(GenerationError):
+        strict.get_structured_plan(rec)
+
+
+def test_async_structured_plan_retries_invalid_json():
+    """The async path validates each attempt and retries invalid responses."""
+    responses = iter(['{"oops": true}', json.dumps(
+        {'summary': 's', 'days': [{'day': 'Monday', 'activity': 'Rest'}], 'advice': 'a'})])
+
+    class FlakyJson:
+        async def generate_content_async(self, prompt, generation_config=None):
+            return type('Response', (), {'text': next(responses)})()
+
+    handler = AsyncLLMHandler(model=FlakyJson(), cache=None, max_retries=1, backoff=0.001)
+    plan = asyncio.run(handler.get_structured_plan_async(_recommendation()))
+    assert plan.summary == 's' and len(plan.days) == 7
+    assert handler.stats['retries'] == 1
+
+
+def test_template_backend_structured(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'template')
+    rec = _recommendation()
+    assert LLMHandler(cache=None).get_structured_plan(rec) == build_plan(rec)
@@ -0,0 +1,121 @@
+"""
+Tests for the multi-week plan simulator
+Checks the vectorized rollout against the one-week recommender and its race and scenario handling
+"""
+
+import numpy as np
+import pytest
+
+from app_resources import get_mileage_predictor, get_recommender
+from plan_simulator import PlanSimulator, make_scenarios, recovery_ratio, simulation_frame
+
+HISTORY = np.array([
+    [10.0, 11.0, 10.5, 12.0, 11.5, 12.0],
+    [25.0, 26.0, 24.0, 27.0, 28.0, 27.5],
+    [38.0, 39.0, 40.0, 41.0, 40.0, 40.0],
+    [5.0, 6.0, 5.5, 6.0, 6.5, 7.0],
+])
+CLUSTERS = np.array([0, 1, 2, 0])
+DAYS = np.array([3, 4, 3, 2])
+
+
+@pytest.fixture(scope='module')
+def simulator():
+    return PlanSimulator()
+
+
+def test_first_week_matches_single_recommendation(simulator):
+    """Week 1 is the one-week recommendation for the athlete's inputs."""
+    print("\n" + "="*80)
+    print("TEST: simulator week 1 vs get_recommendation")
+    print("="*80)
+
+    result = simulator.simulate(HISTORY, CLUSTERS, DAYS, weeks=4)
+    assert result['mileage'].shape == (4, 1, 4)
+
+    recommender = get_recommender()
+    predictor = get_mileage_predictor()
+    for i, history in enumerate(HISTORY):
+        predicted = predictor.predict(history)
+        fatigue = history[-1] / recovery_ratio(DAYS[i])
+        rec = recommender.get_recommendation(CLUSTERS[i], history[-1], predicted, fatigue, DAYS[i])
+        assert result['actions'][result['action'][i, 0, 0]] == rec['action']
+        assert result['predicted'][i, 0, 0] == pytest.approx(predicted, rel=1e-6)
+        low, high = recommender.volume_changes[rec['action']]
+        change = (result['mileage'][i, 0, 0] / history[-1] - 1) * 100
+        assert low - 1e-9 <= change <= high + 1e-9
+    print("✓ Actions and volume bands match the one-week recommender")
+
+
+def test_rollout_feeds_mileage_back(simulator):
+    """Each week's run becomes the next week's current mileage and fatigue."""
+    result = simulator.simulate(HISTORY, CLUSTERS, DAYS, weeks=3)
+    mileage, fatigue, days = result['mileage'], result['fatigue'], result['training_days']
+    for week in range(1, 3):
+        expected = mileage[:, 0, week - 1] / recovery_ratio(days[:, 0, week - 1])
+        assert fatigue[:, 0, week] == pytest.approx(expected)
+
+
+def test_stops_at_race_day_and_tapers(simulator):
+    """Athletes stop at their race; the Peak cluster tapers in the last two weeks."""
+    weeks_until_race = np.array([3, np.nan, 4, 10])
+    result = simulator.simulate(HISTORY, CLUSTERS, DAYS, goal_race_distance=13.1,
+                                weeks_until_race=weeks_until_race)
+    assert result['mileage'].shape[2] == 10
+    assert np.isnan(result['mileage'][0, 0, 3:]).all() and not np.isnan(result['mileage'][0, 0, :3]).any()
+    assert not np.isnan(result['mileage'][1, 0]).any()
+    assert (result['action'][0, 0, 3:] == -1).all()
+    assert result['weeks_until_race'][2, 0, :4].tolist() == [4, 3, 2, 1]
+
+    actions = [result['actions'][code] for code in result['action'][2, 0, :4]]
+    assert actions[2:] == ['taper', 'taper'] and 'taper' not in actions[:2]
+    assert result['mileage'][2, 0, 2] < result['mileage'][2, 0, 1]
+
+
+def test_scenarios_match_separate_runs(simulator):
+    """Simulating S scenarios at once equals simulating each one alone."""
+    scenarios = make_scenarios(adherence=[1.0, 0.5, 0.0], training_days=[np.nan, 5, np.nan])
+    combined = simulator.simulate(HISTORY, CLUSTERS, DAYS, scenarios=scenarios, weeks=6)
+    assert combined['mileage'].shape == (4, 3, 6)
+    for s in range(3):
+        alone = simulator.simulate(HISTORY, CLUSTERS, DAYS, weeks=6,
+                                   scenarios={name: values[s:s + 1] for name, values in scenarios.items()})
+        np.testing.assert_allclose(combined['mileage'][:, s], alone['mileage'][:, 0])
+
+    # Zero adherence never changes volume; the 5-day scenario overrides run days
+    assert combined['mileage'][:, 2] == pytest.approx(np.repeat(HISTORY[:, -1:], 6, axis=1))
+    assert (combined['training_days'][:, 1, 0] == 5).all()
+    with pytest.raises(ValueError):
+        make_scenarios(speed=[1.0])
+
+
+def test_build_consistency_adds_a_day(simulator):
+    """A runner told to add a training day runs one more day the following week."""
+    result = simulator.simulate(HISTORY[3:], CLUSTERS[3:], DAYS[3:], weeks=3)
+    first = result['actions'][result['action'][0, 0, 0]]
+    assert first == 'build_consistency'
+    assert result['training_days'][0, 0, :2].tolist() == [2, 3]
+
+
+def test_simulation_frame_drops_post_race_weeks(simulator):
+    """The long-format table has one row per simulated week with action names."""
+    result = simulator.simulate(HISTORY, CLUSTERS, DAYS, goal_race_distance=6.2,
+                                weeks_until_race=np.array([2, 4, 4, 4]),
+                                scenarios=make_scenarios(adherence=[1.0, 0.8]))
+    frame = simulation_frame(result, athletes=[11, 12, 13, 14])
+    assert len(frame) == 2 * (2 + 4 + 4 + 4)
+    assert frame.groupby('athlete')['week'].max().to_dict() == {11: 2, 12: 4, 13: 4, 14: 4}
+    assert set(frame['action']) <= set(result['actions'])
+
+
+def test_simulate_weekly_uses_latest_history(simulator):
+    """Roster simulation starts each athlete from their latest 6 weeks."""
+    from roster_plans import latest_weeks, read_weekly
+
+    weekly = read_weekly('data/featured-data.csv')
+    weekly = weekly[weekly['athlete'].isin(weekly['athlete'].unique()[:10])]
+    athletes, result = simulator.simulate_weekly(weekly, weeks=2)
+    latest, mileage = latest_weeks(weekly)
+    assert list(athletes) == list(latest.index[latest['weeks'] == 6])
+    first = mileage[latest['weeks'].to_numpy() == 6]
+    assert result['predicted'][:, 0, 0] == pytest.approx(get_mileage_predictor().predict_batch(first))
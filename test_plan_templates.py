@@ -0,0 +1,159 @@
+"""
+Tests for the template plan renderer
+Checks the layout the app parses, mileage arithmetic and LLMHandler failover
+"""
+
+import time
+
+import pytest
+
+from llm_handler import AsyncLLMHandler, LLMHandler
+from llm_http import StubModel
+from plan_parser import parse_plan
+from plan_templates import (ACTION_NAMES, action_code, action_name, render_plan, target_mileage, volume_changes,
+                            weekly_sessions)
+from recommender import RunningRecommender
+
+COLUMNS = ['Day', 'Activity', 'Mileage (mi)', 'Time (min)', 'Pace']
+
+
+def _scenarios():
+    recommender = RunningRecommender()
+    for cluster in (0, 1, 2):
+        for days in range(1, 8):
+            for fatigue in (10.0, 35.0, 55.0):
+                for race in ((None, None), (13.1, 1), (26.2, 12)):
+                    yield recommender.get_recommendation(cluster, 20.0, 23.0, fatigue, days, *race)
+
+
+def test_every_scenario_parses():
+    """All clusters, day counts, fatigue levels and race phases give a full week."""
+    print("\n" + "="*80)
+    print("TEST: template plans across scenarios")
+    print("="*80)
+
+    count = 0
+    for rec in _scenarios():
+        plan = parse_plan(render_plan(rec))
+        assert plan['columns'] == COLUMNS
+        assert [row[0] for row in plan['rows']][0] == 'Monday' and len(plan['rows']) == 7
+        runs = [row for row in plan['rows'] if row[2]]
+        assert len(runs) == min(int(rec['training_days']), 7)
+        assert plan['summary'].strip() and plan['advice'].strip()
+        count += 1
+    print(f"✓ {count} scenarios render and parse")
+
+
+@pytest.mark.parametrize('days', range(1, 8))
+def test_day_mileage_sums_to_target(days):
+    """Run-day mileage adds up to the weekly target within rounding."""
+    rec = RunningRecommender().get_recommendation(1, 30.0, 32.0, 10.0, days)
+    miles = [float(row[2]) for row in parse_plan(render_plan(rec))['rows'] if row[2]]
+    assert sum(miles) == pytest.approx(target_mileage(rec), abs=0.25 * days + 1e-9)
+
+
+def test_recovery_caps_volume_and_drops_quality():
+    """Recovery actions cut below the current week and keep every run easy."""
+    rec = RunningRecommender().get_recommendation(2, 40.0, 44.0, 60.0, 5)
+    assert rec['action'] == 'mandatory_recovery'
+    assert target_mileage(rec) == pytest.approx(40.0 * 0.70)
+    assert set(weekly_sessions(rec)) <= {None, 'easy', 'long'}
+
+    # Display names from the app's action_map are understood too
+    rec['action'] = 'Mandatory Recovery'
+    assert target_mileage(rec) == pytest.approx(40.0 * 0.70)
+
+
+def test_taper_reduces_volume_and_drops_quality():
+    """A taper plans 20-40% below the current week, as its volume advice says."""
+    rec = RunningRecommender().get_recommendation(2, 38.0, 44.0, 20.0, 5, 13.1, 2)
+    assert rec['action'] == 'taper'
+    assert target_mileage(rec) == pytest.approx(38.0 * 0.80)
+    assert set(weekly_sessions(rec)) <= {None, 'easy', 'long'}
+
+
+def test_app_display_names_render_like_codes():
+    """A rec whose action the app replaced with its display name plans the same week."""
+    rec = RunningRecommender().get_recommendation(2, 38.0, 40.0, 20.0, 5, 13.1, 2)
+    shown = dict(rec, action=action_name(rec['action']))
+    assert shown['action'] == 'Taper Phase'
+    assert target_mileage(shown) == pytest.approx(38.0 * 0.80)
+    assert render_plan(shown) == render_plan(rec)
+
+    for code, name in ACTION_NAMES.items():
+        assert action_code(name) == code and action_name(code) == name
+    for code in volume_changes():
+        rec = dict(rec, action=code, predicted_mileage=rec['current_mileage'] * 2)
+        assert target_mileage(dict(rec, action=action_name(code))) == pytest.approx(target_mileage(rec))
+
+
+def test_build_consistency_holds_volume():
+    """'Maintain current volume' plans the current week, not the predicted increase."""
+    rec = RunningRecommender().get_recommendation(0, 10.0, 14.0, 10.0, 2)
+    assert rec['action'] == 'build_consistency'
+    assert target_mileage(rec) == pytest.approx(10.0)
+
+
+def test_bands_come_from_the_rule_table():
+    """Edited volume_change_pct bands change the planned mileage."""
+    rec = RunningRecommender().get_recommendation(2, 38.0, 44.0, 20.0, 5, 13.1, 2)
+    assert target_mileage(rec, {'taper': (-50.0, -50.0)}) == pytest.approx(19.0)
+    assert target_mileage(rec, {}) == pytest.approx(44.0)
+
+
+def test_quality_sessions_follow_cluster():
+    """Foundation runs easy, Cruiser adds a tempo, Peak adds intervals and tempo."""
+    recommender = RunningRecommender()
+    sessions = {c: weekly_sessions(recommender.get_recommendation(c, 20.0, 21.0, 5.0, 5))
+                for c in (0, 1, 2)}
+    assert 'tempo' not in sessions[0] and 'interval' not in sessions[0]
+    assert sessions[1].count('tempo') == 1 and 'interval' not in sessions[1]
+    assert sessions[2].count('tempo') == 1 and sessions[2].count('interval') == 1
+    assert sessions[2][6] == 'long'
+
+
+def test_renders_in_well_under_10ms():
+    rec = RunningRecommender().get_recommendation(2, 30.0, 33.0, 25.0, 5, 13.1, 6)
+    start = time.perf_counter()
+    for _ in range(100):
+        render_plan(rec)
+    assert (time.perf_counter() - start) / 100 < 0.01
+
+
+def test_missing_api_key_uses_template(monkeypatch):
+    """Without GEMINI_API_KEY the handler renders locally instead of raising."""
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    monkeypatch.delenv('LLM_BACKEND', raising=False)
+    rec = RunningRecommender().get_recommendation(0, 10.0, 11.0, 10.0, 3)
+
+    handler = LLMHandler(cache=None)
+    assert handler.get_friendly_plan(rec) == render_plan(rec)
+    assert handler.last_source == 'template'
+    assert list(handler.stream_friendly_plan(rec)) == [render_plan(rec)]
+
+    with pytest.raises(ValueError):
+        LLMHandler(cache=None, fallback=False)
+
+
+def test_failover_on_errors():
+    """Gemini failures fall back to the template in every generation path."""
+    rec = RunningRecommender().get_recommendation(1, 20.0, 21.0, 15.0, 4)
+    expected = render_plan(rec)
+
+    handler = LLMHandler(model=StubModel(failure_rate=1.0), cache=None)
+    assert handler.get_friendly_plan(rec) == expected
+    assert list(handler.stream_friendly_plan(rec)) == [expected]
+
+    async_handler = AsyncLLMHandler(model=StubModel(failure_rate=1.0), cache=None,
+                                    max_retries=1, backoff=0.001)
+    assert async_handler.get_friendly_plans([rec, rec]) == [expected, expected]
+    assert async_handler.last_source == 'template'
+
+
+def test_template_backend(monkeypatch):
+    """LLM_BACKEND=template uses the renderer as the fast path."""
+    monkeypatch.setenv('LLM_BACKEND', 'template')
+    rec = RunningRecommender().get_recommendation(1, 20.0, 21.0, 15.0, 4)
+    handler = LLMHandler(cache=None)
+    assert handler.model is None
+    assert handler.get_friendly_plan(rec) == render_plan(rec)
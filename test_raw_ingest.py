@@ -0,0 +1,87 @@
+"""
+Tests for raw activity ingestion
+Checks the fixed-format parser and vectorized filters against feature_engineering.clean_runs
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import clean_runs, read_raw_runs
+from raw_ingest import (CLEANED_COLUMNS, byte_ranges, civil_to_datetime, clean_raw_runs, ingest,
+                        parse_raw_bytes)
+
+RAW_PATH = 'data/raw-data-kaggle.csv'
+HEADER = 'athlete;gender;timestamp;distance (m);elapsed time (s);elevation gain (m);average heart rate (bpm)\n'
+
+
+@pytest.fixture(scope='module')
+def expected():
+    return clean_runs(read_raw_runs(RAW_PATH)).reset_index(drop=True)
+
+
+def test_matches_clean_runs(expected):
+    """Same rows, values and order as the notebook's cleaning."""
+    print("\n" + "="*80)
+    print("TEST: raw ingestion vs clean_runs")
+    print("="*80)
+
+    runs = ingest(RAW_PATH, workers=1)
+    assert runs.columns.tolist() == CLEANED_COLUMNS
+    assert runs['gender'].dtype == 'category'
+    pd.testing.assert_frame_equal(runs.astype({'gender': object}), expected)
+    print(f"✓ {len(runs)} clean runs identical to clean_runs")
+
+
+def test_directory_chunks_and_workers(expected, tmp_path):
+    """A directory split into many byte ranges over a pool gives the same table."""
+    lines = open(RAW_PATH).read().splitlines(keepends=True)
+    body = lines[1:]
+    half = len(body) // 2
+    (tmp_path / 'a.csv').write_text(lines[0] + ''.join(body[:half]))
+    (tmp_path / 'b.csv').write_text(lines[0] + ''.join(body[half:]))
+    (tmp_path / 'notes.txt').write_text("ignored")
+
+    ranges = byte_ranges(tmp_path / 'a.csv', chunk_bytes=100_000)
+    assert len(ranges) > 5 and all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    runs = ingest(tmp_path, workers=2, chunk_bytes=100_000)
+    pd.testing.assert_frame_equal(runs.astype({'gender': object}), expected)
+
+
+def test_fixed_format_timestamps():
+    """Timestamps match pandas' parse, including leap days and day-first dates."""
+    text = ['29/02/2020 23:59', '01/03/2020 00:00', '12/01/2019 07:05', '31/12/1999 12:30']
+    parts = np.array([[int(t[0:2]), int(t[3:5]), int(t[6:10]), int(t[11:13]), int(t[14:16])] for t in text])
+    day, month, year, hour, minute = parts.T
+    parsed = civil_to_datetime(year, month, day, hour, minute)
+    np.testing.assert_array_equal(parsed, pd.to_datetime(text, format='%d/%m/%Y %H:%M').to_numpy())
+
+    with pytest.raises(ValueError, match='Invalid timestamp'):
+        civil_to_datetime([2019], [2], [29], [10], [0])
+
+
+def test_bad_rows_raise(tmp_path):
+    """Malformed rows and foreign files are errors, not silent NaNs."""
+    with pytest.raises(ValueError):
+        parse_raw_bytes(b'1;M;2019-12-15 09:08;2965.8;812;17.4;150.3\n')
+    with pytest.raises(ValueError):
+        parse_raw_bytes(b'1;M;15/13/2019 09:08;2965.8;812;17.4;150.3\n')
+
+    (tmp_path / 'other.csv').write_text("a,b\n1,2\n")
+    with pytest.raises(ValueError, match='not a raw activity export'):
+        ingest(tmp_path / 'other.csv')
+
+    (tmp_path / 'empty.csv').write_text(HEADER)
+    assert ingest(tmp_path / 'empty.csv').columns.tolist() == CLEANED_COLUMNS
+
+
+def test_max_distance_filter():
+    """The optional 50-mile cap removes only the long runs."""
+    data = (HEADER + '1;F;15/12/2019 09:08;90000;30000;10;150\n'
+            '1;F;16/12/2019 09:08;10000;3000;10;0\n').encode()
+    runs = parse_raw_bytes(data.split(b'\n', 1)[1])
+    assert len(clean_raw_runs(runs)) == 2
+    capped = clean_raw_runs(runs, max_distance_miles=50)
+    assert capped['distance (m)'].tolist() == [10000]
+    assert np.isnan(capped['average heart rate (bpm)'].iloc[0])
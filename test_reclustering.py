@@ -0,0 +1,132 @@
+"""
+Tests for warm-started re-clustering
+Checks label stability across refits and that ClusterAssigner keeps the recommender mapping
+"""
+
+import json
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from cluster_assignment import KMEANS_TO_RECOMMENDER, ClusterAssigner, load_label_map
+from reclustering import match_labels, refit, roster_profiles, uncovered_clusters, write_artifacts
+from recommender import RULES_PATH, RunningRecommender
+
+
+@pytest.fixture(scope='module')
+def profiles():
+    return roster_profiles(pd.read_csv('data/featured-data.csv'))
+
+
+@pytest.fixture
+def current(tmp_path):
+    """A copy of the deployed models and profiles to refit from."""
+    for name in ('kmeans_model.pkl', 'clustering_scaler.pkl'):
+        shutil.copy(f'models/{name}', tmp_path / name)
+    shutil.copy('data/cluster_profiles.json', tmp_path / 'cluster_profiles.json')
+    return tmp_path
+
+
+def _assigner(directory):
+    return ClusterAssigner(directory / 'kmeans_model.pkl', directory / 'clustering_scaler.pkl',
+                           profiles_path=directory / 'cluster_profiles.json')
+
+
+def test_refit_keeps_labels_and_names(profiles, current):
+    """Refitting the shipped roster at k=3 keeps every label's profile and rules."""
+    print("\n" + "="*80)
+    print("TEST: warm-started MiniBatchKMeans refit")
+    print("="*80)
+
+    result = refit(profiles, workers=1, models_dir=current, profiles_path=current / 'cluster_profiles.json')
+    saved = pd.read_csv('data/athlete_profiles_clustered_k3.csv', index_col=0).set_index('athlete')['cluster']
+    agreement = (result['labels'] == saved.reindex(profiles.index).to_numpy()).mean()
+    assert agreement > 0.95
+
+    old = json.load(open('data/cluster_profiles.json'))
+    for label, entry in result['profiles'].items():
+        assert entry['name'] == old[label]['name']
+        assert entry['recommender_cluster_id'] == KMEANS_TO_RECOMMENDER[int(label)]
+    assert sum(entry['num_athletes'] for entry in result['profiles'].values()) == len(profiles)
+    assert max(result['centroid_shift']) < 0.5
+    print(f"✓ {agreement:.1%} of athletes keep their label; centroid shifts "
+          f"{np.round(result['centroid_shift'], 2).tolist()}")
+
+
+def test_labels_follow_previous_model(profiles, current):
+    """If the saved labels were in another order, the refit follows that order."""
+    permutation = [2, 0, 1]
+    kmeans = joblib.load(current / 'kmeans_model.pkl')
+    kmeans.cluster_centers_ = kmeans.cluster_centers_[permutation]
+    joblib.dump(kmeans, current / 'kmeans_model.pkl')
+    old = json.load(open('data/cluster_profiles.json'))
+    permuted = {str(i): {**old[str(p)], 'recommender_cluster_id': KMEANS_TO_RECOMMENDER[p]}
+                for i, p in enumerate(permutation)}
+    json.dump(permuted, open(current / 'cluster_profiles.json', 'w'))
+    before = _assigner(current).assign(profiles)['cluster_id']
+
+    result = refit(profiles, workers=1, models_dir=current, profiles_path=current / 'cluster_profiles.json')
+    assert [result['profiles'][str(i)]['name'] for i in range(3)] == [permuted[str(i)]['name'] for i in range(3)]
+    write_artifacts(result, current, current / 'cluster_profiles.json')
+    after = _assigner(current).assign(profiles)['cluster_id']
+    assert (before == after).mean() > 0.95
+
+
+def test_new_k_records_recommender_ids(profiles, current):
+    """A larger k keeps the old labels, appends new ones and maps them to rules."""
+    result = refit(profiles, k=5, k_range=range(2, 6), workers=2, models_dir=current,
+                   profiles_path=current / 'cluster_profiles.json')
+    assert [row['k'] for row in result['sweep']] == [2, 3, 4, 5]
+    assert all(-1 <= row['silhouette'] <= 1 for row in result['sweep'])
+    assert result['model'].cluster_centers_.shape == (5, 6)
+
+    old = json.load(open('data/cluster_profiles.json'))
+    assert [result['profiles'][str(i)]['name'] for i in range(3)] == [old[str(i)]['name'] for i in range(3)]
+    assert np.isnan(result['centroid_shift'][3:]).all()
+    assert {entry['recommender_cluster_id'] for entry in result['profiles'].values()} <= {0, 1, 2}
+
+    write_artifacts(result, current, current / 'cluster_profiles.json')
+    assert set(load_label_map(current / 'cluster_profiles.json')) == set(range(5))
+    assert set(_assigner(current).assign(profiles)['kmeans_label']) <= set(range(5))
+
+
+def test_match_labels():
+    """Matching is by nearest centroid, with unmatched clusters appended."""
+    previous = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+    centers = np.array([[0.0, 9.0], [20.0, 20.0], [1.0, 0.0], [9.0, 1.0]])
+    order, matched = match_labels(centers, previous)
+    assert order.tolist() == [2, 3, 0, 1] and matched.tolist() == [0, 1, 2, -1]
+
+    order, matched = match_labels(centers[[0, 2]], previous)
+    assert order.tolist() == [1, 0] and matched.tolist() == [0, 2]
+
+
+def test_unmapped_labels_raise(current):
+    """A model with labels the recommender map doesn't cover is rejected."""
+    kmeans = joblib.load(current / 'kmeans_model.pkl')
+    kmeans.cluster_centers_ = np.vstack([kmeans.cluster_centers_, kmeans.cluster_centers_[:1] + 1])
+    joblib.dump(kmeans, current / 'kmeans_model.pkl')
+    with pytest.raises(ValueError, match='No recommender cluster_id'):
+        _assigner(current)
+
+
+def test_smaller_k_is_not_deployed(profiles, current):
+    """k below the rule table's clusters would leave a recommender cluster_id unreachable."""
+    result = refit(profiles, k=2, workers=1, models_dir=current, profiles_path=current / 'cluster_profiles.json')
+    assert len(result['profiles']) == 2
+    assert len(uncovered_clusters(result)) == 1
+    before = {path.name: path.read_bytes() for path in current.iterdir()}
+    with pytest.raises(ValueError, match='without a label'):
+        write_artifacts(result, current, current / 'cluster_profiles.json')
+    assert {path.name: path.read_bytes() for path in current.iterdir()} == before
+
+    # The recommender's cluster_ids come from the rule table, not the profile file's labels
+    json.dump(result['profiles'], open(current / 'k2_profiles.json', 'w'))
+    recommender = RunningRecommender(current / 'k2_profiles.json', rules_path=RULES_PATH)
+    for cluster_id in (0, 1, 2):
+        assert recommender.get_recommendation(cluster_id, 30, 32, 20, 4)['cluster_id'] == cluster_id
+    with pytest.raises(KeyError):
+        recommender.get_recommendation(3, 30, 32, 20, 4)
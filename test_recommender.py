@@ -5,6 +5,11 @@ Tests all cluster types and edge cases
 
 from recommender import RunningRecommender
 import json
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
 
 
 def print_recommendation(rec, title):
@@ -279,6 +284,164 @@ def test_edge_cases():
     print_recommendation(rec3, "EDGE CASE 3: Very High Mileage (50 miles)")
 
 
+def _scenario_grid():
+    """Inputs covering every rule branch, boundary and race phase."""
+    return list(itertools.product(
+        [0, 1, 2],                          # cluster_id
+        [0.0, 10.0, 24.9, 30.0],            # current mileage
+        [0.95, 1.0, 1.01, 1.1, 1.13, 1.2],  # predicted / current
+        [20.0, 25.0, 30.0, 40.0, 46.0],     # fatigue
+        [2, 3, 5],                          # training days
+        [None, 13.1, 10.0],                 # goal race distance
+        [None, 1, 2, 6, 8, 12],             # weeks until race
+    ))
+
+
+def test_batch_matches_single():
+    """Batch recommendations must match the per-athlete path row for row."""
+    recommender = RunningRecommender()
+    
+    print("\n" + "#"*80)
+    print("# TESTING BATCH RECOMMENDATIONS")
+    print("#"*80)
+    
+    rows = []
+    for cluster, mileage, ratio, fatigue, days, distance, weeks in _scenario_grid():
+        rows.append({
+            "cluster_id": cluster,
+            "current_weekly_mileage": mileage,
+            "predicted_next_week_mileage": mileage * ratio,
+            "current_fatigue_index": fatigue,
+            "training_days_per_week": days,
+            "goal_race_distance": distance,
+            "weeks_until_race": weeks,
+        })
+    batch = recommender.get_recommendations_batch(pd.DataFrame(rows))
+    batch_rows = pd.DataFrame(batch).to_dict("records")
+    print(f"Compared {len(rows)} scenarios")
+    
+    for kwargs, row in zip(rows, batch_rows):
+        rec = recommender.get_recommendation(**kwargs)
+        for key in batch:
+            expected = rec.get(key)
+            actual = row[key]
+            if key == "caution_flags":
+                assert list(actual) == expected, (kwargs, key)
+            elif expected is None:
+                assert pd.isna(actual), (kwargs, key)
+            elif isinstance(expected, str):
+                assert actual == expected, (kwargs, key)
+            else:
+                assert math.isclose(actual, expected, abs_tol=1e-9), (kwargs, key)
+
+
+def test_batch_column_arrays():
+    """Batch API accepts plain column arrays and broadcasts scalars."""
+    recommender = RunningRecommender()
+    result = recommender.get_recommendations_batch(
+        cluster_id=[0, 1, 2],
+        current_weekly_mileage=[10.0, 22.0, 38.0],
+        predicted_next_week_mileage=[11.5, 25.0, 40.0],
+        current_fatigue_index=[8.5, 32.0, 36.0],
+        training_days_per_week=[2, 3, 4],
+        goal_race_distance=13.1,
+        weeks_until_race=[np.nan, np.nan, 2]
+    )
+    assert list(result["action"]) == ["build_consistency", "recovery_week", "reduce_volume"]
+    assert pd.isna(result["goal_race"][0])
+    assert result["goal_race"][2] == "Half Marathon"
+    assert "TAPER PHASE" in result["race_specific_advice"][2]
+
+
+def _legacy_action(cluster, mileage, predicted, fatigue, days, weeks):
+    """The original hard-coded if-chains, kept as the reference behavior."""
+    change_pct = (predicted - mileage) / mileage * 100 if mileage > 0 else 0
+    if cluster == 0:
+        if days < 3:
+            return "build_consistency"
+        elif fatigue > 20:
+            return "recovery_focus"
+        elif change_pct > 15:
+            return "slow_progression"
+        return "gradual_build"
+    if cluster == 1:
+        if fatigue > 30:
+            return "recovery_week"
+        elif abs(change_pct) < 2 and mileage < 25:
+            return "progressive_overload"
+        elif change_pct > 12:
+            return "moderate_increase"
+        return "balanced_progression"
+    if fatigue > 45:
+        return "mandatory_recovery"
+    elif fatigue > 35:
+        return "reduce_volume"
+    elif weeks and weeks <= 2:
+        return "taper"
+    elif mileage >= 30:
+        return "maintain_or_build"
+    return "progressive_build"
+
+
+def _legacy_race_phase(weeks):
+    """The original race phase thresholds."""
+    if weeks <= 2:
+        return "TAPER PHASE"
+    elif weeks <= 8:
+        return "PEAK TRAINING"
+    return "BASE BUILDING"
+
+
+def test_rule_table_matches_legacy_rules():
+    """The compiled rule table reproduces the original hard-coded rules."""
+    recommender = RunningRecommender()
+    
+    print("\n" + "#"*80)
+    print("# TESTING RULE TABLE EQUIVALENCE")
+    print("#"*80)
+    
+    for cluster, mileage, ratio, fatigue, days, distance, weeks in _scenario_grid():
+        rec = recommender.get_recommendation(
+            cluster_id=cluster,
+            current_weekly_mileage=mileage,
+            predicted_next_week_mileage=mileage * ratio,
+            current_fatigue_index=fatigue,
+            training_days_per_week=days,
+            goal_race_distance=distance,
+            weeks_until_race=weeks
+        )
+        expected = _legacy_action(cluster, mileage, mileage * ratio, fatigue, days, weeks)
+        assert rec['action'] == expected, (cluster, mileage, ratio, fatigue, days, weeks)
+        if distance and weeks:
+            assert rec['race_specific_advice'].strip().startswith(_legacy_race_phase(weeks))
+        else:
+            assert 'race_specific_advice' not in rec
+    print(f"Checked {len(_scenario_grid())} scenarios against the legacy rules")
+
+
+def test_custom_rule_table(tmp_path):
+    """Coaches can retune thresholds through the rule table alone."""
+    with open('data/recommendation_rules.json', encoding='utf-8') as f:
+        table = json.load(f)
+    # Make Foundation Builders more fatigue-sensitive: 20 -> 15
+    table['clusters']['0']['rules'][1]['when'] = {'fatigue': {'gt': 15}}
+    rules_path = tmp_path / 'rules.json'
+    rules_path.write_text(json.dumps(table), encoding='utf-8')
+    
+    default = RunningRecommender()
+    tuned = RunningRecommender(rules_path=rules_path)
+    kwargs = dict(
+        cluster_id=0,
+        current_weekly_mileage=12.0,
+        predicted_next_week_mileage=13.0,
+        current_fatigue_index=18.0,
+        training_days_per_week=3
+    )
+    assert default.get_recommendation(**kwargs)['action'] == 'gradual_build'
+    assert tuned.get_recommendation(**kwargs)['action'] == 'recovery_focus'
+    assert list(tuned.get_recommendations_batch(**kwargs)['action']) == ['recovery_focus']
+
+
 def run_all_tests():
     """Run all test suites."""
     print("\n" + "="*80)
@@ -301,6 +464,13 @@ def run_all_tests():
         test_edge_cases()
         print("\n✅ Edge case tests passed!")
         
+        test_batch_matches_single()
+        test_batch_column_arrays()
+        print("\n✅ Batch recommendation tests passed!")
+        
+        test_rule_table_matches_legacy_rules()
+        print("\n✅ Rule table equivalence tests passed!")
+        
         print("\n" + "="*80)
         print("🎉 ALL TESTS PASSED!")
         print("="*80)
@@ -0,0 +1,148 @@
+"""
+Tests for roster plan generation
+Checks batch scoring against the single-athlete path, sharding and resume after interruption
+"""
+
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_resources import get_mileage_predictor, get_recommender
+from recommender import RunningRecommender
+from roster_plans import (WEEKLY_PATH, completed_athletes, generate_roster_plans, latest_weeks, main,
+                          parse_shard, read_weekly, shard_mask)
+
+
+@pytest.fixture(scope='module')
+def weekly():
+    weekly = read_weekly('data/featured-data.csv')
+    athletes = weekly['athlete'].unique()[:24]
+    return weekly[weekly['athlete'].isin(athletes)]
+
+
+def _read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_match_single_athlete_path(weekly, tmp_path):
+    """Batch scoring gives the same recommendation as predicting and recommending one athlete."""
+    print("\n" + "="*80)
+    print("TEST: roster plans vs single-athlete recommendations")
+    print("="*80)
+
+    output = tmp_path / 'plans.jsonl'
+    summary = generate_roster_plans(weekly, output, chunk_size=7)
+    records = _read(output)
+    assert summary['written'] == len(records) == weekly['athlete'].nunique()
+
+    recommender = get_recommender()
+    predictor = get_mileage_predictor()
+    for record in records[:5]:
+        rec = record['recommendation']
+        predicted = predictor.predict(record['recent_mileage'])
+        expected = recommender.get_recommendation(rec['cluster_id'], record['recent_mileage'][-1], predicted,
+                                                  rec['current_fatigue'], rec['training_days'])
+        assert rec['predicted_mileage'] == pytest.approx(predicted, rel=1e-6)
+        assert rec['action'] == expected['action']
+        assert rec['caution_flags'] == expected['caution_flags']
+        assert isinstance(record['profile_outlier'], bool)
+        assert len(record['plan']['days']) == 7
+    print(f"✓ {len(records)} athletes scored in {summary['seconds']:.2f}s")
+
+
+def test_latest_weeks_takes_most_recent_history():
+    """The window is each athlete's last weeks in date order, left-padded when short."""
+    weekly = pd.DataFrame({
+        'athlete': [1] * 8 + [2] * 2,
+        # Athlete 1's rows are out of order; mileage equals the month
+        'timestamp': pd.to_datetime([f'2020-{m:02d}-06' for m in range(8, 0, -1)] + ['2020-01-06', '2020-01-13']),
+        'weekly_mileage': [8, 7, 6, 5, 4, 3, 2, 1, 10, 11],
+        'fatigue_index': [8.0, 1, 1, 1, 1, 1, 1, 1, 1, 2.0],
+        'actual_training_days': [4, 3, 3, 3, 3, 3, 3, 3, 3, 9],
+    })
+    latest, mileage = latest_weeks(weekly)
+    assert list(latest.index) == [1, 2]
+    assert list(latest['weeks']) == [6, 2]
+    assert mileage[0].tolist() == [3, 4, 5, 6, 7, 8]
+    assert np.isnan(mileage[1, :4]).all() and mileage[1, 4:].tolist() == [10, 11]
+    assert latest['week'].iloc[0] == pd.Timestamp('2020-08-06')
+    assert latest['fatigue'].tolist() == [8.0, 2.0]
+    assert latest['training_days'].tolist() == [4, 7]
+
+
+def test_short_history_gets_error_record(weekly, tmp_path):
+    """Athletes with fewer than 6 weeks are recorded as errors so a resume doesn't retry them."""
+    short = weekly[weekly['athlete'] == weekly['athlete'].iloc[0]].head(3)
+    output = tmp_path / 'plans.jsonl'
+    generate_roster_plans(short, output)
+    record, = _read(output)
+    assert 'needs 6 weeks' in record['error']
+    assert 'recommendation' not in record
+
+
+def test_shards_partition_the_roster(weekly, tmp_path):
+    """Shards are disjoint, cover every athlete and don't depend on input order."""
+    athletes = weekly['athlete'].unique()
+    masks = [shard_mask(athletes, i, 3) for i in range(3)]
+    assert (np.sum(masks, axis=0) == 1).all()
+    shuffled = athletes[::-1]
+    assert set(shuffled[shard_mask(shuffled, 1, 3)]) == set(athletes[masks[1]])
+
+    seen = []
+    for i in range(3):
+        generate_roster_plans(weekly, tmp_path / f'shard-{i}.jsonl', shard=(i, 3))
+        seen += [record['athlete'] for record in _read(tmp_path / f'shard-{i}.jsonl')]
+    assert sorted(seen) == sorted(athletes.tolist())
+
+    assert parse_shard('2/8') == (2, 8)
+    for bad in ('3/3', '1', 'a/b', '0/0'):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_resume_skips_finished_athletes(weekly, tmp_path):
+    """An interrupted file (torn last line) is repaired and only missing athletes are scored."""
+    full = tmp_path / 'full.jsonl'
+    generate_roster_plans(weekly, full)
+    lines = full.read_text().splitlines(keepends=True)
+
+    partial = tmp_path / 'partial.jsonl'
+    partial.write_text(''.join(lines[:10]) + lines[10][:40])
+    assert len(completed_athletes(partial)) == 10
+
+    summary = generate_roster_plans(weekly, partial)
+    assert summary['skipped'] == 10
+    assert summary['written'] == len(lines) - 10
+    assert sorted(partial.read_text().splitlines()) == sorted(line.rstrip('\n') for line in lines)
+
+
+def test_process_pool_matches_in_process(weekly, tmp_path):
+    """Pool workers produce the same records, in the same order."""
+    generate_roster_plans(weekly, tmp_path / 'inline.jsonl', chunk_size=5)
+    generate_roster_plans(weekly, tmp_path / 'pool.jsonl', chunk_size=5, workers=2)
+    assert _read(tmp_path / 'inline.jsonl') == _read(tmp_path / 'pool.jsonl')
+
+
+def test_parquet_input_matches_csv(weekly, tmp_path):
+    """Parquet and CSV inputs give identical output."""
+    athletes = weekly['athlete'].unique()[:4]
+    subset = weekly[weekly['athlete'].isin(athletes)]
+    subset.to_csv(tmp_path / 'weekly.csv', index=False)
+    subset.to_parquet(tmp_path / 'weekly.parquet', index=False)
+    generate_roster_plans(tmp_path / 'weekly.csv', tmp_path / 'csv.jsonl', plans='none')
+    generate_roster_plans(tmp_path / 'weekly.parquet', tmp_path / 'parquet.jsonl', plans='none')
+    assert _read(tmp_path / 'csv.jsonl') == _read(tmp_path / 'parquet.jsonl')
+    assert 'plan' not in _read(tmp_path / 'csv.jsonl')[0]
+
+
+def test_cli_runs_outside_the_repository(tmp_path, monkeypatch):
+    """The CLI and RunningRecommender find the shipped data from any working directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', ['roster_plans.py', '--plans', 'none'])
+    main()
+    assert len(_read(tmp_path / 'roster_plans.jsonl')) == read_weekly(WEEKLY_PATH)['athlete'].nunique()
+    assert RunningRecommender().get_recommendation(1, 20.0, 22.0, 20.0, 4)['cluster_id'] == 1
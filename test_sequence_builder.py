@@ -0,0 +1,105 @@
+"""
+Tests for the LSTM sequence builder
+Checks vectorized windows against the notebook loop and the .npy cache behaviour
+"""
+
+import numpy as np
+import pandas as pd
+
+from sequence_builder import build_sequences, cache_key, load_sequences
+
+
+def _load_weekly():
+    weekly = pd.read_csv('data/featured-data.csv', usecols=['athlete', 'timestamp', 'weekly_mileage'])
+    weekly['timestamp'] = pd.to_datetime(weekly['timestamp'])
+    return weekly
+
+
+def _notebook_sequences(weekly, lookback=6):
+    """create_sequences from notebooks/lstm_model.ipynb, looped over athletes."""
+    athlete_weeks = weekly.groupby('athlete').size()
+    valid_athletes = athlete_weeks[athlete_weeks >= lookback + 1].index
+
+    X_all, y_all = [], []
+    for athlete_id in valid_athletes:
+        data = weekly[weekly['athlete'] == athlete_id].sort_values('timestamp')['weekly_mileage'].values
+        X, y = [], []
+        for i in range(len(data) - lookback):
+            X.append(data[i:i + lookback])
+            y.append(data[i + lookback])
+        if len(X) > 0:
+            X_all.append(np.array(X))
+            y_all.append(np.array(y))
+    return np.concatenate(X_all), np.concatenate(y_all)
+
+
+def test_matches_notebook_loop():
+    """Same windows and targets, in the same order, as the notebook."""
+    print("\n" + "="*80)
+    print("TEST: vectorized windows vs notebook loop")
+    print("="*80)
+
+    weekly = _load_weekly()
+    X, y = _notebook_sequences(weekly)
+    sequences = build_sequences(weekly)
+
+    np.testing.assert_array_equal(sequences['X'], X)
+    np.testing.assert_array_equal(sequences['y'], y)
+    assert X.shape == (13548, 6)
+    print(f"✓ {len(X):,} windows match")
+
+
+def test_athlete_index_and_target_week():
+    """Each window records its athlete and the week it predicts."""
+    weekly = _load_weekly()
+    sequences = build_sequences(weekly)
+
+    lookup = weekly.set_index(['athlete', 'timestamp'])['weekly_mileage']
+    keys = pd.MultiIndex.from_arrays([sequences['athlete'], pd.to_datetime(sequences['target_week'])])
+    np.testing.assert_array_equal(lookup.loc[keys].to_numpy(), sequences['y'])
+
+
+def test_short_histories_are_skipped():
+    """Athletes with fewer than lookback + 1 weeks produce no windows."""
+    weekly = pd.DataFrame({
+        'athlete': [1] * 3 + [2] * 8,
+        'timestamp': list(pd.date_range('2020-01-06', periods=3, freq='W-MON'))
+                     + list(pd.date_range('2020-01-06', periods=8, freq='W-MON')),
+        'weekly_mileage': np.arange(11, dtype=float),
+    })
+    sequences = build_sequences(weekly)
+    assert sequences['X'].shape == (2, 6)
+    assert set(sequences['athlete']) == {2}
+    assert build_sequences(weekly[weekly['athlete'] == 1])['X'].shape == (0, 6)
+
+
+def test_cache_is_memory_mapped_and_reused(tmp_path):
+    """A cache hit returns read-only memmaps of the saved windows."""
+    source = tmp_path / 'weekly.csv'
+    _load_weekly().to_csv(source, index=False)
+
+    first = load_sequences(source, cache_dir=tmp_path / 'cache')
+    entries = list((tmp_path / 'cache').iterdir())
+    second = load_sequences(source, cache_dir=tmp_path / 'cache')
+
+    assert len(entries) == 1
+    assert isinstance(second['X'], np.memmap)
+    assert not second['X'].flags.writeable
+    np.testing.assert_array_equal(first['X'], second['X'])
+    np.testing.assert_array_equal(second['X'], build_sequences(_load_weekly())['X'])
+
+
+def test_cache_key_tracks_source_data(tmp_path):
+    """Editing the data or the window settings changes the key."""
+    weekly = _load_weekly()
+    source = tmp_path / 'weekly.csv'
+    weekly.to_csv(source, index=False)
+    key = cache_key(source)
+
+    assert cache_key(source, lookback=4) != key
+    assert cache_key(weekly) == cache_key(weekly.copy())
+
+    weekly.loc[0, 'weekly_mileage'] += 1
+    assert cache_key(weekly) != cache_key(_load_weekly())
+    weekly.to_csv(source, index=False)
+    assert cache_key(source) != key
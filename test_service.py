@@ -0,0 +1,172 @@
+"""
+Tests for the recommendation service
+Exercises the HTTP endpoints in-process against the offline stub model
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("starlette")
+httpx = pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient
+
+import service
+from llm_handler import AsyncLLMHandler
+from llm_http import HttpModel, StubModel, create_stub_app
+from recommender import RunningRecommender
+from service import create_app
+
+ATHLETE = {
+    'cluster_id': 1,
+    'current_weekly_mileage': 20.0,
+    'predicted_next_week_mileage': 22.0,
+    'current_fatigue_index': 20.0,
+    'training_days_per_week': 4,
+}
+
+
+@pytest.fixture(scope='module')
+def client():
+    handler = AsyncLLMHandler(model=StubModel(), cache=None)
+    with TestClient(create_app(llm_handler=handler)) as client:
+        yield client
+
+
+def test_recommend_matches_recommender(client):
+    """The endpoint returns exactly what RunningRecommender returns."""
+    print("\n" + "="*80)
+    print("TEST: /recommend")
+    print("="*80)
+
+    response = client.post('/recommend', json=ATHLETE)
+    assert response.status_code == 200
+    expected = RunningRecommender().get_recommendation(1, 20.0, 22.0, 20.0, 4)
+    assert response.json() == expected
+    print("✓ Recommendation matches the library call")
+
+
+def test_recommend_derives_fields_from_history(client):
+    """recent_mileage fills in current mileage, the prediction and the cluster."""
+    athlete = {'recent_mileage': [18, 19, 20, 21, 20, 22], 'current_fatigue_index': 20.0,
+               'training_days_per_week': 4}
+    rec = client.post('/recommend', json=athlete).json()
+    predicted = client.post('/predict-mileage', json={'recent_mileage': athlete['recent_mileage']}).json()
+
+    assert rec['current_mileage'] == 22
+    assert rec['predicted_mileage'] == pytest.approx(predicted['predicted_mileage'])
+    assert rec['cluster_id'] in (0, 1, 2)
+
+
+def test_batch_matches_single_requests(client):
+    """Vectorized batch results equal the per-athlete endpoint, including races."""
+    athletes = [dict(ATHLETE, cluster_id=i % 3, current_fatigue_index=10.0 + 5 * i) for i in range(6)]
+    athletes[2].update(goal_race_distance=13.1, weeks_until_race=2)
+    athletes[4] = {'recent_mileage': [10, 12, 11, 13, 12, 14], 'current_fatigue_index': 25.0,
+                   'training_days_per_week': 3}
+
+    batch = client.post('/recommend/batch', json={'athletes': athletes}).json()['recommendations']
+    single = [client.post('/recommend', json=athlete).json() for athlete in athletes]
+    assert len(batch) == len(athletes)
+    for got, expected in zip(batch, single):
+        for field, value in expected.items():
+            if isinstance(value, float):
+                assert got[field] == pytest.approx(value), field
+            else:
+                assert got[field] == value, field
+    assert batch[0]['goal_race'] is None
+
+
+def test_predict_mileage_batch(client):
+    """Sequences are predicted in one call and agree with single predictions."""
+    sequences = [[10, 11, 12, 13, 14, 15], [30, 28, 32, 31, 29, 30]]
+    batch = client.post('/predict-mileage', json={'sequences': sequences}).json()['predicted_mileage']
+    single = [client.post('/predict-mileage', json={'recent_mileage': s}).json()['predicted_mileage']
+              for s in sequences]
+    assert batch == pytest.approx(single, rel=1e-5)
+
+
+def test_plan_formats(client):
+    """/plan returns the structured plan by default and Markdown on request."""
+    structured = client.post('/plan', json=ATHLETE).json()
+    assert structured['source'] == 'llm'
+    assert [day['day'] for day in structured['plan']['days']][0] == 'Monday'
+    assert len(structured['plan']['days']) == 7
+
+    markdown = client.post('/plan', json=dict(ATHLETE, format='markdown')).json()
+    assert '| Day |' in markdown['plan']
+    assert markdown['recommendation']['action'] == structured['recommendation']['action']
+
+
+def test_invalid_requests_return_422(client):
+    """Missing or malformed fields are client errors, not server errors."""
+    cases = [
+        ('/recommend', {'current_fatigue_index': 20.0, 'training_days_per_week': 4}),
+        ('/recommend', dict(ATHLETE, cluster_id=5)),
+        ('/recommend', dict(ATHLETE, current_fatigue_index='high')),
+        ('/recommend/batch', {'athletes': []}),
+        ('/predict-mileage', {'recent_mileage': [1, 2, 3]}),
+        ('/plan', dict(ATHLETE, format='pdf')),
+    ]
+    for path, body in cases:
+        response = client.post(path, json=body)
+        assert response.status_code == 422, (path, body)
+        assert 'error' in response.json()
+    assert client.post('/recommend', content=b'not json').status_code == 422
+
+
+def test_model_calls_run_off_the_event_loop(client, monkeypatch):
+    """Recommender and predictor calls run in the thread pool, not on the event loop."""
+    calls = []
+
+    def outside_loop(get):
+        def wrapped():
+            try:
+                asyncio.get_running_loop()
+                calls.append('event loop')
+            except RuntimeError:
+                calls.append('thread pool')
+            return get()
+        return wrapped
+
+    monkeypatch.setattr(service, 'get_recommender', outside_loop(service.get_recommender))
+    monkeypatch.setattr(service, 'get_mileage_predictor', outside_loop(service.get_mileage_predictor))
+    client.post('/recommend', json=ATHLETE)
+    client.post('/recommend/batch', json={'athletes': [ATHLETE]})
+    client.post('/predict-mileage', json={'recent_mileage': [18, 19, 20, 21, 20, 22]})
+    client.post('/plan', json=dict(ATHLETE, format='markdown'))
+    assert calls == ['thread pool'] * 4
+
+
+def test_health_reports_resident_models(client):
+    """Models are loaded at startup and reported by /health."""
+    health = client.get('/health').json()
+    assert {'recommender', 'mileage_predictor', 'cluster_assigner'} <= set(health['resources'])
+    assert health['llm']['model'] == 'StubModel'
+
+
+def test_http_model_reuses_pooled_client():
+    """HttpModel round-trips through the stub server on one shared client."""
+    print("\n" + "="*80)
+    print("TEST: pooled HTTP LLM client")
+    print("="*80)
+
+    stub = StubModel()
+    model = HttpModel(base_url='http://stub', transport=httpx.ASGITransport(app=create_stub_app(stub)))
+    handler = AsyncLLMHandler(model=model, cache=None)
+    recs = [RunningRecommender().get_recommendation(i % 3, 10.0 + i, 11.0 + i, 15.0, 4) for i in range(5)]
+
+    async def run():
+        plans = await handler.get_friendly_plans_async(recs)
+        structured = await handler.get_structured_plan_async(recs[0])
+        clients = list(model._async_clients.values())
+        await model.aclose()
+        return plans, structured, clients
+
+    plans, structured, clients = asyncio.run(run())
+    assert all('stub plan' in plan for plan in plans)
+    assert len(structured.days) == 7
+    assert stub.calls == 6
+    assert len(clients) == 1
+    print(f"✓ {stub.calls} calls over one pooled client")
@@ -0,0 +1,126 @@
+"""
+Tests for the similar-runners index
+Checks inverted-file search against brute force, memory mapping and incremental adds
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender import RunningRecommender
+from similar_runners import SimilarRunnersIndex, get_index, window_vectors
+
+
+@pytest.fixture(scope='module')
+def weekly():
+    return pd.read_csv('data/featured-data.csv', parse_dates=['timestamp'])
+
+
+@pytest.fixture(scope='module')
+def index(weekly, tmp_path_factory):
+    return SimilarRunnersIndex.build(weekly, tmp_path_factory.mktemp('index') / 'similar_runners')
+
+
+def _brute_force(index, query, k):
+    vectors = np.concatenate([np.asarray(s['vectors']) for s in index.segments]).astype(np.float64)
+    distances = np.sqrt(((vectors - query) ** 2).sum(axis=1))
+    return np.sort(distances)[:k]
+
+
+def test_exact_search_matches_brute_force(index):
+    """nprobe=None returns the true k nearest windows."""
+    print("\n" + "="*80)
+    print("TEST: Exact similar-runners search vs brute force")
+    print("="*80)
+
+    rng = np.random.default_rng(0)
+    vectors = np.asarray(index.segments[0]['vectors'])
+    for row in rng.choice(len(vectors), 20, replace=False):
+        query = vectors[row] + rng.normal(0, 0.1, vectors.shape[1]).astype(np.float32)
+        found = index.search(query, k=10, nprobe=None)
+        np.testing.assert_allclose(found['distance'], _brute_force(index, query, 10), rtol=1e-4, atol=1e-4)
+    print(f"✓ Exact search over {len(index)} windows matches brute force")
+
+
+def test_probed_search_recall(index):
+    """The default nprobe finds most of the true neighbors."""
+    rng = np.random.default_rng(1)
+    vectors = np.asarray(index.segments[0]['vectors'])
+    recalls = []
+    for row in rng.choice(len(vectors), 50, replace=False):
+        exact = index.search(vectors[row], k=20, nprobe=None)['distance']
+        probed = index.search(vectors[row], k=20)['distance']
+        recalls.append(np.mean(probed <= exact[-1] + 1e-6))
+    assert np.mean(recalls) > 0.9
+
+
+def test_loads_memory_mapped(index):
+    """Reopening maps the segment arrays instead of reading them."""
+    reopened = SimilarRunnersIndex(index.path)
+    assert isinstance(reopened.segments[0]['vectors'], np.memmap)
+    assert len(reopened) == len(index)
+    assert get_index().lookback == index.lookback
+
+
+def test_incremental_add_matches_full_build(weekly, tmp_path):
+    """Adding athletes later gives the same neighbors as indexing them up front; repeats are skipped."""
+    athletes = weekly['athlete'].unique()
+    first, later = weekly[weekly['athlete'].isin(athletes[:80])], weekly[weekly['athlete'].isin(athletes[80:])]
+    full = SimilarRunnersIndex.build(weekly, tmp_path / 'full')
+    grown = SimilarRunnersIndex.build(first, tmp_path / 'grown')
+
+    added = grown.add_weekly(later)
+    assert added == len(full) - len(SimilarRunnersIndex(tmp_path / 'grown').segments[0]['next'])
+    assert grown.add_weekly(later) == 0
+    assert len(SimilarRunnersIndex(tmp_path / 'grown')) == len(full)
+
+    query = grown.query_vector([20, 22, 21, 24, 23, 25], 4)
+    expected = full.search(query, k=15, nprobe=None)
+    np.testing.assert_allclose(grown.search(query, k=15, nprobe=None)['distance'], expected['distance'], rtol=1e-5)
+
+    grown.compact()
+    reopened = SimilarRunnersIndex(tmp_path / 'grown')
+    assert len(reopened.segments) == 1 and len(reopened) == len(full)
+    np.testing.assert_allclose(reopened.search(query, k=15, nprobe=None)['distance'], expected['distance'],
+                               rtol=1e-5)
+
+
+def test_exclude_athlete_and_summary(weekly, index):
+    """An athlete's own windows can be left out; the summary reports their next weeks."""
+    vectors, payload = window_vectors(weekly, index._mean, index._scale)
+    athlete = payload['athlete'][0]
+    found = index.search(vectors[0], k=10, nprobe=None)
+    assert found['athlete'][0] == athlete and found['distance'][0] == pytest.approx(0, abs=1e-5)
+    assert athlete not in index.search(vectors[0], k=10, nprobe=None, exclude_athlete=athlete)['athlete']
+
+    summary = index.similar([30, 32, 31, 33, 35, 34], 5, k=25)
+    assert summary['k'] == 25
+    quantiles = list(summary['next_week_mileage'].values())
+    assert quantiles == sorted(quantiles) and list(summary['next_week_mileage']) == ['p10', 'p25', 'p50', 'p75', 'p90']
+    with pytest.raises(ValueError):
+        index.similar([30, 32], 5)
+
+
+def test_recommender_attaches_similar_runners(index):
+    """The recommendation carries the similar runners' next-week distribution."""
+    rec = RunningRecommender().get_recommendation_with_similar_runners(
+        cluster_id=1, recent_mileage=[20, 21, 22, 21, 23, 24], predicted_next_week_mileage=25,
+        current_fatigue_index=1.0, training_days_per_week=4, k=15, index=index)
+    assert rec['current_mileage'] == 24
+    assert rec['similar_runners']['k'] == 15
+    assert 'p50' in rec['similar_runners']['next_week_mileage']
+
+
+def test_recommender_uses_the_given_empty_index():
+    """An index passed in is used even when it is empty (and so falsy)."""
+    class EmptyIndex:
+        def __len__(self):
+            return 0
+
+        def similar(self, recent_mileage, training_days, pace_km=None, k=20):
+            return {'k': 0, 'athletes': 0, 'next_week_mileage': {}, 'change_pct': {}}
+
+    rec = RunningRecommender().get_recommendation_with_similar_runners(
+        cluster_id=1, recent_mileage=[20, 21, 22, 21, 23, 24], predicted_next_week_mileage=25,
+        current_fatigue_index=1.0, training_days_per_week=4, index=EmptyIndex())
+    assert rec['similar_runners']['k'] == 0